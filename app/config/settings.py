@@ -3,7 +3,7 @@ Application settings and configuration
 """
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 import os
 
 
@@ -22,20 +22,97 @@ class Settings(BaseSettings):
     
     # Data Configuration
     listings_file_path: str = "listings.json"
-    
+    # Memory-mapped at startup instead of parsing listings_file_path when built from it
+    # (build with `python -m app.services.compiled_listings_builder`)
+    compiled_listings_path: str = "listings.bin"
+    # Compile compiled_listings_path on startup when missing or stale (once, whichever worker gets there first)
+    # and memory-map it in every worker, so all workers share one read-only copy of the dataset
+    shared_dataset: bool = False
+    # Where the dataset is served from: "json" reads listings_file_path (or its compiled form) into memory;
+    # "sqlite" opens sqlite_database_path and reads location blocks on demand, keeping at most
+    # sqlite_cache_locations hot locations in memory (build with `python -m app.services.sqlite_listings_builder`).
+    # The sharded search engine always loads listings_file_path.
+    storage_backend: Literal["json", "sqlite"] = "json"
+    sqlite_database_path: str = "listings.db"
+    sqlite_cache_locations: int = 16384
+    # Watch the storage backend's file (listings_file_path or sqlite_database_path) and swap in a new snapshot
+    # when it changes
+    hot_reload_enabled: bool = False
+    reload_interval_seconds: float = 2.0
+    # Bearer token for the listing upsert/delete endpoints; they answer 403 while unset. Changes are applied
+    # in memory per process (a reload or restart serves the storage backend's dataset again)
+    listings_api_token: Optional[str] = None
+    max_listing_changes: int = 1000  # upserts + deletes per request
+    # Once this many locations are overlaid by changes, fold them into a fresh in-memory snapshot
+    listing_compaction_locations: int = 10000
+
     # Business Rules
     max_vehicles_per_request: int = 5
+    # Total quantity allowed on /search/fleet, which packs vehicles a block of equal rounded lengths at a time
+    fleet_max_vehicles: int = 500
+    # Keep lane table entries for fleets of fleet_max_vehicles rather than max_vehicles_per_request, so fleet
+    # searches never fall back to packing a location's columns; costs memory where locations hold many listings
+    fleet_lane_tables: bool = False
     vehicle_width: int = 10  # Fixed width in feet
     max_response_time_ms: int = 300
+    # "greedy": cheapest price-per-lane heuristic; "exact": minimum total price (branch and bound)
+    packing_solver: Literal["greedy", "exact"] = "greedy"
+    # "local": search in the request's process; "sharded": scatter to a pool of shard workers
+    search_engine: Literal["local", "sharded"] = "local"
+    search_workers: int = 0  # 0 = one shard worker per CPU
+    # /search pagination: page size when only a cursor is given, and the largest allowed limit
+    search_default_limit: int = 20
+    search_max_limit: int = 1000
+    max_batch_queries: int = 500  # queries per /search/batch request
+    # Searches run on a bounded thread pool off the event loop: at most search_max_in_flight at once and
+    # search_max_queue waiting; one that cannot start within max_response_time_ms is shed with 503,
+    # and a full queue answers 429
+    search_max_in_flight: int = 2
+    search_max_queue: int = 32
+    # Serve plain /search requests without pydantic (hand validation, results encoded straight to JSON bytes)
+    fast_search_enabled: bool = False
+    # Compress responses of at least compression_min_bytes for clients sending Accept-Encoding br (with the
+    # brotli package installed) or gzip
+    compression_enabled: bool = False
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
     
     # Performance
+    # Load the dataset, build its derived indexes and search warmup_queries (/search bodies, as a JSON list)
+    # on a background thread at startup; /ready answers 503 until that has finished
+    warmup_enabled: bool = True
+    warmup_queries: List[List[Dict[str, int]]] = [
+        [{"length": 10, "quantity": 1}],
+        [{"length": 20, "quantity": 2}],
+        [{"length": 25, "quantity": 1}, {"length": 10, "quantity": 2}],
+        [{"length": 40, "quantity": 5}],
+    ]
     enable_caching: bool = True
     cache_ttl_seconds: int = 3600
-    
+    cache_max_entries: int = 4096
+    # Precomputed answers (build with `python -m app.services.answer_table_builder`)
+    answer_table_path: str = "answer_table.bin"
+
+    # Profiling: /search?debug=..., /admin/profile and /admin/memory answer 403 until profiling_api_token is set,
+    # and then need it as a bearer token
+    profiling_api_token: Optional[str] = None
+    profiling_max_seconds: float = 60.0  # longest /admin/profile run
+    profiling_sample_interval_ms: float = 5.0
+    profiling_top_functions: int = 25  # functions listed by /search?debug=profile
+    # Trace Python allocations from startup with this many frames per traceback, for /admin/memory
+    # (0 = off; tracing slows allocation-heavy code down noticeably)
+    tracemalloc_frames: int = 0
+
     class Config:
         env_file = ".env"
         case_sensitive = False
     
+    @property
+    def lane_table_depth(self) -> int:
+        """Most vehicles per search the lane tables are compiled for"""
+        return self.fleet_max_vehicles if self.fleet_lane_tables else self.max_vehicles_per_request
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Override with environment variables if they exist
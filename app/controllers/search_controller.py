@@ -2,12 +2,25 @@
 Search controller for handling API requests
 """
 
+import tracemalloc
 from fastapi import HTTPException, status
-from typing import List
-from ..models.vehicle import Vehicle
+from functools import partial
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional, Tuple
+from ..models.vehicle import FleetVehicle, Vehicle
+from ..models.listing import Listing
+from ..models.listing_changes import ListingChangeResult
 from ..models.search_result import SearchResult
+from ..models.batch_search import BatchSearchResponse
 from ..services.search_service import SearchService
 from ..services.listing_service import ListingService
+from ..services.sharded_search import ShardedSearchEngine
+from ..services.listing_reloader import ListingReloader
+from ..services.warmup import WarmUp
+from ..utils.search_executor import SearchExecutor, SearchRejected
+from ..utils.profiling import (
+    ProfilerBusy, RequestTrace, SamplingProfiler, process_rss, profile_call, structure_memory, tracemalloc_report
+)
 from ..config.settings import settings
 
 
@@ -17,8 +30,82 @@ class SearchController:
     """
     
     def __init__(self):
+        if settings.tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            # Before the dataset loads, so its allocations are traced too
+            tracemalloc.start(settings.tracemalloc_frames)
         self.listing_service = ListingService()
         self.search_service = SearchService(self.listing_service)
+        self.search_service.load_answer_table(settings.answer_table_path)
+        if settings.search_engine == "sharded":
+            self.search_service.attach_sharded_engine(ShardedSearchEngine.with_default_workers(
+                self.listing_service.listings_file_path,
+                settings.search_workers,
+                self.search_service.packing_solver,
+                self.listing_service.compiled_listings_path,
+            ))
+        # Searches run here, never on the event loop
+        self.executor = SearchExecutor(
+            settings.search_max_in_flight,
+            settings.search_max_queue,
+            settings.max_response_time_ms / 1000,
+            self.search_service.metrics,
+        )
+        self.profiler = SamplingProfiler()
+        self.reloader = None
+        if settings.hot_reload_enabled:
+            self.reloader = ListingReloader(self.listing_service, settings.reload_interval_seconds).start()
+        self.warmup = None
+        if settings.warmup_enabled:
+            self.warmup = WarmUp(self.search_service, settings.warmup_queries, settings.fast_search_enabled).start()
+        self._register_gauges()
+    
+    @property
+    def ready(self) -> bool:
+        """Whether the startup warm-up has finished (always, when it is disabled)"""
+        return self.warmup is None or self.warmup.ready
+    
+    def _register_gauges(self):
+        """Expose dataset and cache state on /metrics; read only when scraped"""
+        registry = self.search_service.metrics.registry
+        listing_service = self.listing_service
+        search_service = self.search_service
+        
+        def snapshot_value(read):
+            return lambda: read(listing_service.snapshot) if listing_service.snapshot is not None else None
+        
+        def cache_value(key):
+            return lambda: search_service.result_cache.stats()[key] if search_service.result_cache is not None else None
+        
+        registry.gauge_callback("dataset_listings", "Listings in the current snapshot", snapshot_value(lambda s: len(s.store)))
+        registry.gauge_callback("dataset_locations", "Locations in the current snapshot", snapshot_value(lambda s: s.store.location_count))
+        registry.gauge_callback("dataset_version", "Version of the current snapshot", snapshot_value(lambda s: s.version))
+        registry.gauge_callback("dataset_build_seconds", "Time taken to build the current snapshot", snapshot_value(lambda s: s.build_seconds))
+        registry.gauge_callback("dataset_loaded_timestamp_seconds", "When the current snapshot was loaded", snapshot_value(lambda s: s.loaded_at))
+        registry.gauge_callback("result_cache_entries", "Entries in the result cache", cache_value("entries"))
+        registry.counter_callback("result_cache_hits_total", "Result cache hits", cache_value("hits"))
+        registry.counter_callback("result_cache_misses_total", "Result cache misses", cache_value("misses"))
+        registry.counter_callback("result_cache_evictions_total", "Result cache LRU evictions", cache_value("evictions"))
+        registry.gauge_callback("search_executor_queue_depth", "Searches waiting for an executor thread", lambda: self.executor.queued)
+        registry.gauge_callback("search_executor_in_flight", "Searches running on the executor", lambda: self.executor.in_flight)
+        registry.gauge_callback("ready", "1 once the startup warm-up has finished", lambda: 1 if self.ready else 0)
+        registry.gauge_callback(
+            "warmup_duration_seconds", "Time the startup warm-up took (load, indexes and warm-up queries)",
+            lambda: self.warmup.duration_seconds if self.warmup is not None else None,
+        )
+        registry.gauge_callback(
+            "answer_table_loaded", "1 if a precomputed answer table is attached",
+            lambda: 1 if search_service.answer_table is not None else 0,
+        )
+    
+    def close(self):
+        """Release background resources (warm-up and reloader threads, search threads, shard workers)"""
+        if self.warmup is not None:
+            self.warmup.stop()
+        if self.reloader is not None:
+            self.reloader.stop()
+        self.executor.shutdown()
+        if self.search_service.sharded_engine is not None:
+            self.search_service.sharded_engine.close()
     
     async def search_vehicles(self, vehicles: List[Vehicle]) -> List[SearchResult]:
         """
@@ -34,9 +121,197 @@ class SearchController:
             HTTPException: If search fails
         """
         try:
-            results = self.search_service.search_locations(vehicles)
+            results = await self.executor.run(self.search_service.search_locations, vehicles)
             return results
             
+        except SearchRejected as e:
+            raise self._rejected(e)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Internal server error: {str(e)}"
+            )
+    
+    async def search_vehicles_page(
+        self,
+        vehicles: List[Vehicle],
+        limit: Optional[int],
+        cursor: Optional[str],
+    ) -> Tuple[List[SearchResult], Optional[str]]:
+        """
+        Handle a paginated vehicle search request
+        
+        Args:
+            vehicles: List of vehicles to search for
+            limit: Page size, defaults to ``settings.search_default_limit``
+            cursor: Cursor of the previous page, None for the first page
+            
+        Returns:
+            Tuple[List[SearchResult], Optional[str]]: Page of results and the next page's cursor
+            
+        Raises:
+            HTTPException: If search fails
+        """
+        try:
+            return await self.executor.run(
+                self.search_service.search_page, vehicles, limit or settings.search_default_limit, cursor
+            )
+            
+        except SearchRejected as e:
+            raise self._rejected(e)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Internal server error: {str(e)}"
+            )
+    
+    async def search_vehicles_batch(self, queries: List[List[Vehicle]]) -> BatchSearchResponse:
+        """
+        Handle batch vehicle search request
+        
+        Args:
+            queries: One list of vehicles per search
+            
+        Returns:
+            BatchSearchResponse: Per-query results and timings
+            
+        Raises:
+            HTTPException: If the batch is invalid or the search fails
+        """
+        try:
+            return await self.executor.run(self.search_service.search_batch, queries)
+            
+        except SearchRejected as e:
+            raise self._rejected(e)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Internal server error: {str(e)}"
+            )
+    
+    async def search_fleet(
+        self,
+        vehicles: List[FleetVehicle],
+        limit: Optional[int],
+        cursor: Optional[str],
+    ) -> Tuple[List[SearchResult], Optional[str]]:
+        """
+        Handle a fleet search request
+        
+        Args:
+            vehicles: Fleet vehicle types and their quantities
+            limit: Page size; with ``cursor`` None and ``limit`` None all results are returned
+            cursor: Cursor of the previous page
+            
+        Returns:
+            Tuple[List[SearchResult], Optional[str]]: Results and the next page's cursor
+            
+        Raises:
+            HTTPException: If search fails
+        """
+        if cursor is not None and limit is None:
+            limit = settings.search_default_limit
+        try:
+            return await self.executor.run(self.search_service.search_fleet, vehicles, limit, cursor)
+            
+        except SearchRejected as e:
+            raise self._rejected(e)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Internal server error: {str(e)}"
+            )
+    
+    async def search_json(self, vehicles: List[Tuple[int, int]], media_type: str, fields: Tuple[str, ...]) -> bytes:
+        """
+        Run a fast-path search on the executor
+        
+        Args:
+            vehicles: Hand-validated (length, quantity) pairs
+            media_type: Negotiated wire format
+            fields: Result fields to include
+            
+        Returns:
+            bytes: Encoded /search response body
+            
+        Raises:
+            SearchRejected: If admission control sheds the search
+            ValueError: If input validation fails
+        """
+        return await self.executor.run(self.search_service.search_json, vehicles, media_type, fields)
+    
+    @staticmethod
+    def _rejected(error: SearchRejected) -> HTTPException:
+        """HTTP error for a shed search; clients should back off before retrying"""
+        return HTTPException(
+            status_code=error.status_code,
+            detail=error.detail,
+            headers={"Retry-After": "1"}
+        )
+    
+    async def search_vehicles_debug(
+        self,
+        vehicles: List[Vehicle],
+        limit: Optional[int],
+        cursor: Optional[str],
+        profile: bool,
+    ) -> Dict[str, Any]:
+        """
+        Handle a vehicle search request that also reports where its time went
+        
+        The search runs like any other (admission control, caches, answer
+        table) but records its stages into a ``RequestTrace``; with
+        ``profile`` it also runs under cProfile, which inflates its timings.
+        
+        Args:
+            vehicles: List of vehicles to search for
+            limit: Page size; with ``cursor`` None and ``limit`` None all results are returned
+            cursor: Cursor of the previous page
+            profile: Also return the functions the search spent most time in
+            
+        Returns:
+            Dict[str, Any]: ``results``, ``next_cursor`` and ``debug`` (stage milliseconds,
+            counters, profiler summary)
+            
+        Raises:
+            HTTPException: If search fails
+        """
+        trace = RequestTrace(self.search_service.metrics)
+        service = self.search_service.with_metrics(trace)
+        paged = limit is not None or cursor is not None
+        if paged:
+            search = partial(service.search_page, vehicles, limit or settings.search_default_limit, cursor)
+        else:
+            search = partial(service.search_locations, vehicles)
+        
+        try:
+            if profile:
+                outcome, summary = await self.executor.run(profile_call, search, settings.profiling_top_functions)
+            else:
+                outcome, summary = await self.executor.run(search), None
+            
+        except SearchRejected as e:
+            raise self._rejected(e)
         except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -47,6 +322,115 @@ class SearchController:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Internal server error: {str(e)}"
             )
+        
+        results, next_cursor = outcome if paged else (outcome, None)
+        snapshot = self.listing_service.snapshot
+        return {
+            "results": [result.model_dump() for result in results],
+            "next_cursor": next_cursor,
+            "debug": {
+                "timings_ms": trace.timings_ms(),
+                "counts": trace.counts,
+                "dataset_version": snapshot.version if snapshot is not None else None,
+                "packing_solver": self.search_service.packing_solver,
+                "profile": summary,
+            },
+        }
+    
+    async def profile_worker(self, seconds: float, interval: float, include_idle: bool) -> Dict[str, Any]:
+        """
+        Sample this process's threads for a while, on a worker thread
+        
+        Args:
+            seconds: How long to sample
+            interval: Seconds between samples
+            include_idle: Keep stacks of threads that are only waiting
+            
+        Returns:
+            Dict[str, Any]: ``SamplingProfiler.run`` output
+            
+        Raises:
+            HTTPException: 409 if a profile is already running
+        """
+        try:
+            return await run_in_threadpool(self.profiler.run, seconds, interval, include_idle)
+        except ProfilerBusy as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=str(e)
+            )
+    
+    def _memory_report(self, top: int) -> Dict[str, Any]:
+        snapshot = self.listing_service.snapshot
+        result_cache = self.search_service.result_cache
+        structures = {
+            "listing_store": snapshot.store if snapshot is not None else None,
+            "capacity_index": snapshot.capacity_index if snapshot is not None else None,
+            "lane_tables": snapshot.lane_tables if snapshot is not None else None,
+            "dataset_stats": snapshot.stats if snapshot is not None else None,
+            "answer_table": self.search_service.answer_table,
+        }
+        samples = {}
+        if result_cache is not None:
+            samples["result_cache"] = (result_cache.sample(64), len(result_cache))
+        return {
+            "rss_bytes": process_rss(),
+            "structures": structure_memory(structures, samples),
+            "tracemalloc": tracemalloc_report(top),
+        }
+    
+    async def memory_report(self, top: int) -> Dict[str, Any]:
+        """
+        Memory held by the dataset structures and caches, plus traced allocations
+        
+        Walking the structures visits every listing id, so it runs on a
+        worker thread.
+        
+        Args:
+            top: Number of allocation sites to list when tracemalloc is on
+            
+        Returns:
+            Dict[str, Any]: Process RSS, per-structure sizes and the tracemalloc report
+        """
+        return await run_in_threadpool(self._memory_report, top)
+    
+    async def apply_listing_changes(self, upserts: List[Listing], deletes: List[str]) -> ListingChangeResult:
+        """
+        Handle a listing upsert/delete request
+        
+        Applied on a worker thread, outside the search executor so changes
+        are never shed; searches keep serving the previous snapshot meanwhile.
+        
+        Args:
+            upserts: Listings to insert or replace
+            deletes: Listing ids to remove
+            
+        Returns:
+            ListingChangeResult: Change report
+            
+        Raises:
+            HTTPException: If the batch is too large, the engine is sharded or applying fails
+        """
+        if len(upserts) + len(deletes) > settings.max_listing_changes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {settings.max_listing_changes} changes per request"
+            )
+        if self.search_service.sharded_engine is not None:
+            # Shard workers load the listings file themselves and would not see the changes
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Listing changes are not supported with the sharded search engine"
+            )
+        try:
+            report = await run_in_threadpool(self.listing_service.apply_changes, upserts, deletes)
+            return ListingChangeResult(**report)
+            
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error applying listing changes: {str(e)}"
+            )
     
     async def get_search_statistics(self, vehicles: List[Vehicle]) -> dict:
         """
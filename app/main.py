@@ -2,15 +2,26 @@
 Main FastAPI application
 """
 
-from fastapi import FastAPI, HTTPException, status
+import hmac
+import os
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List
+from pydantic import ValidationError
+from typing import List, Literal, Optional, Union
 
-from .models import Vehicle, SearchResult
+from .models import FleetVehicle, Vehicle, Listing, SearchResult, BatchSearchResponse, ListingChanges, ListingChangeResult
 from .controllers import SearchController
 from .config.settings import settings
+from .utils.metrics import (
+    SCOPE_HANDLER_ENTRY, SCOPE_STARTED, MetricsMiddleware, MetricsRegistry, mark_handler_entry, mark_handler_exit
+)
+from .utils.profiling import SamplingProfiler
+from .utils.fast_search import FastSearchMiddleware
+from .utils.compression import CompressionMiddleware, available_encodings
+from .utils.wire_formats import DEFAULT_FORMAT, ResultFormat, available_media_types, encode_rows, negotiate_media_type, parse_fields
 
 
 # Global controller instance
@@ -27,6 +38,7 @@ async def lifespan(app: FastAPI):
     search_controller = SearchController()
     yield
     # Shutdown
+    search_controller.close()
     search_controller = None
 
 
@@ -38,6 +50,12 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Pydantic-free /search; added first so CORS and metrics still wrap it
+app.add_middleware(
+    FastSearchMiddleware,
+    get_search=lambda: search_controller.search_json if search_controller and settings.fast_search_enabled else None,
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -47,6 +65,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# brotli/gzip response bodies; inside the metrics middleware, so compression counts as serialization
+app.add_middleware(
+    CompressionMiddleware,
+    get_minimum_size=lambda: settings.compression_min_bytes if settings.compression_enabled else None,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
+
+# Per-request timing for /metrics (request validation and serialization stages)
+app.add_middleware(
+    MetricsMiddleware,
+    get_metrics=lambda: search_controller.search_service.metrics if search_controller else None,
+)
+
 
 @app.get("/", tags=["Health"])
 async def health_check():
@@ -61,6 +93,26 @@ async def health_check():
     }
 
 
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """
+    Readiness probe, unlike the liveness `/`
+    
+    - 200 once the startup warm-up (dataset load, derived indexes, warm-up queries) has finished
+    - 503 while it is running or after it failed; the body carries its state and timings
+    """
+    warmup = search_controller.warmup.stats() if search_controller and search_controller.warmup else None
+    ready = search_controller is not None and search_controller.ready
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "warmup": warmup,
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+
 @app.get("/health", tags=["Health"])
 async def detailed_health_check():
     """
@@ -69,22 +121,34 @@ async def detailed_health_check():
     try:
         # Test listing service
         listing_service = search_controller.listing_service if search_controller else None
-        if listing_service:
-            listings = listing_service.get_all_listings()
-            listing_count = len(listings)
+        engine = search_controller.search_service.sharded_engine if search_controller else None
+        # Never load here: a load holds the build lock and would block the event loop
+        snapshot = listing_service.snapshot if listing_service else None
+        listing_state = None
+        if engine is not None:
+            # Shard workers hold the dataset; this process never loads it
+            listing_count = engine.listing_count
+            dataset_version = listing_service.dataset_version
+        elif snapshot is not None:
+            listing_count = snapshot.stats.listing_count
+            dataset_version = snapshot.version
         else:
             listing_count = 0
+            dataset_version = None
+            if listing_service:
+                listing_state = "loading"
         
         return {
             "status": "healthy",
             "version": settings.app_version,
             "timestamp": datetime.now().isoformat(),
             "services": {
-                "listing_service": "healthy" if listing_count > 0 else "unhealthy",
+                "listing_service": listing_state or ("healthy" if listing_count > 0 else "unhealthy"),
                 "search_service": "healthy" if search_controller else "unhealthy"
             },
             "metrics": {
                 "total_listings": listing_count,
+                "dataset_version": dataset_version,
                 "max_vehicles_per_request": settings.max_vehicles_per_request
             }
         }
@@ -95,14 +159,164 @@ async def detailed_health_check():
         )
 
 
+def _require_bearer_token(token: Optional[str], authorization: Optional[str], disabled: str) -> None:
+    """
+    Check an Authorization header against a configured token
+    
+    Raises:
+        HTTPException: 403 while ``token`` is unset, 401 if the header does not carry it
+    """
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=disabled
+        )
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing bearer token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def require_listings_token(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Bearer-token check for the listing change endpoints
+    
+    They are disabled (403) until ``settings.listings_api_token`` is set.
+    """
+    _require_bearer_token(settings.listings_api_token, authorization, "Listing changes are disabled")
+
+
+def require_profiling_token(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Bearer-token check for the profiling endpoints and debug searches
+    
+    They are disabled (403) until ``settings.profiling_api_token`` is set.
+    """
+    _require_bearer_token(settings.profiling_api_token, authorization, "Profiling is disabled")
+
+
+def _result_format(request: Request, fields: Optional[str]) -> ResultFormat:
+    """
+    Media type negotiated from the Accept header, and the ``fields`` projection
+    
+    Raises:
+        HTTPException: 400 if ``fields`` names unknown fields
+    """
+    try:
+        return negotiate_media_type(request.headers.get("accept")), parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _render_results(
+    results: List[SearchResult], result_format: ResultFormat, response: Response
+) -> Union[List[SearchResult], Response]:
+    """Results as the route returns them: the model list for the default format, else an encoded body"""
+    response.headers["Vary"] = "Accept"
+    if result_format == DEFAULT_FORMAT:
+        return results
+    rows = [(result.location_id, result.listing_ids, result.total_price_in_cents) for result in results]
+    media_type, fields = result_format
+    return Response(content=encode_rows(rows, media_type, fields), media_type=media_type, headers=dict(response.headers))
+
+
 @app.post("/search", response_model=List[SearchResult], tags=["Search"])
-async def search_vehicles(vehicles: List[Vehicle]):
+async def search_vehicles(
+    vehicles: List[Vehicle],
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.search_max_limit, description="Maximum results to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    fields: Optional[str] = Query(None, description="Comma-separated result fields to return (default: all)"),
+    debug: Optional[Literal["timings", "profile"]] = Query(
+        None, description="Wrap the results with this request's stage timings (and a profiler summary)"
+    ),
+):
     """
     Search for storage locations that can accommodate the given vehicles
     
     - **vehicles**: List of vehicles with length and quantity
     - Returns all possible locations with optimal pricing
     - Results are sorted by total price in ascending order
+    - **limit** / **cursor**: return one page; the next page's cursor is in the `X-Next-Cursor` header
+    - **fields**: project results to some fields, e.g. `location_id,total_price_in_cents`
+    - **Accept**: `application/json` (default), `application/vnd.search.columnar+json` or `application/msgpack`
+      for one array per field instead of one object per result
+    - **debug**: return `{"results", "next_cursor", "debug"}` with per-stage milliseconds, and with `profile`
+      the functions the search spent most time in; needs the profiling bearer token
+    """
+    if not search_controller:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search service not available"
+        )
+    
+    mark_handler_entry(request.scope)
+    result_format = _result_format(request, fields)
+    if debug is not None:
+        require_profiling_token(request.headers.get("authorization"))
+        report = await search_controller.search_vehicles_debug(vehicles, limit, cursor, debug == "profile")
+        started, entry = request.scope.get(SCOPE_STARTED), request.scope.get(SCOPE_HANDLER_ENTRY)
+        if started is not None and entry is not None:
+            report["debug"]["timings_ms"] = dict(
+                request_validation=round((entry - started) * 1000, 3), **report["debug"]["timings_ms"]
+            )
+        mark_handler_exit(request.scope)
+        return JSONResponse(report)
+    if limit is None and cursor is None:
+        results = await search_controller.search_vehicles(vehicles)
+    else:
+        results, next_cursor = await search_controller.search_vehicles_page(vehicles, limit, cursor)
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+    mark_handler_exit(request.scope)
+    return _render_results(results, result_format, response)
+
+
+@app.post("/search/batch", response_model=BatchSearchResponse, tags=["Search"])
+async def search_vehicles_batch(queries: List[List[Vehicle]], request: Request):
+    """
+    Run many searches in one request
+    
+    - **queries**: List of vehicle lists, each one a `/search` request body
+    - Identical queries (after rounding lengths) are searched once
+    - Returns per-query results (or a validation error) in request order, with timings
+    """
+    if not search_controller:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search service not available"
+        )
+    
+    mark_handler_entry(request.scope)
+    results = await search_controller.search_vehicles_batch(queries)
+    mark_handler_exit(request.scope)
+    return results
+
+
+@app.post("/search/fleet", response_model=List[SearchResult], tags=["Search"])
+async def search_fleet(
+    vehicles: List[FleetVehicle],
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.search_max_limit, description="Maximum results to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    fields: Optional[str] = Query(None, description="Comma-separated result fields to return (default: all)"),
+):
+    """
+    Search for storage locations for a whole fleet at once
+    
+    - **vehicles**: List of vehicles with length and quantity, up to `fleet_max_vehicles` in total
+    - Vehicles of the same rounded length are placed into lanes as one block
+    - Results are sorted by total price in ascending order, as on `/search` with the greedy solver
+    - **limit** / **cursor**: return one page; the next page's cursor is in the `X-Next-Cursor` header
+    - **fields** / **Accept**: projection and wire format, as on `/search`
     """
     if not search_controller:
         raise HTTPException(
@@ -110,7 +324,136 @@ async def search_vehicles(vehicles: List[Vehicle]):
             detail="Search service not available"
         )
     
-    return await search_controller.search_vehicles(vehicles)
+    mark_handler_entry(request.scope)
+    result_format = _result_format(request, fields)
+    results, next_cursor = await search_controller.search_fleet(vehicles, limit, cursor)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    mark_handler_exit(request.scope)
+    return _render_results(results, result_format, response)
+
+
+async def apply_listing_changes(upserts: List[Listing], deletes: List[str]) -> ListingChangeResult:
+    """Validate a change batch and apply it through the controller"""
+    if not search_controller:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service not available"
+        )
+    try:
+        changes = ListingChanges(upserts=upserts, deletes=deletes)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    return await search_controller.apply_listing_changes(changes.upserts, changes.deletes)
+
+
+@app.post("/listings/changes", response_model=ListingChangeResult, tags=["Listings"],
+          dependencies=[Depends(require_listings_token)])
+async def change_listings(changes: ListingChanges):
+    """
+    Upsert and delete listings in one atomic step
+    
+    - **upserts**: listings to insert or replace, matched by id (a changed `location_id` moves the listing)
+    - **deletes**: listing ids to remove, applied before the upserts; unknown ids are reported in `missing_ids`
+    - Only the affected locations are re-indexed; searches see either none or all of the changes
+    - Changes are held in memory by this process; a reload of the storage backend replaces them
+    """
+    return await apply_listing_changes(changes.upserts, changes.deletes)
+
+
+@app.put("/listings/{listing_id}", response_model=ListingChangeResult, tags=["Listings"],
+         dependencies=[Depends(require_listings_token)])
+async def upsert_listing(listing_id: str, listing: Listing):
+    """
+    Insert or replace one listing; the body's `id` must match the path
+    """
+    if listing.id != listing_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Listing id in the body does not match the path"
+        )
+    return await apply_listing_changes([listing], [])
+
+
+@app.delete("/listings/{listing_id}", response_model=ListingChangeResult, tags=["Listings"],
+            dependencies=[Depends(require_listings_token)])
+async def delete_listing(listing_id: str):
+    """
+    Delete one listing
+    """
+    result = await apply_listing_changes([], [listing_id])
+    if result.missing_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Listing not found: {listing_id}"
+        )
+    return result
+
+
+@app.post("/admin/profile", tags=["Profiling"], dependencies=[Depends(require_profiling_token)])
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0, le=settings.profiling_max_seconds, description="How long to sample"),
+    interval_ms: float = Query(settings.profiling_sample_interval_ms, ge=1, le=1000, description="Time between samples"),
+    idle: bool = Query(False, description="Keep stacks of threads that are only waiting"),
+):
+    """
+    Sample this worker's Python stacks and return them as a flamegraph
+    
+    - Runs for **seconds** while the worker keeps serving; only one profile runs at a time per worker (409)
+    - Returns collapsed stacks (`frame;frame;frame count` per line), the input of flamegraph.pl, inferno and
+      speedscope; `X-Profile-Samples` and `X-Profile-Pid` tell how many samples were taken and in which process
+    """
+    if not search_controller:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service not available"
+        )
+    
+    profile = await search_controller.profile_worker(seconds, interval_ms / 1000, idle)
+    return Response(
+        content=SamplingProfiler.collapsed(profile["stacks"]),
+        media_type="text/plain",
+        headers={"X-Profile-Samples": str(profile["samples"]), "X-Profile-Pid": str(os.getpid())}
+    )
+
+
+@app.get("/admin/memory", tags=["Profiling"], dependencies=[Depends(require_profiling_token)])
+async def memory_report(top: int = Query(20, ge=1, le=200, description="Allocation sites to list")):
+    """
+    Memory of this worker by structure
+    
+    - **structures**: bytes held by the listing store, capacity index, lane tables, aggregates, answer table
+      and result cache (sampled), per attribute; memory-mapped data is counted separately
+    - **tracemalloc**: top allocation sites by file and line, when started with `TRACEMALLOC_FRAMES`
+    """
+    if not search_controller:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service not available"
+        )
+    
+    return dict(await search_controller.memory_report(top), pid=os.getpid())
+
+
+@app.get("/metrics", tags=["Statistics"])
+async def get_metrics():
+    """
+    Prometheus metrics: per-stage search latency histograms, search counters,
+    dataset and cache gauges
+    """
+    if not search_controller:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service not available"
+        )
+    
+    return Response(
+        content=search_controller.search_service.metrics.render(),
+        media_type=MetricsRegistry.CONTENT_TYPE
+    )
 
 
 @app.get("/stats", tags=["Statistics"])
@@ -126,43 +469,50 @@ async def get_statistics():
                 detail="Service not available"
             )
         
-        listings = listing_service.get_all_listings()
-        location_groups = listing_service.get_listings_by_location()
-        
-        # Calculate statistics
-        total_listings = len(listings)
-        total_locations = len(location_groups)
-        
-        # Price statistics
-        prices = [listing.price_in_cents for listing in listings]
-        min_price = min(prices) if prices else 0
-        max_price = max(prices) if prices else 0
-        avg_price = sum(prices) / len(prices) if prices else 0
-        
-        # Size statistics
-        areas = [listing.area for listing in listings]
-        min_area = min(areas) if areas else 0
-        max_area = max(areas) if areas else 0
-        avg_area = sum(areas) / len(areas) if areas else 0
+        engine = search_controller.search_service.sharded_engine
+        # Never load here: a load holds the build lock and would block the event loop
+        snapshot = listing_service.snapshot
+        aggregates = dict.fromkeys(
+            ("total_listings", "total_locations", "price_statistics", "size_statistics", "listings_per_location")
+        )
+        if engine is not None:
+            # Shard workers hold the dataset, so only its counts are known in this process
+            aggregates.update(total_listings=engine.listing_count, total_locations=engine.location_count)
+            dataset = dict(engine.describe(), version=listing_service.dataset_version)
+        elif snapshot is not None:
+            # Aggregates are computed when the snapshot is built, not per request
+            aggregates = snapshot.stats.summary
+            dataset = snapshot.describe()
+        else:
+            dataset = {"status": "loading", "version": listing_service.dataset_version}
         
         return {
-            "total_listings": total_listings,
-            "total_locations": total_locations,
-            "price_statistics": {
-                "min_price_cents": min_price,
-                "max_price_cents": max_price,
-                "avg_price_cents": round(avg_price, 2),
-                "min_price_dollars": round(min_price / 100, 2),
-                "max_price_dollars": round(max_price / 100, 2),
-                "avg_price_dollars": round(avg_price / 100, 2)
-            },
-            "size_statistics": {
-                "min_area": min_area,
-                "max_area": max_area,
-                "avg_area": round(avg_area, 2)
-            },
+            "total_listings": aggregates["total_listings"],
+            "total_locations": aggregates["total_locations"],
+            "price_statistics": aggregates["price_statistics"],
+            "size_statistics": aggregates["size_statistics"],
+            "listings_per_location": aggregates["listings_per_location"],
+            "dataset": dict(
+                dataset,
+                storage=listing_service.backend.describe(),
+                reloader=search_controller.reloader.stats() if search_controller.reloader is not None else None,
+            ),
+            "result_cache": (
+                search_controller.search_service.result_cache.stats()
+                if search_controller.search_service.result_cache is not None else None
+            ),
+            "top_k_search": search_controller.search_service.top_k_stats,
+            "warmup": search_controller.warmup.stats() if search_controller.warmup is not None else None,
+            "search_executor": search_controller.executor.stats(),
+            "answer_table": (
+                search_controller.search_service.answer_table.describe()
+                if search_controller.search_service.answer_table is not None else None
+            ),
             "configuration": {
                 "max_vehicles_per_request": settings.max_vehicles_per_request,
+                "fleet_max_vehicles": settings.fleet_max_vehicles,
+                "result_media_types": available_media_types(),
+                "response_compression": available_encodings() if settings.compression_enabled else [],
                 "vehicle_width": settings.vehicle_width,
                 "max_response_time_ms": settings.max_response_time_ms
             }
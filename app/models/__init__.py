@@ -2,8 +2,12 @@
 Data models for the Multi-Vehicle Search API
 """
 
-from .vehicle import Vehicle
+from .vehicle import FleetVehicle, Vehicle
 from .listing import Listing
+from .listing_store import ListingStore
 from .search_result import SearchResult
+from .batch_search import BatchQueryResult, BatchSearchResponse
+from .listing_changes import ListingChangeResult, ListingChanges
 
-__all__ = ["Vehicle", "Listing", "SearchResult"]
\ No newline at end of file
+__all__ = ["Vehicle", "FleetVehicle", "Listing", "ListingStore", "SearchResult", "BatchQueryResult", "BatchSearchResponse",
+           "ListingChanges", "ListingChangeResult"]
\ No newline at end of file
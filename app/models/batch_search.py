@@ -0,0 +1,41 @@
+"""
+Batch search model definitions
+"""
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from .search_result import SearchResult
+
+
+class BatchQueryResult(BaseModel):
+    """
+    Represents the answer to one query of a batch search
+    """
+    results: List[SearchResult] = Field(default_factory=list, description="Search results sorted by price")
+    error: Optional[str] = Field(None, description="Validation error, if the query was rejected")
+    time_ms: float = Field(..., description="Time spent answering this query's canonical form, in milliseconds")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "results": [
+                    {
+                        "location_id": "abc123",
+                        "listing_ids": ["def456"],
+                        "total_price_in_cents": 3000
+                    }
+                ],
+                "error": None,
+                "time_ms": 0.42
+            }
+        }
+
+
+class BatchSearchResponse(BaseModel):
+    """
+    Represents the answers to a batch search, in request order
+    """
+    queries: List[BatchQueryResult] = Field(..., description="One entry per query, in request order")
+    query_count: int = Field(..., description="Number of queries in the batch")
+    unique_query_count: int = Field(..., description="Distinct canonical queries actually searched")
+    total_time_ms: float = Field(..., description="Time spent on the whole batch, in milliseconds")
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Listing change model definitions
+"""
+
+from pydantic import BaseModel, Field, field_validator
+from typing import List
+from .listing import Listing
+
+
+class ListingChanges(BaseModel):
+    """
+    Represents a batch of listing upserts and deletes
+    """
+    upserts: List[Listing] = Field(default_factory=list, description="Listings to insert or replace, matched by id")
+    deletes: List[str] = Field(default_factory=list, description="Listing ids to remove; applied before the upserts")
+
+    @field_validator("upserts")
+    @classmethod
+    def validate_upserts(cls, upserts: List[Listing]) -> List[Listing]:
+        """Reject dimensions and prices the columnar store cannot hold"""
+        for listing in upserts:
+            if not 0 < listing.length < 2 ** 31 or not 0 < listing.width < 2 ** 31:
+                raise ValueError(f"Listing {listing.id}: length and width must be positive 32-bit integers")
+            if not 0 <= listing.price_in_cents < 2 ** 63:
+                raise ValueError(f"Listing {listing.id}: price_in_cents must be a non-negative 64-bit integer")
+        return upserts
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "upserts": [
+                    {
+                        "id": "abc123",
+                        "location_id": "def456",
+                        "length": 20,
+                        "width": 10,
+                        "price_in_cents": 1500
+                    }
+                ],
+                "deletes": ["ghi789"]
+            }
+        }
+
+
+class ListingChangeResult(BaseModel):
+    """
+    Represents the outcome of applying listing changes
+    """
+    version: int = Field(..., description="Dataset version now served")
+    upserted: int = Field(..., description="Listings inserted or replaced")
+    deleted: int = Field(..., description="Listings removed")
+    missing_ids: List[str] = Field(default_factory=list, description="Deleted ids that were not found")
+    changed_locations: int = Field(..., description="Locations whose listings changed")
+    compacted: bool = Field(..., description="Whether the overlaid changes were folded into a fresh snapshot")
+    listings: int = Field(..., description="Listings in the dataset after the changes")
+    locations: int = Field(..., description="Locations in the dataset after the changes, including emptied ones")
+    apply_ms: float = Field(..., description="Time spent applying the changes, in milliseconds")
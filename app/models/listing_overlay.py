@@ -0,0 +1,243 @@
+"""
+Listing store with changed locations layered over an unchanged base store
+"""
+
+import numpy as np
+from collections.abc import Sequence
+from typing import Dict, List, Optional, Tuple
+from .listing import Listing
+from .listing_store import ListingStore
+
+
+class OverlayRows:
+    """
+    Append-only listing rows shared by every overlay over the same base store.
+
+    Row ``base_rows + i`` is entry ``i`` of the lists. Each overlay only
+    reads rows it was built with, so appending rows for a newer overlay
+    never changes what an older one sees. New locations get indices from
+    ``base_locations`` upwards the same way.
+    """
+
+    def __init__(self, base_rows: int, base_locations: int):
+        self.base_rows = base_rows
+        self.base_locations = base_locations
+        self.ids: List[str] = []
+        self.locations: List[int] = []
+        self.lengths: List[int] = []
+        self.widths: List[int] = []
+        self.prices: List[int] = []
+        self.location_ids: List[str] = []
+        self.location_lookup: Dict[str, int] = {}
+
+    def append_group(
+        self,
+        location: int,
+        ids: List[str],
+        lengths: List[int],
+        widths: List[int],
+        prices: List[int],
+    ) -> Tuple[int, int]:
+        """Append a location's listings, returning their ``[start, end)`` row range"""
+        start = self.base_rows + len(self.ids)
+        self.ids.extend(ids)
+        self.locations.extend([location] * len(ids))
+        self.lengths.extend(lengths)
+        self.widths.extend(widths)
+        self.prices.extend(prices)
+        return start, start + len(ids)
+
+    def add_location(self, location_id: str) -> int:
+        """Index of a new location"""
+        location = self.base_locations + len(self.location_ids)
+        self.location_ids.append(location_id)
+        self.location_lookup[location_id] = location
+        return location
+
+
+class _OverlayIds(Sequence):
+    """Listing ids by row, or location ids by location index, across the base store and the overlay rows"""
+
+    def __init__(self, base: Sequence, extra: List[str], base_count: int, count: int):
+        self._base = base
+        self._extra = extra
+        self._base_count = base_count
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        if index < self._base_count:
+            return self._base[index]
+        return self._extra[index - self._base_count]
+
+
+class OverlayListingStore:
+    """
+    ``ListingStore`` interface over a base store with some locations replaced.
+
+    Each changed location's listings live in a fresh row range of the shared
+    ``OverlayRows``; ``groups`` maps those locations to their range, and
+    every other location is read from the base store untouched. Location
+    indices never move: a location whose listings were all deleted stays as
+    an empty group, and new locations are numbered after the base ones.
+    Deriving the next overlay copies ``groups`` and ``moved_ids``, so the
+    cost of a change grows with the changed locations, not the dataset.
+    The NumPy columns of ``ListingStore`` are not available; ``compacted``
+    folds an overlay over a ``ListingStore`` back into one.
+    """
+
+    def __init__(
+        self,
+        base,
+        rows: OverlayRows,
+        groups: Dict[int, Tuple[int, int]],
+        moved_ids: Dict[str, Optional[int]],
+        location_count: int,
+        listing_count: int,
+    ):
+        """
+        Args:
+            base: Store the overlay is layered over (a ``ListingStore`` or ``SqliteListingStore``)
+            rows: Row storage shared with the other overlays over ``base``
+            groups: ``[start, end)`` overlay rows of every replaced location
+            moved_ids: Location now holding each listing id changed since ``base`` (None once deleted)
+            location_count: Locations, including new ones
+            listing_count: Live listings
+        """
+        self.base = base
+        self.rows = rows
+        self.groups = groups
+        self.moved_ids = moved_ids
+        self._location_count = location_count
+        self._listing_count = listing_count
+        self.ids = _OverlayIds(base.ids, rows.ids, rows.base_rows, rows.base_rows + len(rows.ids))
+        self.location_ids = _OverlayIds(base.location_ids, rows.location_ids, rows.base_locations, location_count)
+
+    @classmethod
+    def over(cls, base) -> 'OverlayListingStore':
+        """Overlay with no changes yet"""
+        return cls(base, OverlayRows(len(base), base.location_count), {}, {}, base.location_count, len(base))
+
+    def __len__(self) -> int:
+        return self._listing_count
+
+    @property
+    def location_count(self) -> int:
+        """Number of locations, including emptied ones"""
+        return self._location_count
+
+    def location_range(self, location: int) -> Tuple[int, int]:
+        """Return the ``[start, end)`` row range of a location index"""
+        group = self.groups.get(location)
+        return group if group is not None else self.base.location_range(location)
+
+    def location_columns(self, location: int) -> Tuple[int, List[int], List[int], List[int]]:
+        """Return a location's first row and its lengths, widths and prices as lists"""
+        group = self.groups.get(location)
+        if group is None:
+            return self.base.location_columns(location)
+        rows = self.rows
+        start, end = group
+        low, high = start - rows.base_rows, end - rows.base_rows
+        return start, rows.lengths[low:high], rows.widths[low:high], rows.prices[low:high]
+
+    def find_location(self, location_id: str) -> Optional[int]:
+        """Return the location index for a location_id, or None if unknown"""
+        location = self.base.find_location(location_id)
+        if location is None:
+            location = self.rows.location_lookup.get(location_id)
+            if location is not None and location >= self._location_count:
+                return None
+        return location
+
+    def find_listing(self, listing_id: str) -> Optional[int]:
+        """Return the location index holding a listing id, or None if unknown"""
+        if listing_id in self.moved_ids:
+            return self.moved_ids[listing_id]
+        return self.base.find_listing(listing_id)
+
+    def listing(self, row: int) -> Listing:
+        """Materialize a single row as a ``Listing``"""
+        rows = self.rows
+        if row < rows.base_rows:
+            return self.base.listing(row)
+        index = row - rows.base_rows
+        return Listing(
+            id=rows.ids[index],
+            location_id=self.location_ids[rows.locations[index]],
+            length=rows.lengths[index],
+            width=rows.widths[index],
+            price_in_cents=rows.prices[index],
+        )
+
+    def listings(self, start: int = 0, end: Optional[int] = None) -> List[Listing]:
+        """
+        Materialize a row range as ``Listing`` objects
+
+        Rows of replaced groups stay in the base store, so the whole store
+        (the default) is listed location by location instead of by row.
+        """
+        if start == 0 and end is None:
+            return [
+                listing
+                for location in range(self._location_count)
+                for listing in self.location_listings(location)
+            ]
+        return [self.listing(row) for row in range(start, end)]
+
+    def location_listings(self, location: int) -> List[Listing]:
+        """Materialize every listing of a location index"""
+        return self.listings(*self.location_range(location))
+
+    def compacted(self) -> ListingStore:
+        """
+        Fold the overlay into a plain ``ListingStore``
+
+        Emptied locations are dropped; the others keep their relative order,
+        so results ordered by location index do not change.
+
+        Raises:
+            TypeError: If the base store is not a ``ListingStore``
+        """
+        base = self.base
+        if not isinstance(base, ListingStore):
+            raise TypeError(f"Cannot compact an overlay over {type(base).__name__}")
+        rows = self.rows
+        extra = len(self.ids) - rows.base_rows
+
+        starts = np.zeros(self._location_count, dtype=np.int64)
+        ends = np.zeros(self._location_count, dtype=np.int64)
+        starts[:rows.base_locations] = base.location_offsets[:-1]
+        ends[:rows.base_locations] = base.location_offsets[1:]
+        if self.groups:
+            replaced = np.fromiter(self.groups, dtype=np.int64, count=len(self.groups))
+            ranges = np.array(list(self.groups.values()), dtype=np.int64)
+            starts[replaced] = ranges[:, 0]
+            ends[replaced] = ranges[:, 1]
+        kept = np.flatnonzero(ends > starts)
+        counts = ends[kept] - starts[kept]
+        offsets = np.zeros(len(kept) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        gather = np.repeat(starts[kept] - offsets[:-1], counts) + np.arange(offsets[-1], dtype=np.int64)
+
+        def column(base_column: np.ndarray, extra_column: List[int]) -> np.ndarray:
+            combined = np.concatenate([base_column, np.asarray(extra_column[:extra], dtype=base_column.dtype)])
+            return combined[gather]
+
+        return ListingStore(
+            ids=[self.ids[row] for row in gather.tolist()],
+            location_ids=[self.location_ids[location] for location in kept.tolist()],
+            lengths=column(base.lengths, rows.lengths),
+            widths=column(base.widths, rows.widths),
+            prices=column(base.prices, rows.prices),
+            location_index=np.repeat(np.arange(len(kept), dtype=np.int32), counts),
+            location_offsets=offsets,
+        )
@@ -0,0 +1,193 @@
+"""
+Columnar listing store definition
+"""
+
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from .listing import Listing
+
+
+class ListingStore:
+    """
+    Struct-of-arrays container for listings.
+
+    Numeric fields live in contiguous NumPy columns. Rows are grouped by
+    location (locations in order of first appearance, listings in file order
+    within a location), so location ``i`` owns the row range
+    ``location_offsets[i]:location_offsets[i + 1]``. ``Listing`` objects are
+    only built on request.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        location_ids: Sequence[str],
+        lengths: np.ndarray,
+        widths: np.ndarray,
+        prices: np.ndarray,
+        location_index: np.ndarray,
+        location_offsets: np.ndarray,
+        location_order: Optional[np.ndarray] = None,
+    ):
+        self.ids = ids
+        self.location_ids = location_ids
+        self.lengths = lengths
+        self.widths = widths
+        self.prices = prices
+        self.location_index = location_index
+        self.location_offsets = location_offsets
+        self.location_order = location_order
+        self._location_lookup: Optional[Dict[str, int]] = None
+        self._listing_locations: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'ListingStore':
+        """
+        Build a store from raw listing dictionaries
+
+        Args:
+            records: Iterable of dictionaries shaped like ``Listing``
+
+        Returns:
+            ListingStore: Columnar store grouped by location
+
+        Raises:
+            ValueError: If a record is missing a field or has a non-integer value
+        """
+        ids: List[str] = []
+        lengths: List[int] = []
+        widths: List[int] = []
+        prices: List[int] = []
+        row_locations: List[int] = []
+        location_lookup: Dict[str, int] = {}
+
+        for position, item in enumerate(records):
+            try:
+                location_id = str(item["location_id"])
+                ids.append(str(item["id"]))
+                lengths.append(int(item["length"]))
+                widths.append(int(item["width"]))
+                prices.append(int(item["price_in_cents"]))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid listing at position {position}: {e}")
+            row_locations.append(location_lookup.setdefault(location_id, len(location_lookup)))
+
+        location_index = np.asarray(row_locations, dtype=np.int32)
+        # Stable sort keeps file order within each location
+        order = np.argsort(location_index, kind="stable")
+        counts = np.bincount(location_index, minlength=len(location_lookup))
+        location_offsets = np.zeros(len(location_lookup) + 1, dtype=np.int64)
+        np.cumsum(counts, out=location_offsets[1:])
+
+        store = cls(
+            ids=[ids[i] for i in order.tolist()],
+            location_ids=list(location_lookup),
+            lengths=np.asarray(lengths, dtype=np.int32)[order],
+            widths=np.asarray(widths, dtype=np.int32)[order],
+            prices=np.asarray(prices, dtype=np.int64)[order],
+            location_index=location_index[order],
+            location_offsets=location_offsets,
+        )
+        store._location_lookup = location_lookup
+        return store
+
+    def __len__(self) -> int:
+        return int(self.lengths.shape[0])
+
+    @property
+    def location_count(self) -> int:
+        """Number of distinct locations"""
+        return len(self.location_ids)
+
+    @property
+    def areas(self) -> np.ndarray:
+        """Area column (length * width) as int64"""
+        return self.lengths.astype(np.int64) * self.widths
+
+    def select_locations(self, locations: np.ndarray) -> 'ListingStore':
+        """
+        Build a store holding only the given locations, in the given order
+
+        Args:
+            locations: Location indices of this store
+
+        Returns:
+            ListingStore: New store; location ``i`` of it is ``locations[i]`` here
+        """
+        locations = np.asarray(locations, dtype=np.int64)
+        starts = self.location_offsets[locations]
+        counts = self.location_offsets[locations + 1] - starts
+        offsets = np.zeros(len(locations) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        rows = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1], dtype=np.int64)
+        row_list = rows.tolist()
+        return ListingStore(
+            ids=[self.ids[row] for row in row_list],
+            location_ids=[self.location_ids[location] for location in locations.tolist()],
+            lengths=self.lengths[rows],
+            widths=self.widths[rows],
+            prices=self.prices[rows],
+            location_index=np.repeat(np.arange(len(locations), dtype=np.int32), counts),
+            location_offsets=offsets,
+        )
+
+    def location_range(self, location: int) -> Tuple[int, int]:
+        """Return the ``[start, end)`` row range of a location index"""
+        return int(self.location_offsets[location]), int(self.location_offsets[location + 1])
+
+    def location_columns(self, location: int) -> Tuple[int, List[int], List[int], List[int]]:
+        """Return a location's first row and its lengths, widths and prices as lists"""
+        start, end = self.location_range(location)
+        return (
+            start,
+            self.lengths[start:end].tolist(),
+            self.widths[start:end].tolist(),
+            self.prices[start:end].tolist(),
+        )
+
+    def find_location(self, location_id: str) -> Optional[int]:
+        """Return the location index for a location_id, or None if unknown"""
+        if self._location_lookup is None and self.location_order is not None:
+            return self._bisect_location(location_id)
+        if self._location_lookup is None:
+            self._location_lookup = {loc_id: i for i, loc_id in enumerate(self.location_ids)}
+        return self._location_lookup.get(location_id)
+
+    def find_listing(self, listing_id: str) -> Optional[int]:
+        """Return the location index holding a listing id, or None if unknown"""
+        if self._listing_locations is None:
+            self._listing_locations = dict(zip(self.ids, self.location_index.tolist()))
+        return self._listing_locations.get(listing_id)
+
+    def _bisect_location(self, location_id: str) -> Optional[int]:
+        """Binary search of ``location_order`` for a location id"""
+        order = self.location_order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.location_ids[int(order[middle])] < location_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and self.location_ids[int(order[low])] == location_id:
+            return int(order[low])
+        return None
+
+    def listing(self, row: int) -> Listing:
+        """Materialize a single row as a ``Listing``"""
+        return Listing(
+            id=self.ids[row],
+            location_id=self.location_ids[int(self.location_index[row])],
+            length=int(self.lengths[row]),
+            width=int(self.widths[row]),
+            price_in_cents=int(self.prices[row]),
+        )
+
+    def listings(self, start: int = 0, end: Optional[int] = None) -> List[Listing]:
+        """Materialize a contiguous row range as ``Listing`` objects"""
+        end = len(self) if end is None else end
+        return [self.listing(row) for row in range(start, end)]
+
+    def location_listings(self, location: int) -> List[Listing]:
+        """Materialize every listing of a location index"""
+        return self.listings(*self.location_range(location))
@@ -37,4 +37,19 @@ class Vehicle(BaseModel):
                 "length": 20,
                 "quantity": 2
             }
-        }
\ No newline at end of file
+        }
+
+
+class FleetVehicle(Vehicle):
+    """
+    A vehicle entry of a fleet search; the total quantity is bounded by ``settings.fleet_max_vehicles``
+    """
+    quantity: int = Field(..., ge=1, description="Number of vehicles of this type")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "length": 20,
+                "quantity": 120
+            }
+        }
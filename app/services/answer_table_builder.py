@@ -0,0 +1,80 @@
+"""
+Offline build step for the precomputed answer table
+
+Usage:
+    python -m app.services.answer_table_builder [listings.json] [answer_table.bin]
+"""
+
+import sys
+import time
+from typing import Any, Dict, Optional
+from ..utils.answer_table import canonical_queries, write_answer_table
+from .listing_service import ListingService
+from .search_service import SearchService
+from ..config.settings import settings
+
+
+def build_answer_table(
+    listings_file_path: str,
+    output_path: str,
+    max_vehicles: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Run the search engine for every canonical query and write the answers
+
+    Args:
+        listings_file_path: Dataset to answer for
+        output_path: Artifact destination
+        max_vehicles: Largest query size, defaults to ``settings.max_vehicles_per_request``
+
+    Returns:
+        Dict[str, Any]: Build report (query/result counts, build time, artifact size)
+    """
+    max_vehicles = max_vehicles or settings.max_vehicles_per_request
+    started = time.perf_counter()
+
+    listing_service = ListingService(listings_file_path)
+    search_service = SearchService(listing_service)
+    store = listing_service.load_store()
+
+    answers = {}
+    for query in canonical_queries(max_vehicles):
+        answers[query] = [
+            (store.location_ids[location], [store.ids[row] for row in rows], total_price)
+            for location, rows, total_price in search_service.search_rows(list(query))
+        ]
+    search_seconds = time.perf_counter() - started
+
+    meta = {
+        "dataset_hash": listing_service.get_dataset_hash(),
+        "listing_count": len(store),
+        "location_count": store.location_count,
+        "max_vehicles": max_vehicles,
+        "packing_solver": search_service.packing_solver,
+        "search_seconds": round(search_seconds, 3),
+    }
+    artifact_bytes = write_answer_table(output_path, answers, meta)
+    build_seconds = time.perf_counter() - started
+
+    return dict(
+        meta,
+        query_count=len(answers),
+        result_count=sum(len(rows) for rows in answers.values()),
+        build_seconds=round(build_seconds, 3),
+        artifact_bytes=artifact_bytes,
+        output_path=output_path,
+    )
+
+
+if __name__ == "__main__":
+    listings_path = sys.argv[1] if len(sys.argv) > 1 else settings.listings_file_path
+    output = sys.argv[2] if len(sys.argv) > 2 else settings.answer_table_path
+    report = build_answer_table(listings_path, output)
+    print(
+        f"Answer table: {report['query_count']} queries, {report['result_count']} results "
+        f"for {report['listing_count']} listings / {report['location_count']} locations"
+    )
+    print(
+        f"Built in {report['build_seconds']:.2f}s (search {report['search_seconds']:.2f}s), "
+        f"{report['artifact_bytes'] / 1024:.1f} KiB -> {report['output_path']}"
+    )
@@ -0,0 +1,64 @@
+"""
+Compile step turning listings.json into a memory-mappable binary snapshot
+
+Usage:
+    python -m app.services.compiled_listings_builder [listings.json] [listings.bin]
+"""
+
+import sys
+import time
+from typing import Any, Dict
+from ..utils.compiled_listings import write_compiled_listings
+from .listing_service import ListingService
+from ..config.settings import settings
+
+
+def build_compiled_listings(listings_file_path: str, output_path: str) -> Dict[str, Any]:
+    """
+    Parse a listings file once and write its store and capacity index in binary form
+
+    Args:
+        listings_file_path: Dataset to compile
+        output_path: Artifact destination
+
+    Returns:
+        Dict[str, Any]: Build report (listing/location counts, parse and build time, artifact size,
+            lane table pruning)
+    """
+    started = time.perf_counter()
+    listing_service = ListingService(listings_file_path)
+    snapshot = listing_service.get_snapshot()
+    parse_seconds = time.perf_counter() - started
+
+    meta = {"dataset_hash": snapshot.dataset_hash}
+    artifact_bytes = write_compiled_listings(
+        output_path, snapshot.store, snapshot.capacity_index, meta, snapshot.lane_tables
+    )
+
+    return {
+        "dataset_hash": snapshot.dataset_hash,
+        "listing_count": len(snapshot.store),
+        "location_count": snapshot.store.location_count,
+        "parse_seconds": round(parse_seconds, 3),
+        "build_seconds": round(time.perf_counter() - started, 3),
+        "artifact_bytes": artifact_bytes,
+        "lane_tables": snapshot.lane_tables.pruning,
+        "output_path": output_path,
+    }
+
+
+if __name__ == "__main__":
+    listings_path = sys.argv[1] if len(sys.argv) > 1 else settings.listings_file_path
+    output = sys.argv[2] if len(sys.argv) > 2 else settings.compiled_listings_path
+    report = build_compiled_listings(listings_path, output)
+    print(
+        f"Compiled {report['listing_count']} listings / {report['location_count']} locations "
+        f"in {report['build_seconds']:.2f}s (JSON parse {report['parse_seconds']:.2f}s), "
+        f"{report['artifact_bytes'] / 1024:.1f} KiB -> {report['output_path']}"
+    )
+    pruning = report["lane_tables"]
+    print(
+        f"Lane tables: {pruning['searchable_listings']} of {pruning['listings']} listings searchable "
+        f"({pruning['unreachable_listings']} past the depth cap, {pruning['unusable_listings']} fit no vehicle), "
+        f"{pruning['pruned_entries']} of {pruning['entries'] + pruning['pruned_entries']} entries pruned"
+    )
@@ -0,0 +1,388 @@
+"""
+Storage backends a ListingService loads its snapshots from
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+from ..models.listing_store import ListingStore
+from ..utils.capacity_index import LocationCapacityIndex
+from ..utils.compiled_listings import CompiledListings
+from ..utils.dataset_stats import DatasetStats
+from ..utils.lane_tables import LaneTables
+from ..utils.sqlite_listings import SqliteListings, SqliteListingStore
+from .listing_snapshot import ListingSnapshot
+from ..config.settings import settings
+
+
+def compute_dataset_hash(path: str) -> str:
+    """
+    SHA-256 of a listings file, used to tie derived artifacts to a dataset
+
+    Args:
+        path: Listings file path
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ListingBackend(ABC):
+    """
+    Where a ``ListingService`` reads the dataset from.
+
+    A backend turns its storage into ``ListingSnapshot`` objects; the
+    service owns versioning, locking and invalidation. ``source_path`` is
+    the file the hot reloader watches for changes.
+    """
+
+    name = "backend"
+    source_path: str = ""
+
+    @abstractmethod
+    def dataset_hash(self) -> str:
+        """SHA-256 of the dataset as currently stored, without loading it"""
+
+    @abstractmethod
+    def load(
+        self,
+        previous: Optional[ListingSnapshot],
+        version: int,
+        started: float,
+        force: bool = False,
+    ) -> Optional[ListingSnapshot]:
+        """
+        Build a snapshot of the stored dataset
+
+        Args:
+            previous: Snapshot currently served, None on the first load
+            version: Dataset version number to stamp on the snapshot
+            started: ``time.perf_counter()`` when loading began
+            force: Rebuild even if the stored dataset is the one ``previous`` was built from
+
+        Returns:
+            Optional[ListingSnapshot]: The new snapshot, or None if ``previous`` is still current
+
+        Raises:
+            FileNotFoundError: If the storage does not exist
+            ValueError: If the stored data is invalid
+        """
+
+    def describe(self) -> Dict[str, Any]:
+        """Backend name, storage location and settings"""
+        return {"backend": self.name, "source_path": self.source_path}
+
+
+class JsonListingBackend(ListingBackend):
+    """
+    A listings JSON file parsed into memory, or its compiled form memory-mapped.
+
+    Every load reads the whole dataset; a reload reuses the previous
+    snapshot's per-location work for locations whose listings did not change.
+    """
+
+    name = "json"
+
+    def __init__(
+        self,
+        listings_file_path: str,
+        compiled_listings_path: Optional[str] = None,
+        shared_dataset: bool = False,
+        shard: Optional[Tuple[int, int]] = None,
+    ):
+        """
+        Args:
+            listings_file_path: Listings file
+            compiled_listings_path: Compiled form of the listings file to memory-map on first load
+            shared_dataset: Compile ``compiled_listings_path`` when it is missing or stale and always
+                serve from the memory-mapped file (needs a compiled listings path)
+            shard: Optional (index, count); keep only locations whose index modulo count equals index
+        """
+        self.listings_file_path = listings_file_path
+        self.compiled_listings_path = compiled_listings_path
+        self.shared_dataset = bool(shared_dataset and compiled_listings_path)
+        self.shard = shard
+        self.source_path = listings_file_path
+
+    def dataset_hash(self) -> str:
+        return compute_dataset_hash(self.listings_file_path)
+
+    def load(
+        self,
+        previous: Optional[ListingSnapshot],
+        version: int,
+        started: float,
+        force: bool = False,
+    ) -> Optional[ListingSnapshot]:
+        """
+        Memory-map the compiled listings when they match the JSON, otherwise parse it
+
+        A reload parses the file unless ``shared_dataset`` is on, in which
+        case it is recompiled and the new compiled listings mapped instead,
+        so the reloaded dataset stays shared. A previous snapshot carrying
+        listing changes never matches the file, so the file replaces them,
+        and is rebuilt in full since an overlaid store cannot be diffed.
+        """
+        if previous is None:
+            snapshot = self._load_compiled(version, started)
+            if snapshot is None:
+                snapshot = self._build_snapshot(self._read_file(), None, version, started)
+            return snapshot
+
+        raw = self._read_file()
+        if not force and previous.dataset_hash == hashlib.sha256(raw).hexdigest():
+            return None
+        snapshot = self._load_compiled(version, started) if self.shared_dataset else None
+        if snapshot is None:
+            diff_from = previous if isinstance(previous.store, ListingStore) else None
+            snapshot = self._build_snapshot(raw, diff_from, version, started)
+        return snapshot
+
+    def describe(self) -> Dict[str, Any]:
+        return dict(
+            super().describe(),
+            compiled_listings_path=self.compiled_listings_path,
+            shared_dataset=self.shared_dataset,
+        )
+
+    def _read_file(self) -> bytes:
+        try:
+            with open(self.listings_file_path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Listings file not found: {self.listings_file_path}")
+
+    def _load_compiled(self, version: int, started: float) -> Optional[ListingSnapshot]:
+        """
+        Memory-map the compiled listings if they were built from the current listings file
+
+        With ``shared_dataset`` a missing or stale file is compiled first.
+
+        Returns:
+            Optional[ListingSnapshot]: Snapshot over the compiled file, or None to parse the JSON instead
+        """
+        path = self.compiled_listings_path
+        if not path or not os.path.exists(self.listings_file_path):
+            return None
+        dataset_hash = compute_dataset_hash(self.listings_file_path)
+        if self.shared_dataset:
+            try:
+                self._compile_shared(dataset_hash)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"Could not compile {path}: {e}; loading JSON")
+                return None
+        if not os.path.exists(path):
+            return None
+        try:
+            compiled = CompiledListings(path)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring compiled listings {path}: {e}")
+            return None
+
+        if compiled.dataset_hash != dataset_hash:
+            print(f"Compiled listings {path} were built from a different {self.listings_file_path}; loading JSON")
+            return None
+
+        store = compiled.store()
+        capacity_index = compiled.capacity_index()
+        lane_tables = compiled.lane_tables(store)
+        if lane_tables is not None and not lane_tables.covers(settings.lane_table_depth):
+            lane_tables = None
+        if self.shard is not None:
+            shard_index, shard_count = self.shard
+            store = store.select_locations(np.arange(shard_index, store.location_count, shard_count))
+            capacity_index = LocationCapacityIndex.from_store(store)
+            lane_tables = None
+        if lane_tables is None:
+            lane_tables = LaneTables.from_store(store, settings.lane_table_depth)
+
+        return ListingSnapshot(
+            store=store,
+            capacity_index=capacity_index,
+            lane_tables=lane_tables,
+            stats=DatasetStats.from_store(store),
+            fingerprints=None,
+            version=version,
+            dataset_hash=dataset_hash,
+            build_seconds=time.perf_counter() - started,
+            changed_locations=store.location_count,
+            reused_locations=0,
+            source="compiled",
+        )
+
+    def _compile_shared(self, dataset_hash: str) -> None:
+        """
+        Compile the listings file unless the compiled listings already match ``dataset_hash``
+
+        Processes starting together take an exclusive lock next to the
+        compiled file, so only the first compiles and the others map its
+        result. The compile runs in a child process: parsing the JSON would
+        otherwise leave its peak heap in this worker for good.
+
+        Raises:
+            OSError: If the lock cannot be taken or the compiler cannot be started
+            subprocess.CalledProcessError: If compiling fails
+        """
+        import fcntl  # POSIX only; imported here so the module still imports elsewhere
+
+        path = self.compiled_listings_path
+        with open(f"{path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if CompiledListings(path).dataset_hash == dataset_hash:
+                    return
+            except (OSError, ValueError):
+                pass
+            print(f"Compiling {self.listings_file_path} -> {path}")
+            package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            subprocess.run(
+                [sys.executable, "-m", "app.services.compiled_listings_builder",
+                 os.path.abspath(self.listings_file_path), os.path.abspath(path)],
+                cwd=package_root,
+                check=True,
+                capture_output=True,
+            )
+
+    def _build_snapshot(
+        self,
+        raw: bytes,
+        previous: Optional[ListingSnapshot],
+        version: int,
+        started: float,
+    ) -> ListingSnapshot:
+        """Parse raw file contents into a snapshot"""
+        try:
+            data = json.loads(raw)
+
+            store = ListingStore.from_records(data)
+            if self.shard is not None:
+                shard_index, shard_count = self.shard
+                store = store.select_locations(np.arange(shard_index, store.location_count, shard_count))
+
+            return ListingSnapshot.build(
+                store,
+                version=version,
+                dataset_hash=hashlib.sha256(raw).hexdigest(),
+                previous=previous,
+                started=started,
+                lane_depth=settings.lane_table_depth,
+            )
+
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in listings file: {e}")
+        except Exception as e:
+            raise ValueError(f"Error loading listings: {e}")
+
+
+class SqliteListingBackend(ListingBackend):
+    """
+    An indexed SQLite listings database, read on demand.
+
+    Loading opens the database and reads its metadata and aggregates only,
+    so startup time does not grow with the dataset; searches read location
+    blocks as they reach them and keep a bounded cache of hot ones (see
+    ``SqliteListingStore``). Snapshots have no lane tables: the greedy
+    packer works from each location's columns instead. Build the database
+    with ``python -m app.services.sqlite_listings_builder``.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, database_path: str, cache_locations: int):
+        """
+        Args:
+            database_path: Database written by ``write_sqlite_listings``
+            cache_locations: Locations kept in memory between searches
+        """
+        self.database_path = database_path
+        self.cache_locations = cache_locations
+        self.source_path = database_path
+        # Store of the latest snapshot, for its cache counters
+        self._store: Optional[SqliteListingStore] = None
+
+    def dataset_hash(self) -> str:
+        database = SqliteListings(self.database_path)
+        try:
+            return database.dataset_hash
+        finally:
+            database.close()
+
+    def load(
+        self,
+        previous: Optional[ListingSnapshot],
+        version: int,
+        started: float,
+        force: bool = False,
+    ) -> Optional[ListingSnapshot]:
+        """
+        Open the database; a reload only swaps snapshots when the database was rebuilt
+
+        The builder replaces the file atomically, so searches still running
+        on the previous snapshot keep reading the database they started on.
+        """
+        database = SqliteListings(self.database_path)
+        if previous is not None and not force and previous.dataset_hash == database.dataset_hash:
+            database.close()
+            return None
+        self._store = database.store(self.cache_locations)
+        return ListingSnapshot(
+            store=self._store,
+            capacity_index=database.capacity_index(),
+            lane_tables=None,
+            stats=database.stats(),
+            fingerprints=None,
+            version=version,
+            dataset_hash=database.dataset_hash,
+            build_seconds=time.perf_counter() - started,
+            changed_locations=database.meta["location_count"],
+            reused_locations=0,
+            source="sqlite",
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        return dict(
+            super().describe(),
+            cache_locations=self.cache_locations,
+            cache=self._store.cache_stats() if self._store is not None else None,
+        )
+
+
+def create_listing_backend(
+    storage_backend: str,
+    listings_file_path: str,
+    compiled_listings_path: Optional[str] = None,
+    shared_dataset: bool = False,
+    shard: Optional[Tuple[int, int]] = None,
+) -> ListingBackend:
+    """
+    Backend for a ``storage_backend`` setting value
+
+    Args:
+        storage_backend: "json" or "sqlite"
+        listings_file_path: Listings file of the JSON backend
+        compiled_listings_path: Compiled listings of the JSON backend
+        shared_dataset: Shared compiled dataset for the JSON backend
+        shard: Location shard of the JSON backend
+
+    Returns:
+        ListingBackend: The configured backend
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if storage_backend == "json":
+        return JsonListingBackend(listings_file_path, compiled_listings_path, shared_dataset, shard)
+    if storage_backend == "sqlite":
+        return SqliteListingBackend(settings.sqlite_database_path, settings.sqlite_cache_locations)
+    raise ValueError(f"Unknown storage backend: {storage_backend}")
@@ -0,0 +1,208 @@
+"""
+Listing upserts and deletes applied to a snapshot, one location group at a time
+"""
+
+import hashlib
+import json
+import time
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..models.listing import Listing
+from ..models.listing_overlay import OverlayListingStore
+from ..models.listing_store import ListingStore
+from ..utils.capacity_index import LENGTH_BUCKETS, LocationCapacityIndex, OverlayCapacityIndex
+from ..utils.lane_tables import OverlayLaneTables
+from .listing_snapshot import ListingSnapshot
+
+
+def _group_capacity(groups: List[List[List]]) -> LocationCapacityIndex:
+    """Capacity summary of some location groups, one row per group (empty groups fit nothing)"""
+    n_buckets = len(LENGTH_BUCKETS)
+    summary = LocationCapacityIndex(
+        max_lanes=np.zeros((len(groups), n_buckets), dtype=np.int32),
+        total_lanes=np.zeros((len(groups), n_buckets), dtype=np.int32),
+        min_lane_price=np.full((len(groups), n_buckets), np.inf),
+    )
+    filled = [position for position, listings in enumerate(groups) if listings]
+    if filled:
+        store = ListingStore.from_records(
+            {"id": entry[0], "location_id": str(position), "length": entry[1], "width": entry[2],
+             "price_in_cents": entry[3]}
+            for position in filled for entry in groups[position]
+        )
+        fresh = LocationCapacityIndex.from_store(store)
+        summary.max_lanes[filled] = fresh.max_lanes
+        summary.total_lanes[filled] = fresh.total_lanes
+        summary.min_lane_price[filled] = fresh.min_lane_price
+    return summary
+
+
+def apply_listing_changes(
+    snapshot: ListingSnapshot,
+    upserts: Sequence[Listing],
+    deletes: Sequence[str],
+    version: int,
+    started: Optional[float] = None,
+) -> Tuple[ListingSnapshot, List[int], List[str]]:
+    """
+    Derive the snapshot that results from deleting and upserting listings
+
+    Deletes apply first, then upserts in order. An upsert replaces the
+    listing with the same id in place, moving it if its location changed,
+    or appends it to its location (a new location if the id is unknown).
+    Only the affected locations are re-read and summarized: the new
+    snapshot layers their new listings over the previous snapshot's store
+    (``OverlayListingStore``), patches their capacity rows and packs them
+    from columns instead of the lane tables, and updates the aggregates by
+    the listings removed and added. ``snapshot`` itself is not modified.
+
+    Args:
+        snapshot: Snapshot the changes apply to
+        upserts: Listings to insert or replace
+        deletes: Listing ids to remove
+        version: Dataset version number to stamp on the new snapshot
+        started: ``time.perf_counter()`` when applying began, for build_seconds
+
+    Returns:
+        Tuple[ListingSnapshot, List[int], List[str]]: New snapshot, the ascending indices of the
+        locations whose listings changed, and the deleted ids that were not found
+    """
+    started = time.perf_counter() if started is None else started
+    store = snapshot.store
+    if not isinstance(store, OverlayListingStore):
+        store = OverlayListingStore.over(store)
+    capacity_index = snapshot.capacity_index
+    if not isinstance(capacity_index, OverlayCapacityIndex):
+        capacity_index = OverlayCapacityIndex.over(capacity_index)
+    lane_tables = snapshot.lane_tables
+    if isinstance(lane_tables, OverlayLaneTables):
+        lane_tables = lane_tables.base
+
+    # Working copy of every affected location as [id, length, width, price] entries
+    groups: Dict[int, List[List]] = {}
+    # Columns of the affected existing locations before the changes
+    before: Dict[int, Tuple[List[int], List[int], List[int]]] = {}
+    located: Dict[str, Optional[int]] = {}
+    new_locations: Dict[str, int] = {}
+
+    def group(location: int) -> List[List]:
+        listings = groups.get(location)
+        if listings is None:
+            listings = []
+            if location < store.location_count:
+                start, lengths, widths, prices = store.location_columns(location)
+                ids = store.ids
+                listings = [[ids[start + i], lengths[i], widths[i], prices[i]] for i in range(len(lengths))]
+                before[location] = (lengths, widths, prices)
+            groups[location] = listings
+        return listings
+
+    def current_location(listing_id: str) -> Optional[int]:
+        if listing_id in located:
+            return located[listing_id]
+        return store.find_listing(listing_id)
+
+    def remove(location: int, listing_id: str) -> None:
+        listings = group(location)
+        listings[:] = [entry for entry in listings if entry[0] != listing_id]
+
+    missing: List[str] = []
+    for listing_id in deletes:
+        location = current_location(listing_id)
+        if location is None:
+            missing.append(listing_id)
+            continue
+        remove(location, listing_id)
+        located[listing_id] = None
+
+    for listing in upserts:
+        location = store.find_location(listing.location_id)
+        if location is None:
+            location = new_locations.setdefault(listing.location_id, store.location_count + len(new_locations))
+        previous_location = current_location(listing.id)
+        if previous_location is not None and previous_location != location:
+            remove(previous_location, listing.id)
+        entry = [listing.id, listing.length, listing.width, listing.price_in_cents]
+        listings = group(location)
+        for position, existing in enumerate(listings):
+            if existing[0] == listing.id:
+                listings[position] = entry
+                break
+        else:
+            listings.append(entry)
+        located[listing.id] = location
+
+    changed = sorted(groups)
+    location_count = store.location_count + len(new_locations)
+    if not changed:
+        return snapshot, changed, missing
+
+    # Only appended to from here on; rows of older overlays stay as they were
+    rows = store.rows
+    for location_id in new_locations:
+        rows.add_location(location_id)
+    replaced = dict(store.groups)
+    for location in changed:
+        listings = groups[location]
+        replaced[location] = rows.append_group(
+            location,
+            [entry[0] for entry in listings],
+            [entry[1] for entry in listings],
+            [entry[2] for entry in listings],
+            [entry[3] for entry in listings],
+        )
+    moved_ids = dict(store.moved_ids)
+    moved_ids.update(located)
+    listing_count = (
+        len(store) + sum(len(groups[location]) for location in changed)
+        - sum(len(columns[0]) for columns in before.values())
+    )
+    new_store = OverlayListingStore(store.base, rows, replaced, moved_ids, location_count, listing_count)
+
+    after = [groups[location] for location in changed]
+    stats = snapshot.stats.with_changes(
+        list(before.values()),
+        [([e[1] for e in listings], [e[2] for e in listings], [e[3] for e in listings]) for listings in after],
+    )
+    change_digest = hashlib.sha256(snapshot.dataset_hash.encode())
+    change_digest.update(json.dumps([list(deletes), [listing.model_dump() for listing in upserts]]).encode())
+
+    return ListingSnapshot(
+        store=new_store,
+        capacity_index=capacity_index.replaced(np.asarray(changed), _group_capacity(after), location_count),
+        lane_tables=OverlayLaneTables(lane_tables, new_store) if lane_tables is not None else None,
+        stats=stats,
+        fingerprints=None,
+        version=version,
+        dataset_hash=change_digest.hexdigest(),
+        build_seconds=time.perf_counter() - started,
+        changed_locations=len(changed),
+        reused_locations=location_count - len(changed),
+        source=snapshot.source,
+    ), changed, missing
+
+
+def compact_snapshot(snapshot: ListingSnapshot, lane_depth: Optional[int] = None) -> Optional[ListingSnapshot]:
+    """
+    Fold an overlay snapshot into a plain in-memory one with the same version and contents
+
+    Rebuilds every index from scratch, so lane tables cover all locations
+    again; only possible when the overlay sits on a ``ListingStore``.
+
+    Args:
+        snapshot: Snapshot produced by ``apply_listing_changes``
+        lane_depth: Most vehicles per search, see ``ListingSnapshot.build``
+
+    Returns:
+        Optional[ListingSnapshot]: Compacted snapshot, or None if it cannot be compacted
+    """
+    store = snapshot.store
+    if not isinstance(store, OverlayListingStore) or not isinstance(store.base, ListingStore):
+        return None
+    return ListingSnapshot.build(
+        store.compacted(),
+        version=snapshot.version,
+        dataset_hash=snapshot.dataset_hash,
+        lane_depth=lane_depth,
+        source="compacted",
+    )
@@ -0,0 +1,81 @@
+"""
+Background watcher that hot-reloads the listings file or database
+"""
+
+import os
+import threading
+from typing import Optional, Tuple
+from .listing_service import ListingService
+
+
+class ListingReloader:
+    """
+    Polls the storage backend's file and reloads the dataset when it changes.
+
+    Changes are detected from the file's (mtime, size) signature; the reload
+    itself runs on this thread, so requests keep being served from the
+    current snapshot until the new one is swapped in. A file that fails to
+    parse (e.g. caught mid-write) is skipped and retried on its next change.
+    """
+
+    def __init__(self, listing_service: ListingService, interval_seconds: float):
+        self.listing_service = listing_service
+        self.interval_seconds = interval_seconds
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="listing-reloader", daemon=True)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.listing_service.backend.source_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self) -> 'ListingReloader':
+        """Start polling in a daemon thread"""
+        self._thread.start()
+        return self
+
+    def check(self) -> bool:
+        """
+        Reload once if the file changed since the last check
+
+        Returns:
+            bool: True if a new snapshot was swapped in
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            reloaded = self.listing_service.reload()
+        except (FileNotFoundError, ValueError) as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"Listing reload failed, keeping version {self.listing_service.dataset_version}: {e}")
+            return False
+        self.reloads += reloaded
+        return reloaded
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.check()
+
+    def stop(self) -> None:
+        """Stop polling and wait for an in-progress reload to finish"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def stats(self) -> dict:
+        """Reload counters"""
+        return {
+            "interval_seconds": self.interval_seconds,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
@@ -2,74 +2,301 @@
 Listing service for data management
 """
 
-import json
-import os
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, List, Dict, Optional, Sequence, Tuple
 from ..models.listing import Listing
+from ..models.listing_overlay import OverlayListingStore
+from ..models.listing_store import ListingStore
+from ..utils.capacity_index import LocationCapacityIndex
+from .listing_backends import ListingBackend, create_listing_backend
+from .listing_changes import apply_listing_changes, compact_snapshot
+from .listing_snapshot import ListingSnapshot
 from ..config.settings import settings
 
+if TYPE_CHECKING:
+    from .sharded_search import ShardedSearchEngine
+
 
 class ListingService:
     """
     Service for managing listing data
     """
     
-    def __init__(self):
-        self._listings_cache: Optional[List[Listing]] = None
-        self._location_groups_cache: Optional[Dict[str, List[Listing]]] = None
+    def __init__(
+        self,
+        listings_file_path: Optional[str] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        compiled_listings_path: Optional[str] = None,
+        shared_dataset: Optional[bool] = None,
+        storage_backend: Optional[str] = None,
+    ):
+        """
+        Args:
+            listings_file_path: Listings file, defaults to ``settings.listings_file_path``
+            shard: Optional (index, count); keep only locations whose index modulo count equals index
+            compiled_listings_path: Compiled form of the listings file to memory-map on first load;
+                defaults to ``settings.compiled_listings_path`` for the default listings file only
+            shared_dataset: Compile ``compiled_listings_path`` when it is missing or stale and always
+                serve from the memory-mapped file, so processes share the dataset pages; defaults to
+                ``settings.shared_dataset`` and needs a compiled listings path
+            storage_backend: "json" (the listings file) or "sqlite" (``settings.sqlite_database_path``);
+                defaults to ``settings.storage_backend`` for the default, unsharded dataset only
+        """
+        self.listings_file_path = listings_file_path or settings.listings_file_path
+        if compiled_listings_path is None and listings_file_path is None:
+            compiled_listings_path = settings.compiled_listings_path
+        self.compiled_listings_path = compiled_listings_path
+        if shared_dataset is None:
+            shared_dataset = settings.shared_dataset
+        self.shared_dataset = bool(shared_dataset and compiled_listings_path)
+        self.shard = shard
+        if storage_backend is None:
+            use_settings = listings_file_path is None and shard is None
+            storage_backend = settings.storage_backend if use_settings else "json"
+        self.backend: ListingBackend = create_listing_backend(
+            storage_backend, self.listings_file_path, compiled_listings_path, self.shared_dataset, shard
+        )
+        # Current immutable snapshot; replaced wholesale, never mutated
+        self._snapshot: Optional[ListingSnapshot] = None
+        # Serializes snapshot builds; readers never take it
+        self._build_lock = threading.Lock()
+        # Bumped whenever a new dataset is loaded or the cache is cleared
+        self._version = 0
+        self._dataset_hash: Optional[str] = None
+        # Set by ``delegate_loading``; its workers hold the dataset instead of this process
+        self._engine: Optional["ShardedSearchEngine"] = None
+        self._invalidation_listeners: List[Callable[[], None]] = []
+        self._change_listeners: List[Callable[[ListingSnapshot, ListingSnapshot, List[int]], None]] = []
     
-    def load_listings(self) -> List[Listing]:
+    @property
+    def dataset_version(self) -> int:
+        """Version of the current dataset, bumped by every load, reload and ``clear_cache``"""
+        return self._version
+    
+    @property
+    def snapshot(self) -> Optional[ListingSnapshot]:
+        """Current snapshot without loading one, None before the first load"""
+        return self._snapshot
+    
+    def get_snapshot(self) -> ListingSnapshot:
         """
-        Load listings from the JSON file
+        Get the current dataset snapshot, loading it on first use
+        
+        Callers should take the snapshot once per operation and read the store
+        and indexes from it, so a concurrent reload cannot mix two versions.
         
         Returns:
-            List[Listing]: List of all listings
+            ListingSnapshot: Current snapshot
             
         Raises:
             FileNotFoundError: If listings file is not found
             ValueError: If JSON data is invalid
+            RuntimeError: If loading was delegated to a sharded engine
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        
+        with self._build_lock:
+            return self._load_locked()
+    
+    def _load_locked(self) -> ListingSnapshot:
+        if self._engine is not None:
+            raise RuntimeError("The dataset is loaded by the sharded search engine's workers, not this process")
+        if self._snapshot is None:
+            snapshot = self.backend.load(None, self._version + 1, time.perf_counter())
+            self._install(snapshot)
+            print(f"Loaded {len(snapshot.store)} listings ({snapshot.source})")
+        return self._snapshot
+    
+    def load_store(self) -> ListingStore:
         """
-        if self._listings_cache is not None:
-            return self._listings_cache
+        Load listings from the JSON file into a columnar store
         
-        try:
-            with open(settings.listings_file_path, 'r') as f:
-                data = json.load(f)
+        Returns:
+            ListingStore: Columnar store of all listings grouped by location
             
-            listings = [Listing.from_dict(item) for item in data]
-            self._listings_cache = listings
+        Raises:
+            FileNotFoundError: If listings file is not found
+            ValueError: If JSON data is invalid
+        """
+        return self.get_snapshot().store
+    
+    def get_capacity_index(self) -> LocationCapacityIndex:
+        """
+        Get the per-location lane capacity summary used to prefilter searches
+        
+        Returns:
+            LocationCapacityIndex: Capacity summary aligned with ``load_store`` locations
+        """
+        return self.get_snapshot().capacity_index
+    
+    def reload(self, force: bool = False) -> bool:
+        """
+        Re-read the storage backend and atomically swap in a new snapshot
+        
+        The new snapshot is built while the old one keeps serving; with the
+        JSON backend only locations whose listings changed get their indexes
+        recomputed. Searches already running finish on the snapshot they
+        started with. See ``JsonListingBackend.load`` and
+        ``SqliteListingBackend.load``. After ``delegate_loading`` the
+        engine's workers reload instead and only the version moves here.
+        
+        Args:
+            force: Rebuild even if the file contents are unchanged
             
-            print(f"Loaded {len(listings)} listings")
-            return listings
+        Returns:
+            bool: True if a new snapshot was swapped in
             
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Listings file not found: {settings.listings_file_path}")
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON in listings file: {e}")
-        except Exception as e:
-            raise ValueError(f"Error loading listings: {e}")
+        Raises:
+            FileNotFoundError: If listings file is not found
+            ValueError: If JSON data is invalid; the current snapshot is kept
+        """
+        if self._engine is not None:
+            return self._reload_engine(force)
+        with self._build_lock:
+            snapshot = self.backend.load(self._snapshot, self._version + 1, time.perf_counter(), force)
+            if snapshot is None:
+                return False
+            self._install(snapshot)
+            print(
+                f"Reloaded {len(snapshot.store)} listings (version {snapshot.version}, "
+                f"{snapshot.changed_locations} changed locations) in {snapshot.build_seconds:.3f}s"
+            )
+        
+        self._notify_listeners()
+        return True
     
-    def get_listings_by_location(self) -> Dict[str, List[Listing]]:
+    def delegate_loading(self, engine: "ShardedSearchEngine") -> None:
         """
-        Group listings by location_id
+        Leave the dataset to a sharded engine's workers; this process never loads it from then on
+        
+        The version and dataset hash keep being tracked here: the workers'
+        startup load counts as a new version, ``reload`` and ``clear_cache``
+        reload the workers instead, and anything that needs a snapshot
+        (``get_snapshot``, ``apply_changes``) raises ``RuntimeError``.
+        
+        Args:
+            engine: Running engine whose workers loaded the same dataset
+        """
+        with self._build_lock:
+            self._engine = engine
+            self._snapshot = None
+            self._dataset_hash = engine.dataset_hash
+            self._version += 1
+    
+    def _reload_engine(self, force: bool) -> bool:
+        with self._build_lock:
+            # Workers finish reloading before the version moves on, so no new-version result comes from old shards
+            if not self._engine.reload(force):
+                return False
+            self._dataset_hash = self._engine.dataset_hash
+            self._version += 1
+            print(f"Reloaded {self._engine.listing_count} listings in shard workers (version {self._version})")
         
+        self._notify_listeners()
+        return True
+    
+    def apply_changes(self, upserts: Sequence[Listing] = (), deletes: Sequence[str] = ()) -> Dict[str, Any]:
+        """
+        Upsert and delete listings, swapping in a snapshot that differs only in the affected locations
+        
+        Work is proportional to the listings in the changed locations, not
+        the dataset (see ``apply_listing_changes``); searches keep running
+        on the snapshot they started with and never wait. Change listeners
+        then get the chance to carry over state for untouched locations. Once
+        more than ``settings.listing_compaction_locations`` locations are
+        overlaid, the dataset is compacted into a plain in-memory snapshot.
+        
+        Changes only live in this process: a reload or restart serves the
+        storage backend's dataset again.
+        
+        Args:
+            upserts: Listings to insert or replace, matched by id
+            deletes: Listing ids to remove; deletes apply before upserts
+            
         Returns:
-            Dict[str, List[Listing]]: Dictionary mapping location_id to listings
+            Dict[str, Any]: Change report (new version, applied counts, missing ids, changed locations)
+            
+        Raises:
+            FileNotFoundError: If the dataset is not loaded yet and its storage is missing
+            ValueError: If the dataset is not loaded yet and is invalid
         """
-        if self._location_groups_cache is not None:
-            return self._location_groups_cache
+        started = time.perf_counter()
+        with self._build_lock:
+            previous = self._load_locked()
+            snapshot, changed, missing = apply_listing_changes(
+                previous, upserts, deletes, self._version + 1, started
+            )
+            compacted = None
+            if changed:
+                store = snapshot.store
+                if isinstance(store, OverlayListingStore) and len(store.groups) > settings.listing_compaction_locations:
+                    compacted = compact_snapshot(snapshot, settings.lane_table_depth)
+                self._install(compacted or snapshot)
+                # Inside the lock, so listeners see changes in the order they were applied
+                for callback in self._change_listeners:
+                    callback(previous, snapshot, changed)
+            current = self._snapshot
         
-        listings = self.load_listings()
-        location_groups = {}
+        return {
+            "version": current.version,
+            "upserted": len(upserts),
+            "deleted": len(deletes) - len(missing),
+            "missing_ids": missing,
+            "changed_locations": len(changed),
+            "compacted": compacted is not None,
+            "listings": len(current.store),
+            "locations": current.store.location_count,
+            "apply_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+    
+    def get_dataset_hash(self) -> str:
+        """
+        Get the SHA-256 of the current listings file
         
-        for listing in listings:
-            location_id = listing.location_id
-            if location_id not in location_groups:
-                location_groups[location_id] = []
-            location_groups[location_id].append(listing)
+        Taken from the loaded dataset when there is one, otherwise asked of
+        the backend without loading. Cached until ``clear_cache``.
         
-        self._location_groups_cache = location_groups
-        return location_groups
+        Returns:
+            str: Hex digest of the listings file the dataset was built from
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.dataset_hash
+        if self._dataset_hash is None:
+            self._dataset_hash = self.backend.dataset_hash()
+        return self._dataset_hash
+    
+    def _install(self, snapshot: ListingSnapshot) -> None:
+        self._version = snapshot.version
+        self._dataset_hash = snapshot.dataset_hash
+        self._snapshot = snapshot
+    
+    def load_listings(self) -> List[Listing]:
+        """
+        Load listings as ``Listing`` objects
+        
+        The objects are built from the columnar store once per snapshot and
+        shared by every caller until a reload or change swaps it; prefer
+        ``load_store`` on hot paths. Listings come grouped by location
+        (locations in order of first appearance, file order within each),
+        not in plain file order.
+        
+        Returns:
+            List[Listing]: List of all listings, grouped by location
+        """
+        return self.get_snapshot().listings
+    
+    def get_listings_by_location(self) -> Dict[str, List[Listing]]:
+        """
+        Group listings by location_id
+        
+        Returns:
+            Dict[str, List[Listing]]: Dictionary mapping location_id to listings, built once per snapshot
+        """
+        return self.get_snapshot().listings_by_location
     
     def get_all_listings(self) -> List[Listing]:
         """
@@ -90,10 +317,44 @@ class ListingService:
         Returns:
             List[Listing]: List of listings for the location
         """
-        location_groups = self.get_listings_by_location()
-        return location_groups.get(location_id, [])
+        store = self.load_store()
+        location = store.find_location(location_id)
+        if location is None:
+            return []
+        return store.location_listings(location)
+    
+    def add_invalidation_listener(self, callback: Callable[[], None]) -> None:
+        """
+        Register a callback run whenever the cached dataset is dropped
+        
+        Args:
+            callback: Function called without arguments
+        """
+        self._invalidation_listeners.append(callback)
+    
+    def add_change_listener(
+        self,
+        callback: Callable[[ListingSnapshot, ListingSnapshot, List[int]], None],
+    ) -> None:
+        """
+        Register a callback run whenever ``apply_changes`` swaps in a new snapshot
+        
+        Args:
+            callback: Function called with the previous snapshot, the changed snapshot and the
+                ascending indices of the locations whose listings changed (indices shared by both)
+        """
+        self._change_listeners.append(callback)
     
     def clear_cache(self):
         """Clear the listings cache"""
-        self._listings_cache = None
-        self._location_groups_cache = None
\ No newline at end of file
+        with self._build_lock:
+            if self._engine is not None:
+                self._engine.reload()
+            self._snapshot = None
+            self._dataset_hash = self._engine.dataset_hash if self._engine is not None else None
+            self._version += 1
+        self._notify_listeners()
+    
+    def _notify_listeners(self) -> None:
+        for callback in self._invalidation_listeners:
+            callback()
\ No newline at end of file
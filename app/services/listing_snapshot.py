@@ -0,0 +1,205 @@
+"""
+Immutable listing dataset snapshots
+"""
+
+import time
+import numpy as np
+from typing import Any, Dict, List, Optional
+from ..models.listing import Listing
+from ..models.listing_overlay import OverlayListingStore
+from ..models.listing_store import ListingStore
+from ..utils.capacity_index import LocationCapacityIndex
+from ..utils.dataset_stats import DatasetStats
+from ..utils.lane_tables import LaneTables
+
+
+# Odd 64-bit multipliers used to mix numeric columns into row fingerprints
+_MIX = (
+    np.uint64(0x9E3779B97F4A7C15),
+    np.uint64(0xC2B2AE3D27D4EB4F),
+    np.uint64(0x165667B19E3779F9),
+    np.uint64(0xD6E8FEB86659FD93),
+)
+
+
+def location_fingerprints(store: ListingStore) -> np.ndarray:
+    """
+    One 64-bit fingerprint per location over its rows (ids, dimensions, prices and order).
+
+    Only meant for comparing snapshots inside one process: listing ids go
+    through Python's per-process string hash.
+    """
+    if len(store) == 0:
+        return np.zeros(store.location_count, dtype=np.uint64)
+    starts = store.location_offsets[:-1]
+    position = np.arange(len(store), dtype=np.int64) - np.repeat(starts, np.diff(store.location_offsets))
+    id_hashes = np.fromiter((hash(i) for i in store.ids), dtype=np.int64, count=len(store)).view(np.uint64)
+    with np.errstate(over="ignore"):
+        rows = (
+            id_hashes
+            ^ (store.lengths.astype(np.uint64) * _MIX[0])
+            ^ (store.widths.astype(np.uint64) * _MIX[1])
+            ^ (store.prices.astype(np.uint64) * _MIX[2])
+        ) * (position.astype(np.uint64) * np.uint64(2) + np.uint64(1)) * _MIX[3]
+        return np.add.reduceat(rows, starts) ^ np.diff(store.location_offsets).astype(np.uint64)
+
+
+class ListingSnapshot:
+    """
+    Immutable view of one version of the dataset: the listing store and every
+    index derived from it.
+
+    Searches take a reference to the current snapshot once and use it
+    throughout, so a reload swapping in a new snapshot never affects a search
+    already in flight. Backends that read listings on demand supply objects
+    with the same interface as the store and capacity index, and may have
+    no lane tables.
+    """
+
+    def __init__(
+        self,
+        store: ListingStore,
+        capacity_index: LocationCapacityIndex,
+        lane_tables: Optional[LaneTables],
+        stats: DatasetStats,
+        fingerprints: Optional[np.ndarray],
+        version: int,
+        dataset_hash: str,
+        build_seconds: float,
+        changed_locations: int,
+        reused_locations: int,
+        source: str = "json",
+    ):
+        self.store = store
+        self.capacity_index = capacity_index
+        self.lane_tables = lane_tables
+        self.stats = stats
+        self._fingerprints = fingerprints
+        self.version = version
+        self.dataset_hash = dataset_hash
+        self.build_seconds = build_seconds
+        self.changed_locations = changed_locations
+        self.reused_locations = reused_locations
+        self.source = source
+        self.loaded_at = time.time()
+        self._listings: Optional[List[Listing]] = None
+        self._listings_by_location: Optional[Dict[str, List[Listing]]] = None
+
+    @property
+    def fingerprints(self) -> np.ndarray:
+        """Per-location fingerprints, computed on first use (the next reload's diff)"""
+        if self._fingerprints is None:
+            self._fingerprints = location_fingerprints(self.store)
+        return self._fingerprints
+
+    @property
+    def listings(self) -> List[Listing]:
+        """Every listing as a ``Listing`` object, grouped by location, built on first use"""
+        if self._listings is None:
+            self._listings = self.store.listings()
+        return self._listings
+
+    @property
+    def listings_by_location(self) -> Dict[str, List[Listing]]:
+        """``listings`` per location id, skipping locations emptied by deletes, built on first use"""
+        if self._listings_by_location is None:
+            store, listings = self.store, self.listings
+            by_location = {}
+            position = 0
+            # ``listings`` runs location by location, so each location is the next slice of its size
+            for location, location_id in enumerate(store.location_ids):
+                start, end = store.location_range(location)
+                # Locations emptied by deletes keep their index until compaction
+                if end > start:
+                    by_location[location_id] = listings[position:position + end - start]
+                    position += end - start
+            self._listings_by_location = by_location
+        return self._listings_by_location
+
+    @classmethod
+    def build(
+        cls,
+        store: ListingStore,
+        version: int,
+        dataset_hash: str,
+        previous: Optional['ListingSnapshot'] = None,
+        started: Optional[float] = None,
+        lane_depth: Optional[int] = None,
+        source: str = "json",
+    ) -> 'ListingSnapshot':
+        """
+        Derive every index for a store, reusing the previous snapshot's work for unchanged locations
+
+        Args:
+            store: Freshly loaded listing store
+            version: Dataset version number to stamp on the snapshot
+            dataset_hash: SHA-256 of the source file
+            previous: Snapshot being replaced, if any
+            started: ``time.perf_counter()`` when loading began, to include parsing in build_seconds
+            lane_depth: Most vehicles per search; lane table entries no such search can reach are
+                pruned (see ``LaneTables``)
+            source: Where the store came from, reported by ``describe``
+
+        Returns:
+            ListingSnapshot: The new snapshot
+        """
+        started = time.perf_counter() if started is None else started
+        # Only a reload diffs fingerprints; the first load leaves them to be computed on demand
+        fingerprints = location_fingerprints(store) if previous is not None else None
+
+        reuse_from = np.full(store.location_count, -1, dtype=np.int64)
+        if previous is not None:
+            old_store = previous.store
+            for location, location_id in enumerate(store.location_ids):
+                old_location = old_store.find_location(location_id)
+                if old_location is not None and previous.fingerprints[old_location] == fingerprints[location]:
+                    reuse_from[location] = old_location
+            capacity_index = LocationCapacityIndex.from_previous(store, previous.capacity_index, reuse_from)
+            stats = DatasetStats.from_previous(store, old_store, previous.stats, reuse_from)
+        else:
+            capacity_index = LocationCapacityIndex.from_store(store)
+            stats = DatasetStats.from_store(store)
+
+        old_tables = previous.lane_tables if previous is not None else None
+        # Overlaid tables, and tables loaded without a build report, are rebuilt instead
+        if (
+            type(old_tables) is LaneTables and old_tables.depth == lane_depth
+            and isinstance(previous.store, ListingStore) and "pruned_entries" in old_tables.pruning
+        ):
+            lane_tables = LaneTables.from_previous(store, previous.store, old_tables, reuse_from)
+        else:
+            lane_tables = LaneTables.from_store(store, lane_depth)
+
+        reused = int(np.count_nonzero(reuse_from >= 0))
+        return cls(
+            store=store,
+            capacity_index=capacity_index,
+            lane_tables=lane_tables,
+            stats=stats,
+            fingerprints=fingerprints,
+            version=version,
+            dataset_hash=dataset_hash,
+            build_seconds=time.perf_counter() - started,
+            changed_locations=store.location_count - reused,
+            reused_locations=reused,
+            source=source,
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        """Version, source hash and build statistics"""
+        return {
+            "version": self.version,
+            "dataset_hash": self.dataset_hash,
+            "loaded_at": self.loaded_at,
+            "build_seconds": round(self.build_seconds, 4),
+            "source": self.source,
+            "listings": len(self.store),
+            "locations": self.store.location_count,
+            "changed_locations": self.changed_locations,
+            "reused_locations": self.reused_locations,
+            # Locations replaced by listing changes since the store was loaded or compacted
+            "overlay_locations": len(self.store.groups) if isinstance(self.store, OverlayListingStore) else 0,
+            "lane_tables": (
+                dict(self.lane_tables.pruning, depth=self.lane_tables.depth) if self.lane_tables is not None else None
+            ),
+        }
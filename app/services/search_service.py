@@ -2,23 +2,70 @@
 Search service for vehicle storage search
 """
 
-from typing import List
+import bisect
+import copy
+import heapq
+import os
+import time
+import numpy as np
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 from ..models.vehicle import Vehicle
 from ..models.vehicle_unit import VehicleUnit
-from ..models.listing import Listing
 from ..models.search_result import SearchResult
+from ..models.batch_search import BatchQueryResult, BatchSearchResponse
+from ..models.listing_store import ListingStore
 from ..utils.bin_packing import BinPackingAlgorithm
+from ..utils.capacity_index import LENGTH_BUCKETS, bucket_index
+from ..utils.lane_tables import pack_blocks_from_columns
+from ..utils.exact_packing import ExactPackingSolver
+from ..utils.answer_table import AnswerTable
+from ..utils.result_cache import ResultCache
+from ..utils.pagination import SortKey, decode_cursor, encode_cursor
+from ..utils.metrics import SearchMetrics
+from ..utils.wire_formats import JSON_MEDIA_TYPE, RESULT_FIELDS, encode_rows
 from .listing_service import ListingService
+from .listing_snapshot import ListingSnapshot
 from ..config.settings import settings
 
+if TYPE_CHECKING:
+    from .sharded_search import ShardedSearchEngine
+
+
+# Most location packs spent re-checking cached results after a listing change, beyond which the cache is dropped
+CARRY_OVER_PACK_BUDGET = 50_000
+
 
 class SearchService:
     """
     Service for handling vehicle storage search operations
     """
     
-    def __init__(self, listing_service: ListingService):
+    def __init__(self, listing_service: ListingService, packing_solver: Optional[str] = None):
         self.listing_service = listing_service
+        self.packing_solver = packing_solver or settings.packing_solver
+        if self.packing_solver == "exact":
+            self._find_rows = ExactPackingSolver.find_optimal_rows
+        elif self.packing_solver == "greedy":
+            self._find_rows = BinPackingAlgorithm.find_optimal_rows
+        else:
+            raise ValueError(f"Unknown packing solver: {self.packing_solver}")
+        # Running totals of the capacity prefilter
+        self.prefilter_stats = {"searches": 0, "locations_scanned": 0, "locations_pruned": 0}
+        # Running totals of the top-k search: locations packed vs skipped on their price bound
+        self.top_k_stats = {"searches": 0, "locations_packed": 0, "locations_skipped": 0}
+        # Results keyed on the canonical query; dropped whenever the dataset is
+        self.result_cache: Optional[ResultCache] = None
+        if settings.enable_caching:
+            self.result_cache = ResultCache(settings.cache_max_entries, settings.cache_ttl_seconds)
+            listing_service.add_invalidation_listener(self.result_cache.clear)
+            listing_service.add_change_listener(self._carry_over_results)
+        # Precomputed answers, used only while their dataset hash matches
+        self.answer_table: Optional[AnswerTable] = None
+        # Multi-process engine; when set, searches are scattered to its shard workers
+        self.sharded_engine: Optional["ShardedSearchEngine"] = None
+        # Per-stage latency histograms and counters, exported on /metrics
+        self.metrics = SearchMetrics()
     
     def validate_vehicles(self, vehicles: List[Vehicle]) -> None:
         """
@@ -30,16 +77,48 @@ class SearchService:
         Raises:
             ValueError: If validation fails
         """
-        if not vehicles:
+        self.validate_quantities([vehicle.quantity for vehicle in vehicles])
+    
+    def validate_quantities(self, quantities: List[int]) -> None:
+        """
+        Validate the per-vehicle quantities of a request
+        
+        Args:
+            quantities: Quantity of each vehicle entry
+            
+        Raises:
+            ValueError: If validation fails
+        """
+        if not quantities:
             raise ValueError("At least one vehicle is required")
         
-        total_quantity = sum(vehicle.quantity for vehicle in vehicles)
+        total_quantity = sum(quantities)
         if total_quantity > settings.max_vehicles_per_request:
             raise ValueError(f"Total vehicle quantity cannot exceed {settings.max_vehicles_per_request}")
         
         if total_quantity == 0:
             raise ValueError("At least one vehicle with quantity > 0 is required")
     
+    def validate_fleet_quantities(self, quantities: List[int]) -> None:
+        """
+        Validate the per-vehicle quantities of a fleet request
+        
+        Args:
+            quantities: Quantity of each vehicle entry
+            
+        Raises:
+            ValueError: If validation fails
+        """
+        if not quantities:
+            raise ValueError("At least one vehicle is required")
+        
+        total_quantity = sum(quantities)
+        if total_quantity > settings.fleet_max_vehicles:
+            raise ValueError(f"Total vehicle quantity cannot exceed {settings.fleet_max_vehicles}")
+        
+        if total_quantity == 0:
+            raise ValueError("At least one vehicle with quantity > 0 is required")
+    
     def convert_vehicles_to_units(self, vehicles: List[Vehicle]) -> List[VehicleUnit]:
         """
         Convert vehicles to individual vehicle units
@@ -55,6 +134,32 @@ class SearchService:
             vehicle_units.extend(vehicle.to_individual_vehicles())
         return vehicle_units
     
+    def vehicle_sizes(self, vehicles: List[Vehicle]) -> List[int]:
+        """
+        Expand vehicles into rounded lane lengths without building units
+        
+        Args:
+            vehicles: List of vehicles
+            
+        Returns:
+            List[int]: Rounded vehicle lengths, largest first
+        """
+        return BinPackingAlgorithm.vehicle_sizes(
+            vehicle.length for vehicle in vehicles for _ in range(vehicle.quantity)
+        )
+    
+    def fleet_blocks(self, vehicles: List[Vehicle]) -> List[Tuple[int, int]]:
+        """
+        Merge vehicles into blocks of equal rounded length, without expanding quantities
+        
+        Args:
+            vehicles: List of vehicles
+            
+        Returns:
+            List[Tuple[int, int]]: (rounded length, count) per distinct length, largest first
+        """
+        return BinPackingAlgorithm.vehicle_blocks((vehicle.length, vehicle.quantity) for vehicle in vehicles)
+    
     def search_locations(self, vehicles: List[Vehicle]) -> List[SearchResult]:
         """
         Search for storage locations that can accommodate the given vehicles
@@ -68,41 +173,645 @@ class SearchService:
         Raises:
             ValueError: If input validation fails
         """
+        metrics = self.metrics
+        started = time.perf_counter()
+        
         # Validate input
         self.validate_vehicles(vehicles)
+        validated = time.perf_counter()
+        metrics.validate_vehicles.observe(validated - started)
         
-        # Convert to vehicle units
-        vehicle_units = self.convert_vehicles_to_units(vehicles)
+        # Rounded vehicle lengths, largest first
+        sizes = self.vehicle_sizes(vehicles)
+        converted = time.perf_counter()
+        metrics.unit_conversion.observe(converted - validated)
         
-        # Get all location groups
-        location_groups = self.listing_service.get_listings_by_location()
+        # One snapshot for the whole search, even if a reload swaps in another meanwhile
+        snapshot, version, dataset_hash = self._current_dataset()
         
-        results = []
+        lookup_started = time.perf_counter()
+        answer = self._precomputed(sizes, version, dataset_hash)
+        metrics.lookup.observe(time.perf_counter() - lookup_started)
+        metrics.searches.inc()
+        if answer is not None:
+            metrics.precomputed.inc()
+            metrics.results_returned.inc(len(answer))
+            return list(answer)
         
-        # Check each location
-        for location_id, location_listings in location_groups.items():
-            # Check if vehicles can fit in this location
-            if BinPackingAlgorithm.can_fit_vehicles(vehicle_units, location_listings):
-                # Find optimal combination for this location
-                optimal_listings = BinPackingAlgorithm.find_optimal_combination(
-                    vehicle_units, location_listings
-                )
-                
-                if optimal_listings:
-                    total_price = BinPackingAlgorithm.calculate_total_price(optimal_listings)
-                    listing_ids = [listing.id for listing in optimal_listings]
-                    
-                    results.append(SearchResult(
+        results = self.search_sizes(sizes, snapshot)
+        if self.result_cache is not None:
+            self.result_cache.put((version, tuple(sizes)), tuple(results))
+        metrics.results_returned.inc(len(results))
+        return results
+    
+    def search_json(
+        self,
+        vehicles: List[Tuple[int, int]],
+        media_type: str = JSON_MEDIA_TYPE,
+        fields: Tuple[str, ...] = RESULT_FIELDS,
+    ) -> bytes:
+        """
+        ``search_locations`` for hand-validated input, producing the response body
+        
+        Used by the /search fast path: results go from plain tuples straight
+        to encoded bytes without building ``SearchResult`` objects, and the
+        encoded body is what gets cached (per media type and projection).
+        
+        Args:
+            vehicles: (length, quantity) per vehicle, within the ``Vehicle`` field bounds
+            media_type: Wire format (see ``wire_formats.available_media_types``), JSON by default
+            fields: Result fields to include
+            
+        Returns:
+            bytes: Results sorted by price; by default the JSON array /search returns
+            
+        Raises:
+            ValueError: If input validation fails
+        """
+        metrics = self.metrics
+        started = time.perf_counter()
+        
+        self.validate_quantities([quantity for _, quantity in vehicles])
+        validated = time.perf_counter()
+        metrics.validate_vehicles.observe(validated - started)
+        
+        sizes = BinPackingAlgorithm.vehicle_sizes(
+            length for length, quantity in vehicles for _ in range(quantity)
+        )
+        converted = time.perf_counter()
+        metrics.unit_conversion.observe(converted - validated)
+        
+        snapshot, version, dataset_hash = self._current_dataset()
+        
+        lookup_started = time.perf_counter()
+        key = (version, tuple(sizes), media_type, fields)
+        cached = self.result_cache.get(key) if self.result_cache is not None else None
+        rows = None
+        if cached is None and self.answer_table is not None and self.answer_table.dataset_hash == dataset_hash:
+            rows = self.answer_table.lookup_rows(sizes)
+        metrics.lookup.observe(time.perf_counter() - lookup_started)
+        metrics.searches.inc()
+        if cached is not None:
+            result_count, body = cached
+            metrics.precomputed.inc()
+            metrics.results_returned.inc(result_count)
+            return body
+        
+        if rows is not None:
+            metrics.precomputed.inc()
+        elif self.sharded_engine is not None:
+            rows = [
+                (location_id, listing_ids, total_price)
+                for _, location_id, listing_ids, total_price in self.sharded_engine.search(sizes)
+            ]
+        else:
+            store = snapshot.store
+            location_rows = self.search_rows(sizes, snapshot)
+            materialize_started = time.perf_counter()
+            location_ids, ids = store.location_ids, store.ids
+            rows = [
+                (location_ids[location], [ids[row] for row in listing_rows], total_price)
+                for location, listing_rows, total_price in location_rows
+            ]
+            metrics.materialize.observe(time.perf_counter() - materialize_started)
+        
+        encode_started = time.perf_counter()
+        body = encode_rows(rows, media_type, fields)
+        metrics.serialization.observe(time.perf_counter() - encode_started)
+        
+        if self.result_cache is not None:
+            self.result_cache.put(key, (len(rows), body))
+        metrics.results_returned.inc(len(rows))
+        return body
+    
+    def search_batch(self, queries: List[List[Vehicle]]) -> BatchSearchResponse:
+        """
+        Answer many searches at once
+        
+        Queries are reduced to their canonical form and deduplicated; those
+        not answered by the answer table or the cache are searched together
+        in a single pass over the candidate locations (see ``search_rows_batch``).
+        An invalid query gets an error entry instead of failing the batch.
+        
+        Args:
+            queries: One list of vehicles per search
+            
+        Returns:
+            BatchSearchResponse: Per-query results and timings, in request order
+            
+        Raises:
+            ValueError: If the batch is empty or too large
+        """
+        started = time.perf_counter()
+        if not queries:
+            raise ValueError("At least one query is required")
+        if len(queries) > settings.max_batch_queries:
+            raise ValueError(f"A batch cannot hold more than {settings.max_batch_queries} queries")
+        
+        canonical: List[Optional[Tuple[int, ...]]] = []
+        errors: List[Optional[str]] = []
+        for vehicles in queries:
+            try:
+                self.validate_vehicles(vehicles)
+            except ValueError as e:
+                canonical.append(None)
+                errors.append(str(e))
+                continue
+            canonical.append(self.canonical_query(vehicles))
+            errors.append(None)
+        unique = list(dict.fromkeys(sizes for sizes in canonical if sizes is not None))
+        
+        snapshot, version, dataset_hash = self._current_dataset()
+        answers: Dict[Tuple[int, ...], List[SearchResult]] = {}
+        seconds: Dict[Tuple[int, ...], float] = {}
+        pending = []
+        for sizes in unique:
+            lookup_started = time.perf_counter()
+            answer = self._precomputed(list(sizes), version, dataset_hash)
+            if answer is None:
+                pending.append(sizes)
+            else:
+                answers[sizes] = list(answer)
+                seconds[sizes] = time.perf_counter() - lookup_started
+        
+        if pending:
+            pending_sizes = [list(sizes) for sizes in pending]
+            if self.sharded_engine is not None:
+                found, pack_seconds = self.sharded_engine.search_batch(pending_sizes)
+            else:
+                found, pack_seconds = self.search_rows_batch(pending_sizes, snapshot)
+            for sizes, rows, elapsed in zip(pending, found, pack_seconds):
+                build_started = time.perf_counter()
+                if self.sharded_engine is not None:
+                    results = [
+                        SearchResult(location_id=location_id, listing_ids=listing_ids, total_price_in_cents=total_price)
+                        for _, location_id, listing_ids, total_price in rows
+                    ]
+                else:
+                    results = self._results_from_rows(snapshot.store, rows)
+                if self.result_cache is not None:
+                    self.result_cache.put((version, sizes), tuple(results))
+                answers[sizes] = results
+                seconds[sizes] = elapsed + time.perf_counter() - build_started
+        
+        self.metrics.searches.inc(len(unique))
+        self.metrics.precomputed.inc(len(unique) - len(pending))
+        self.metrics.results_returned.inc(sum(len(answers[sizes]) for sizes in canonical if sizes is not None))
+        return BatchSearchResponse(
+            queries=[
+                BatchQueryResult(error=error, time_ms=0.0) if sizes is None else
+                BatchQueryResult(results=answers[sizes], time_ms=round(seconds[sizes] * 1000, 3))
+                for sizes, error in zip(canonical, errors)
+            ],
+            query_count=len(queries),
+            unique_query_count=len(unique),
+            total_time_ms=round((time.perf_counter() - started) * 1000, 3),
+        )
+    
+    def search_page(
+        self,
+        vehicles: List[Vehicle],
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[SearchResult], Optional[str]]:
+        """
+        Search for one page of the results ``search_locations`` would return
+        
+        Args:
+            vehicles: List of vehicles to store
+            limit: Maximum number of results on the page
+            cursor: Cursor returned with the previous page, None for the first page
+            
+        Returns:
+            Tuple[List[SearchResult], Optional[str]]: The page and the cursor of the
+            next one (None on the last page)
+            
+        Raises:
+            ValueError: If input validation fails or the cursor is invalid or expired
+        """
+        self.validate_vehicles(vehicles)
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        sizes = self.vehicle_sizes(vehicles)
+        snapshot, version, dataset_hash = self._current_dataset()
+        after = decode_cursor(cursor, version, sizes) if cursor else None
+        
+        # Slice a full answer when one is already at hand; that needs each result's
+        # location index, which only a local snapshot has (shard workers page themselves)
+        full = self._precomputed(sizes, version, dataset_hash) if snapshot is not None else None
+        
+        if full is not None:
+            store = snapshot.store
+            keys = [(result.total_price_in_cents, store.find_location(result.location_id)) for result in full]
+            start = bisect.bisect_right(keys, after) if after is not None else 0
+            page = list(full[start:start + limit])
+            page_keys = keys[start:start + limit]
+            has_more = start + limit < len(full)
+        else:
+            # One extra result tells whether another page exists
+            if self.sharded_engine is not None:
+                rows = [
+                    ((total_price, location), SearchResult(
                         location_id=location_id,
                         listing_ids=listing_ids,
                         total_price_in_cents=total_price
                     ))
+                    for location, location_id, listing_ids, total_price
+                    in self.sharded_engine.search_top(sizes, limit + 1, after)
+                ]
+            else:
+                store = snapshot.store
+                rows = [
+                    ((total_price, location), SearchResult(
+                        location_id=store.location_ids[location],
+                        listing_ids=[store.ids[row] for row in listing_rows],
+                        total_price_in_cents=total_price
+                    ))
+                    for location, listing_rows, total_price in self.search_top_rows(sizes, limit + 1, after, snapshot)
+                ]
+            has_more = len(rows) > limit
+            page_keys = [key for key, _ in rows[:limit]]
+            page = [result for _, result in rows[:limit]]
         
-        # Sort by total price (ascending)
-        results.sort(key=lambda x: x.total_price_in_cents)
+        next_cursor = encode_cursor(version, sizes, page_keys[-1]) if has_more else None
+        self.metrics.searches.inc()
+        self.metrics.results_returned.inc(len(page))
+        return page, next_cursor
+    
+    def search_fleet(
+        self,
+        vehicles: List[Vehicle],
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[SearchResult], Optional[str]]:
+        """
+        Search for storage locations for a fleet of up to ``settings.fleet_max_vehicles`` vehicles
+        
+        Vehicles are merged into one block per rounded length and each block
+        is placed into lanes at once (see ``find_optimal_rows_for_blocks``),
+        so nothing is expanded, allocated or scanned per vehicle. Fleet
+        searches follow the greedy rule whatever ``packing_solver`` is; with
+        a sharded engine attached, its workers search their shards.
+        
+        Args:
+            vehicles: List of vehicles to store
+            limit: Maximum number of results, None for all of them
+            cursor: Cursor returned with the previous page, None for the first page
+            
+        Returns:
+            Tuple[List[SearchResult], Optional[str]]: Results sorted by price, and the cursor of the
+            next page (None on the last page)
+            
+        Raises:
+            ValueError: If input validation fails or the cursor is invalid or expired
+        """
+        metrics = self.metrics
+        started = time.perf_counter()
+        
+        self.validate_fleet_quantities([vehicle.quantity for vehicle in vehicles])
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1")
+        validated = time.perf_counter()
+        metrics.validate_vehicles.observe(validated - started)
+        
+        blocks = self.fleet_blocks(vehicles)
+        converted = time.perf_counter()
+        metrics.unit_conversion.observe(converted - validated)
+        
+        snapshot, version, _ = self._current_dataset()
+        # Cursors carry the blocks as JSON lists
+        query = [list(block) for block in blocks]
+        after = decode_cursor(cursor, version, query) if cursor else None
+        
+        lookup_started = time.perf_counter()
+        key = (version, tuple(blocks), "fleet")
+        full = self.result_cache.get(key) if self.result_cache is not None else None
+        metrics.lookup.observe(time.perf_counter() - lookup_started)
+        metrics.searches.inc()
+        if full is not None:
+            metrics.precomputed.inc()
+        
+        if limit is None:
+            if full is None:
+                if self.sharded_engine is not None:
+                    full = tuple(
+                        SearchResult(location_id=location_id, listing_ids=listing_ids, total_price_in_cents=total_price)
+                        for _, location_id, listing_ids, total_price in self.sharded_engine.search_fleet(blocks)
+                    )
+                else:
+                    rows = self.search_fleet_rows(blocks, snapshot)
+                    materialize_started = time.perf_counter()
+                    full = tuple(self._results_from_rows(snapshot.store, rows))
+                    metrics.materialize.observe(time.perf_counter() - materialize_started)
+                if self.result_cache is not None:
+                    self.result_cache.put(key, full)
+            metrics.results_returned.inc(len(full))
+            return list(full), None
+        
+        if full is not None and snapshot is not None:
+            store = snapshot.store
+            keys = [(result.total_price_in_cents, store.find_location(result.location_id)) for result in full]
+            start = bisect.bisect_right(keys, after) if after is not None else 0
+            page = list(full[start:start + limit])
+            page_keys = keys[start:start + limit]
+            has_more = start + limit < len(full)
+        elif self.sharded_engine is not None:
+            # One extra result tells whether another page exists
+            shard_rows = self.sharded_engine.search_fleet_top(blocks, limit + 1, after)
+            has_more = len(shard_rows) > limit
+            page_keys = [(total_price, location) for location, _, _, total_price in shard_rows[:limit]]
+            page = [
+                SearchResult(location_id=location_id, listing_ids=listing_ids, total_price_in_cents=total_price)
+                for _, location_id, listing_ids, total_price in shard_rows[:limit]
+            ]
+        else:
+            rows = self.search_fleet_top_rows(blocks, limit + 1, after, snapshot)
+            has_more = len(rows) > limit
+            page_keys = [(total_price, location) for location, _, total_price in rows[:limit]]
+            page = self._results_from_rows(snapshot.store, rows[:limit])
+        
+        next_cursor = encode_cursor(version, query, page_keys[-1]) if has_more else None
+        metrics.results_returned.inc(len(page))
+        return page, next_cursor
+    
+    def with_metrics(self, metrics: SearchMetrics) -> 'SearchService':
+        """
+        A view of this service recording into other metrics, e.g. a ``RequestTrace``
+        
+        Shares the dataset, caches, answer table and engine; only the
+        metrics object differs, so the service itself is never slowed down.
+        
+        Args:
+            metrics: Metrics the view's searches record into
+            
+        Returns:
+            SearchService: Shallow copy using ``metrics``
+        """
+        view = copy.copy(self)
+        view.metrics = metrics
+        return view
+    
+    def attach_sharded_engine(self, engine: "ShardedSearchEngine") -> None:
+        """
+        Route searches through a sharded engine, leaving the dataset to its workers
+        
+        The listing service stops loading (see ``ListingService.delegate_loading``),
+        so this process never holds more than the engine's merged results.
+        
+        Args:
+            engine: Running ShardedSearchEngine over the same listings file
+        """
+        self.sharded_engine = engine
+        self.listing_service.delegate_loading(engine)
+    
+    def load_answer_table(self, path: str) -> bool:
+        """
+        Attach a precomputed answer table if it matches the current dataset
+        
+        Args:
+            path: Answer table artifact
+            
+        Returns:
+            bool: True if the table was attached, False if it is missing, invalid or stale
+        """
+        self.answer_table = None
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            table = AnswerTable(path)
+        except ValueError as e:
+            print(f"Ignoring answer table {path}: {e}")
+            return False
+        if table.dataset_hash != self.listing_service.get_dataset_hash():
+            print(f"Ignoring answer table {path}: built for a different dataset")
+            return False
+        if table.meta.get("packing_solver", "greedy") != self.packing_solver:
+            print(f"Ignoring answer table {path}: built with the {table.meta.get('packing_solver')} solver")
+            return False
+        self.answer_table = table
+        print(f"Loaded answer table with {table.meta['query_count']} queries ({table.nbytes} bytes)")
+        return True
+    
+    def canonical_query(self, vehicles: List[Vehicle]) -> Tuple[int, ...]:
+        """
+        Canonical form of a request: the sorted multiset of rounded lengths
+        
+        ``[{length: 12, quantity: 2}]`` and ``[{length: 20, quantity: 1}, {length: 15, quantity: 1}]``
+        both become ``(20, 20)`` and are answered identically.
         
+        Args:
+            vehicles: List of vehicles
+            
+        Returns:
+            Tuple[int, ...]: Rounded vehicle lengths, largest first
+        """
+        return tuple(self.vehicle_sizes(vehicles))
+    
+    def search_sizes(self, sizes: List[int], snapshot: Optional[ListingSnapshot] = None) -> List[SearchResult]:
+        """
+        Run the search for rounded vehicle lengths, bypassing the cache
+        
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+            snapshot: Dataset snapshot to search, defaults to the current one
+            
+        Returns:
+            List[SearchResult]: List of search results sorted by price
+        """
+        if self.sharded_engine is not None:
+            return [
+                SearchResult(
+                    location_id=location_id,
+                    listing_ids=listing_ids,
+                    total_price_in_cents=total_price
+                )
+                for _, location_id, listing_ids, total_price in self.sharded_engine.search(sizes)
+            ]
+        
+        snapshot = snapshot or self.listing_service.get_snapshot()
+        rows = self.search_rows(sizes, snapshot)
+        started = time.perf_counter()
+        results = self._results_from_rows(snapshot.store, rows)
+        self.metrics.materialize.observe(time.perf_counter() - started)
         return results
     
+    def search_rows(
+        self,
+        sizes: List[int],
+        snapshot: Optional[ListingSnapshot] = None,
+    ) -> List[Tuple[int, List[int], int]]:
+        """
+        Core search over the columnar store, producing plain tuples
+        
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+            snapshot: Dataset snapshot to search, defaults to the current one
+            
+        Returns:
+            List[Tuple[int, List[int], int]]: (location index, listing rows, total_price_in_cents)
+            per feasible location, sorted by price then location index
+        """
+        started = time.perf_counter()
+        snapshot = snapshot or self.listing_service.get_snapshot()
+        pack = self._packer(snapshot, sizes)
+        
+        # Batched capacity check over all locations; only plausible ones get packed
+        candidates = snapshot.capacity_index.candidate_locations(sizes)
+        return self._pack_candidates(snapshot, candidates, pack, sizes, started)
+    
+    def search_rows_batch(
+        self,
+        queries: List[List[int]],
+        snapshot: Optional[ListingSnapshot] = None,
+    ) -> Tuple[List[List[Tuple[int, List[int], int]]], List[float]]:
+        """
+        ``search_rows`` for many queries in one pass over the locations
+        
+        Each location that is a candidate for any query is visited once and
+        every query is packed into it in turn: with the greedy solver from
+        the snapshot's lane tables, with the exact solver from columns
+        extracted once for all of them.
+        
+        Args:
+            queries: Rounded vehicle lengths per query, largest first
+            snapshot: Dataset snapshot to search, defaults to the current one
+            
+        Returns:
+            Tuple[List[List[Tuple[int, List[int], int]]], List[float]]: ``search_rows``
+            output per query, and the packing and sorting seconds spent on each
+        """
+        snapshot = snapshot or self.listing_service.get_snapshot()
+        store = snapshot.store
+        lane_tables = snapshot.lane_tables if self.packing_solver == "greedy" else None
+        if lane_tables is not None and not lane_tables.covers(max(map(len, queries), default=0)):
+            lane_tables = None
+        
+        # (location, query) candidate pairs, grouped by location
+        candidate_lists = [snapshot.capacity_index.candidate_locations(sizes) for sizes in queries]
+        for candidates in candidate_lists:
+            self._record_prefilter(store.location_count, len(candidates))
+        pair_locations = np.concatenate(candidate_lists) if candidate_lists else np.zeros(0, dtype=np.int64)
+        pair_queries = np.repeat(np.arange(len(queries)), [len(c) for c in candidate_lists])
+        order = np.argsort(pair_locations, kind="stable")
+        pair_locations = pair_locations[order]
+        pair_queries = pair_queries[order].tolist()
+        bounds = np.flatnonzero(np.diff(pair_locations)) + 1
+        
+        results: List[List[Tuple[int, List[int], int]]] = [[] for _ in queries]
+        seconds = [0.0] * len(queries)
+        for group_start, group_end in zip([0] + bounds.tolist(), bounds.tolist() + [len(pair_queries)]):
+            if group_start == group_end:
+                continue
+            location = int(pair_locations[group_start])
+            if lane_tables is not None:
+                pack = partial(lane_tables.pack, location)
+            else:
+                start, lengths, widths, prices = store.location_columns(location)
+                
+                def pack(sizes: List[int]) -> Optional[Tuple[List[int], int]]:
+                    rows = self._find_rows(sizes, lengths, widths, prices)
+                    if not rows:
+                        return None
+                    return [start + row for row in rows], sum(prices[row] for row in rows)
+            
+            for query in pair_queries[group_start:group_end]:
+                query_started = time.perf_counter()
+                packed = pack(queries[query])
+                if packed:
+                    rows, total_price = packed
+                    results[query].append((location, rows, total_price))
+                seconds[query] += time.perf_counter() - query_started
+        
+        for query, query_results in enumerate(results):
+            sort_started = time.perf_counter()
+            query_results.sort(key=lambda x: x[2])
+            seconds[query] += time.perf_counter() - sort_started
+        self.metrics.feasible_locations.inc(sum(len(query_results) for query_results in results))
+        return results, seconds
+    
+    def search_top_rows(
+        self,
+        sizes: List[int],
+        limit: int,
+        after: Optional[SortKey] = None,
+        snapshot: Optional[ListingSnapshot] = None,
+    ) -> List[Tuple[int, List[int], int]]:
+        """
+        The ``limit`` first results of ``search_rows`` that sort after a given key
+        
+        Candidates are packed in order of their price lower bound while a
+        bounded max-heap keeps the best ``limit`` results; once the next
+        bound cannot beat the worst kept result, no remaining location can
+        either and the scan stops.
+        
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+            limit: Number of results to return
+            after: Only return results whose (price, location) is greater than this
+            snapshot: Dataset snapshot to search, defaults to the current one
+            
+        Returns:
+            List[Tuple[int, List[int], int]]: (location index, listing rows, total_price_in_cents),
+            in the same order as ``search_rows``
+        """
+        started = time.perf_counter()
+        snapshot = snapshot or self.listing_service.get_snapshot()
+        pack = self._packer(snapshot, sizes)
+        
+        candidates = snapshot.capacity_index.candidate_locations(sizes)
+        bounds = snapshot.capacity_index.price_lower_bounds(sizes, candidates)
+        return self._top_candidates(snapshot, candidates, bounds, pack, sizes, limit, after, started)
+    
+    def search_fleet_rows(
+        self,
+        blocks: List[Tuple[int, int]],
+        snapshot: Optional[ListingSnapshot] = None,
+    ) -> List[Tuple[int, List[int], int]]:
+        """
+        ``search_rows`` for vehicles given as blocks
+        
+        Args:
+            blocks: (rounded length, count) pairs, largest length first
+            snapshot: Dataset snapshot to search, defaults to the current one
+            
+        Returns:
+            List[Tuple[int, List[int], int]]: (location index, listing rows, total_price_in_cents)
+            per feasible location, sorted by price then location index
+        """
+        started = time.perf_counter()
+        snapshot = snapshot or self.listing_service.get_snapshot()
+        pack = self._fleet_packer(snapshot, blocks)
+        candidates = snapshot.capacity_index.candidate_locations_for_counts(self._block_counts(blocks))
+        return self._pack_candidates(snapshot, candidates, pack, blocks, started)
+    
+    def search_fleet_top_rows(
+        self,
+        blocks: List[Tuple[int, int]],
+        limit: int,
+        after: Optional[SortKey] = None,
+        snapshot: Optional[ListingSnapshot] = None,
+    ) -> List[Tuple[int, List[int], int]]:
+        """
+        ``search_top_rows`` for vehicles given as blocks
+        
+        Args:
+            blocks: (rounded length, count) pairs, largest length first
+            limit: Number of results to return
+            after: Only return results whose (price, location) is greater than this
+            snapshot: Dataset snapshot to search, defaults to the current one
+            
+        Returns:
+            List[Tuple[int, List[int], int]]: (location index, listing rows, total_price_in_cents),
+            in the same order as ``search_fleet_rows``
+        """
+        started = time.perf_counter()
+        snapshot = snapshot or self.listing_service.get_snapshot()
+        pack = self._fleet_packer(snapshot, blocks)
+        counts = self._block_counts(blocks)
+        candidates = snapshot.capacity_index.candidate_locations_for_counts(counts)
+        bounds = snapshot.capacity_index.price_lower_bounds_for_counts(counts, candidates)
+        return self._top_candidates(snapshot, candidates, bounds, pack, blocks, limit, after, started)
+    
     def get_search_statistics(self, vehicles: List[Vehicle]) -> dict:
         """
         Get statistics about the search operation
@@ -113,21 +822,330 @@ class SearchService:
         Returns:
             dict: Search statistics
         """
-        vehicle_units = self.convert_vehicles_to_units(vehicles)
-        location_groups = self.listing_service.get_listings_by_location()
+        sizes = self.vehicle_sizes(vehicles)
+        if self.sharded_engine is not None:
+            counts = self.sharded_engine.location_statistics(sizes)
+        else:
+            counts = self.location_statistics(sizes)
+        total_locations = counts["total_locations"]
+        feasible_locations = counts["feasible_locations"]
         
-        total_locations = len(location_groups)
-        feasible_locations = 0
-        total_listings = sum(len(listings) for listings in location_groups.values())
+        return {
+            "total_vehicles": len(sizes),
+            "total_locations": total_locations,
+            "feasible_locations": feasible_locations,
+            "total_listings": counts["total_listings"],
+            "candidate_locations": counts["candidate_locations"],
+            "pruned_locations": total_locations - counts["candidate_locations"],
+            "feasibility_rate": feasible_locations / total_locations if total_locations > 0 else 0
+        }
+    
+    def location_statistics(self, sizes: List[int], snapshot: Optional[ListingSnapshot] = None) -> Dict[str, int]:
+        """
+        Count the locations a query could use, for ``get_search_statistics``
         
-        for location_listings in location_groups.values():
-            if BinPackingAlgorithm.can_fit_vehicles(vehicle_units, location_listings):
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+            snapshot: Dataset snapshot to search, defaults to the current one
+            
+        Returns:
+            Dict[str, int]: ``total_locations``, ``feasible_locations``, ``total_listings``
+            and ``candidate_locations`` (those passing the capacity prefilter)
+        """
+        snapshot = snapshot or self.listing_service.get_snapshot()
+        store = snapshot.store
+        pack = self._packer(snapshot, sizes)
+        candidates = snapshot.capacity_index.candidate_locations(sizes)
+        
+        feasible_locations = 0
+        for location in candidates.tolist():
+            if pack(location, sizes):
                 feasible_locations += 1
         
         return {
-            "total_vehicles": len(vehicle_units),
-            "total_locations": total_locations,
+            "total_locations": store.location_count,
             "feasible_locations": feasible_locations,
-            "total_listings": total_listings,
-            "feasibility_rate": feasible_locations / total_locations if total_locations > 0 else 0
-        }
\ No newline at end of file
+            "total_listings": len(store),
+            "candidate_locations": len(candidates),
+        }
+    
+    def _current_dataset(self) -> Tuple[Optional[ListingSnapshot], int, str]:
+        """
+        The snapshot to search with its version and dataset hash
+        
+        With a sharded engine the workers hold the dataset: there is no
+        snapshot in this process, and the version and hash come from the
+        listing service, which never loads in that mode.
+        """
+        if self.sharded_engine is not None:
+            return None, self.listing_service.dataset_version, self.listing_service.get_dataset_hash()
+        snapshot = self.listing_service.get_snapshot()
+        return snapshot, snapshot.version, snapshot.dataset_hash
+    
+    def _precomputed(self, sizes: List[int], version: int, dataset_hash: str) -> Optional[List[SearchResult]]:
+        """Full results from the answer table or the result cache, or None if neither has them"""
+        if self.answer_table is not None and self.answer_table.dataset_hash == dataset_hash:
+            answer = self.answer_table.lookup(sizes)
+            if answer is not None:
+                return answer
+        if self.result_cache is not None:
+            return self.result_cache.get((version, tuple(sizes)))
+        return None
+    
+    def _carry_over_results(
+        self,
+        previous: ListingSnapshot,
+        snapshot: ListingSnapshot,
+        locations: List[int],
+    ) -> None:
+        """
+        Keep cached results that a listing change cannot have affected
+        
+        A cached query's results only change if one of the changed locations
+        now packs differently (or starts or stops fitting), so each distinct
+        cached query is packed into just those locations on both snapshots.
+        Entries that still hold move to the new version; the rest are dropped.
+        
+        Args:
+            previous: Snapshot the cached results were computed on
+            snapshot: Snapshot with the changes applied
+            locations: Indices of the changed locations
+        """
+        keys = [key for key in self.result_cache.keys() if key[0] == previous.version]
+        queries = {key[1] for key in keys}
+        if len(queries) * len(locations) > CARRY_OVER_PACK_BUDGET:
+            self.result_cache.clear()
+            return
+        
+        old_store, new_store = previous.store, snapshot.store
+        unaffected = {}
+        for sizes in queries:
+            sizes_list = list(sizes)
+            # Fleet searches are cached under their (length, count) blocks
+            packer = self._fleet_packer if sizes and isinstance(sizes[0], tuple) else self._packer
+            old_pack, new_pack = packer(previous, sizes_list), packer(snapshot, sizes_list)
+            unaffected[sizes] = True
+            for location in locations:
+                old = old_pack(location, sizes_list) if location < old_store.location_count else None
+                new = new_pack(location, sizes_list)
+                if (old is None) != (new is None) or (old is not None and (
+                    old[1] != new[1]
+                    or [old_store.ids[row] for row in old[0]] != [new_store.ids[row] for row in new[0]]
+                )):
+                    unaffected[sizes] = False
+                    break
+        
+        self.result_cache.rekey({
+            key: (snapshot.version,) + key[1:] if key[0] == previous.version and unaffected.get(key[1], False) else None
+            for key in self.result_cache.keys()
+            if key[0] != snapshot.version
+        })
+    
+    def _results_from_rows(
+        self,
+        store: ListingStore,
+        rows: List[Tuple[int, List[int], int]],
+    ) -> List[SearchResult]:
+        """Materialize ``search_rows`` tuples as ``SearchResult`` objects"""
+        return [
+            SearchResult(
+                location_id=store.location_ids[location],
+                listing_ids=[store.ids[row] for row in listing_rows],
+                total_price_in_cents=total_price
+            )
+            for location, listing_rows, total_price in rows
+        ]
+    
+    def _pack_candidates(
+        self,
+        snapshot: ListingSnapshot,
+        candidates: np.ndarray,
+        pack: Callable,
+        query: List,
+        started: float,
+    ) -> List[Tuple[int, List[int], int]]:
+        """
+        ``search_rows`` over prefiltered candidates: pack each one, keep the feasible ones sorted by price
+        
+        Args:
+            snapshot: Dataset snapshot being searched
+            candidates: Ascending location indices that passed the capacity prefilter
+            pack: ``pack(location, query)`` returning (store rows, total_price_in_cents), or None
+            query: Vehicles as ``pack`` takes them
+            started: When the search started, for the location scan stage
+        """
+        metrics = self.metrics
+        self._record_prefilter(snapshot.store.location_count, len(candidates))
+        scanned = time.perf_counter()
+        metrics.location_scan.observe(scanned - started)
+        
+        results = []
+        
+        # Check each candidate location (ascending, so ties keep location order)
+        for location in candidates.tolist():
+            packed = pack(location, query)
+            
+            if packed:
+                rows, total_price = packed
+                results.append((location, rows, total_price))
+        packed_at = time.perf_counter()
+        metrics.packing.observe(packed_at - scanned)
+        metrics.feasible_locations.inc(len(results))
+        
+        # Sort by total price (ascending)
+        results.sort(key=lambda x: x[2])
+        metrics.sorting.observe(time.perf_counter() - packed_at)
+        
+        return results
+    
+    def _top_candidates(
+        self,
+        snapshot: ListingSnapshot,
+        candidates: np.ndarray,
+        bounds: np.ndarray,
+        pack: Callable,
+        query: List,
+        limit: int,
+        after: Optional[SortKey],
+        started: float,
+    ) -> List[Tuple[int, List[int], int]]:
+        """
+        ``search_top_rows`` over prefiltered candidates and their price lower bounds
+        
+        Args:
+            snapshot: Dataset snapshot being searched
+            candidates: Ascending location indices that passed the capacity prefilter
+            bounds: Price lower bound of each candidate
+            pack: ``pack(location, query)`` returning (store rows, total_price_in_cents), or None
+            query: Vehicles as ``pack`` takes them
+            limit: Number of results to return
+            after: Only return results whose (price, location) is greater than this
+            started: When the search started, for the location scan stage
+        """
+        metrics = self.metrics
+        self._record_prefilter(snapshot.store.location_count, len(candidates))
+        scanned = time.perf_counter()
+        metrics.location_scan.observe(scanned - started)
+        
+        # Max-heap of the best results so far, as (-price, -location, rows)
+        heap: List[Tuple[int, int, List[int]]] = []
+        packed = 0
+        feasible = 0
+        for index in np.lexsort((candidates, bounds)).tolist():
+            location = int(candidates[index])
+            if len(heap) == limit and (int(bounds[index]), location) > (-heap[0][0], -heap[0][1]):
+                break
+            packed += 1
+            result = pack(location, query)
+            if result is None:
+                continue
+            rows, total_price = result
+            feasible += 1
+            if after is not None and (total_price, location) <= after:
+                continue
+            if len(heap) < limit:
+                heapq.heappush(heap, (-total_price, -location, rows))
+            elif (total_price, location) < (-heap[0][0], -heap[0][1]):
+                heapq.heapreplace(heap, (-total_price, -location, rows))
+        
+        packed_at = time.perf_counter()
+        metrics.packing.observe(packed_at - scanned)
+        metrics.feasible_locations.inc(feasible)
+        
+        stats = self.top_k_stats
+        stats["searches"] += 1
+        stats["locations_packed"] += packed
+        stats["locations_skipped"] += len(candidates) - packed
+        
+        ordered = [(-location, rows, -price) for price, location, rows in sorted(heap, reverse=True)]
+        metrics.sorting.observe(time.perf_counter() - packed_at)
+        return ordered
+    
+    def _record_prefilter(self, total_locations: int, candidate_count: int) -> None:
+        """Accumulate prefilter counters for one search"""
+        stats = self.prefilter_stats
+        stats["searches"] += 1
+        stats["locations_scanned"] += candidate_count
+        stats["locations_pruned"] += total_locations - candidate_count
+        self.metrics.locations_scanned.inc(candidate_count)
+        self.metrics.locations_pruned.inc(total_locations - candidate_count)
+    
+    def _packer(
+        self,
+        snapshot: ListingSnapshot,
+        sizes: List[int],
+    ) -> Callable[[int, List[int]], Optional[Tuple[List[int], int]]]:
+        """
+        Function packing the vehicles into one location of a snapshot
+        
+        The greedy solver reads the snapshot's lane tables when there are any
+        deep enough for the query; otherwise the location's columns are packed.
+        
+        Args:
+            snapshot: Dataset snapshot being searched
+            sizes: Rounded vehicle lengths that will be packed
+            
+        Returns:
+            Callable: ``pack(location, sizes)`` returning (store rows, total_price_in_cents), or None
+        """
+        lane_tables = snapshot.lane_tables
+        if self.packing_solver == "greedy" and lane_tables is not None and lane_tables.covers(len(sizes)):
+            return lane_tables.pack
+        store = snapshot.store
+        return lambda location, sizes: self._pack_location(store, location, sizes)
+    
+    def _fleet_packer(
+        self,
+        snapshot: ListingSnapshot,
+        blocks: List[Tuple[int, int]],
+    ) -> Callable[[int, List[Tuple[int, int]]], Optional[Tuple[List[int], int]]]:
+        """
+        Function packing blocks of vehicles into one location of a snapshot
+        
+        Blocks are placed from the snapshot's lane tables when it has any,
+        falling back to the location's columns where the tables were cut
+        shorter than the fleet needs.
+        
+        Args:
+            snapshot: Dataset snapshot being searched
+            blocks: Vehicle blocks that will be packed
+            
+        Returns:
+            Callable: ``pack(location, blocks)`` returning (store rows, total_price_in_cents), or None
+        """
+        location_columns = snapshot.store.location_columns
+        lane_tables = snapshot.lane_tables
+        if lane_tables is not None:
+            return lambda location, blocks: lane_tables.pack_blocks(location, blocks, location_columns)
+        return lambda location, blocks: pack_blocks_from_columns(location, blocks, location_columns)
+    
+    @staticmethod
+    def _block_counts(blocks: List[Tuple[int, int]]) -> np.ndarray:
+        """Vehicles per length bucket, as the capacity index takes them"""
+        counts = np.zeros(len(LENGTH_BUCKETS), dtype=np.int64)
+        for size, count in blocks:
+            counts[bucket_index(size)] += count
+        return counts
+    
+    def _pack_location(
+        self,
+        store: ListingStore,
+        location: int,
+        sizes: List[int],
+    ) -> Optional[Tuple[List[int], int]]:
+        """
+        Pack the vehicles into one location
+        
+        Args:
+            store: Columnar listing store
+            location: Location index
+            sizes: Rounded vehicle lengths, largest first
+            
+        Returns:
+            Optional[Tuple[List[int], int]]: (store rows, total_price_in_cents), or None if they don't fit
+        """
+        start, lengths, widths, prices = store.location_columns(location)
+        rows = self._find_rows(sizes, lengths, widths, prices)
+        if not rows:
+            return None
+        return [start + row for row in rows], sum(prices[row] for row in rows)
\ No newline at end of file
@@ -0,0 +1,382 @@
+"""
+Scatter/gather search over a pool of long-lived shard worker processes
+"""
+
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+from .listing_service import ListingService
+from .search_service import SearchService
+
+
+# (global location index, location_id, listing_ids, total_price_in_cents)
+ShardResult = Tuple[int, str, List[str], int]
+
+# Summed across shards by ``ShardedSearchEngine.location_statistics``
+STATISTICS_COUNTS = ("total_locations", "feasible_locations", "total_listings", "candidate_locations")
+
+
+def _shard_worker(
+    conn: Any,
+    listings_file_path: str,
+    shard_index: int,
+    shard_count: int,
+    packing_solver: str,
+    compiled_listings_path: Optional[str] = None,
+) -> None:
+    """
+    Worker loop: load one shard of locations at startup, then answer queries until told to stop.
+
+    Messages in are ``(request_id, command, payload)`` with the commands
+    ``("search", sizes)``, ``("top", (sizes, limit, after))``,
+    ``("batch", queries)``, ``("fleet", blocks)``,
+    ``("fleet_top", (blocks, limit, after))``, ``("statistics", sizes)``,
+    ``("reload", force)`` and ``("stop", None)``; a reload only rebuilds the
+    shard if the file contents changed (or ``force``). Every message is
+    answered with ``(request_id, "ok", payload)`` or
+    ``(request_id, "error", message)``; the startup load answers as request 0.
+    """
+    listing_service = ListingService(
+        listings_file_path, shard=(shard_index, shard_count), compiled_listings_path=compiled_listings_path
+    )
+    search_service = SearchService(listing_service, packing_solver=packing_solver)
+    search_service.result_cache = None
+
+    def describe() -> Dict[str, Any]:
+        snapshot = listing_service.get_snapshot()
+        return {
+            "listings": len(snapshot.store),
+            "locations": snapshot.store.location_count,
+            "dataset_hash": snapshot.dataset_hash,
+        }
+
+    def global_rows(store: Any, rows: List[Tuple[int, List[int], int]]) -> List[ShardResult]:
+        return [
+            # Shard-local location i is global location i * shard_count + shard_index
+            (location * shard_count + shard_index, store.location_ids[location],
+             [store.ids[row] for row in listing_rows], total_price)
+            for location, listing_rows, total_price in rows
+        ]
+
+    def local_after(after: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        if after is None:
+            return None
+        # Global location g sorts after ``after`` iff its local index does after this bound
+        return after[0], (after[1] - shard_index) // shard_count
+
+    try:
+        conn.send((0, "ok", describe()))
+    except Exception as e:
+        conn.send((0, "error", str(e)))
+        return
+
+    while True:
+        request_id, command, payload = conn.recv()
+        if command == "stop":
+            conn.send((request_id, "ok", None))
+            return
+        try:
+            if command == "reload":
+                reloaded = listing_service.reload(payload)
+                conn.send((request_id, "ok", dict(describe(), reloaded=reloaded)))
+                continue
+            snapshot = listing_service.get_snapshot()
+            store = snapshot.store
+            if command == "search":
+                reply = global_rows(store, search_service.search_rows(payload, snapshot))
+            elif command == "top":
+                sizes, limit, after = payload
+                reply = global_rows(store, search_service.search_top_rows(sizes, limit, local_after(after), snapshot))
+            elif command == "batch":
+                found, seconds = search_service.search_rows_batch(payload, snapshot)
+                reply = ([global_rows(store, query_rows) for query_rows in found], seconds)
+            elif command == "fleet":
+                reply = global_rows(store, search_service.search_fleet_rows(payload, snapshot))
+            elif command == "fleet_top":
+                blocks, limit, after = payload
+                reply = global_rows(
+                    store, search_service.search_fleet_top_rows(blocks, limit, local_after(after), snapshot)
+                )
+            elif command == "statistics":
+                reply = search_service.location_statistics(payload, snapshot)
+            else:
+                conn.send((request_id, "error", f"Unknown command: {command}"))
+                continue
+            conn.send((request_id, "ok", reply))
+        except Exception as e:
+            conn.send((request_id, "error", str(e)))
+
+
+def _merge(shard_results: List[List[ShardResult]]) -> Any:
+    """Shard results merged by (price, global location index), lazily"""
+    return heapq.merge(*shard_results, key=lambda result: (result[3], result[0]))
+
+
+class ShardedSearchEngine:
+    """
+    Search engine that splits locations round-robin across worker processes.
+
+    Each worker loads its own shard once and keeps it in memory. A query ships
+    only the canonical sizes to every worker; each returns its feasible
+    locations already sorted, and the lists are merged by (price, location
+    order) so the output matches the single-process engine exactly.
+
+    Requests are tagged with an id and answered through per-shard reader
+    threads, so concurrent searches overlap instead of queueing behind one
+    another. Only sending is serialized, which keeps every worker seeing
+    requests (and reloads) in the same order.
+    """
+
+    def __init__(
+        self,
+        listings_file_path: str,
+        worker_count: int,
+        packing_solver: str = "greedy",
+        compiled_listings_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            listings_file_path: Dataset every worker loads its shard from
+            worker_count: Number of worker processes (shards)
+            packing_solver: Solver each worker uses, see ``settings.packing_solver``
+            compiled_listings_path: Compiled form of the dataset workers memory-map when it is current
+
+        Raises:
+            ValueError: If a worker fails to load its shard
+        """
+        if worker_count < 1:
+            raise ValueError("worker_count must be at least 1")
+        self.worker_count = worker_count
+        # Held only while a request is written to every worker
+        self._send_lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        # Futures of requests sent but not answered yet, by (shard, request id)
+        self._pending: Dict[Tuple[int, int], Future] = {}
+        self._closed = False
+        context = multiprocessing.get_context("spawn")
+        self._connections = []
+        self._processes = []
+        for shard_index in range(worker_count):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_shard_worker,
+                args=(child_conn, listings_file_path, shard_index, worker_count, packing_solver, compiled_listings_path),
+                daemon=True,
+                name=f"search-shard-{shard_index}",
+            )
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+        replies = [conn.recv() for conn in self._connections]
+        errors = [payload for _, status, payload in replies if status != "ok"]
+        if errors:
+            self._stop_workers()
+            for conn in self._connections:
+                conn.close()
+            raise ValueError(f"Shard worker failed: {errors[0]}")
+        self._describe([payload for _, _, payload in replies])
+        self._readers = [
+            threading.Thread(target=self._read, args=(shard, conn), name=f"search-shard-{shard}-reader", daemon=True)
+            for shard, conn in enumerate(self._connections)
+        ]
+        for reader in self._readers:
+            reader.start()
+
+    @classmethod
+    def with_default_workers(
+        cls,
+        listings_file_path: str,
+        worker_count: int,
+        packing_solver: str,
+        compiled_listings_path: Optional[str] = None,
+    ) -> 'ShardedSearchEngine':
+        """Create an engine; ``worker_count`` 0 means one worker per CPU"""
+        return cls(listings_file_path, worker_count or os.cpu_count() or 1, packing_solver, compiled_listings_path)
+
+    def _describe(self, shards: List[Dict[str, Any]]) -> None:
+        self.shard_sizes = [shard["listings"] for shard in shards]
+        self.shard_locations = [shard["locations"] for shard in shards]
+        self.dataset_hash = shards[0]["dataset_hash"]
+
+    @property
+    def listing_count(self) -> int:
+        """Listings across every shard"""
+        return sum(self.shard_sizes)
+
+    @property
+    def location_count(self) -> int:
+        """Locations across every shard"""
+        return sum(self.shard_locations)
+
+    def describe(self) -> Dict[str, Any]:
+        """Dataset hash and listing and location counts, in total and per shard"""
+        return {
+            "dataset_hash": self.dataset_hash,
+            "source": f"{self.worker_count} shard workers",
+            "listings": self.listing_count,
+            "locations": self.location_count,
+            "shard_listings": list(self.shard_sizes),
+            "shard_locations": list(self.shard_locations),
+        }
+
+    def _read(self, shard: int, conn: Any) -> None:
+        """Reader thread of one worker: hand each reply to the request waiting for it"""
+        while True:
+            try:
+                request_id, status, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            future = self._pending.pop((shard, request_id), None)
+            if future is None:
+                continue
+            if status == "ok":
+                future.set_result(payload)
+            else:
+                future.set_exception(ValueError(f"Shard worker failed: {payload}"))
+        # The worker is gone; nothing will answer what it still owes
+        with self._send_lock:
+            self._closed = True
+            keys = [key for key in self._pending if key[0] == shard]
+        for key in keys:
+            future = self._pending.pop(key, None)
+            if future is not None:
+                future.set_exception(ValueError(f"Shard worker {shard} exited"))
+
+    def _send(self, command: str, payload: Any = None) -> List[Future]:
+        """Send one request to every worker; returns a future of each worker's reply"""
+        with self._send_lock:
+            if self._closed:
+                raise ValueError("Sharded search engine is closed")
+            request_id = next(self._request_ids)
+            futures = []
+            for shard, conn in enumerate(self._connections):
+                future = Future()
+                # Registered before sending, so the reply always finds it
+                self._pending[(shard, request_id)] = future
+                conn.send((request_id, command, payload))
+                futures.append(future)
+            return futures
+
+    def _broadcast(self, command: str, payload: Any = None) -> List[Any]:
+        return [future.result() for future in self._send(command, payload)]
+
+    def search(self, sizes: List[int]) -> List[ShardResult]:
+        """
+        Search every shard and merge the results
+
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+
+        Returns:
+            List[ShardResult]: Results sorted by price, ties in dataset location order
+        """
+        return list(_merge(self._broadcast("search", list(sizes))))
+
+    def search_top(self, sizes: List[int], limit: int, after: Optional[Tuple[int, int]] = None) -> List[ShardResult]:
+        """
+        The ``limit`` cheapest results after a sort key, across every shard
+
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+            limit: Number of results to return
+            after: Only return results whose (price, global location index) is greater
+
+        Returns:
+            List[ShardResult]: At most ``limit`` results in ``search`` order
+        """
+        shard_results = self._broadcast("top", (list(sizes), limit, after))
+        return list(itertools.islice(_merge(shard_results), limit))
+
+    def search_batch(self, queries: List[List[int]]) -> Tuple[List[List[ShardResult]], List[float]]:
+        """
+        Search every shard for a batch of queries
+
+        Args:
+            queries: Rounded vehicle lengths per query, largest first
+
+        Returns:
+            Tuple[List[List[ShardResult]], List[float]]: Merged results per query, and
+            the seconds each query took on its slowest shard
+        """
+        replies = self._broadcast("batch", [list(sizes) for sizes in queries])
+        results = [list(_merge([found[query] for found, _ in replies])) for query in range(len(queries))]
+        seconds = [max(shard_seconds[query] for _, shard_seconds in replies) for query in range(len(queries))]
+        return results, seconds
+
+    def search_fleet(self, blocks: List[Tuple[int, int]]) -> List[ShardResult]:
+        """
+        ``search`` for vehicles given as (rounded length, count) blocks, largest length first
+        """
+        return list(_merge(self._broadcast("fleet", list(blocks))))
+
+    def search_fleet_top(
+        self,
+        blocks: List[Tuple[int, int]],
+        limit: int,
+        after: Optional[Tuple[int, int]] = None,
+    ) -> List[ShardResult]:
+        """
+        ``search_top`` for vehicles given as (rounded length, count) blocks, largest length first
+        """
+        shard_results = self._broadcast("fleet_top", (list(blocks), limit, after))
+        return list(itertools.islice(_merge(shard_results), limit))
+
+    def location_statistics(self, sizes: List[int]) -> Dict[str, int]:
+        """
+        ``SearchService.location_statistics`` summed over every shard
+
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+
+        Returns:
+            Dict[str, int]: Location, candidate, feasible and listing counts
+        """
+        replies = self._broadcast("statistics", list(sizes))
+        return {name: sum(reply[name] for reply in replies) for name in STATISTICS_COUNTS}
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Make every worker reload its shard from disk
+
+        Args:
+            force: Rebuild even if the file contents are unchanged
+
+        Returns:
+            bool: True if any worker swapped in a new shard
+        """
+        replies = self._broadcast("reload", force)
+        self._describe(replies)
+        return any(reply["reloaded"] for reply in replies)
+
+    def _stop_workers(self) -> None:
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def close(self) -> None:
+        """Stop the workers, after the requests already sent to them"""
+        try:
+            futures = self._send("stop")
+        except (ValueError, OSError):
+            futures = []
+        for future in futures:
+            try:
+                future.result(timeout=5)
+            except Exception:
+                pass
+        with self._send_lock:
+            self._closed = True
+        self._stop_workers()
+        # Readers exit once their worker's end of the pipe closes
+        for reader in self._readers:
+            reader.join(timeout=5)
+        for conn in self._connections:
+            conn.close()
+        self._connections = []
+        self._processes = []
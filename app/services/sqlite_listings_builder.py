@@ -0,0 +1,56 @@
+"""
+Import step turning listings.json into the indexed SQLite database served by the sqlite storage backend
+
+Usage:
+    python -m app.services.sqlite_listings_builder [listings.json] [listings.db]
+"""
+
+import sys
+import time
+from typing import Any, Dict
+from ..utils.sqlite_listings import write_sqlite_listings
+from .listing_service import ListingService
+from ..config.settings import settings
+
+
+def build_sqlite_listings(listings_file_path: str, output_path: str) -> Dict[str, Any]:
+    """
+    Parse a listings file once and write its store, capacity summary and aggregates to SQLite
+
+    Args:
+        listings_file_path: Dataset to import
+        output_path: Database destination, replaced atomically
+
+    Returns:
+        Dict[str, Any]: Build report (listing/location counts, parse and build time, database size)
+    """
+    started = time.perf_counter()
+    listing_service = ListingService(listings_file_path, storage_backend="json")
+    snapshot = listing_service.get_snapshot()
+    parse_seconds = time.perf_counter() - started
+
+    meta = {"dataset_hash": snapshot.dataset_hash}
+    database_bytes = write_sqlite_listings(
+        output_path, snapshot.store, snapshot.capacity_index, snapshot.stats, meta
+    )
+
+    return {
+        "dataset_hash": snapshot.dataset_hash,
+        "listing_count": len(snapshot.store),
+        "location_count": snapshot.store.location_count,
+        "parse_seconds": round(parse_seconds, 3),
+        "build_seconds": round(time.perf_counter() - started, 3),
+        "database_bytes": database_bytes,
+        "output_path": output_path,
+    }
+
+
+if __name__ == "__main__":
+    listings_path = sys.argv[1] if len(sys.argv) > 1 else settings.listings_file_path
+    output = sys.argv[2] if len(sys.argv) > 2 else settings.sqlite_database_path
+    report = build_sqlite_listings(listings_path, output)
+    print(
+        f"Imported {report['listing_count']} listings / {report['location_count']} locations "
+        f"in {report['build_seconds']:.2f}s (JSON parse {report['parse_seconds']:.2f}s), "
+        f"{report['database_bytes'] / 1024:.1f} KiB -> {report['output_path']}"
+    )
@@ -0,0 +1,117 @@
+"""
+Startup warm-up: load the dataset, build its derived indexes and run warm-up searches before reporting ready
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..models.listing_store import ListingStore
+from ..models.vehicle import Vehicle
+from ..utils.metrics import SearchMetrics
+from .search_service import SearchService
+
+
+class WarmUp:
+    """
+    Warms a search service on a background thread, so the first user request does not pay for it.
+
+    The stages run in order: ``load`` builds the first snapshot (parsing or
+    memory-mapping the dataset, capacity index, lane tables, statistics),
+    ``indexes`` computes what a snapshot otherwise derives on first use (the
+    location fingerprints the next reload diffs against), and ``queries``
+    runs each warm-up query like a /search request (and through the fast
+    path's encoder when it is enabled). Warm-up searches fill the result
+    cache but record into their own metrics, so /metrics only counts user
+    traffic. Until every stage has finished, ``ready`` is False.
+    """
+
+    def __init__(self, search_service: SearchService, queries: List[List[Dict[str, Any]]], fast_search: bool = False):
+        self.search_service = search_service
+        self.queries = queries
+        self.fast_search = fast_search
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.stage_seconds: Dict[str, float] = {}
+        self.duration_seconds: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self.run, name="warm-up", daemon=True)
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> 'WarmUp':
+        """Run the warm-up in a daemon thread"""
+        self._thread.start()
+        return self
+
+    def run(self) -> None:
+        """Run every stage on the calling thread, recording timings and the outcome"""
+        self.state = "running"
+        started = time.perf_counter()
+        service = self.search_service.with_metrics(SearchMetrics())
+        try:
+            stage_started = time.perf_counter()
+            snapshot = None
+            # Shard workers load their shards before the engine exists; this process never loads then
+            if service.sharded_engine is None:
+                snapshot = service.listing_service.get_snapshot()
+            self.stage_seconds["load"] = time.perf_counter() - stage_started
+
+            stage_started = time.perf_counter()
+            # Overlaid and SQLite stores are never diffed, so they need no fingerprints
+            if snapshot is not None and isinstance(snapshot.store, ListingStore):
+                snapshot.fingerprints
+            self.stage_seconds["indexes"] = time.perf_counter() - stage_started
+
+            stage_started = time.perf_counter()
+            for query in self.queries:
+                if self._stop.is_set():
+                    self.state = "stopped"
+                    return
+                vehicles = [Vehicle(**vehicle) for vehicle in query]
+                service.search_locations(vehicles)
+                if self.fast_search:
+                    service.search_json([(vehicle.length, vehicle.quantity) for vehicle in vehicles])
+            self.stage_seconds["queries"] = time.perf_counter() - stage_started
+
+            self.duration_seconds = time.perf_counter() - started
+            self.state = "ready"
+            print(f"Warm-up finished in {self.duration_seconds:.3f}s ({len(self.queries)} queries)")
+        except Exception as e:
+            self.duration_seconds = time.perf_counter() - started
+            self.state = "failed"
+            self.error = str(e)
+            print(f"Warm-up failed after {self.duration_seconds:.3f}s: {e}")
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the warm-up has finished, successfully or not
+
+        Returns:
+            bool: True if it finished within ``timeout``
+        """
+        return self._done.wait(timeout)
+
+    def stop(self) -> None:
+        """Skip the remaining warm-up queries and wait for the current stage to finish"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def stats(self) -> dict:
+        """State, per-stage and total seconds, and the error of a failed warm-up"""
+        return {
+            "state": self.state,
+            "queries": len(self.queries),
+            "stage_seconds": {name: round(seconds, 4) for name, seconds in self.stage_seconds.items()},
+            "duration_seconds": round(self.duration_seconds, 4) if self.duration_seconds is not None else None,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
@@ -3,5 +3,7 @@ Utility functions
 """
 
 from .bin_packing import BinPackingAlgorithm
+from .capacity_index import LocationCapacityIndex
+from .result_cache import ResultCache
 
-__all__ = ["BinPackingAlgorithm"]
\ No newline at end of file
+__all__ = ["BinPackingAlgorithm", "LocationCapacityIndex", "ResultCache"]
\ No newline at end of file
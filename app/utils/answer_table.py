@@ -0,0 +1,176 @@
+"""
+Precomputed answers for every canonical query of a dataset
+"""
+
+import itertools
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from ..models.search_result import SearchResult
+from .binary_format import BinaryContainer, encode_strings, write_container
+from .capacity_index import LENGTH_BUCKETS
+
+
+ANSWER_TABLE_KIND = "answer_table"
+ANSWER_TABLE_VERSION = 1
+
+
+def encode_query(sizes: Sequence[int]) -> int:
+    """
+    Pack a canonical query (rounded lengths, largest first) into one integer.
+
+    Each length contributes its bucket number 1..10 as a base-11 digit, so
+    distinct queries of any length map to distinct codes.
+    """
+    code = 0
+    for size in sizes:
+        code = code * 11 + size // 10
+    return code
+
+
+def canonical_queries(max_vehicles: int) -> Iterator[Tuple[int, ...]]:
+    """Every sorted multiset of 1..max_vehicles rounded lengths, largest first."""
+    lengths = sorted(LENGTH_BUCKETS.tolist(), reverse=True)
+    for count in range(1, max_vehicles + 1):
+        yield from itertools.combinations_with_replacement(lengths, count)
+
+
+def write_answer_table(
+    path: str,
+    answers: Dict[Tuple[int, ...], List[Tuple[str, List[str], int]]],
+    meta: Dict[str, Any],
+) -> int:
+    """
+    Write answers to an answer table artifact.
+
+    Args:
+        path: Destination file
+        answers: Sorted (location_id, listing_ids, total_price_in_cents) rows per canonical query
+        meta: Build metadata; must include ``dataset_hash``
+
+    Returns:
+        int: Artifact size in bytes
+    """
+    queries = sorted(answers, key=encode_query)
+    location_index: Dict[str, int] = {}
+    listing_index: Dict[str, int] = {}
+
+    query_offsets = [0]
+    result_locations: List[int] = []
+    result_prices: List[int] = []
+    result_listing_offsets = [0]
+    result_listings: List[int] = []
+    for query in queries:
+        for location_id, listing_ids, total_price in answers[query]:
+            result_locations.append(location_index.setdefault(location_id, len(location_index)))
+            result_prices.append(total_price)
+            result_listings.extend(listing_index.setdefault(i, len(listing_index)) for i in listing_ids)
+            result_listing_offsets.append(len(result_listings))
+        query_offsets.append(len(result_locations))
+
+    location_data, location_offsets = encode_strings(list(location_index))
+    listing_data, listing_offsets = encode_strings(list(listing_index))
+    sections = {
+        "query_codes": np.asarray([encode_query(q) for q in queries], dtype=np.int64),
+        "query_offsets": np.asarray(query_offsets, dtype=np.int64),
+        "result_locations": np.asarray(result_locations, dtype=np.int32),
+        "result_prices": np.asarray(result_prices, dtype=np.int64),
+        "result_listing_offsets": np.asarray(result_listing_offsets, dtype=np.int64),
+        "result_listings": np.asarray(result_listings, dtype=np.int32),
+        "location_ids_data": location_data,
+        "location_ids_offsets": location_offsets,
+        "listing_ids_data": listing_data,
+        "listing_ids_offsets": listing_offsets,
+    }
+    meta = dict(meta, table_version=ANSWER_TABLE_VERSION, query_count=len(queries),
+                result_count=len(result_locations))
+    return write_container(path, ANSWER_TABLE_KIND, meta, sections)
+
+
+class AnswerTable:
+    """
+    Memory-mapped answer table; ``lookup`` answers a canonical query with one binary search.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Artifact written by ``write_answer_table``
+
+        Raises:
+            FileNotFoundError: If the artifact does not exist
+            ValueError: If the artifact is not an answer table of this version
+        """
+        self._container = BinaryContainer(path, kind=ANSWER_TABLE_KIND)
+        self.meta = self._container.meta
+        if self.meta.get("table_version") != ANSWER_TABLE_VERSION:
+            raise ValueError(f"Unsupported answer table version {self.meta.get('table_version')} in {path}")
+        self.path = path
+        self._query_codes = self._container.section("query_codes")
+        self._query_offsets = self._container.section("query_offsets")
+        self._result_locations = self._container.section("result_locations")
+        self._result_prices = self._container.section("result_prices")
+        self._result_listing_offsets = self._container.section("result_listing_offsets")
+        self._result_listings = self._container.section("result_listings")
+        self._location_ids = self._container.strings("location_ids")
+        self._listing_ids = self._container.strings("listing_ids")
+
+    @property
+    def dataset_hash(self) -> str:
+        return self.meta["dataset_hash"]
+
+    @property
+    def nbytes(self) -> int:
+        return self._container.nbytes
+
+    def lookup(self, sizes: Sequence[int]) -> Optional[List[SearchResult]]:
+        """
+        Answer a canonical query
+
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+
+        Returns:
+            Optional[List[SearchResult]]: Results sorted by price, or None if the query is not in the table
+        """
+        rows = self.lookup_rows(sizes)
+        if rows is None:
+            return None
+        return [
+            SearchResult(location_id=location_id, listing_ids=listing_ids, total_price_in_cents=price)
+            for location_id, listing_ids, price in rows
+        ]
+
+    def lookup_rows(self, sizes: Sequence[int]) -> Optional[List[Tuple[str, List[str], int]]]:
+        """
+        Answer a canonical query with plain tuples
+
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+
+        Returns:
+            Optional[List[Tuple[str, List[str], int]]]: (location_id, listing_ids, total_price_in_cents)
+            sorted by price, or None if the query is not in the table
+        """
+        code = encode_query(sizes)
+        position = int(np.searchsorted(self._query_codes, code))
+        if position >= len(self._query_codes) or int(self._query_codes[position]) != code:
+            return None
+
+        first, last = int(self._query_offsets[position]), int(self._query_offsets[position + 1])
+        locations = self._result_locations[first:last].tolist()
+        prices = self._result_prices[first:last].tolist()
+        listing_offsets = self._result_listing_offsets[first:last + 1].tolist()
+        listings = self._result_listings[listing_offsets[0]:listing_offsets[-1]].tolist()
+        base = listing_offsets[0]
+        return [
+            (
+                self._location_ids[location],
+                [self._listing_ids[i] for i in listings[start - base:end - base]],
+                price
+            )
+            for location, price, start, end in zip(locations, prices, listing_offsets, listing_offsets[1:])
+        ]
+
+    def describe(self) -> Dict[str, Any]:
+        """Build metadata plus artifact size"""
+        return dict(self.meta, path=self.path, artifact_bytes=self.nbytes)
@@ -2,7 +2,7 @@
 Bin packing algorithm utilities (2D lanes packing)
 """
 
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, List, Sequence, Tuple, Optional
 from math import ceil
 from ..models.listing import Listing
 from ..models.vehicle_unit import VehicleUnit
@@ -12,33 +12,44 @@ def _round_up_to_10(value: int) -> int:
     return int(ceil(value / 10) * 10)
 
 
-def _orientations(listing: Listing) -> List[Tuple[int, int]]:
+def _orientations_for(length: int, width: int) -> List[Tuple[int, int]]:
     """
-    Return possible orientations for a listing as tuples (length_limit, lanes).
+    Return possible orientations for listing dimensions as tuples (length_limit, lanes).
     lanes = floor(other_dimension / 10). Only lanes >= 1 are valid.
     """
     orientations: List[Tuple[int, int]] = []
     # Vehicle width fixed at 10. If we align vehicle length along listing.length,
     # the number of lanes is floor(listing.width/10)
-    lanes1 = listing.width // 10
+    lanes1 = width // 10
     if lanes1 >= 1:
-        orientations.append((listing.length, lanes1))
-    lanes2 = listing.length // 10
+        orientations.append((length, lanes1))
+    lanes2 = length // 10
     if lanes2 >= 1:
-        orientations.append((listing.width, lanes2))
+        orientations.append((width, lanes2))
     return orientations
 
 
-def _best_orientation_for_length(listing: Listing, vehicle_length: int) -> Optional[Tuple[int, int]]:
+def _orientations(listing: Listing) -> List[Tuple[int, int]]:
+    """
+    Return possible orientations for a listing as tuples (length_limit, lanes).
+    """
+    return _orientations_for(listing.length, listing.width)
+
+
+def _best_orientation_for_dims(length: int, width: int, vehicle_length: int) -> Optional[Tuple[int, int]]:
     """Choose the orientation that can fit the given vehicle length and yields
     the most lanes. Return (length_limit, lanes), or None if not feasible.
     """
-    candidates = [(L, lanes) for (L, lanes) in _orientations(listing) if L >= vehicle_length]
+    candidates = [(L, lanes) for (L, lanes) in _orientations_for(length, width) if L >= vehicle_length]
     if not candidates:
         return None
     # Prefer the one with more lanes (more capacity). Tie-breaker: larger length limit.
-    candidates.sort(key=lambda x: (x[1], x[0]), reverse=True)
-    return candidates[0]
+    return max(candidates, key=lambda x: (x[1], x[0]))
+
+
+def _best_orientation_for_length(listing: Listing, vehicle_length: int) -> Optional[Tuple[int, int]]:
+    """Best orientation of a listing for the given vehicle length, see ``_best_orientation_for_dims``."""
+    return _best_orientation_for_dims(listing.length, listing.width, vehicle_length)
 
 
 def _price_per_lane(listing: Listing, vehicle_length: int) -> Optional[float]:
@@ -55,6 +66,23 @@ class BinPackingAlgorithm:
     Vehicles are placed one per lane; lanes count down. No stacking along length.
     """
 
+    @staticmethod
+    def vehicle_sizes(lengths: Iterable[int]) -> List[int]:
+        """Round vehicle lengths up to the nearest 10 and sort them largest first."""
+        return sorted((_round_up_to_10(length) for length in lengths), reverse=True)
+
+    @staticmethod
+    def vehicle_blocks(vehicles: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Merge (length, quantity) pairs into (rounded length, count) blocks, largest length first.
+
+        The run-length form of ``vehicle_sizes``: its size does not grow with the quantities.
+        """
+        counts: Dict[int, int] = {}
+        for length, quantity in vehicles:
+            size = _round_up_to_10(length)
+            counts[size] = counts.get(size, 0) + quantity
+        return sorted(counts.items(), reverse=True)
+
     @staticmethod
     def can_fit_vehicles(vehicles: List[VehicleUnit], listings: List[Listing]) -> bool:
         return len(BinPackingAlgorithm.find_optimal_combination(vehicles, listings)) > 0
@@ -64,54 +92,140 @@ class BinPackingAlgorithm:
         if not vehicles or not listings:
             return []
 
-        # Convert vehicles to sizes (rounded up to nearest 10)
-        sizes = sorted([_round_up_to_10(v.length) for v in vehicles], reverse=True)
+        sizes = BinPackingAlgorithm.vehicle_sizes(v.length for v in vehicles)
+        rows = BinPackingAlgorithm.find_optimal_rows(
+            sizes,
+            [l.length for l in listings],
+            [l.width for l in listings],
+            [l.price_in_cents for l in listings],
+        )
+        return [listings[row] for row in rows]
 
-        # Filter listings that can host at least one lane
-        feasible_listings = [l for l in listings if (l.width // 10) >= 1 or (l.length // 10) >= 1]
-        if not feasible_listings:
+    @staticmethod
+    def find_optimal_rows(
+        sizes: List[int],
+        lengths: Sequence[int],
+        widths: Sequence[int],
+        prices: Sequence[int],
+    ) -> List[int]:
+        """Columnar form of ``find_optimal_combination``.
+
+        ``sizes`` are rounded vehicle lengths sorted largest first (see ``vehicle_sizes``);
+        ``lengths``/``widths``/``prices`` are the parallel columns of one location.
+        Return the positions of the chosen listings in opening order, or [] if they don't fit.
+        """
+        if not sizes or not len(prices):
             return []
 
-        # Open bins: list of (listing, length_limit, remaining_lanes)
-        open_bins: List[Tuple[Listing, int, int]] = []
-        # Track unused listings
-        unused = feasible_listings.copy()
+        # Open bins: list of (row, length_limit, remaining_lanes)
+        open_bins: List[Tuple[int, int, int]] = []
+        # Track unused listings (rows that cannot host a single lane never become candidates)
+        unused = list(range(len(prices)))
 
         for s in sizes:
             # Try place into existing bin with sufficient length_limit and lanes
             best_idx = -1
             best_lanes_left = -1
-            for idx, (lst, Llim, lanes_left) in enumerate(open_bins):
+            for idx, (row, Llim, lanes_left) in enumerate(open_bins):
                 if lanes_left > 0 and Llim >= s:
                     if lanes_left > best_lanes_left:
                         best_lanes_left = lanes_left
                         best_idx = idx
             if best_idx != -1:
-                lst, Llim, lanes_left = open_bins[best_idx]
-                open_bins[best_idx] = (lst, Llim, lanes_left - 1)
+                row, Llim, lanes_left = open_bins[best_idx]
+                open_bins[best_idx] = (row, Llim, lanes_left - 1)
                 continue
 
             # Need to open a new bin: choose cheapest per-lane listing that can fit 's'
-            # Compute price per lane for all unused that can fit
-            candidates: List[Tuple[float, Listing, int, int]] = []  # (price_per_lane, listing, length_limit, lanes)
-            for lst in unused:
-                ori = _best_orientation_for_length(lst, s)
+            best: Optional[Tuple[float, int, int]] = None  # (price_per_lane, -lanes, -length_limit)
+            chosen_pos = -1
+            chosen_ori: Tuple[int, int] = (0, 0)
+            for pos, row in enumerate(unused):
+                ori = _best_orientation_for_dims(lengths[row], widths[row], s)
                 if ori:
                     Llim, lanes = ori
-                    ppl = lst.price_in_cents / lanes
-                    candidates.append((ppl, lst, Llim, lanes))
-            if not candidates:
+                    # cheaper per-lane, then more lanes, then larger length_limit; first wins ties
+                    key = (prices[row] / lanes, -lanes, -Llim)
+                    if best is None or key < best:
+                        best = key
+                        chosen_pos = pos
+                        chosen_ori = ori
+            if best is None:
                 return []
-            candidates.sort(key=lambda x: (x[0], -x[3], -x[2]))  # cheaper per-lane, then more lanes, then larger length_limit
-            _, chosen, Llim, lanes = candidates[0]
             # Remove chosen from unused
-            unused.remove(chosen)
+            chosen = unused.pop(chosen_pos)
+            Llim, lanes = chosen_ori
             # Place this vehicle consuming one lane
             open_bins.append((chosen, Llim, lanes - 1))
 
         # Extract used listings in order of opening; this is already minimal by lanes strategy
-        used_listings = [lst for (lst, _, _) in open_bins]
-        return used_listings
+        return [row for (row, _, _) in open_bins]
+
+    @staticmethod
+    def find_optimal_rows_for_blocks(
+        blocks: List[Tuple[int, int]],
+        lengths: Sequence[int],
+        widths: Sequence[int],
+        prices: Sequence[int],
+    ) -> List[int]:
+        """``find_optimal_rows`` for vehicles given as blocks, placing a whole block at a time.
+
+        ``blocks`` are (rounded length, count) pairs, largest length first (see ``vehicle_blocks``).
+        Returns exactly what ``find_optimal_rows`` returns for the expanded sizes, in time that
+        depends on the number of blocks and listings but not on the counts.
+
+        The per-vehicle rule only opens a listing once every open bin long enough for the vehicle
+        is full. Every vehicle placed so far is at least as long as the current one, so it sits in
+        such a bin: the lanes still free to the current block are the lanes of the open bins long
+        enough for it, minus all vehicles placed so far, however they were spread. The vehicle that
+        opens a listing is then followed into it by the rest of its block until it fills up, so a
+        block opens the block's cheapest unused listings in rank order, each filled completely
+        except possibly the last.
+        """
+        if not blocks or not len(prices):
+            return []
+
+        # Open bins: list of (row, length_limit, lanes)
+        open_bins: List[Tuple[int, int, int]] = []
+        used = set()
+        placed = 0
+
+        for s, count in blocks:
+            free = sum(lanes for (_, Llim, lanes) in open_bins if Llim >= s) - placed
+            if count <= free:
+                placed += count
+                continue
+            placed += free
+            count -= free
+
+            # Unused listings that fit 's', in the order the per-vehicle scan would open them
+            ranked = []
+            for row in range(len(prices)):
+                if row in used:
+                    continue
+                # Inlined _best_orientation_for_dims: more lanes, then the larger length limit
+                length, width = lengths[row], widths[row]
+                along_length = width // 10 if length >= s else 0
+                along_width = length // 10 if width >= s else 0
+                if along_width > along_length or (along_width == along_length and width > length):
+                    lanes, Llim = along_width, width
+                else:
+                    lanes, Llim = along_length, length
+                if lanes > 0:
+                    ranked.append((prices[row] / lanes, -lanes, -Llim, row))
+            ranked.sort()
+            for _, neg_lanes, neg_Llim, row in ranked:
+                used.add(row)
+                open_bins.append((row, -neg_Llim, -neg_lanes))
+                taken = min(count, -neg_lanes)
+                placed += taken
+                count -= taken
+                if not count:
+                    break
+            if count:
+                return []
+
+        return [row for (row, _, _) in open_bins]
 
     @staticmethod
     def calculate_total_price(listings: List[Listing]) -> int:
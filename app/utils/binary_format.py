@@ -0,0 +1,176 @@
+"""
+Versioned, memory-mappable container for NumPy columns
+"""
+
+import json
+import os
+import struct
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+MAGIC = b"NBRCOLS\x00"
+CONTAINER_VERSION = 1
+_ALIGNMENT = 64
+_LENGTH = struct.Struct("<Q")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def encode_strings(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pack strings into one UTF-8 byte column plus an offsets column.
+
+    String ``i`` is ``data[offsets[i]:offsets[i + 1]]``.
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return data, offsets
+
+
+class StringTable:
+    """
+    Read-only sequence of strings backed by ``encode_strings`` columns.
+
+    Strings are decoded on access, so a memory-mapped table costs nothing
+    until it is read.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+        self._count = int(offsets.shape[0]) - 1
+        # Buffer views index to plain ints/bytes several times faster than NumPy scalars
+        self._data_view = memoryview(np.ascontiguousarray(data))
+        self._offsets_view = memoryview(np.ascontiguousarray(offsets, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("string table index out of range")
+        offsets = self._offsets_view
+        return str(self._data_view[offsets[index]:offsets[index + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+def write_container(path: str, kind: str, meta: Dict[str, Any], sections: Dict[str, np.ndarray]) -> int:
+    """
+    Write named arrays to ``path`` atomically.
+
+    Layout: magic, header length, JSON header (kind, versions, meta and the
+    dtype/shape/offset of every section), then each section's raw bytes at a
+    64-byte aligned offset.
+
+    Args:
+        path: Destination file; written to a temporary file then renamed
+        kind: Artifact type, checked again when reading
+        meta: JSON-serializable metadata stored in the header
+        sections: Arrays to store, by name
+
+    Returns:
+        int: Size of the written file in bytes
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in sections.items()}
+
+    def header_bytes(base: int) -> Tuple[bytes, Dict[str, Dict[str, Any]]]:
+        layout = {}
+        offset = base
+        for name, array in arrays.items():
+            offset = _aligned(offset)
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += array.nbytes
+        header = {
+            "container_version": CONTAINER_VERSION,
+            "kind": kind,
+            "meta": meta,
+            "sections": layout,
+        }
+        return json.dumps(header, sort_keys=True).encode("utf-8"), layout
+
+    # Section offsets depend on the header length and vice versa; grow until stable
+    base = _ALIGNMENT
+    while True:
+        header, layout = header_bytes(base)
+        needed = _aligned(len(MAGIC) + _LENGTH.size + len(header))
+        if needed <= base:
+            break
+        base = needed
+
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(layout[name]["offset"])
+            f.write(array.tobytes())
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+class BinaryContainer:
+    """
+    Memory-mapped view of a file written by ``write_container``.
+
+    Sections are zero-copy, read-only NumPy views; pages are loaded lazily by the OS.
+    """
+
+    def __init__(self, path: str, kind: Optional[str] = None):
+        """
+        Args:
+            path: Container file
+            kind: Expected artifact type, if it should be checked
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ValueError: If the file is not a container of the expected kind and version
+        """
+        self.path = path
+        self._buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        prefix = len(MAGIC) + _LENGTH.size
+        if self._buffer.shape[0] < prefix or self._buffer[:len(MAGIC)].tobytes() != MAGIC:
+            raise ValueError(f"Not a column container: {path}")
+        (header_length,) = _LENGTH.unpack(self._buffer[len(MAGIC):prefix].tobytes())
+        header = json.loads(self._buffer[prefix:prefix + header_length].tobytes().decode("utf-8"))
+        if header.get("container_version") != CONTAINER_VERSION:
+            raise ValueError(f"Unsupported container version {header.get('container_version')} in {path}")
+        if kind is not None and header.get("kind") != kind:
+            raise ValueError(f"Expected a {kind} container, found {header.get('kind')} in {path}")
+        self.kind: str = header["kind"]
+        self.meta: Dict[str, Any] = header["meta"]
+        self._sections: Dict[str, Dict[str, Any]] = header["sections"]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._buffer.shape[0])
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sections
+
+    def section(self, name: str) -> np.ndarray:
+        """Zero-copy view of a named section"""
+        info = self._sections[name]
+        dtype = np.dtype(info["dtype"])
+        count = int(np.prod(info["shape"], dtype=np.int64))
+        if count == 0:
+            return np.empty(info["shape"], dtype=dtype)
+        flat = np.frombuffer(self._buffer, dtype=dtype, count=count, offset=info["offset"])
+        return flat.reshape(info["shape"])
+
+    def strings(self, name: str) -> StringTable:
+        """String table stored as ``<name>_data`` / ``<name>_offsets`` sections"""
+        return StringTable(self.section(f"{name}_data"), self.section(f"{name}_offsets"))
@@ -0,0 +1,244 @@
+"""
+Per-location lane capacity summary used to prefilter locations before packing
+"""
+
+import numpy as np
+from typing import List
+from ..models.listing_store import ListingStore
+
+
+# Rounded vehicle lengths the engine can see (lengths are 1..100, rounded up to 10)
+LENGTH_BUCKETS = np.arange(10, 101, 10, dtype=np.int32)
+
+
+def bucket_index(size: int) -> int:
+    """Column of ``LENGTH_BUCKETS`` holding a rounded vehicle length."""
+    return size // 10 - 1
+
+
+def best_lanes_by_bucket(lengths: np.ndarray, widths: np.ndarray) -> np.ndarray:
+    """
+    Lanes of each listing's best orientation for every length bucket.
+
+    Vectorized form of ``_best_orientation_for_dims``: a listing offers
+    ``width // 10`` lanes if ``length`` fits the vehicle and ``length // 10``
+    lanes if ``width`` does; the best orientation is the one with more lanes.
+    Returns an (n_listings, n_buckets) int32 array, 0 where nothing fits.
+    """
+    lengths = lengths.astype(np.int32)[:, None]
+    widths = widths.astype(np.int32)[:, None]
+    along_length = np.where(lengths >= LENGTH_BUCKETS, widths // 10, 0)
+    along_width = np.where(widths >= LENGTH_BUCKETS, lengths // 10, 0)
+    return np.maximum(along_length, along_width).astype(np.int32)
+
+
+class LocationCapacityIndex:
+    """
+    Capacity summary of every location, one row per location and one column per length bucket.
+
+    ``max_lanes[i, b]`` is the most lanes a single listing of location ``i`` offers to a
+    vehicle of bucket ``b``; ``total_lanes[i, b]`` is the sum over all its listings.
+    Any packing places each vehicle of length >= s in a lane of a listing whose orientation
+    fits s, so ``total_lanes`` bounds how many such vehicles a location can ever hold.
+
+    ``min_lane_price[i, b]`` is the cheapest price per lane (price / lanes) any listing of
+    location ``i`` offers to bucket ``b`` (inf if none fits). A listing holding vehicles
+    costs at least its price per lane for each of them, so summing this over the vehicles
+    bounds the price of any packing from below.
+    """
+
+    def __init__(self, max_lanes: np.ndarray, total_lanes: np.ndarray, min_lane_price: np.ndarray):
+        self.max_lanes = max_lanes
+        self.total_lanes = total_lanes
+        self.min_lane_price = min_lane_price
+
+    @classmethod
+    def from_store(cls, store: ListingStore) -> 'LocationCapacityIndex':
+        n_buckets = len(LENGTH_BUCKETS)
+        if len(store) == 0:
+            empty = np.zeros((store.location_count, n_buckets), dtype=np.int32)
+            return cls(empty, empty.copy(), np.full(empty.shape, np.inf))
+
+        lanes = best_lanes_by_bucket(store.lengths, store.widths)
+        starts = store.location_offsets[:-1]
+        with np.errstate(divide="ignore"):
+            lane_prices = np.where(lanes > 0, store.prices[:, None] / lanes, np.inf)
+        return cls(
+            max_lanes=np.maximum.reduceat(lanes, starts, axis=0),
+            total_lanes=np.add.reduceat(lanes, starts, axis=0).astype(np.int32),
+            min_lane_price=np.minimum.reduceat(lane_prices, starts, axis=0),
+        )
+
+    @classmethod
+    def from_previous(
+        cls,
+        store: ListingStore,
+        previous: 'LocationCapacityIndex',
+        reuse_from: np.ndarray,
+    ) -> 'LocationCapacityIndex':
+        """
+        Rebuild the summary for a new store, recomputing only changed locations.
+
+        ``reuse_from[i]`` is the row of ``previous`` holding location ``i``'s
+        unchanged summary, or -1 if location ``i`` is new or changed.
+        """
+        n_buckets = len(LENGTH_BUCKETS)
+        max_lanes = np.zeros((store.location_count, n_buckets), dtype=np.int32)
+        total_lanes = np.zeros((store.location_count, n_buckets), dtype=np.int32)
+        min_lane_price = np.full((store.location_count, n_buckets), np.inf)
+
+        reused = np.flatnonzero(reuse_from >= 0)
+        max_lanes[reused] = previous.max_lanes[reuse_from[reused]]
+        total_lanes[reused] = previous.total_lanes[reuse_from[reused]]
+        min_lane_price[reused] = previous.min_lane_price[reuse_from[reused]]
+
+        changed = np.flatnonzero(reuse_from < 0)
+        if len(changed):
+            fresh = cls.from_store(store.select_locations(changed))
+            max_lanes[changed] = fresh.max_lanes
+            total_lanes[changed] = fresh.total_lanes
+            min_lane_price[changed] = fresh.min_lane_price
+        return cls(max_lanes, total_lanes, min_lane_price)
+
+    @property
+    def location_count(self) -> int:
+        return int(self.total_lanes.shape[0])
+
+    @staticmethod
+    def bucket_counts(sizes: List[int]) -> np.ndarray:
+        """Number of vehicles in each length bucket."""
+        return np.bincount([bucket_index(s) for s in sizes], minlength=len(LENGTH_BUCKETS))
+
+    @staticmethod
+    def lane_demand(sizes: List[int]) -> np.ndarray:
+        """Number of vehicles at least as long as each bucket."""
+        return LocationCapacityIndex.lane_demand_for_counts(LocationCapacityIndex.bucket_counts(sizes))
+
+    @staticmethod
+    def lane_demand_for_counts(counts: np.ndarray) -> np.ndarray:
+        """``lane_demand`` from the number of vehicles in each bucket (see ``bucket_counts``)."""
+        return np.cumsum(np.asarray(counts)[::-1])[::-1]
+
+    def candidate_mask(self, sizes: List[int]) -> np.ndarray:
+        """
+        Boolean mask of locations that might hold the vehicles.
+
+        Conservative: a location is only dropped when it lacks the lanes any
+        packing would need, so no feasible location is ever pruned.
+        """
+        return self.candidate_mask_for_counts(self.bucket_counts(sizes))
+
+    def candidate_mask_for_counts(self, counts: np.ndarray) -> np.ndarray:
+        """``candidate_mask`` from the number of vehicles in each bucket."""
+        return np.all(self.total_lanes >= self.lane_demand_for_counts(counts), axis=1)
+
+    def candidate_locations(self, sizes: List[int]) -> np.ndarray:
+        """Ascending indices of locations that pass ``candidate_mask``."""
+        return np.flatnonzero(self.candidate_mask(sizes))
+
+    def candidate_locations_for_counts(self, counts: np.ndarray) -> np.ndarray:
+        """``candidate_locations`` from the number of vehicles in each bucket."""
+        return np.flatnonzero(self.candidate_mask_for_counts(counts))
+
+    def price_lower_bounds(self, sizes: List[int], locations: np.ndarray) -> np.ndarray:
+        """
+        Lower bound on the total price of packing the vehicles into each location.
+
+        Valid for every packing rule (greedy or exact), so a location whose bound
+        exceeds a known price can be skipped without running the solver.
+        Returns int64 cents, aligned with ``locations``.
+        """
+        return self.price_lower_bounds_for_counts(self.bucket_counts(sizes), locations)
+
+    def price_lower_bounds_for_counts(self, counts: np.ndarray, locations: np.ndarray) -> np.ndarray:
+        """``price_lower_bounds`` from the number of vehicles in each bucket."""
+        counts = np.asarray(counts)
+        used = np.flatnonzero(counts)
+        bounds = self.min_lane_price[np.asarray(locations)[:, None], used] @ counts[used]
+        # Prices are whole cents; the margin absorbs float rounding of the per-lane prices
+        return np.ceil(bounds - 1e-6).astype(np.int64)
+
+
+class OverlayCapacityIndex:
+    """
+    Capacity summary of an ``OverlayListingStore``: the base summary, with
+    the rows of replaced and new locations taken from a small summary of
+    their own.
+
+    ``locations`` is sorted and ``overrides`` row ``k`` summarizes location
+    ``locations[k]``. Queries run on the base summary and then patch in the
+    replaced locations, so they return exactly what a summary rebuilt from
+    scratch would.
+    """
+
+    def __init__(self, base, locations: np.ndarray, overrides: LocationCapacityIndex, location_count: int):
+        self.base = base
+        self.locations = locations
+        self.overrides = overrides
+        self._location_count = location_count
+
+    @classmethod
+    def over(cls, base) -> 'OverlayCapacityIndex':
+        """Overlay with no replaced locations"""
+        n_buckets = len(LENGTH_BUCKETS)
+        empty = np.zeros((0, n_buckets), dtype=np.int32)
+        overrides = LocationCapacityIndex(empty, empty.copy(), np.zeros((0, n_buckets)))
+        return cls(base, np.zeros(0, dtype=np.int64), overrides, base.location_count)
+
+    def replaced(
+        self,
+        locations: np.ndarray,
+        summary: LocationCapacityIndex,
+        location_count: int,
+    ) -> 'OverlayCapacityIndex':
+        """
+        New overlay with more locations replaced
+
+        Args:
+            locations: Replaced or new location indices, one per row of ``summary``
+            summary: Capacity of those locations as they are now
+            location_count: Locations, including new ones
+        """
+        locations = np.asarray(locations, dtype=np.int64)
+        kept = ~np.isin(self.locations, locations)
+        merged = np.concatenate([self.locations[kept], locations])
+        order = np.argsort(merged, kind="stable")
+
+        def rows(previous: np.ndarray, fresh: np.ndarray) -> np.ndarray:
+            return np.concatenate([previous[kept], fresh])[order]
+
+        overrides = LocationCapacityIndex(
+            max_lanes=rows(self.overrides.max_lanes, summary.max_lanes),
+            total_lanes=rows(self.overrides.total_lanes, summary.total_lanes),
+            min_lane_price=rows(self.overrides.min_lane_price, summary.min_lane_price),
+        )
+        return OverlayCapacityIndex(self.base, merged[order], overrides, location_count)
+
+    @property
+    def location_count(self) -> int:
+        return self._location_count
+
+    def candidate_locations(self, sizes: List[int]) -> np.ndarray:
+        """Ascending indices of locations that pass ``candidate_mask``."""
+        return self.candidate_locations_for_counts(LocationCapacityIndex.bucket_counts(sizes))
+
+    def candidate_locations_for_counts(self, counts: np.ndarray) -> np.ndarray:
+        """``candidate_locations`` from the number of vehicles in each bucket."""
+        base_candidates = self.base.candidate_locations_for_counts(counts)
+        base_candidates = base_candidates[~np.isin(base_candidates, self.locations)]
+        return np.union1d(base_candidates, self.locations[self.overrides.candidate_mask_for_counts(counts)])
+
+    def price_lower_bounds(self, sizes: List[int], locations: np.ndarray) -> np.ndarray:
+        """``LocationCapacityIndex.price_lower_bounds``, aligned with ``locations``"""
+        return self.price_lower_bounds_for_counts(LocationCapacityIndex.bucket_counts(sizes), locations)
+
+    def price_lower_bounds_for_counts(self, counts: np.ndarray, locations: np.ndarray) -> np.ndarray:
+        """``price_lower_bounds`` from the number of vehicles in each bucket."""
+        locations = np.asarray(locations, dtype=np.int64)
+        position = np.searchsorted(self.locations, locations)
+        replaced = position < len(self.locations)
+        replaced[replaced] = self.locations[position[replaced]] == locations[replaced]
+        bounds = np.empty(len(locations), dtype=np.int64)
+        bounds[~replaced] = self.base.price_lower_bounds_for_counts(counts, locations[~replaced])
+        bounds[replaced] = self.overrides.price_lower_bounds_for_counts(counts, position[replaced])
+        return bounds
@@ -0,0 +1,142 @@
+"""
+Compiled binary form of a listings file, memory-mapped for fast cold starts
+"""
+
+import numpy as np
+from typing import Any, Dict, Optional
+from ..models.listing_store import ListingStore
+from .binary_format import BinaryContainer, encode_strings, write_container
+from .capacity_index import LocationCapacityIndex
+from .lane_tables import LaneTables
+
+
+COMPILED_LISTINGS_KIND = "compiled_listings"
+COMPILED_LISTINGS_VERSION = 1
+
+
+def write_compiled_listings(
+    path: str,
+    store: ListingStore,
+    capacity_index: LocationCapacityIndex,
+    meta: Dict[str, Any],
+    lane_tables: Optional[LaneTables] = None,
+) -> int:
+    """
+    Write a listing store and its capacity index as a compiled listings artifact.
+
+    Numeric columns are stored fixed-width, listing and location ids as string
+    tables, and ``location_offsets`` as the location index. ``location_order``
+    (location indices sorted by id) lets readers look locations up by id
+    without building a dict. The greedy packer's lane tables are stored too,
+    built from ``store`` (complete, no depth cap) unless given.
+
+    Args:
+        path: Destination file
+        store: Listing store to compile
+        capacity_index: Capacity summary of ``store``
+        meta: Build metadata; must include ``dataset_hash``
+        lane_tables: Lane tables of ``store``, if already built
+
+    Returns:
+        int: Artifact size in bytes
+    """
+    id_data, id_offsets = encode_strings(list(store.ids))
+    location_ids = list(store.location_ids)
+    location_data, location_offsets = encode_strings(location_ids)
+    if lane_tables is None:
+        lane_tables = LaneTables.from_store(store)
+    location_order = np.asarray(sorted(range(len(location_ids)), key=location_ids.__getitem__), dtype=np.int32)
+    sections = {
+        "lengths": store.lengths.astype(np.int32),
+        "widths": store.widths.astype(np.int32),
+        "prices": store.prices.astype(np.int64),
+        "location_index": store.location_index.astype(np.int32),
+        "location_offsets": store.location_offsets.astype(np.int64),
+        "ids_data": id_data,
+        "ids_offsets": id_offsets,
+        "location_ids_data": location_data,
+        "location_ids_offsets": location_offsets,
+        "location_order": location_order,
+        "max_lanes": capacity_index.max_lanes,
+        "total_lanes": capacity_index.total_lanes,
+        "min_lane_price": capacity_index.min_lane_price,
+        "lane_rows": lane_tables.rows,
+        "lane_lanes": lane_tables.lanes,
+        "lane_limits": lane_tables.limits,
+        "lane_offsets": lane_tables.offsets,
+    }
+    meta = dict(meta, compiled_version=COMPILED_LISTINGS_VERSION, listing_count=len(store),
+                location_count=store.location_count, lane_table_depth=lane_tables.depth,
+                lane_table_pruning=lane_tables.pruning)
+    return write_container(path, COMPILED_LISTINGS_KIND, meta, sections)
+
+
+class CompiledListings:
+    """
+    Memory-mapped compiled listings.
+
+    ``store``, ``capacity_index`` and ``lane_tables`` are zero-copy views of the file: opening
+    it reads only the header, and pages are loaded by the OS as searches touch them.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Artifact written by ``write_compiled_listings``
+
+        Raises:
+            FileNotFoundError: If the artifact does not exist
+            ValueError: If the file is not a compiled listings artifact of this version
+        """
+        self.path = path
+        self._container = BinaryContainer(path, kind=COMPILED_LISTINGS_KIND)
+        self.meta: Dict[str, Any] = self._container.meta
+        if self.meta.get("compiled_version") != COMPILED_LISTINGS_VERSION:
+            raise ValueError(f"Unsupported compiled listings version {self.meta.get('compiled_version')} in {path}")
+
+    @property
+    def dataset_hash(self) -> str:
+        return self.meta["dataset_hash"]
+
+    @property
+    def nbytes(self) -> int:
+        return self._container.nbytes
+
+    def store(self) -> ListingStore:
+        """Listing store whose columns and id tables are views of the file"""
+        container = self._container
+        return ListingStore(
+            ids=container.strings("ids"),
+            location_ids=container.strings("location_ids"),
+            lengths=container.section("lengths"),
+            widths=container.section("widths"),
+            prices=container.section("prices"),
+            location_index=container.section("location_index"),
+            location_offsets=container.section("location_offsets"),
+            # Optional: artifacts compiled before it was added fall back to a lookup dict
+            location_order=container.section("location_order") if "location_order" in container else None,
+        )
+
+    def capacity_index(self) -> LocationCapacityIndex:
+        """Capacity summary stored alongside the store"""
+        container = self._container
+        return LocationCapacityIndex(
+            max_lanes=container.section("max_lanes"),
+            total_lanes=container.section("total_lanes"),
+            min_lane_price=container.section("min_lane_price"),
+        )
+
+    def lane_tables(self, store: ListingStore) -> Optional[LaneTables]:
+        """Lane tables stored alongside ``store``, or None for artifacts compiled without them"""
+        container = self._container
+        if "lane_rows" not in container:
+            return None
+        return LaneTables(
+            rows=container.section("lane_rows"),
+            lanes=container.section("lane_lanes"),
+            limits=container.section("lane_limits"),
+            offsets=container.section("lane_offsets"),
+            prices=store.prices,
+            depth=self.meta.get("lane_table_depth"),
+            pruning=self.meta.get("lane_table_pruning"),
+        )
@@ -0,0 +1,142 @@
+"""
+Response compression (brotli or gzip) negotiated from Accept-Encoding
+"""
+
+import gzip
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+def available_encodings() -> List[str]:
+    """Content codings responses can be compressed with, preferred first"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick a content coding from an Accept-Encoding header
+
+    The available coding with the highest quality wins, brotli on a tie;
+    ``*`` stands for any coding not listed explicitly.
+
+    Args:
+        accept_encoding: Accept-Encoding header value, if any
+
+    Returns:
+        Optional[str]: "br" or "gzip", None to send the body uncompressed
+    """
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for coding in accept_encoding.split(","):
+        name, *params = coding.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for name in available_encodings():
+        quality = qualities.get(name, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    """Compress a body with one of ``available_encodings()``"""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 keeps identical bodies byte-identical
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def vary_accept_encoding(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Response headers with Accept-Encoding added to Vary, merged into an existing Vary header"""
+    merged, varied = [], False
+    for name, value in headers:
+        if name.lower() == b"vary" and not varied:
+            varied = True
+            tokens = [token.strip().lower() for token in value.split(b",")]
+            if b"accept-encoding" not in tokens and b"*" not in tokens:
+                value += b", Accept-Encoding"
+        merged.append((name, value))
+    if not varied:
+        merged.append((b"vary", b"Accept-Encoding"))
+    return merged
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete response bodies.
+
+    A response is compressed when the client accepts brotli or gzip, the
+    body arrives in one message (streamed responses pass through untouched),
+    it is not already encoded, and it is at least the minimum size; small
+    bodies cost more to compress than they save on the wire. Whether or not
+    it ends up compressed, every response carries ``Vary: Accept-Encoding``,
+    so shared caches keep the encodings apart.
+    """
+
+    def __init__(
+        self,
+        app,
+        get_minimum_size: Callable[[], Optional[int]],
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.get_minimum_size = get_minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        minimum_size = self.get_minimum_size() if scope["type"] == "http" else None
+        if minimum_size is None:
+            await self.app(scope, receive, send)
+            return
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = negotiate_encoding(value.decode("latin-1"))
+                break
+
+        start = None
+
+        async def compressing_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            held, start = start, None
+            headers = vary_accept_encoding(held["headers"])
+            body = message.get("body", b"")
+            if (
+                encoding is not None
+                and message["type"] == "http.response.body"
+                and not message.get("more_body", False)
+                and len(body) >= minimum_size
+                and not any(name.lower() == b"content-encoding" for name, _ in headers)
+            ):
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+                headers += [
+                    (b"content-encoding", encoding.encode("latin-1")),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                ]
+                message = dict(message, body=body)
+            await send(dict(held, headers=headers))
+            await send(message)
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,218 @@
+"""
+Dataset aggregates for /stats and /health, maintained incrementally across reloads
+"""
+
+import numpy as np
+from typing import Any, Dict, Sequence, Tuple
+from ..models.listing_store import ListingStore
+
+
+PERCENTILES = (50, 90, 95, 99)
+# Histogram bucket lower edges; the last bucket is open-ended
+PRICE_HISTOGRAM_EDGES_CENTS = (0, 2500, 5000, 10000, 25000, 50000, 75000, 100000)
+AREA_HISTOGRAM_EDGES = (0, 100, 200, 400, 800, 1600, 2500)
+
+
+class ValueCounts:
+    """
+    Multiset of integers held as sorted unique values and their counts.
+
+    Sums, extremes, percentiles and histograms are read off the unique
+    values, and adding or removing a batch of values only touches the
+    values in that batch.
+    """
+
+    def __init__(self, values: np.ndarray, counts: np.ndarray):
+        self.values = values
+        self.counts = counts
+
+    @classmethod
+    def of(cls, values: np.ndarray) -> 'ValueCounts':
+        unique, counts = np.unique(np.asarray(values, dtype=np.int64), return_counts=True)
+        return cls(unique, counts.astype(np.int64))
+
+    def merged(self, added: np.ndarray, removed: np.ndarray) -> 'ValueCounts':
+        """New multiset with ``added`` values inserted and ``removed`` ones taken out"""
+        batch = np.concatenate([np.asarray(added, dtype=np.int64), np.asarray(removed, dtype=np.int64)])
+        if not len(batch):
+            return self
+        signs = np.concatenate([np.ones(len(added)), -np.ones(len(removed))])
+        batch_values, inverse = np.unique(batch, return_inverse=True)
+        change = np.rint(np.bincount(inverse, weights=signs)).astype(np.int64)
+
+        position = np.searchsorted(self.values, batch_values)
+        known = position < len(self.values)
+        known[known] = self.values[position[known]] == batch_values[known]
+        counts = self.counts.copy()
+        counts[position[known]] += change[known]
+        fresh = ~known & (change > 0)
+        values = np.insert(self.values, position[fresh], batch_values[fresh])
+        counts = np.insert(counts, position[fresh], change[fresh])
+        keep = counts > 0
+        return ValueCounts(values[keep], counts[keep])
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def summary(self, edges: Sequence[int], percentiles: Sequence[int] = PERCENTILES) -> Dict[str, Any]:
+        """
+        Count, min, max, mean, nearest-rank percentiles and a histogram
+
+        Args:
+            edges: Ascending lower edges of the histogram buckets
+            percentiles: Percentiles to report
+
+        Returns:
+            Dict[str, Any]: Aggregates, zeros for an empty multiset
+        """
+        total = self.total
+        if total == 0:
+            return {
+                "count": 0, "min": 0, "max": 0, "mean": 0, "sum": 0,
+                "percentiles": {f"p{p}": 0 for p in percentiles},
+                "histogram": [{"from": edge, "count": 0} for edge in edges],
+            }
+        cumulative = np.cumsum(self.counts)
+        # Nearest rank: the smallest value with at least p% of the values at or below it
+        ranks = np.ceil(np.asarray(percentiles, dtype=np.float64) / 100 * total).astype(np.int64)
+        picks = self.values[np.searchsorted(cumulative, np.maximum(ranks, 1))]
+        buckets = np.searchsorted(np.asarray(edges), self.values, side="right") - 1
+        histogram = np.bincount(np.maximum(buckets, 0), weights=self.counts, minlength=len(edges))
+        value_sum = int(np.dot(self.values, self.counts))
+        return {
+            "count": total,
+            "min": int(self.values[0]),
+            "max": int(self.values[-1]),
+            "mean": value_sum / total,
+            "sum": value_sum,
+            "percentiles": {f"p{p}": int(v) for p, v in zip(percentiles, picks.tolist())},
+            "histogram": [{"from": edge, "count": int(c)} for edge, c in zip(edges, histogram.tolist())],
+        }
+
+
+def _rows_of(store: ListingStore, locations: np.ndarray) -> np.ndarray:
+    """Row indices of the given locations"""
+    starts = store.location_offsets[locations]
+    counts = store.location_offsets[locations + 1] - starts
+    if not len(locations):
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()), dtype=np.int64)
+
+
+class DatasetStats:
+    """
+    Aggregates over a listing store: listing and location counts, price and
+    area distributions, and the distribution of listings per location.
+
+    Built once per snapshot; the summary served by /stats is computed at
+    construction, so reading it is O(1). A reload derives the new aggregates
+    from the previous ones by removing the rows of dropped or changed
+    locations and adding those of new or changed ones.
+    """
+
+    def __init__(self, prices: ValueCounts, areas: ValueCounts, location_sizes: ValueCounts):
+        self.prices = prices
+        self.areas = areas
+        self.location_sizes = location_sizes
+        self.listing_count = prices.total
+        self.location_count = location_sizes.total
+        self.summary = self._summarize()
+
+    @classmethod
+    def from_store(cls, store: ListingStore) -> 'DatasetStats':
+        return cls(
+            prices=ValueCounts.of(store.prices),
+            areas=ValueCounts.of(store.areas),
+            location_sizes=ValueCounts.of(np.diff(store.location_offsets)),
+        )
+
+    @classmethod
+    def from_previous(
+        cls,
+        store: ListingStore,
+        previous_store: ListingStore,
+        previous: 'DatasetStats',
+        reuse_from: np.ndarray,
+    ) -> 'DatasetStats':
+        """
+        Aggregates for a new store, updated from the previous store's by the changed locations only.
+
+        ``reuse_from[i]`` is the location of ``previous_store`` that location
+        ``i`` is unchanged from, or -1 if location ``i`` is new or changed.
+        """
+        added = np.flatnonzero(reuse_from < 0)
+        kept = np.zeros(previous_store.location_count, dtype=bool)
+        kept[reuse_from[reuse_from >= 0]] = True
+        removed = np.flatnonzero(~kept)
+
+        added_rows = _rows_of(store, added)
+        removed_rows = _rows_of(previous_store, removed)
+        return cls(
+            prices=previous.prices.merged(store.prices[added_rows], previous_store.prices[removed_rows]),
+            areas=previous.areas.merged(store.areas[added_rows], previous_store.areas[removed_rows]),
+            location_sizes=previous.location_sizes.merged(
+                np.diff(store.location_offsets)[added], np.diff(previous_store.location_offsets)[removed]
+            ),
+        )
+
+    def with_changes(
+        self,
+        removed: Sequence[Tuple[Sequence[int], Sequence[int], Sequence[int]]],
+        added: Sequence[Tuple[Sequence[int], Sequence[int], Sequence[int]]],
+    ) -> 'DatasetStats':
+        """
+        Aggregates after replacing some locations' listings, touching only those listings.
+
+        ``removed`` holds the (lengths, widths, prices) columns of each
+        replaced location as it was, ``added`` those of each location as it
+        is now; empty groups do not count as locations.
+        """
+        def values(groups, column):
+            columns = [np.asarray(group[column], dtype=np.int64) for group in groups]
+            return np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64)
+
+        def areas(groups):
+            return values(groups, 0) * values(groups, 1)
+
+        def sizes(groups):
+            return np.asarray([len(group[2]) for group in groups if len(group[2])], dtype=np.int64)
+
+        return DatasetStats(
+            prices=self.prices.merged(values(added, 2), values(removed, 2)),
+            areas=self.areas.merged(areas(added), areas(removed)),
+            location_sizes=self.location_sizes.merged(sizes(added), sizes(removed)),
+        )
+
+    def _summarize(self) -> Dict[str, Any]:
+        prices = self.prices.summary(PRICE_HISTOGRAM_EDGES_CENTS)
+        areas = self.areas.summary(AREA_HISTOGRAM_EDGES)
+        sizes = self.location_sizes
+        return {
+            "total_listings": self.listing_count,
+            "total_locations": self.location_count,
+            "price_statistics": {
+                "min_price_cents": prices["min"],
+                "max_price_cents": prices["max"],
+                "avg_price_cents": round(prices["mean"], 2),
+                "min_price_dollars": round(prices["min"] / 100, 2),
+                "max_price_dollars": round(prices["max"] / 100, 2),
+                "avg_price_dollars": round(prices["mean"] / 100, 2),
+                "percentiles_cents": prices["percentiles"],
+                "histogram_cents": prices["histogram"],
+            },
+            "size_statistics": {
+                "min_area": areas["min"],
+                "max_area": areas["max"],
+                "avg_area": round(areas["mean"], 2),
+                "percentiles": areas["percentiles"],
+                "histogram": areas["histogram"],
+            },
+            "listings_per_location": {
+                "min": int(sizes.values[0]) if len(sizes.values) else 0,
+                "max": int(sizes.values[-1]) if len(sizes.values) else 0,
+                "avg": round(self.listing_count / self.location_count, 2) if self.location_count else 0,
+                "distribution": {str(v): int(c) for v, c in zip(sizes.values.tolist(), sizes.counts.tolist())},
+            },
+        }
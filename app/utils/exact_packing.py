@@ -0,0 +1,212 @@
+"""
+Exact minimum-price packing (branch and bound) for one location
+"""
+
+import numpy as np
+from math import inf
+from typing import Dict, List, Optional, Sequence, Tuple
+from .bin_packing import BinPackingAlgorithm
+from .capacity_index import LENGTH_BUCKETS, best_lanes_by_bucket, bucket_index
+
+
+# Locations up to this size skip the NumPy dominance pass
+SMALL_LOCATION_LISTINGS = 24
+_BUCKET_LENGTHS = LENGTH_BUCKETS.tolist()
+
+
+def dominance_survivors(lanes: np.ndarray, prices: np.ndarray, max_vehicles: int) -> np.ndarray:
+    """
+    Rows that can appear in some minimum-price packing of up to ``max_vehicles`` vehicles.
+
+    Listing ``i`` dominates ``j`` when it offers at least as many lanes for every
+    length bucket (lanes capped at ``max_vehicles``) for no more money; ties between
+    identical listings go to the lower row. A packing uses at most ``max_vehicles``
+    listings, so if ``j`` has ``max_vehicles`` dominators one of them is always free
+    to replace it at no extra cost: such rows are never needed.
+
+    Args:
+        lanes: (n, n_buckets) lanes per bucket, see ``best_lanes_by_bucket``
+        prices: Price of each row
+        max_vehicles: Largest number of vehicles that will be packed
+
+    Returns:
+        np.ndarray: Ascending surviving row positions
+    """
+    if len(prices) == 0:
+        return np.zeros(0, dtype=np.int64)
+    capped = np.minimum(lanes, max_vehicles)
+    # Rows with the same capability vector: only the max_vehicles cheapest can survive
+    groups, group_of = np.unique(capped, axis=0, return_inverse=True)
+    group_of = group_of.reshape(-1)
+    order = np.lexsort((np.arange(len(prices)), prices, group_of))
+    ordered_groups = group_of[order]
+    group_starts = np.searchsorted(ordered_groups, np.arange(len(groups)))
+    rank_in_group = np.arange(len(order)) - group_starts[ordered_groups]
+    kept = order[rank_in_group < max_vehicles]
+
+    # Across groups: a strictly more capable group dominates at equal or lower price
+    group_prices: List[np.ndarray] = [np.zeros(0, dtype=prices.dtype)] * len(groups)
+    kept_by_group: Dict[int, List[int]] = {}
+    for row in kept.tolist():
+        kept_by_group.setdefault(int(group_of[row]), []).append(row)
+    for g, rows in kept_by_group.items():
+        group_prices[g] = np.sort(prices[rows])
+    covers = np.all(groups[:, None, :] >= groups[None, :, :], axis=2)
+    np.fill_diagonal(covers, False)
+
+    survivors = []
+    for g, rows in kept_by_group.items():
+        dominating = np.flatnonzero(covers[:, g])
+        for rank, row in enumerate(rows):
+            dominators = rank  # cheaper (or earlier) rows with the same capability
+            for h in dominating.tolist():
+                dominators += int(np.searchsorted(group_prices[h], prices[row], side="right"))
+                if dominators >= max_vehicles:
+                    break
+            if dominators < max_vehicles:
+                survivors.append(row)
+    return np.asarray(sorted(survivors), dtype=np.int64)
+
+
+class ExactPackingSolver:
+    """
+    Minimum total price packing of one location.
+
+    Vehicles are placed largest first, so every lane already opened fits every
+    later vehicle: free lanes are always used before paying for a new listing,
+    and a new listing is always opened in its orientation with the most lanes
+    for the current vehicle. The only decision left is which listing to open
+    when no lane is free, explored depth first with:
+
+    * the greedy answer on the same candidates as the initial upper bound,
+    * a lower bound of the cheapest price per lane for every vehicle that still
+      needs a new lane (and at least the cheapest listing that fits the next one),
+    * load-time dominance pruning (``dominance_survivors``) and skipping
+      listings identical in price and capability to one already tried.
+    """
+
+    @staticmethod
+    def find_optimal_rows(
+        sizes: List[int],
+        lengths: Sequence[int],
+        widths: Sequence[int],
+        prices: Sequence[int],
+        small_location_listings: int = SMALL_LOCATION_LISTINGS,
+    ) -> List[int]:
+        """Same contract as ``BinPackingAlgorithm.find_optimal_rows`` but minimizing total price.
+
+        Return the positions of the chosen listings in opening order, or [] if they don't fit.
+        Locations of up to ``small_location_listings`` listings skip the dominance pass.
+        """
+        if not sizes or not len(prices):
+            return []
+        n = len(sizes)
+        if len(prices) <= small_location_listings:
+            # Too few listings for dominance pruning to pay for its NumPy setup
+            lanes = [
+                [min(n, max(w // 10 if l >= s else 0, l // 10 if w >= s else 0)) for s in _BUCKET_LENGTHS]
+                for l, w in zip(lengths, widths)
+            ]
+            greedy = BinPackingAlgorithm.find_optimal_rows(sizes, lengths, widths, prices)
+            return ExactPackingSolver.solve(sizes, lanes, list(prices), list(range(len(prices))), greedy)
+
+        lengths_arr = np.asarray(lengths, dtype=np.int32)
+        widths_arr = np.asarray(widths, dtype=np.int32)
+        prices_arr = np.asarray(prices, dtype=np.int64)
+        lane_table = best_lanes_by_bucket(lengths_arr, widths_arr)
+        rows = dominance_survivors(lane_table, prices_arr, n)
+        if len(rows) == 0:
+            return []
+        # The greedy answer on the same candidates seeds the upper bound
+        greedy = BinPackingAlgorithm.find_optimal_rows(
+            sizes, lengths_arr[rows].tolist(), widths_arr[rows].tolist(), prices_arr[rows].tolist()
+        )
+        return ExactPackingSolver.solve(
+            sizes, np.minimum(lane_table[rows], n).tolist(), prices_arr[rows].tolist(), rows.tolist(), greedy
+        )
+
+    @staticmethod
+    def solve(
+        sizes: List[int],
+        lanes: List[List[int]],
+        prices: List[int],
+        rows: List[int],
+        initial_plan: Optional[List[int]] = None,
+    ) -> List[int]:
+        """
+        Branch and bound over candidate listings.
+
+        Args:
+            sizes: Rounded vehicle lengths, largest first
+            lanes: Lanes per length bucket of each candidate listing, capped at len(sizes)
+            prices: Price of each candidate
+            rows: Position of each candidate in the caller's columns
+            initial_plan: Any feasible plan (candidate positions) used as the first upper bound
+
+        Returns:
+            List[int]: Chosen positions (from ``rows``) in opening order, or [] if they don't fit
+        """
+        n = len(sizes)
+        buckets = [bucket_index(s) for s in sizes]
+        price_list = prices
+
+        # Candidates per vehicle bucket, best price per lane first; identical listings collapse
+        candidates: Dict[int, List[Tuple[int, int]]] = {}
+        min_lane_price = [inf] * len(LENGTH_BUCKETS)
+        min_listing_price = [inf] * len(LENGTH_BUCKETS)
+        for b in set(buckets):
+            column = [lane_row[b] for lane_row in lanes]
+            options = [
+                (price_list[i] / column[i], -column[i], price_list[i], i)
+                for i in range(len(price_list)) if column[i] > 0
+            ]
+            options.sort()
+            candidates[b] = [(i, column[i]) for _, _, _, i in options]
+            if options:
+                min_lane_price[b] = options[0][0]
+                min_listing_price[b] = min(option[2] for option in options)
+        signatures = [(price_list[i], tuple(lanes[i])) for i in range(len(price_list))]
+
+        # Suffix sums of the cheapest lane price, for the lower bound
+        lane_bound = [0.0] * (n + 1)
+        for k in range(n - 1, -1, -1):
+            lane_bound[k] = lane_bound[k + 1] + min_lane_price[buckets[k]]
+        if lane_bound[0] == inf:
+            return []
+
+        best_cost = inf
+        best_plan: List[int] = []
+        if initial_plan:
+            best_cost = sum(price_list[i] for i in initial_plan)
+            best_plan = list(initial_plan)
+
+        used = [False] * len(price_list)
+        plan: List[int] = []
+
+        def search(k: int, free: int, cost: int) -> None:
+            nonlocal best_cost, best_plan
+            # Fill free lanes first; every open lane fits every remaining vehicle
+            k = min(n, k + free)
+            if k == n:
+                if cost < best_cost:
+                    best_cost = cost
+                    best_plan = list(plan)
+                return
+            bound = cost + max(lane_bound[k], min_listing_price[buckets[k]])
+            if bound >= best_cost:
+                return
+            tried = set()
+            for i, lane_count in candidates[buckets[k]]:
+                if used[i] or signatures[i] in tried:
+                    continue
+                if cost + price_list[i] + lane_bound[min(n, k + lane_count)] >= best_cost:
+                    continue
+                tried.add(signatures[i])
+                used[i] = True
+                plan.append(i)
+                search(k + 1, lane_count - 1, cost + price_list[i])
+                plan.pop()
+                used[i] = False
+
+        search(0, 0, 0)
+        return [rows[i] for i in best_plan]
@@ -0,0 +1,198 @@
+"""
+Pydantic-free fast path for /search
+"""
+
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder writes the same bytes, only slower
+    orjson = None
+
+from ..models.vehicle import Vehicle
+from .metrics import mark_handler_entry
+from .search_executor import SearchRejected
+from .wire_formats import RESULT_FIELDS, negotiate_media_type, parse_fields
+
+
+FAST_SEARCH_PATH = "/search"
+
+# Coroutine answering hand-validated (length, quantity) pairs with the response body in a media type,
+# projected to some result fields
+FastSearch = Callable[[List[Tuple[int, int]], str, Tuple[str, ...]], Awaitable[bytes]]
+
+
+def _field_bounds(name: str) -> Tuple[int, int]:
+    """(ge, le) of a Vehicle field, so hand validation cannot drift from the model"""
+    lower = upper = None
+    for constraint in Vehicle.model_fields[name].metadata:
+        lower = getattr(constraint, "ge", lower)
+        upper = getattr(constraint, "le", upper)
+    return lower, upper
+
+
+LENGTH_BOUNDS = _field_bounds("length")
+QUANTITY_BOUNDS = _field_bounds("quantity")
+
+
+def parse_vehicles(body: bytes) -> Optional[List[Tuple[int, int]]]:
+    """
+    Validate a /search body by hand
+
+    Only the plain shape is accepted: a JSON array of objects whose
+    ``length`` and ``quantity`` are integers within the ``Vehicle`` bounds.
+    Anything else (malformed JSON, strings or floats pydantic would coerce,
+    out-of-range values) returns None, so the regular route handles it and
+    produces the usual response.
+
+    Args:
+        body: Raw request body
+
+    Returns:
+        Optional[List[Tuple[int, int]]]: (length, quantity) per vehicle, or None
+    """
+    try:
+        data = orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError:
+        return None
+    if type(data) is not list:
+        return None
+
+    min_length, max_length = LENGTH_BOUNDS
+    min_quantity, max_quantity = QUANTITY_BOUNDS
+    vehicles = []
+    for item in data:
+        if type(item) is not dict:
+            return None
+        length = item.get("length")
+        quantity = item.get("quantity")
+        # type() rather than isinstance(): bools are ints too
+        if type(length) is not int or type(quantity) is not int:
+            return None
+        if not (min_length <= length <= max_length and min_quantity <= quantity <= max_quantity):
+            return None
+        vehicles.append((length, quantity))
+    return vehicles
+
+
+def _is_json(scope: Dict[str, Any]) -> bool:
+    """Whether FastAPI would parse the body as JSON (no content type, or a JSON one)"""
+    for name, value in scope["headers"]:
+        if name == b"content-type":
+            media_type = value.split(b";", 1)[0].strip().lower()
+            return media_type == b"application/json" or (
+                media_type.startswith(b"application/") and media_type.endswith(b"+json")
+            )
+    return True
+
+
+def _projected_fields(query_string: bytes) -> Optional[Tuple[str, ...]]:
+    """Fields a query string projects results to, or None unless ``fields`` is its only (valid) parameter"""
+    if not query_string:
+        return RESULT_FIELDS
+    params = parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+    if len(params) != 1 or params[0][0] != "fields":
+        return None
+    try:
+        return parse_fields(params[0][1])
+    except ValueError:
+        return None
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class FastSearchMiddleware:
+    """
+    ASGI middleware serving plain ``POST /search`` requests without pydantic.
+
+    The body is validated by hand and the search service encodes its results
+    straight to bytes, in the media type negotiated from the Accept header and
+    projected to the ``fields`` query parameter. A search shed by admission
+    control is answered here, as the route would. Everything else (other query
+    parameters, bodies the fast path does not accept, validation errors) goes
+    to the regular route with the body replayed, so error responses and the
+    OpenAPI schema are unchanged. Any other search error propagates like an
+    error in the route would, instead of running the search a second time.
+    """
+
+    def __init__(self, app, get_search: Callable[[], Optional[FastSearch]]):
+        self.app = app
+        self.get_search = get_search
+
+    async def __call__(self, scope, receive, send):
+        search = fields = None
+        if scope["type"] == "http" and scope["path"] == FAST_SEARCH_PATH and scope["method"] == "POST" and _is_json(scope):
+            fields = _projected_fields(scope["query_string"])
+            if fields is not None:
+                search = self.get_search()
+        if search is None:
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return  # client disconnected
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        payload = None
+        vehicles = parse_vehicles(body)
+        media_type = negotiate_media_type(_header(scope, b"accept"))
+        if vehicles is not None:
+            mark_handler_entry(scope)
+            try:
+                payload = await search(vehicles, media_type, fields)
+            except SearchRejected as e:
+                # Answer right away: replaying a shed search would only queue it again
+                error = json.dumps({"detail": e.detail}, separators=(",", ":")).encode("utf-8")
+                await _send(send, e.status_code, error, "application/json", [(b"retry-after", b"1")])
+                return
+            except ValueError:
+                # Let the route produce its 400 response; any other error is a server fault and propagates
+                payload = None
+
+        if payload is None:
+            await self.app(scope, _replay(body, receive), send)
+            return
+
+        await _send(send, 200, payload, media_type, [(b"vary", b"Accept")])
+
+
+async def _send(
+    send, status_code: int, body: bytes, media_type: str, headers: Sequence[Tuple[bytes, bytes]] = ()
+) -> None:
+    """Send a complete response with the headers starlette's Response sets"""
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": list(headers) + [
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"content-type", media_type.encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _replay(body: bytes, receive: Callable[[], Awaitable[Dict[str, Any]]]) -> Callable[[], Awaitable[Dict[str, Any]]]:
+    """An ASGI receive that yields an already-read body once, then defers to the original"""
+    sent = False
+
+    async def replay() -> Dict[str, Any]:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
@@ -0,0 +1,479 @@
+"""
+Per-location lane tables compiled at load time for the greedy packer
+"""
+
+import numpy as np
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from ..models.listing_overlay import OverlayListingStore
+from ..models.listing_store import ListingStore
+from .bin_packing import BinPackingAlgorithm
+from .capacity_index import LENGTH_BUCKETS
+
+
+def best_orientations_by_bucket(lengths: np.ndarray, widths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lanes and length limit of each listing's best orientation for every length bucket.
+
+    Vectorized form of ``_best_orientation_for_dims``: of the orientations
+    that fit the vehicle and offer at least one lane, the one with more
+    lanes wins, then the one with the larger length limit.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (lanes, length_limits), each (n_listings, n_buckets)
+        int32; lanes is 0 where nothing fits
+    """
+    lengths = lengths.astype(np.int32)[:, None]
+    widths = widths.astype(np.int32)[:, None]
+    along_length = np.where(lengths >= LENGTH_BUCKETS, widths // 10, 0)
+    along_width = np.where(widths >= LENGTH_BUCKETS, lengths // 10, 0)
+    use_width = (along_width > along_length) | ((along_width == along_length) & (widths > lengths))
+    lanes = np.where(use_width, along_width, along_length).astype(np.int32)
+    limits = np.where(use_width, widths, lengths).astype(np.int32)
+    return lanes, limits
+
+
+def pack_blocks_from_columns(
+    location: int,
+    blocks: Sequence[Tuple[int, int]],
+    location_columns: Callable[[int], Tuple[int, List[int], List[int], List[int]]],
+) -> Optional[Tuple[List[int], int]]:
+    """
+    Pack vehicle blocks into one location from its columns (``find_optimal_rows_for_blocks``)
+
+    Returns:
+        Optional[Tuple[List[int], int]]: (store rows, total_price_in_cents), or None if they don't fit
+    """
+    start, lengths, widths, prices = location_columns(location)
+    rows = BinPackingAlgorithm.find_optimal_rows_for_blocks(list(blocks), lengths, widths, prices)
+    if not rows:
+        return None
+    return [start + row for row in rows], sum(prices[row] for row in rows)
+
+
+class LaneTables:
+    """
+    Greedy opening order of every location, for every length bucket.
+
+    For bucket ``b`` and location ``i``, entries
+    ``offsets[b, i]:offsets[b, i + 1]`` list the store rows of location ``i``
+    that can host a vehicle of that length, with the lanes and length limit
+    of their best orientation, sorted the way ``find_optimal_rows`` picks a
+    listing to open: cheapest price per lane, then more lanes, then larger
+    length limit, then lower row. The greedy packer then only advances a
+    cursor per bucket past rows already opened, instead of re-deriving and
+    re-ranking orientations for every vehicle.
+
+    With a ``depth``, the lists are capped at their first ``depth`` entries.
+    Every vehicle opens at most one listing, so packing ``depth`` vehicles
+    opens at most ``depth - 1`` listings before any other, and an entry
+    behind ``depth`` better-ranked listings of its location is never reached
+    by a query of up to ``depth`` vehicles. Listings past the cap in every
+    bucket are unreachable and drop out of the search entirely. The cap only
+    follows the greedy opening order; it is not a listing-vs-listing
+    dominance test, and the exact and fleet packers do not use it.
+    """
+
+    def __init__(
+        self,
+        rows: np.ndarray,
+        lanes: np.ndarray,
+        limits: np.ndarray,
+        offsets: np.ndarray,
+        prices: np.ndarray,
+        depth: Optional[int] = None,
+        pruning: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Args:
+            rows: Store row of every entry, int32
+            lanes: Lanes of every entry's best orientation, int32
+            limits: Length limit of every entry's best orientation, int32
+            offsets: (n_buckets, location_count + 1) entry ranges, int64
+            prices: Price column of the store the rows refer to
+            depth: Entries kept per location and bucket, None if the lists are complete
+            pruning: Build report, see ``from_store``
+        """
+        self.rows = rows
+        self.lanes = lanes
+        self.limits = limits
+        self.offsets = offsets
+        self.prices = prices
+        self.depth = depth
+        self.pruning = pruning or {}
+        self._stride = int(offsets.shape[1])
+        # Buffer views index to plain ints several times faster than NumPy scalars
+        self._rows_view = memoryview(np.ascontiguousarray(rows, dtype=np.int32))
+        self._lanes_view = memoryview(np.ascontiguousarray(lanes, dtype=np.int32))
+        self._limits_view = memoryview(np.ascontiguousarray(limits, dtype=np.int32))
+        self._offsets_view = memoryview(np.ascontiguousarray(offsets, dtype=np.int64).ravel())
+        self._prices_view = memoryview(np.ascontiguousarray(prices, dtype=np.int64))
+
+    @classmethod
+    def from_store(cls, store: ListingStore, depth: Optional[int] = None) -> 'LaneTables':
+        """
+        Build the tables of a store
+
+        Args:
+            store: Listing store
+            depth: Largest number of vehicles the tables must answer for; None keeps every entry
+
+        Returns:
+            LaneTables: Tables whose ``pruning`` report counts listings and entries before and after
+            the depth cap
+        """
+        n_buckets = len(LENGTH_BUCKETS)
+        location_count = store.location_count
+        lanes, limits = best_orientations_by_bucket(store.lengths, store.widths)
+        location_index = np.asarray(store.location_index, dtype=np.int64)
+        prices = np.asarray(store.prices, dtype=np.int64)
+
+        offsets = np.zeros((n_buckets, location_count + 1), dtype=np.int64)
+        parts: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        base = 0
+        total_entries = 0
+        for bucket in range(n_buckets):
+            rows = np.flatnonzero(lanes[:, bucket] > 0)
+            bucket_lanes = lanes[rows, bucket]
+            bucket_limits = limits[rows, bucket]
+            locations = location_index[rows]
+            # Same key as find_optimal_rows' scan: price per lane, -lanes, -length limit, row
+            order = np.lexsort((rows, -bucket_limits, -bucket_lanes, prices[rows] / bucket_lanes, locations))
+            counts = np.bincount(locations, minlength=location_count)
+            total_entries += len(rows)
+            if depth is not None:
+                # Rank of each sorted entry within its location; keep the first ``depth``
+                starts = np.zeros(location_count, dtype=np.int64)
+                np.cumsum(counts[:-1], out=starts[1:])
+                order = order[np.arange(len(order)) - starts[locations[order]] < depth]
+                counts = np.minimum(counts, depth)
+            parts.append((rows[order], bucket_lanes[order], bucket_limits[order]))
+            np.cumsum(counts, out=offsets[bucket, 1:])
+            offsets[bucket] += base
+            base += len(order)
+
+        kept_rows = np.concatenate([p[0] for p in parts])
+        pruning = {
+            "listings": len(store),
+            # Fit no vehicle length in either orientation
+            "unusable_listings": int(np.count_nonzero(~(lanes > 0).any(axis=1))),
+            "searchable_listings": int(len(np.unique(kept_rows))),
+            "entries": int(len(kept_rows)),
+            "pruned_entries": int(total_entries - len(kept_rows)),
+        }
+        pruning["unreachable_listings"] = (
+            pruning["listings"] - pruning["unusable_listings"] - pruning["searchable_listings"]
+        )
+        return cls(
+            rows=kept_rows.astype(np.int32),
+            lanes=np.concatenate([p[1] for p in parts]).astype(np.int32),
+            limits=np.concatenate([p[2] for p in parts]).astype(np.int32),
+            offsets=offsets,
+            prices=prices,
+            depth=depth,
+            pruning=pruning,
+        )
+
+    @classmethod
+    def from_previous(
+        cls,
+        store: ListingStore,
+        previous_store: ListingStore,
+        previous: 'LaneTables',
+        reuse_from: np.ndarray,
+    ) -> 'LaneTables':
+        """
+        Tables for a new store, sorting only the entries of changed locations.
+
+        ``reuse_from[i]`` is the location of ``previous_store`` that location
+        ``i`` is unchanged from, or -1 if location ``i`` is new or changed. An
+        unchanged location has the same rows in the same order, so its entries
+        are the previous ones with their rows shifted to where the location
+        starts now. The depth is the previous tables'.
+        """
+        n_buckets = len(LENGTH_BUCKETS)
+        location_count = store.location_count
+        if location_count == 0:
+            return cls.from_store(store, previous.depth)
+        changed = np.flatnonzero(reuse_from < 0)
+        reused = np.flatnonzero(reuse_from >= 0)
+        selected = store.select_locations(changed)
+        fresh = cls.from_store(selected, previous.depth)
+
+        # Entries are copied from one pool: the previous entries, then the fresh ones
+        pool_rows = np.concatenate([previous.rows, fresh.rows]).astype(np.int64)
+        pool_lanes = np.concatenate([previous.lanes, fresh.lanes])
+        pool_limits = np.concatenate([previous.limits, fresh.limits])
+        starts = np.zeros((n_buckets, location_count), dtype=np.int64)
+        counts = np.zeros((n_buckets, location_count), dtype=np.int64)
+        old = reuse_from[reused]
+        starts[:, reused] = previous.offsets[:, old]
+        counts[:, reused] = previous.offsets[:, old + 1] - previous.offsets[:, old]
+        starts[:, changed] = fresh.offsets[:, :-1] + len(previous.rows)
+        counts[:, changed] = np.diff(fresh.offsets, axis=1)
+        # Added to a copied entry's row: where its location starts now minus where it started in its source
+        shifts = np.zeros(location_count, dtype=np.int64)
+        shifts[reused] = store.location_offsets[reused] - previous_store.location_offsets[old]
+        shifts[changed] = store.location_offsets[changed] - selected.location_offsets[:-1]
+
+        flat_starts, flat_counts = starts.ravel(), counts.ravel()
+        bounds = np.zeros(len(flat_counts) + 1, dtype=np.int64)
+        np.cumsum(flat_counts, out=bounds[1:])
+        entries = np.repeat(flat_starts - bounds[:-1], flat_counts) + np.arange(bounds[-1], dtype=np.int64)
+        rows = pool_rows[entries] + np.repeat(np.tile(shifts, n_buckets), flat_counts)
+        offsets = np.empty((n_buckets, location_count + 1), dtype=np.int64)
+        offsets[:, :-1] = bounds[:-1].reshape(n_buckets, location_count)
+        offsets[:, -1] = bounds[location_count::location_count]
+
+        # The report moves by the dropped and changed locations' listings and the fresh entries
+        kept = np.zeros(previous_store.location_count, dtype=bool)
+        kept[old] = True
+        removed = previous_store.select_locations(np.flatnonzero(~kept))
+        removed_lanes, _ = best_orientations_by_bucket(removed.lengths, removed.widths)
+        searchable = np.zeros(len(store), dtype=bool)
+        searchable[rows] = True
+        candidates = (
+            previous.pruning["entries"] + previous.pruning["pruned_entries"] - int(np.count_nonzero(removed_lanes))
+            + fresh.pruning["entries"] + fresh.pruning["pruned_entries"]
+        )
+        pruning = {
+            "listings": len(store),
+            "unusable_listings": (
+                previous.pruning["unusable_listings"] - int(np.count_nonzero(~(removed_lanes > 0).any(axis=1)))
+                + fresh.pruning["unusable_listings"]
+            ),
+            "searchable_listings": int(np.count_nonzero(searchable)),
+            "entries": int(len(rows)),
+            "pruned_entries": int(candidates - len(rows)),
+        }
+        pruning["unreachable_listings"] = (
+            pruning["listings"] - pruning["unusable_listings"] - pruning["searchable_listings"]
+        )
+        return cls(
+            rows=rows.astype(np.int32),
+            lanes=pool_lanes[entries],
+            limits=pool_limits[entries],
+            offsets=offsets,
+            prices=np.asarray(store.prices, dtype=np.int64),
+            depth=previous.depth,
+            pruning=pruning,
+        )
+
+    def covers(self, vehicle_count: int) -> bool:
+        """Whether the tables can pack this many vehicles (see ``depth``)"""
+        return self.depth is None or vehicle_count <= self.depth
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.lanes.nbytes + self.limits.nbytes + self.offsets.nbytes
+
+    def find_optimal_rows(self, location: int, sizes: Sequence[int]) -> List[int]:
+        """
+        ``BinPackingAlgorithm.find_optimal_rows`` for one location of the store
+
+        Args:
+            location: Location index
+            sizes: Rounded vehicle lengths (multiples of 10 within ``LENGTH_BUCKETS``), largest first,
+                at most ``depth`` of them
+
+        Returns:
+            List[int]: Store rows of the chosen listings in opening order, or [] if they don't fit
+
+        Raises:
+            ValueError: If a size is not a length bucket, or there are more vehicles than ``depth``
+        """
+        if self.depth is not None and len(sizes) > self.depth:
+            raise ValueError(f"Lane tables of depth {self.depth} cannot pack {len(sizes)} vehicles")
+        rows = self._rows_view
+        offsets = self._offsets_view
+        stride = self._stride
+        n_buckets = len(LENGTH_BUCKETS)
+
+        # Open bins: [row, length_limit, remaining_lanes]
+        open_bins: List[List[int]] = []
+        used = set()
+        # Next entry to consider per bucket; entries before it are opened already
+        cursors = {}
+
+        for s in sizes:
+            best = None
+            best_lanes_left = 0
+            for open_bin in open_bins:
+                if open_bin[2] > best_lanes_left and open_bin[1] >= s:
+                    best_lanes_left = open_bin[2]
+                    best = open_bin
+            if best is not None:
+                best[2] -= 1
+                continue
+
+            bucket = s // 10 - 1
+            if not 0 <= bucket < n_buckets or s % 10:
+                raise ValueError(f"Vehicle length {s} is not a length bucket")
+            position = cursors.get(bucket)
+            if position is None:
+                position = offsets[bucket * stride + location]
+            end = offsets[bucket * stride + location + 1]
+            while position < end and rows[position] in used:
+                position += 1
+            if position == end:
+                return []
+            row = rows[position]
+            used.add(row)
+            cursors[bucket] = position + 1
+            open_bins.append([row, self._limits_view[position], self._lanes_view[position] - 1])
+
+        return [open_bin[0] for open_bin in open_bins]
+
+    def find_optimal_rows_for_blocks(self, location: int, blocks: Sequence[Tuple[int, int]]) -> Optional[List[int]]:
+        """
+        ``BinPackingAlgorithm.find_optimal_rows_for_blocks`` for one location of the store
+
+        A block that needs new listings opens them in table order, skipping
+        rows opened by earlier blocks, so its cost grows with the listings it
+        opens, not with its count. Tables cut to a ``depth`` answer as long as
+        no block runs past the end of a list they may have cut short.
+
+        Args:
+            location: Location index
+            blocks: (rounded length, count) pairs, largest length first
+
+        Returns:
+            Optional[List[int]]: Store rows of the chosen listings in opening order, [] if the vehicles
+            don't fit, or None if the tables are too shallow to tell (pack the location's columns instead)
+
+        Raises:
+            ValueError: If a size is not a length bucket
+        """
+        rows = self._rows_view
+        lanes_view = self._lanes_view
+        limits_view = self._limits_view
+        offsets = self._offsets_view
+        stride = self._stride
+        n_buckets = len(LENGTH_BUCKETS)
+
+        # Open bins: (row, length_limit, lanes)
+        open_bins: List[Tuple[int, int, int]] = []
+        used = set()
+        placed = 0
+
+        for s, count in blocks:
+            # Lanes left to this block, see BinPackingAlgorithm.find_optimal_rows_for_blocks
+            free = sum(lanes for (_, limit, lanes) in open_bins if limit >= s) - placed
+            if count <= free:
+                placed += count
+                continue
+            placed += free
+            count -= free
+
+            bucket = s // 10 - 1
+            if not 0 <= bucket < n_buckets or s % 10:
+                raise ValueError(f"Vehicle length {s} is not a length bucket")
+            start = offsets[bucket * stride + location]
+            end = offsets[bucket * stride + location + 1]
+            position = start
+            while count:
+                while position < end and rows[position] in used:
+                    position += 1
+                if position == end:
+                    if self.depth is not None and end - start >= self.depth:
+                        return None
+                    return []
+                row = rows[position]
+                lanes = lanes_view[position]
+                used.add(row)
+                open_bins.append((row, limits_view[position], lanes))
+                taken = min(count, lanes)
+                placed += taken
+                count -= taken
+                position += 1
+
+        return [open_bin[0] for open_bin in open_bins]
+
+    def pack(self, location: int, sizes: Sequence[int]) -> Optional[Tuple[List[int], int]]:
+        """
+        Pack the vehicles into one location
+
+        Returns:
+            Optional[Tuple[List[int], int]]: (store rows, total_price_in_cents), or None if they don't fit
+        """
+        rows = self.find_optimal_rows(location, sizes)
+        if not rows:
+            return None
+        prices = self._prices_view
+        return rows, sum(prices[row] for row in rows)
+
+    def pack_blocks(
+        self,
+        location: int,
+        blocks: Sequence[Tuple[int, int]],
+        location_columns: Callable[[int], Tuple[int, List[int], List[int], List[int]]],
+    ) -> Optional[Tuple[List[int], int]]:
+        """
+        Pack vehicle blocks into one location, from its columns where the tables are too shallow
+
+        Args:
+            location: Location index
+            blocks: (rounded length, count) pairs, largest length first
+            location_columns: The store's ``location_columns``
+
+        Returns:
+            Optional[Tuple[List[int], int]]: (store rows, total_price_in_cents), or None if they don't fit
+        """
+        rows = self.find_optimal_rows_for_blocks(location, blocks)
+        if rows is None:
+            return pack_blocks_from_columns(location, blocks, location_columns)
+        if not rows:
+            return None
+        prices = self._prices_view
+        return rows, sum(prices[row] for row in rows)
+
+
+class OverlayLaneTables:
+    """
+    Lane tables of an ``OverlayListingStore``.
+
+    Locations the overlay replaced are packed from their columns with the
+    same greedy rule; every other location is read from the base store's
+    tables, whose row numbers the overlay keeps.
+    """
+
+    def __init__(self, base: LaneTables, store: OverlayListingStore):
+        self.base = base
+        self.store = store
+        self.depth = base.depth
+        self.pruning = base.pruning
+
+    def covers(self, vehicle_count: int) -> bool:
+        """Whether the tables can pack this many vehicles (see ``LaneTables.depth``)"""
+        return self.base.covers(vehicle_count)
+
+    @property
+    def nbytes(self) -> int:
+        return self.base.nbytes
+
+    def pack(self, location: int, sizes: Sequence[int]) -> Optional[Tuple[List[int], int]]:
+        """
+        Pack the vehicles into one location
+
+        Returns:
+            Optional[Tuple[List[int], int]]: (store rows, total_price_in_cents), or None if they don't fit
+        """
+        if location not in self.store.groups:
+            return self.base.pack(location, sizes)
+        start, lengths, widths, prices = self.store.location_columns(location)
+        rows = BinPackingAlgorithm.find_optimal_rows(list(sizes), lengths, widths, prices)
+        if not rows:
+            return None
+        return [start + row for row in rows], sum(prices[row] for row in rows)
+
+    def pack_blocks(
+        self,
+        location: int,
+        blocks: Sequence[Tuple[int, int]],
+        location_columns: Callable[[int], Tuple[int, List[int], List[int], List[int]]],
+    ) -> Optional[Tuple[List[int], int]]:
+        """
+        ``LaneTables.pack_blocks``; replaced locations are packed from their columns
+        """
+        if location not in self.store.groups:
+            return self.base.pack_blocks(location, blocks, location_columns)
+        return pack_blocks_from_columns(location, blocks, location_columns)
@@ -0,0 +1,294 @@
+"""
+Prometheus-style metrics with preallocated buckets
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Latency buckets in seconds: 10 us .. 5 s
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.3, 0.5, 1.0, 2.5, 5.0,
+)
+
+SEARCH_STAGES: Tuple[str, ...] = (
+    "request_validation",
+    "validate_vehicles",
+    "unit_conversion",
+    "lookup",
+    "location_scan",
+    "packing",
+    "sorting",
+    "materialize",
+    "serialization",
+)
+
+# Why admission control rejected a search: full queue (429), expected or actual deadline miss (503)
+SHED_REASONS: Tuple[str, ...] = ("queue_full", "deadline", "expired")
+
+# Paths whose requests are timed end to end by MetricsMiddleware
+TIMED_PATHS: Tuple[str, ...] = ("/search", "/search/batch", "/search/fleet")
+
+# Keys MetricsMiddleware and the route handlers leave in the ASGI scope
+SCOPE_STARTED = "metrics.started"
+SCOPE_HANDLER_ENTRY = "metrics.handler_entry"
+SCOPE_HANDLER_EXIT = "metrics.handler_exit"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter; ``inc`` only touches a preallocated slot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram.
+
+    Bucket bounds and counts are allocated once; ``observe`` is a bisect and
+    two in-place updates. Counts are stored per bucket and made cumulative
+    only when rendered.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Cumulative bucket counts (last one is +Inf, i.e. the total) and the sum"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class MetricFamily:
+    """A named metric with a fixed label set; children are created up front, never per request."""
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names: Sequence[str] = (),
+                 factory: Callable[[], object] = Counter):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.label_names:
+            self._children[()] = factory()
+
+    def labels(self, *values: str):
+        """Get (creating at setup time) the child for a label value tuple"""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._factory()
+        return child
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in self._children.items():
+            if isinstance(child, Histogram):
+                cumulative, total = child.snapshot()
+                for bound, count in zip(child.buckets + (float("inf"),), cumulative):
+                    le = _format_labels(self.label_names, values, f'le="{_format_value(bound)}"')
+                    yield f"{self.name}_bucket{le} {count}"
+                labels = _format_labels(self.label_names, values)
+                yield f"{self.name}_sum{labels} {_format_value(total)}"
+                yield f"{self.name}_count{labels} {cumulative[-1]}"
+            else:
+                yield f"{self.name}{_format_labels(self.label_names, values)} {child.value}"
+
+
+class CallbackMetric:
+    """Metric whose samples are read from the application only when scraped."""
+
+    def __init__(self, name: str, help_text: str, kind: str,
+                 read: Callable[[], Optional[float]]):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self._read = read
+
+    def render(self) -> Iterable[str]:
+        value = self._read()
+        if value is None:
+            return
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield f"{self.name} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered in the Prometheus text format"""
+
+    # The response class appends "; charset=utf-8"
+    CONTENT_TYPE = "text/plain; version=0.0.4"
+
+    def __init__(self):
+        self._metrics: List[object] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> MetricFamily:
+        return self.register(MetricFamily(name, help_text, "counter", label_names, Counter))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        return self.register(MetricFamily(name, help_text, "histogram", label_names, lambda: Histogram(buckets)))
+
+    def gauge_callback(self, name: str, help_text: str, read: Callable[[], Optional[float]]) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help_text, "gauge", read))
+
+    def counter_callback(self, name: str, help_text: str, read: Callable[[], Optional[float]]) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help_text, "counter", read))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class SearchMetrics:
+    """
+    Metrics of the search path.
+
+    Every child the hot path touches is resolved here once, so recording a
+    stage is an attribute read, a bisect and two in-place updates.
+    """
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        stages = self.registry.histogram(
+            "search_stage_duration_seconds", "Time spent in each stage of a search", ["stage"]
+        )
+        self.stage = {name: stages.labels(name) for name in SEARCH_STAGES}
+        self.request_validation = self.stage["request_validation"]
+        self.validate_vehicles = self.stage["validate_vehicles"]
+        self.unit_conversion = self.stage["unit_conversion"]
+        self.lookup = self.stage["lookup"]
+        self.location_scan = self.stage["location_scan"]
+        self.packing = self.stage["packing"]
+        self.sorting = self.stage["sorting"]
+        self.materialize = self.stage["materialize"]
+        self.serialization = self.stage["serialization"]
+
+        requests = self.registry.histogram(
+            "http_request_duration_seconds", "End-to-end latency of search requests", ["path"]
+        )
+        self.request_duration = {path: requests.labels(path) for path in TIMED_PATHS}
+
+        self.searches = self.registry.counter("search_queries_total", "Searches answered").labels()
+        self.precomputed = self.registry.counter(
+            "search_precomputed_total", "Searches answered by the answer table or result cache"
+        ).labels()
+        self.locations_scanned = self.registry.counter(
+            "search_locations_scanned_total", "Locations that passed the prefilter and were considered for packing"
+        ).labels()
+        self.locations_pruned = self.registry.counter(
+            "search_locations_pruned_total", "Locations dropped by the capacity prefilter"
+        ).labels()
+        self.feasible_locations = self.registry.counter(
+            "search_feasible_locations_total", "Locations that could hold the vehicles"
+        ).labels()
+        self.results_returned = self.registry.counter(
+            "search_results_returned_total", "Search results returned to clients"
+        ).labels()
+
+        self.queue_wait = self.registry.histogram(
+            "search_queue_wait_seconds", "Time searches waited for an executor thread"
+        ).labels()
+        shed = self.registry.counter(
+            "search_shed_total", "Searches rejected by admission control", ["reason"]
+        )
+        self.shed = {reason: shed.labels(reason) for reason in SHED_REASONS}
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+def mark_handler_entry(scope: Dict[str, Any]) -> None:
+    """Called first thing in a timed route: everything before it was request parsing and validation"""
+    if SCOPE_STARTED in scope:
+        scope[SCOPE_HANDLER_ENTRY] = time.perf_counter()
+
+
+def mark_handler_exit(scope: Dict[str, Any]) -> None:
+    """Called just before a timed route returns: everything after it is response serialization"""
+    if SCOPE_STARTED in scope:
+        scope[SCOPE_HANDLER_EXIT] = time.perf_counter()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing search requests end to end.
+
+    Together with the handler marks it splits a request into request
+    validation (arrival to handler entry) and serialization (handler exit to
+    the response start), besides the stages SearchService records itself.
+    """
+
+    def __init__(self, app, get_metrics: Callable[[], Optional[SearchMetrics]]):
+        self.app = app
+        self.get_metrics = get_metrics
+
+    async def __call__(self, scope, receive, send):
+        metrics = self.get_metrics() if scope["type"] == "http" else None
+        histogram = metrics.request_duration.get(scope["path"]) if metrics is not None else None
+        if histogram is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = scope[SCOPE_STARTED] = time.perf_counter()
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                entry = scope.get(SCOPE_HANDLER_ENTRY)
+                if entry is not None:
+                    metrics.request_validation.observe(entry - started)
+                exit_time = scope.get(SCOPE_HANDLER_EXIT)
+                if exit_time is not None:
+                    metrics.serialization.observe(now - exit_time)
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                histogram.observe(time.perf_counter() - started)
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
@@ -0,0 +1,58 @@
+"""
+Opaque cursors for paging through search results
+"""
+
+import base64
+import json
+from typing import List, Tuple
+
+
+# Position in the result order: (total_price_in_cents, location index)
+SortKey = Tuple[int, int]
+
+
+def encode_cursor(dataset_version: int, sizes: List[int], last: SortKey) -> str:
+    """
+    Encode the position after the last result of a page
+
+    Args:
+        dataset_version: Version of the dataset the page was computed on
+        sizes: Canonical query (rounded vehicle lengths, largest first)
+        last: Sort key of the last result on the page
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    payload = json.dumps([dataset_version, list(sizes), last[0], last[1]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, dataset_version: int, sizes: List[int]) -> SortKey:
+    """
+    Decode a cursor and check it belongs to this query and dataset version
+
+    Location indices are only meaningful within one dataset version, so a
+    cursor is rejected once the dataset has been reloaded.
+
+    Args:
+        cursor: Cursor returned with a previous page
+        dataset_version: Version of the dataset being searched
+        sizes: Canonical query of the current request
+
+    Returns:
+        SortKey: Results strictly after this key belong to the next page
+
+    Raises:
+        ValueError: If the cursor is malformed, for another query, or expired
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        version, cursor_sizes, price, location = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last = (int(price), int(location))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sizes != list(sizes):
+        raise ValueError("Cursor belongs to a different search")
+    if version != dataset_version:
+        raise ValueError("Cursor expired: listings have been updated, restart from the first page")
+    return last
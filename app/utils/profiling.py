@@ -0,0 +1,369 @@
+"""
+On-demand profiling: per-request stage traces, a sampling profiler and memory reports
+"""
+
+import cProfile
+import mmap
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import numpy as np
+from collections import Counter as FrameCounter
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .metrics import SEARCH_STAGES, SearchMetrics
+
+
+T = TypeVar("T")
+
+# SearchMetrics counters a request trace also counts for its own request
+TRACED_COUNTERS: Tuple[str, ...] = (
+    "searches",
+    "precomputed",
+    "locations_scanned",
+    "locations_pruned",
+    "feasible_locations",
+    "results_returned",
+)
+
+# Innermost frames of threads that are blocked waiting, not working
+IDLE_FRAMES = frozenset({
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+})
+
+# Package root, so frames and allocation sites inside it are reported relative to it
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the package root, or the file and its directory (e.g. ``pydantic/main.py``)"""
+    if filename.startswith(_ROOT):
+        return filename[len(_ROOT):]
+    directory, name = os.path.split(filename)
+    return os.path.join(os.path.basename(directory), name)
+
+
+class _TracedStage:
+    """Stage histogram that also adds each observation to one request's timings"""
+
+    def __init__(self, histogram, stage: str, timings: Dict[str, float]):
+        self._histogram = histogram
+        self._stage = stage
+        self._timings = timings
+
+    def observe(self, value: float) -> None:
+        self._histogram.observe(value)
+        self._timings[self._stage] = self._timings.get(self._stage, 0.0) + value
+
+
+class _TracedCounter:
+    """Counter that also counts for one request"""
+
+    def __init__(self, counter, name: str, counts: Dict[str, int]):
+        self._counter = counter
+        self._name = name
+        self._counts = counts
+
+    def inc(self, amount: int = 1) -> None:
+        self._counter.inc(amount)
+        self._counts[self._name] = self._counts.get(self._name, 0) + amount
+
+
+class RequestTrace:
+    """
+    ``SearchMetrics`` stand-in recording the stages of a single request.
+
+    Every observation still reaches the shared metrics, so a traced request
+    shows up on /metrics like any other. Only debug requests get one (see
+    ``SearchService.with_metrics``): untraced searches record into
+    ``SearchMetrics`` directly and pay nothing for tracing.
+    """
+
+    def __init__(self, metrics: SearchMetrics):
+        self.registry = metrics.registry
+        self.timings: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.stage = {name: _TracedStage(metrics.stage[name], name, self.timings) for name in SEARCH_STAGES}
+        for name, stage in self.stage.items():
+            setattr(self, name, stage)
+        for name in TRACED_COUNTERS:
+            setattr(self, name, _TracedCounter(getattr(metrics, name), name, self.counts))
+        self.request_duration = metrics.request_duration
+        self.queue_wait = metrics.queue_wait
+        self.shed = metrics.shed
+
+    def timings_ms(self) -> Dict[str, float]:
+        """Milliseconds per stage that ran, in pipeline order"""
+        return {
+            name: round(self.timings[name] * 1000, 3)
+            for name in SEARCH_STAGES if name in self.timings
+        }
+
+
+def profile_call(fn: Callable[[], T], top: int = 25) -> Tuple[T, Dict[str, Any]]:
+    """
+    Run ``fn`` under cProfile and summarize where its time went
+
+    Only the calling thread is profiled. Deterministic profiling slows
+    Python-heavy code down severalfold, so timings taken inside ``fn`` are
+    inflated too.
+
+    Args:
+        fn: Function to run, without arguments
+        top: Number of functions to report
+
+    Returns:
+        Tuple[T, Dict[str, Any]]: ``fn``'s result, and the total calls, profiled time and the
+        ``top`` functions by cumulative time
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn)
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return result, {
+        "total_calls": stats.total_calls,
+        "profiled_ms": round(stats.total_tt * 1000, 3),
+        "functions": [
+            {
+                "function": f"{name} ({_short_path(filename)}:{line})",
+                "calls": calls,
+                "self_ms": round(self_time * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for (filename, line, name), (_, calls, self_time, cumulative, _) in rows
+        ],
+    }
+
+
+class ProfilerBusy(Exception):
+    """A sampling profile is already running in this process"""
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the Python stack of every thread.
+
+    The thread calling ``run`` wakes every ``interval`` seconds and folds
+    each other thread's stack into a count per distinct stack, the
+    "collapsed" format flamegraph.pl, inferno and speedscope read. Nothing
+    runs between profiles, and the sampled threads are never interrupted;
+    only one profile runs at a time per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles = 0
+
+    def run(self, seconds: float, interval: float, include_idle: bool = False) -> Dict[str, Any]:
+        """
+        Sample all other threads for ``seconds``
+
+        Args:
+            seconds: How long to sample
+            interval: Seconds between samples
+            include_idle: Keep stacks of threads blocked in a wait, select or queue get
+
+        Returns:
+            Dict[str, Any]: ``stacks`` (collapsed stack -> samples), ``samples`` and ``duration_seconds``
+
+        Raises:
+            ProfilerBusy: If another profile is running
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            own = threading.get_ident()
+            stacks: FrameCounter = FrameCounter()
+            samples = 0
+            started = time.perf_counter()
+            deadline = started + seconds
+            while True:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    code = frame.f_code
+                    if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                        continue
+                    frames = []
+                    while frame is not None:
+                        code = frame.f_code
+                        frames.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    frames.append(names.get(ident, f"thread-{ident}"))
+                    stacks[";".join(reversed(frames))] += 1
+                samples += 1
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                time.sleep(min(interval, remaining))
+            self.profiles += 1
+            return {
+                "stacks": dict(stacks.most_common()),
+                "samples": samples,
+                "duration_seconds": round(time.perf_counter() - started, 3),
+            }
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapsed(stacks: Dict[str, int]) -> str:
+        """Render stacks as collapsed lines, ``frame;frame;frame count``"""
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.items())
+
+
+def _mapped_file(array: np.ndarray) -> Optional[mmap.mmap]:
+    """The memory map an array's memory belongs to, if any"""
+    base = array
+    while isinstance(base, np.ndarray) and base.base is not None:
+        base = base.base
+    if isinstance(base, memoryview):
+        base = base.obj
+    return base if isinstance(base, mmap.mmap) else None
+
+
+class _Sizer:
+    """
+    Walks an object graph adding up memory, each object counted once.
+
+    NumPy buffers count their ``nbytes``, or the size of their file once
+    per file when memory-mapped (counted separately, since those pages are
+    shared and reclaimable); lists, tuples, dicts and
+    their items count ``sys.getsizeof``; instances of this package's classes
+    (pydantic models included) are followed through their attributes.
+    Anything else is counted shallowly.
+    """
+
+    def __init__(self):
+        self.seen = set()
+
+    def size(self, value: Any) -> Tuple[int, int]:
+        """(heap bytes, memory-mapped bytes) reachable from ``value`` and not counted before"""
+        if id(value) in self.seen or value is None:
+            return 0, 0
+        self.seen.add(id(value))
+        if isinstance(value, np.ndarray):
+            mapping = _mapped_file(value)
+            if mapping is None:
+                return value.nbytes, 0
+            # Every view into one file counts the whole mapping once
+            if id(mapping) in self.seen:
+                return 0, 0
+            self.seen.add(id(mapping))
+            return 0, len(mapping)
+        heap, mapped = sys.getsizeof(value), 0
+        if isinstance(value, (list, tuple, set, frozenset)):
+            items = value
+        elif isinstance(value, dict):
+            items = [item for pair in value.items() for item in pair]
+        elif type(value).__module__.startswith("app.") and hasattr(value, "__dict__"):
+            items = vars(value).values()
+        else:
+            return heap, 0
+        for item in items:
+            item_heap, item_mapped = self.size(item)
+            heap += item_heap
+            mapped += item_mapped
+        return heap, mapped
+
+
+def structure_memory(structures: Dict[str, Any], samples: Optional[Dict[str, Tuple[List[Any], int]]] = None) -> Dict[str, Any]:
+    """
+    Memory held by named structures, broken down by attribute
+
+    Structures are walked in order, so memory shared with an earlier one
+    (e.g. an overlay's base store) is only counted there.
+
+    Args:
+        structures: Objects to measure by name; None entries are reported as absent
+        samples: Collections too large to walk, by name: (a sample of their items, their total item
+            count); the sample's size is scaled up to the full count
+
+    Returns:
+        Dict[str, Any]: Per structure ``bytes``, ``mapped_bytes`` and per-attribute ``attributes``
+    """
+    sizer = _Sizer()
+    report: Dict[str, Any] = {}
+    for name, structure in structures.items():
+        if structure is None:
+            report[name] = None
+            continue
+        sizer.seen.add(id(structure))
+        attributes = {}
+        total_heap = sys.getsizeof(structure)
+        total_mapped = 0
+        for attribute, value in vars(structure).items():
+            heap, mapped = sizer.size(value)
+            if heap or mapped:
+                attributes[attribute] = heap + mapped
+            total_heap += heap
+            total_mapped += mapped
+        report[name] = {"bytes": total_heap, "mapped_bytes": total_mapped, "attributes": attributes}
+    for name, (items, count) in (samples or {}).items():
+        sampled = [sizer.size(item) for item in items]
+        heap = sum(size[0] for size in sampled)
+        report[name] = {
+            "bytes": int(heap * count / len(items)) if items else 0,
+            "entries": count,
+            "sampled_entries": len(items),
+        }
+    return report
+
+
+def process_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def tracemalloc_report(top: int = 20) -> Dict[str, Any]:
+    """
+    Where traced Python memory was allocated, by file and by line
+
+    Args:
+        top: Number of files and of lines to report
+
+    Returns:
+        Dict[str, Any]: ``tracing`` False when tracemalloc is off, otherwise traced and peak
+        bytes and the top files and lines by size
+    """
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+
+    def rows(key_type: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "site": (
+                    _short_path(stat.traceback[0].filename) if key_type == "filename"
+                    else f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}"
+                ),
+                "bytes": stat.size,
+                "blocks": stat.count,
+            }
+            for stat in snapshot.statistics(key_type)[:top]
+        ]
+
+    return {
+        "tracing": True,
+        "traceback_frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "by_file": rows("filename"),
+        "by_line": rows("lineno"),
+    }
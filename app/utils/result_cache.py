@@ -0,0 +1,128 @@
+"""
+Bounded LRU + TTL cache for search results
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class ResultCache:
+    """
+    Least-recently-used cache whose entries also expire after a fixed TTL.
+
+    Lookups move an entry to the most-recent end; inserts beyond ``max_entries``
+    evict from the least-recent end. Hit, miss, expiry and eviction counts are
+    kept for reporting. All operations are guarded by a lock.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.carried_over = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert or refresh an entry, evicting the least recently used one if full"""
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def keys(self) -> List[Hashable]:
+        """Current keys, least recently used first"""
+        with self._lock:
+            return list(self._entries)
+
+    def sample(self, count: int) -> List[Any]:
+        """Up to ``count`` values, most recently used first (expired ones included)"""
+        with self._lock:
+            values = []
+            for _, value in reversed(self._entries.values()):
+                if len(values) == count:
+                    break
+                values.append(value)
+            return values
+
+    def rekey(self, renames: Dict[Hashable, Optional[Hashable]]) -> int:
+        """
+        Move entries to new keys, keeping their expiry time, or drop them
+
+        Keys missing from ``renames`` (e.g. inserted since it was computed)
+        are left alone, and so are the keys that have since expired or been
+        evicted.
+
+        Args:
+            renames: New key per old key, or None to drop the entry
+
+        Returns:
+            int: Number of entries moved
+        """
+        moved = 0
+        with self._lock:
+            for old_key, new_key in renames.items():
+                entry = self._entries.pop(old_key, None)
+                if entry is not None and new_key is not None:
+                    self._entries[new_key] = entry
+                    moved += 1
+            self.carried_over += moved
+        return moved
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of size and counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "carried_over": self.carried_over,
+            "hit_rate": self.hits / lookups if lookups else 0,
+        }
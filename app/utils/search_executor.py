@@ -0,0 +1,158 @@
+"""
+Bounded executor running searches off the event loop, with admission control and deadlines
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from .metrics import SHED_REASONS, SearchMetrics
+
+
+T = TypeVar("T")
+
+# Weight of the latest search in the moving average of search durations
+_EWMA_ALPHA = 0.2
+
+
+class SearchRejected(Exception):
+    """A search shed by admission control; carries the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, reason: str, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.reason = reason
+        self.detail = detail
+
+
+class SearchExecutor:
+    """
+    Runs synchronous searches on a fixed pool of threads so the event loop
+    keeps serving other requests (health checks included) meanwhile.
+
+    At most ``max_in_flight`` searches run at once and at most ``max_queue``
+    wait for a thread. Every search gets a deadline ``timeout_seconds`` after
+    it arrives, and load is shed early instead of piling up:
+
+    - a full queue is rejected at once with 429;
+    - a search that is expected to wait past its deadline (queue position
+      times the moving average search duration) is rejected at once with 503;
+    - a queued search whose deadline passes before a thread picks it up is
+      dropped with 503 without running.
+
+    Threads do not add CPU parallelism for the pure-Python packing loop (the
+    GIL), but NumPy stages and the sharded engine release it, and the event
+    loop is never blocked by a search.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int,
+        timeout_seconds: float,
+        metrics: Optional[SearchMetrics] = None,
+    ):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue cannot be negative")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self.metrics = metrics
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="search")
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.shed = {reason: 0 for reason in SHED_REASONS}
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+        # Moving average of search durations, used to predict queue waits
+        self.average_search_seconds = 0.0
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run ``fn(*args)`` on the pool once admitted
+
+        Raises:
+            SearchRejected: If the search was shed (429 queue full, 503 deadline)
+        """
+        arrived = time.perf_counter()
+        deadline = arrived + self.timeout_seconds
+        with self._lock:
+            if self.in_flight + self.queued >= self.max_in_flight + self.max_queue:
+                self._shed("queue_full")
+                raise SearchRejected(429, "queue_full", "Too many searches queued, retry later")
+            if self.in_flight + self.queued >= self.max_in_flight:
+                # Searches ahead of this one, spread over the threads
+                expected_wait = (self.queued + 1) / self.max_in_flight * self.average_search_seconds
+                if expected_wait >= self.timeout_seconds:
+                    self._shed("deadline")
+                    raise SearchRejected(503, "deadline", "Search cannot start within the response time budget")
+            self.queued += 1
+
+        future = self._pool.submit(self._call, fn, args, arrived, deadline)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # The client went away; a search that never started leaves the queue
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+            raise
+
+    def _call(self, fn: Callable[..., T], args: tuple, arrived: float, deadline: float) -> T:
+        started = time.perf_counter()
+        waited = started - arrived
+        with self._lock:
+            self.queued -= 1
+            self.wait_seconds_total += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            if started > deadline:
+                self._shed("expired")
+                raise SearchRejected(503, "expired", "Search deadline passed while queued")
+            self.in_flight += 1
+        if self.metrics is not None:
+            self.metrics.queue_wait.observe(waited)
+
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                if self.average_search_seconds == 0.0:
+                    self.average_search_seconds = elapsed
+                else:
+                    self.average_search_seconds += _EWMA_ALPHA * (elapsed - self.average_search_seconds)
+
+    def _shed(self, reason: str) -> None:
+        """Count a rejection; called with the lock held"""
+        self.shed[reason] += 1
+        if self.metrics is not None:
+            self.metrics.shed[reason].inc()
+
+    def stats(self) -> Dict[str, Any]:
+        """Limits, current queue depth and in-flight count, wait times and shed counts"""
+        with self._lock:
+            picked_up = self.completed + self.in_flight + self.shed["expired"]
+            return {
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "timeout_ms": round(self.timeout_seconds * 1000, 1),
+                "in_flight": self.in_flight,
+                "queue_depth": self.queued,
+                "completed": self.completed,
+                "shed": dict(self.shed),
+                "avg_wait_ms": round(self.wait_seconds_total / picked_up * 1000, 3) if picked_up else 0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "avg_search_ms": round(self.average_search_seconds * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        """Stop the threads; queued searches are cancelled"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,462 @@
+"""
+Indexed SQLite form of a listings file, read one block of locations at a time
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from ..models.listing import Listing
+from ..models.listing_store import ListingStore
+from .capacity_index import LENGTH_BUCKETS, LocationCapacityIndex
+from .dataset_stats import DatasetStats, ValueCounts
+
+
+SQLITE_LISTINGS_VERSION = 1
+# Consecutive locations read by one query and cached as one unit
+LOCATION_BLOCK = 256
+
+_TOTAL_LANES = [f"total_lanes_{bucket}" for bucket in LENGTH_BUCKETS.tolist()]
+_MIN_LANE_PRICE = [f"min_lane_price_{bucket}" for bucket in LENGTH_BUCKETS.tolist()]
+
+_SCHEMA = f"""
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE locations (
+    location INTEGER PRIMARY KEY,
+    location_id TEXT NOT NULL,
+    first_row INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    {", ".join(f"{column} INTEGER NOT NULL" for column in _TOTAL_LANES)},
+    {", ".join(f"{column} REAL" for column in _MIN_LANE_PRICE)}
+);
+CREATE TABLE listings (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    location INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    price_in_cents INTEGER NOT NULL
+);
+CREATE TABLE value_counts (
+    name TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (name, value)
+) WITHOUT ROWID;
+"""
+
+# Built after the bulk insert
+_INDEXES = """
+CREATE UNIQUE INDEX locations_location_id ON locations (location_id);
+CREATE INDEX listings_location ON listings (location);
+CREATE INDEX listings_id ON listings (id);
+CREATE INDEX listings_dimensions ON listings (length, width);
+"""
+
+
+def write_sqlite_listings(
+    path: str,
+    store: ListingStore,
+    capacity_index: LocationCapacityIndex,
+    stats: DatasetStats,
+    meta: Dict[str, Any],
+) -> int:
+    """
+    Write a listing store, its capacity summary and its aggregates as an SQLite database.
+
+    Listing rows keep the store's numbering, so every location is a
+    contiguous row range and a block of consecutive locations is one range
+    scan. Locations are indexed by ``location_id`` and listings by id,
+    location and dimensions; the capacity summary becomes per-bucket columns of the
+    locations table, so the search prefilter runs as a query. The database
+    is written next to ``path`` and moved into place, so readers never see
+    a partial file.
+
+    Args:
+        path: Destination file
+        store: Listing store to write
+        capacity_index: Capacity summary of ``store``
+        stats: Aggregates of ``store``
+        meta: Build metadata; must include ``dataset_hash``
+
+    Returns:
+        int: Database size in bytes
+    """
+    partial_path = f"{path}.partial"
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    connection = sqlite3.connect(partial_path)
+    try:
+        connection.executescript(_SCHEMA)
+        meta = dict(meta, sqlite_version=SQLITE_LISTINGS_VERSION, listing_count=len(store),
+                    location_count=store.location_count)
+        connection.executemany(
+            "INSERT INTO meta VALUES (?, ?)", [(key, json.dumps(value)) for key, value in meta.items()]
+        )
+
+        offsets = store.location_offsets.tolist()
+        # NULL where no listing of the location fits the bucket
+        min_lane_price = np.where(np.isfinite(capacity_index.min_lane_price), capacity_index.min_lane_price, np.nan)
+        connection.executemany(
+            f"INSERT INTO locations VALUES ({', '.join('?' * (4 + 2 * len(LENGTH_BUCKETS)))})",
+            (
+                (location, location_id, offsets[location], offsets[location + 1] - offsets[location],
+                 *lanes, *(None if price != price else price for price in prices))
+                for location, (location_id, lanes, prices) in enumerate(zip(
+                    store.location_ids, capacity_index.total_lanes.tolist(), min_lane_price.tolist()
+                ))
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO listings VALUES (?, ?, ?, ?, ?, ?)",
+            zip(range(len(store)), store.ids, store.location_index.tolist(), store.lengths.tolist(),
+                store.widths.tolist(), store.prices.tolist()),
+        )
+        for name, value_counts in (("prices", stats.prices), ("areas", stats.areas),
+                                   ("location_sizes", stats.location_sizes)):
+            connection.executemany(
+                "INSERT INTO value_counts VALUES (?, ?, ?)",
+                ((name, value, count) for value, count in zip(value_counts.values.tolist(),
+                                                             value_counts.counts.tolist())),
+            )
+        connection.executescript(_INDEXES)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(partial_path, path)
+    return os.path.getsize(path)
+
+
+class SqliteListings:
+    """
+    Read-only handle on a database written by ``write_sqlite_listings``.
+
+    Opening it reads only the metadata; ``store``, ``capacity_index`` and
+    ``stats`` query the file as they are used. Each thread gets its own
+    connection, so concurrent searches read in parallel.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Database written by ``write_sqlite_listings``
+
+        Raises:
+            FileNotFoundError: If the database does not exist
+            ValueError: If the file is not a listings database of this version
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Listings database not found: {path}")
+        self.path = path
+        self._uri = f"{Path(path).absolute().as_uri()}?mode=ro"
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        try:
+            self.meta: Dict[str, Any] = {
+                key: json.loads(value) for key, value in self.execute("SELECT key, value FROM meta")
+            }
+        except sqlite3.DatabaseError as e:
+            self.close()
+            raise ValueError(f"Not a listings database: {path} ({e})")
+        if self.meta.get("sqlite_version") != SQLITE_LISTINGS_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported listings database version {self.meta.get('sqlite_version')} in {path}")
+
+    @property
+    def dataset_hash(self) -> str:
+        return self.meta["dataset_hash"]
+
+    def execute(self, sql: str, parameters: Tuple = ()) -> sqlite3.Cursor:
+        """Run a query on this thread's connection"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection.execute(sql, parameters)
+
+    def close(self) -> None:
+        """Close every thread's connection"""
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def store(self, cache_locations: int) -> 'SqliteListingStore':
+        """Listing store reading location blocks on demand, caching about ``cache_locations`` of them"""
+        return SqliteListingStore(self, cache_locations)
+
+    def capacity_index(self) -> 'SqliteCapacityIndex':
+        """Capacity summary answered by queries on the locations table"""
+        return SqliteCapacityIndex(self)
+
+    def stats(self) -> DatasetStats:
+        """Aggregates stored with the listings; reads one row per distinct value"""
+        columns: Dict[str, Tuple[List[int], List[int]]] = {
+            "prices": ([], []), "areas": ([], []), "location_sizes": ([], []),
+        }
+        for name, value, count in self.execute("SELECT name, value, count FROM value_counts ORDER BY name, value"):
+            values, counts = columns[name]
+            values.append(value)
+            counts.append(count)
+        return DatasetStats(**{
+            name: ValueCounts(np.asarray(values, dtype=np.int64), np.asarray(counts, dtype=np.int64))
+            for name, (values, counts) in columns.items()
+        })
+
+
+class _LocationBlock:
+    """Columns of ``LOCATION_BLOCK`` consecutive locations, as plain lists"""
+
+    __slots__ = ("first_location", "first_row", "location_ids", "offsets", "ids", "lengths", "widths", "prices")
+
+    def __init__(self, listings: SqliteListings, first_location: int, end_location: int):
+        self.first_location = first_location
+        location_rows = listings.execute(
+            "SELECT location_id, first_row, row_count FROM locations "
+            "WHERE location >= ? AND location < ? ORDER BY location",
+            (first_location, end_location),
+        ).fetchall()
+        self.location_ids = [row[0] for row in location_rows]
+        self.first_row = location_rows[0][1]
+        end_row = location_rows[-1][1] + location_rows[-1][2]
+        # Absolute store rows; location i of the block owns offsets[i]:offsets[i + 1]
+        self.offsets = [row[1] for row in location_rows] + [end_row]
+        rows = listings.execute(
+            "SELECT id, length, width, price_in_cents FROM listings WHERE row >= ? AND row < ? ORDER BY row",
+            (self.first_row, end_row),
+        ).fetchall()
+        self.ids = [row[0] for row in rows]
+        self.lengths = [row[1] for row in rows]
+        self.widths = [row[2] for row in rows]
+        self.prices = [row[3] for row in rows]
+
+
+class _BlockColumn(Sequence):
+    """
+    Read-only sequence of listing or location ids.
+
+    Served from the store's cached blocks when the id's block is cached, and
+    by a primary-key lookup otherwise: results are read in price order, so
+    loading whole blocks for them would only churn the cache.
+    """
+
+    def __init__(self, store: 'SqliteListingStore', by_row: bool):
+        self._store = store
+        self._by_row = by_row
+
+    def __len__(self) -> int:
+        return len(self._store) if self._by_row else self._store.location_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        store = self._store
+        if self._by_row:
+            block = store._cached_block(store._row_location(index))
+            if block is not None:
+                return block.ids[index - block.first_row]
+            sql = "SELECT id FROM listings WHERE row = ?"
+        else:
+            block = store._cached_block(index)
+            if block is not None:
+                return block.location_ids[index - block.first_location]
+            sql = "SELECT location_id FROM locations WHERE location = ?"
+        return store._listings.execute(sql, (index,)).fetchone()[0]
+
+
+class SqliteListingStore:
+    """
+    ``ListingStore`` interface over an SQLite listings database.
+
+    Nothing but the first row of every block of ``LOCATION_BLOCK`` locations
+    is read up front. A location is served from its block, which one range
+    scan loads on first use; the most recently used blocks stay cached, up
+    to about ``cache_locations`` locations, so memory is bounded however
+    large the database is. ``ids`` and ``location_ids`` are sequences over
+    the same blocks, and ``find_location`` goes through the ``location_id``
+    index. The NumPy columns of ``ListingStore`` are not available.
+    """
+
+    def __init__(self, listings: SqliteListings, cache_locations: int):
+        self._listings = listings
+        self._listing_count = int(listings.meta["listing_count"])
+        self._location_count = int(listings.meta["location_count"])
+        self._block_rows = [
+            first_row for first_row, in listings.execute(
+                "SELECT first_row FROM locations WHERE location % ? = 0 ORDER BY location", (LOCATION_BLOCK,)
+            )
+        ]
+        self._max_blocks = max(1, cache_locations // LOCATION_BLOCK)
+        self._blocks: 'OrderedDict[int, _LocationBlock]' = OrderedDict()
+        self._blocks_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.ids = _BlockColumn(self, by_row=True)
+        self.location_ids = _BlockColumn(self, by_row=False)
+
+    def __len__(self) -> int:
+        return self._listing_count
+
+    @property
+    def location_count(self) -> int:
+        """Number of distinct locations"""
+        return self._location_count
+
+    def _block(self, location: int) -> _LocationBlock:
+        """Cached block holding a location, read from the database on a miss"""
+        number = location // LOCATION_BLOCK
+        with self._blocks_lock:
+            block = self._blocks.get(number)
+            if block is not None:
+                self._blocks.move_to_end(number)
+                self.hits += 1
+                return block
+            self.misses += 1
+        # Read outside the lock; two threads missing together both read, and the later insert wins
+        first_location = number * LOCATION_BLOCK
+        block = _LocationBlock(
+            self._listings, first_location, min(first_location + LOCATION_BLOCK, self._location_count)
+        )
+        with self._blocks_lock:
+            self._blocks[number] = block
+            while len(self._blocks) > self._max_blocks:
+                self._blocks.popitem(last=False)
+                self.evictions += 1
+        return block
+
+    def _cached_block(self, location: int) -> Optional[_LocationBlock]:
+        """Block holding a location if it is cached, without reading the database"""
+        return self._blocks.get(location // LOCATION_BLOCK)
+
+    def _row_location(self, row: int) -> int:
+        """First location of the block holding a store row"""
+        return (bisect_right(self._block_rows, row) - 1) * LOCATION_BLOCK
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Block cache occupancy, hit and eviction counters"""
+        with self._blocks_lock:
+            cached = sum(len(block.location_ids) for block in self._blocks.values())
+        return {
+            "cached_locations": cached,
+            "max_cached_locations": self._max_blocks * LOCATION_BLOCK,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def location_range(self, location: int) -> Tuple[int, int]:
+        """Return the ``[start, end)`` row range of a location index"""
+        block = self._block(location)
+        index = location - block.first_location
+        return block.offsets[index], block.offsets[index + 1]
+
+    def location_columns(self, location: int) -> Tuple[int, List[int], List[int], List[int]]:
+        """Return a location's first row and its lengths, widths and prices as lists"""
+        block = self._block(location)
+        index = location - block.first_location
+        start, end = block.offsets[index], block.offsets[index + 1]
+        low, high = start - block.first_row, end - block.first_row
+        return start, block.lengths[low:high], block.widths[low:high], block.prices[low:high]
+
+    def find_location(self, location_id: str) -> Optional[int]:
+        """Return the location index for a location_id, or None if unknown"""
+        found = self._listings.execute(
+            "SELECT location FROM locations WHERE location_id = ?", (location_id,)
+        ).fetchone()
+        return None if found is None else found[0]
+
+    def find_listing(self, listing_id: str) -> Optional[int]:
+        """Return the location index holding a listing id, or None if unknown"""
+        found = self._listings.execute("SELECT location FROM listings WHERE id = ?", (listing_id,)).fetchone()
+        return None if found is None else found[0]
+
+    def listing(self, row: int) -> Listing:
+        """Materialize a single row as a ``Listing``"""
+        return self.listings(row, row + 1)[0]
+
+    def listings(self, start: int = 0, end: Optional[int] = None) -> List[Listing]:
+        """Materialize a contiguous row range as ``Listing`` objects, bypassing the block cache"""
+        end = len(self) if end is None else end
+        return [
+            Listing(id=listing_id, location_id=location_id, length=length, width=width, price_in_cents=price)
+            for listing_id, location_id, length, width, price in self._listings.execute(
+                "SELECT listings.id, locations.location_id, listings.length, listings.width, "
+                "listings.price_in_cents FROM listings JOIN locations USING (location) "
+                "WHERE row >= ? AND row < ? ORDER BY row",
+                (start, end),
+            )
+        ]
+
+    def location_listings(self, location: int) -> List[Listing]:
+        """Materialize every listing of a location index"""
+        return self.listings(*self.location_range(location))
+
+
+class SqliteCapacityIndex:
+    """
+    ``LocationCapacityIndex`` interface answered by the locations table.
+
+    Each call is one scan of the locations table (a few columns per
+    location) instead of reading a resident array; results are identical.
+    """
+
+    def __init__(self, listings: SqliteListings):
+        self._listings = listings
+        self._location_count = int(listings.meta["location_count"])
+
+    @property
+    def location_count(self) -> int:
+        return self._location_count
+
+    def candidate_locations(self, sizes: List[int]) -> np.ndarray:
+        """Ascending indices of locations with enough lanes for the vehicles (``LocationCapacityIndex.candidate_mask``)"""
+        return self.candidate_locations_for_counts(LocationCapacityIndex.bucket_counts(sizes))
+
+    def candidate_locations_for_counts(self, counts: np.ndarray) -> np.ndarray:
+        """``candidate_locations`` from the number of vehicles in each bucket"""
+        demand = LocationCapacityIndex.lane_demand_for_counts(counts).tolist()
+        conditions = [f"{column} >= {need}" for column, need in zip(_TOTAL_LANES, demand) if need > 0]
+        cursor = self._listings.execute(
+            f"SELECT location FROM locations WHERE {' AND '.join(conditions) or '1'} ORDER BY location"
+        )
+        return np.fromiter((location for location, in cursor), dtype=np.int64)
+
+    def price_lower_bounds(self, sizes: List[int], locations: np.ndarray) -> np.ndarray:
+        """``LocationCapacityIndex.price_lower_bounds``, aligned with ``locations``"""
+        return self.price_lower_bounds_for_counts(LocationCapacityIndex.bucket_counts(sizes), locations)
+
+    def price_lower_bounds_for_counts(self, counts: np.ndarray, locations: np.ndarray) -> np.ndarray:
+        """``price_lower_bounds`` from the number of vehicles in each bucket"""
+        locations = np.asarray(locations, dtype=np.int64)
+        counts = np.asarray(counts)
+        used = np.flatnonzero(counts)
+        if not len(locations) or not len(used):
+            return np.zeros(len(locations), dtype=np.int64)
+        # One range scan covering every requested location, picked out afterwards
+        low, high = int(locations.min()), int(locations.max())
+        columns = ", ".join(_MIN_LANE_PRICE[bucket] for bucket in used.tolist())
+        table = np.array(
+            self._listings.execute(
+                f"SELECT {columns} FROM locations WHERE location BETWEEN ? AND ? ORDER BY location", (low, high)
+            ).fetchall(),
+            dtype=np.float64,
+        ).reshape(-1, len(used))
+        table[np.isnan(table)] = np.inf
+        bounds = table[locations - low] @ counts[used]
+        # Prices are whole cents; the margin absorbs float rounding of the per-lane prices
+        return np.ceil(bounds - 1e-6).astype(np.int64)
@@ -0,0 +1,162 @@
+"""
+Wire formats for search results: row JSON, columnar JSON and MessagePack, with field projection
+"""
+
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder writes the same bytes, only slower
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is only offered when the package is installed
+    msgpack = None
+
+
+# Plain result row: (location_id, listing_ids, total_price_in_cents)
+ResultRow = Tuple[str, List[str], int]
+
+# Fields of a search result, in response order
+RESULT_FIELDS: Tuple[str, ...] = ("location_id", "listing_ids", "total_price_in_cents")
+
+# The List[SearchResult] array /search has always returned
+JSON_MEDIA_TYPE = "application/json"
+# One object of per-field arrays: {"location_id": [...], "listing_ids": [[...], ...], "total_price_in_cents": [...]}
+COLUMNAR_MEDIA_TYPE = "application/vnd.search.columnar+json"
+# The columnar object in MessagePack
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Accept header media ranges answered with a supported media type
+MEDIA_TYPE_ALIASES: Dict[str, str] = {
+    "*/*": JSON_MEDIA_TYPE,
+    "application/*": JSON_MEDIA_TYPE,
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+# (media type, projected fields) of a search response
+ResultFormat = Tuple[str, Tuple[str, ...]]
+DEFAULT_FORMAT: ResultFormat = (JSON_MEDIA_TYPE, RESULT_FIELDS)
+
+
+def available_media_types() -> List[str]:
+    """Media types search results can be encoded in, the default first"""
+    media_types = [JSON_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE]
+    if msgpack is not None:
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    return media_types
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """
+    Pick the response media type from an Accept header
+
+    The supported type with the highest quality wins, the earliest listed
+    on a tie. Clients that accept nothing supported (or send no Accept
+    header) get the default JSON, as before formats were negotiable; the
+    response's Content-Type says what they got.
+
+    Args:
+        accept: Accept header value, if any
+
+    Returns:
+        str: One of ``available_media_types()``
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+    available = available_media_types()
+    best, best_quality = JSON_MEDIA_TYPE, 0.0
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        media_type = media_type.strip().lower()
+        media_type = MEDIA_TYPE_ALIASES.get(media_type, media_type)
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type in available and quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parse a ``fields`` projection, e.g. ``location_id,total_price_in_cents``
+
+    Args:
+        fields: Comma-separated result fields, None for all of them
+
+    Returns:
+        Tuple[str, ...]: The requested fields in response order
+
+    Raises:
+        ValueError: If a field is unknown or none is given
+    """
+    if fields is None:
+        return RESULT_FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(RESULT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown result fields: {', '.join(sorted(unknown))} (available: {', '.join(RESULT_FIELDS)})")
+    if not requested:
+        raise ValueError("At least one result field is required")
+    return tuple(name for name in RESULT_FIELDS if name in requested)
+
+
+def _dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    # Same settings as starlette's JSONResponse
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_results(rows: Sequence[ResultRow]) -> bytes:
+    """
+    Encode result rows exactly as the ``List[SearchResult]`` response would be
+
+    Args:
+        rows: (location_id, listing_ids, total_price_in_cents) per result
+
+    Returns:
+        bytes: Compact UTF-8 JSON array
+    """
+    return _dumps([
+        {"location_id": location_id, "listing_ids": listing_ids, "total_price_in_cents": total_price}
+        for location_id, listing_ids, total_price in rows
+    ])
+
+
+def encode_rows(rows: Sequence[ResultRow], media_type: str = JSON_MEDIA_TYPE, fields: Tuple[str, ...] = RESULT_FIELDS) -> bytes:
+    """
+    Encode result rows in a wire format
+
+    Args:
+        rows: (location_id, listing_ids, total_price_in_cents) per result
+        media_type: One of ``available_media_types()``
+        fields: Result fields to include, in ``RESULT_FIELDS`` order
+
+    Returns:
+        bytes: Response body
+
+    Raises:
+        ValueError: If the media type is not available
+    """
+    if media_type == JSON_MEDIA_TYPE:
+        if fields == RESULT_FIELDS:
+            return encode_results(rows)
+        positions = [(name, RESULT_FIELDS.index(name)) for name in fields]
+        return _dumps([{name: row[position] for name, position in positions} for row in rows])
+
+    columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in RESULT_FIELDS]
+    document = {name: columns[RESULT_FIELDS.index(name)] for name in fields}
+    if media_type == COLUMNAR_MEDIA_TYPE:
+        return _dumps(document)
+    if media_type == MSGPACK_MEDIA_TYPE and msgpack is not None:
+        return msgpack.packb(document, use_bin_type=True)
+    raise ValueError(f"Unsupported media type: {media_type}")
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Multi-Vehicle Search API (run from the repository root, e.g.
+``python -m benchmarks.bench_exact_solver``)
+"""
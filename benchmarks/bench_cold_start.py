@@ -0,0 +1,105 @@
+"""
+Cold start: time until /ready and latency of the first searches, with and without the startup warm-up
+
+Usage:
+    python -m benchmarks.bench_cold_start [--locations 20000] [--runs 3] [--json out.json]
+
+Each run starts the app in-process over ASGI on a synthetic dataset (no
+answer table) and measures the lifespan startup, the time until /ready
+answers 200 and the latency of the first two /search requests after that,
+for a query outside ``settings.warmup_queries``. Without the warm-up /ready
+is immediate and the first search pays for loading the dataset; with it,
+that cost moves into the warm-up (reported as ``warmup_duration_seconds``).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from app import main as app_main
+from app.config.settings import settings
+from benchmarks.loadtest import AsgiTarget
+from benchmarks.synthetic import generate_listings, write_listings
+
+
+# Not among the default warm-up queries, so it is never answered from the result cache
+FIRST_QUERY = json.dumps([{"length": 15, "quantity": 1}, {"length": 30, "quantity": 1}]).encode()
+
+
+async def _cold_start(warmup: bool) -> Dict[str, float]:
+    settings.warmup_enabled = warmup
+    target = AsgiTarget()
+    started = time.perf_counter()
+    await target.start()
+    startup = time.perf_counter()
+    try:
+        while (await target.request("GET", "/ready", "", b""))[0] != 200:
+            await asyncio.sleep(0.005)
+        ready = time.perf_counter()
+        searches = []
+        for _ in range(2):
+            search_started = time.perf_counter()
+            status, _ = await target.request("POST", "/search", "", FIRST_QUERY)
+            if status != 200:
+                raise RuntimeError(f"/search returned {status}")
+            searches.append(time.perf_counter() - search_started)
+        warmup = app_main.search_controller.warmup
+        warmup_seconds = warmup.duration_seconds if warmup is not None else 0.0
+    finally:
+        await target.stop()
+    return {
+        "startup_ms": (startup - started) * 1000,
+        "ready_ms": (ready - started) * 1000,
+        "warmup_ms": warmup_seconds * 1000,
+        "first_search_ms": searches[0] * 1000,
+        "second_search_ms": searches[1] * 1000,
+    }
+
+
+async def run(locations: int, runs: int, seed: int) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"locations": locations, "runs": runs, "modes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        write_listings(path, generate_listings(locations, seed=seed))
+        settings.listings_file_path = path
+        settings.answer_table_path = os.path.join(tmp, "missing.bin")
+        settings.compiled_listings_path = os.path.join(tmp, "missing-listings.bin")
+        settings.hot_reload_enabled = False
+
+        # One throwaway start, so imports and first-call costs of the libraries are not charged to either mode
+        await _cold_start(True)
+        for warmup in (False, True):
+            samples: List[Dict[str, float]] = [await _cold_start(warmup) for _ in range(runs)]
+            report["modes"]["warm-up" if warmup else "lazy"] = {
+                name: round(statistics.median(sample[name] for sample in samples), 1) for name in samples[0]
+            }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--locations", type=int, default=20000, help="locations in the synthetic dataset")
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per mode (medians are reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.locations, args.runs, args.seed))
+
+    print(f"\n{args.locations} locations, median of {args.runs} cold starts (ms)")
+    print(f"{'mode':<10}{'startup':>10}{'ready':>10}{'warm-up':>10}{'1st search':>12}{'2nd search':>12}")
+    for label, mode in report["modes"].items():
+        print(f"{label:<10}{mode['startup_ms']:>10}{mode['ready_ms']:>10}{mode['warmup_ms']:>10}"
+              f"{mode['first_search_ms']:>12}{mode['second_search_ms']:>12}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Greedy vs exact packing: per-location latency and price gap
+
+Usage:
+    python -m benchmarks.bench_exact_solver [--sizes 3,10,30,100,300,1000] [--json out.json]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+from app.models.listing_store import ListingStore
+from app.utils.bin_packing import BinPackingAlgorithm
+from app.utils.exact_packing import ExactPackingSolver
+from benchmarks.synthetic import generate_listings
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def bench_store(store: ListingStore, queries: int, seed: int) -> Dict[str, Any]:
+    """Solve random queries on random locations of a store with both solvers."""
+    rng = random.Random(seed)
+    timings: Dict[str, List[float]] = {"greedy": [], "exact": []}
+    gaps: List[float] = []
+    improved = 0
+    exact_only = 0
+    both = 0
+    for _ in range(queries):
+        location = rng.randrange(store.location_count)
+        start, end = store.location_range(location)
+        columns = (
+            store.lengths[start:end].tolist(),
+            store.widths[start:end].tolist(),
+            store.prices[start:end].tolist(),
+        )
+        sizes = BinPackingAlgorithm.vehicle_sizes(
+            rng.randint(1, 50) for _ in range(rng.randint(1, 5))
+        )
+        answers = {}
+        for name, solver in (("greedy", BinPackingAlgorithm), ("exact", ExactPackingSolver)):
+            started = time.perf_counter()
+            rows = solver.find_optimal_rows(sizes, *columns)
+            timings[name].append((time.perf_counter() - started) * 1e6)
+            answers[name] = sum(columns[2][row] for row in rows) if rows else None
+
+        greedy_price, exact_price = answers["greedy"], answers["exact"]
+        if greedy_price is not None and exact_price is not None:
+            both += 1
+            gap = (greedy_price - exact_price) / exact_price
+            gaps.append(gap)
+            improved += gap > 0
+        elif exact_price is not None:
+            exact_only += 1
+
+    report: Dict[str, Any] = {"queries": queries, "feasible": both + exact_only}
+    for name, values in timings.items():
+        report[f"{name}_us"] = {
+            "p50": round(_percentile(values, 0.50), 1),
+            "p95": round(_percentile(values, 0.95), 1),
+            "max": round(max(values), 1),
+        }
+    report["price_gap"] = {
+        "mean_pct": round(100 * statistics.fmean(gaps), 2) if gaps else 0.0,
+        "max_pct": round(100 * max(gaps), 2) if gaps else 0.0,
+        "improved_pct": round(100 * improved / both, 1) if both else 0.0,
+        "exact_only_feasible": exact_only,
+    }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="3,10,30,100,300,1000",
+                        help="listings per location for the synthetic cases")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--profile", default="wide", help="synthetic dimension profile")
+    parser.add_argument("--listings", default="listings.json", help="real dataset to include ('' to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    cases: Dict[str, Dict[str, Any]] = {}
+    if args.listings:
+        with open(args.listings) as f:
+            cases["listings.json"] = bench_store(ListingStore.from_records(json.load(f)), args.queries, args.seed)
+    for size in (int(s) for s in args.sizes.split(",")):
+        locations = max(1, min(50, 20000 // size))
+        store = ListingStore.from_records(
+            generate_listings(locations, size, args.profile, seed=args.seed)
+        )
+        cases[f"{size}/location"] = bench_store(store, args.queries, args.seed)
+
+    header = f"{'case':<16}{'greedy p50/p95 us':>20}{'exact p50/p95/max us':>26}{'gap mean/max %':>18}{'improved %':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, report in cases.items():
+        g, e, gap = report["greedy_us"], report["exact_us"], report["price_gap"]
+        print(
+            f"{name:<16}{g['p50']:>11.1f}/{g['p95']:<8.1f}{e['p50']:>11.1f}/{e['p95']:.1f}/{e['max']:<6.0f}"
+            f"{gap['mean_pct']:>10.2f}/{gap['max_pct']:<7.2f}{gap['improved_pct']:>12.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(cases, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+/search latency with and without the pydantic-free fast path, on wide result sets
+
+Small queries (one or two short vehicles) fit almost every location, so the
+response lists thousands of results and request parsing plus response
+serialization are a large share of the time. Each mode runs the app
+in-process over ASGI on the same synthetic dataset, and the response bodies
+of the two paths are checked to be byte-identical.
+
+Usage:
+    python -m benchmarks.bench_fast_search [--locations 20000] [--requests 50] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.config.settings import settings
+from benchmarks.loadtest import AsgiTarget
+from benchmarks.synthetic import generate_listings, write_listings
+
+
+WIDE_QUERIES = [
+    [{"length": 10, "quantity": 1}],
+    [{"length": 20, "quantity": 1}],
+    [{"length": 10, "quantity": 2}],
+    [{"length": 25, "quantity": 1}],
+    [{"length": 15, "quantity": 1}, {"length": 10, "quantity": 1}],
+]
+
+
+async def _post(app, path: str, body: bytes) -> Tuple[int, bytes]:
+    """One in-process ASGI request; returns (status, response body)"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    chunks: List[bytes] = []
+    status = 0
+    sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+async def _run_mode(fast: bool, caching: bool, bodies: List[bytes], requests: int) -> Tuple[Dict[str, Any], List[bytes]]:
+    settings.fast_search_enabled = fast
+    settings.enable_caching = caching
+    target = AsgiTarget()
+    await target.start()
+    try:
+        # Warm-up, and the reference bodies for the equality check
+        responses = []
+        for body in bodies:
+            status, content = await _post(target.app, "/search", body)
+            if status != 200:
+                raise RuntimeError(f"/search returned {status}: {content[:200]!r}")
+            responses.append(content)
+
+        latencies = []
+        for i in range(requests):
+            started = time.perf_counter()
+            await _post(target.app, "/search", bodies[i % len(bodies)])
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        await target.stop()
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 2),
+        "mean_response_bytes": round(statistics.fmean(len(r) for r in responses)),
+        "mean_results": round(statistics.fmean(len(json.loads(r)) for r in responses)),
+    }, responses
+
+
+async def run(locations: int, requests: int, seed: int) -> Dict[str, Any]:
+    bodies = [json.dumps(query).encode() for query in WIDE_QUERIES]
+    report: Dict[str, Any] = {"locations": locations, "queries": WIDE_QUERIES, "modes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        write_listings(path, generate_listings(locations, seed=seed))
+        settings.listings_file_path = path
+        # Live engine only: no answer table, no reloads
+        settings.answer_table_path = os.path.join(tmp, "missing.bin")
+        settings.hot_reload_enabled = False
+
+        for caching in (False, True):
+            label = "cached" if caching else "uncached"
+            baseline, baseline_bodies = await _run_mode(False, caching, bodies, requests)
+            fast, fast_bodies = await _run_mode(True, caching, bodies, requests)
+            if fast_bodies != baseline_bodies:
+                raise RuntimeError(f"fast path responses differ from the pydantic route ({label})")
+            report["modes"][label] = {
+                "pydantic": baseline,
+                "fast_path": fast,
+                "speedup": round(baseline["mean_ms"] / fast["mean_ms"], 2),
+            }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--locations", type=int, default=20000, help="locations in the synthetic dataset")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.locations, args.requests, args.seed))
+
+    print(f"\n{args.locations} locations, {args.requests} requests per mode (responses byte-identical)")
+    print(f"{'mode':<10}{'path':<11}{'results':>9}{'bytes':>11}{'mean_ms':>10}{'p50_ms':>9}{'p95_ms':>9}")
+    for label, mode in report["modes"].items():
+        for name in ("pydantic", "fast_path"):
+            stats = mode[name]
+            print(f"{label:<10}{name:<11}{stats['mean_results']:>9}{stats['mean_response_bytes']:>11}"
+                  f"{stats['mean_ms']:>10}{stats['p50_ms']:>9}{stats['p95_ms']:>9}")
+        print(f"{'':<10}{'speedup':<11}{str(mode['speedup']) + 'x':>30}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Fleet search latency: vehicles packed a block at a time vs one at a time, up to hundreds per request
+
+Usage:
+    python -m benchmarks.bench_fleet [--vehicles 5,20,50,100,200,500] [--locations 10000] [--json out.json]
+
+Every fleet is searched on the bundled listings.json and on a synthetic yard
+dataset (``--profile lots``, ``--per-location`` listings each) with
+``SearchService.search_fleet``, for all results and for a first page. The
+per-vehicle baseline expands the same fleets into one rounded length per
+vehicle and searches those (what /search would do without its
+``max_vehicles_per_request`` cap); it runs on ``--baseline-queries`` fleets
+only, and must return identical results. Each dataset is loaded
+twice: with lane tables cut to ``max_vehicles_per_request`` (the default,
+where fleets that open more listings fall back to packing columns) and with
+``fleet_lane_tables``.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.config.settings import settings
+from app.models.vehicle import FleetVehicle
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from benchmarks.synthetic import generate_listings, write_listings
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def random_fleet(rng: random.Random, vehicles: int) -> List[FleetVehicle]:
+    """Vehicle entries adding up to exactly ``vehicles``, mostly under 40 ft"""
+    fleet = []
+    remaining = vehicles
+    while remaining:
+        quantity = rng.randint(1, remaining)
+        fleet.append(FleetVehicle(length=rng.randint(1, 100 if rng.random() < 0.2 else 40), quantity=quantity))
+        remaining -= quantity
+    return fleet
+
+
+def _timed(fn) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def bench_dataset(
+    path: str,
+    fleet_lane_tables: bool,
+    vehicle_counts: List[int],
+    queries: int,
+    baseline_queries: int,
+    page: int,
+    seed: int,
+) -> Dict[str, Any]:
+    """Latency percentiles per fleet size on one listings file."""
+    settings.fleet_lane_tables = fleet_lane_tables
+    listing_service = ListingService(path, storage_backend="json")
+    search_service = SearchService(listing_service, "greedy")
+    search_service.result_cache = None
+    snapshot = listing_service.get_snapshot()
+
+    report: Dict[str, Any] = {
+        "listings": len(snapshot.store),
+        "locations": snapshot.store.location_count,
+        "lane_table_depth": snapshot.lane_tables.depth,
+        "lane_table_bytes": snapshot.lane_tables.nbytes,
+        "fleets": {},
+    }
+    rng = random.Random(seed)
+    for vehicles in vehicle_counts:
+        fleets = [random_fleet(rng, vehicles) for _ in range(queries)]
+        timings: Dict[str, List[float]] = {"fleet_all": [], "fleet_page": [], "per_vehicle_all": []}
+        results = 0
+        for index, fleet in enumerate(fleets):
+            (found, _), elapsed = _timed(lambda: search_service.search_fleet(fleet))
+            timings["fleet_all"].append(elapsed)
+            results += len(found)
+            _, elapsed = _timed(lambda: search_service.search_fleet(fleet, page))
+            timings["fleet_page"].append(elapsed)
+            if index < baseline_queries:
+                sizes = search_service.vehicle_sizes(fleet)
+                expected, elapsed = _timed(lambda: search_service.search_sizes(sizes, snapshot))
+                timings["per_vehicle_all"].append(elapsed)
+                assert expected == found, f"Fleet results differ from the per-vehicle search ({vehicles} vehicles)"
+
+        case: Dict[str, Any] = {"queries": queries, "mean_results": round(results / queries, 1)}
+        for name, values in timings.items():
+            if values:
+                case[f"{name}_ms"] = {
+                    "p50": round(_percentile(values, 0.50), 2),
+                    "p95": round(_percentile(values, 0.95), 2),
+                    "max": round(max(values), 2),
+                }
+        case["within_budget"] = case["fleet_page_ms"]["p95"] <= settings.max_response_time_ms
+        report["fleets"][vehicles] = case
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", default="5,20,50,100,200,500", help="vehicles per fleet")
+    parser.add_argument("--queries", type=int, default=20, help="fleets per size")
+    parser.add_argument("--baseline-queries", type=int, default=2, help="fleets per size also searched per vehicle")
+    parser.add_argument("--page", type=int, default=20, help="page size of the paged search")
+    parser.add_argument("--listings", default="listings.json", help="real dataset to include ('' to skip)")
+    parser.add_argument("--locations", type=int, default=10000, help="locations of the synthetic yard dataset (0 to skip)")
+    parser.add_argument("--per-location", type=int, default=20)
+    parser.add_argument("--profile", default="lots", help="synthetic dimension profile")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    vehicle_counts = [int(v) for v in args.vehicles.split(",")]
+    if max(vehicle_counts) > settings.fleet_max_vehicles:
+        parser.error(f"fleets are limited to {settings.fleet_max_vehicles} vehicles (FLEET_MAX_VEHICLES)")
+    cases: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        datasets = []
+        if args.listings:
+            datasets.append((os.path.basename(args.listings), args.listings))
+        if args.locations:
+            path = os.path.join(tmp, "fleet-listings.json")
+            write_listings(path, generate_listings(args.locations, args.per_location, args.profile, seed=args.seed))
+            datasets.append((f"{args.profile} {args.locations}x{args.per_location}", path))
+        for name, path in datasets:
+            for fleet_lane_tables in (False, True):
+                cases[f"{name} ({'fleet' if fleet_lane_tables else 'pruned'} tables)"] = bench_dataset(
+                    path, fleet_lane_tables, vehicle_counts, args.queries, args.baseline_queries, args.page, args.seed
+                )
+
+    print(f"Budget: max_response_time_ms = {settings.max_response_time_ms}")
+    header = (
+        f"{'dataset':<38}{'vehicles':>9}{'results':>9}{'fleet all p50/p95 ms':>24}"
+        f"{'fleet page p50/p95 ms':>25}{'per-vehicle all ms':>20}{'in budget':>11}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, report in cases.items():
+        for vehicles, case in report["fleets"].items():
+            full, paged = case["fleet_all_ms"], case["fleet_page_ms"]
+            baseline = case.get("per_vehicle_all_ms")
+            print(
+                f"{name:<38}{vehicles:>9}{case['mean_results']:>9.0f}"
+                f"{full['p50']:>14.1f}/{full['p95']:<9.1f}{paged['p50']:>15.1f}/{paged['p95']:<9.1f}"
+                f"{baseline['p50'] if baseline else float('nan'):>20.1f}{'yes' if case['within_budget'] else 'NO':>11}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(cases, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
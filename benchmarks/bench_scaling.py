@@ -0,0 +1,232 @@
+"""
+Scaling curves for the packing engine, search, loading and grouping
+
+Three sweeps, each recording wall time and peak traced memory per case:
+  density  find_optimal_combination / find_optimal_rows vs listings per location
+  dataset  ListingService.load_store / load_listings / get_listings_by_location and
+           SearchService.search_locations vs total listings
+  profile  find_optimal_combination vs dimension distribution
+
+Between consecutive points of a curve the local growth exponent
+(log time ratio / log size ratio) is reported, so a complexity cliff shows
+up as a jump in that column.
+
+Usage:
+    python -m benchmarks.bench_scaling [--max-listings 1000000] [--json out.json] [--csv out.csv]
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.models.listing_store import ListingStore
+from app.models.vehicle import Vehicle
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from app.utils.bin_packing import BinPackingAlgorithm
+from benchmarks.synthetic import DIMENSION_PROFILES, generate_listings, generate_queries, write_listings
+
+
+def measure(fn: Callable[[], Any], repeat: int = 3) -> Tuple[float, int]:
+    """Median wall time of ``fn`` over ``repeat`` runs, and its peak traced allocation in bytes"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    # Tracing slows Python code down a lot, so memory gets its own run
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def _packing_calls(store: ListingStore, query_count: int, seed: int):
+    """Pre-built (units, listings, sizes, columns) for packing calls on random locations"""
+    rng = random.Random(seed)
+    calls = []
+    for body in generate_queries(query_count, seed=seed):
+        location = rng.randrange(store.location_count)
+        start, end = store.location_range(location)
+        units = [unit for v in body for unit in Vehicle(**v).to_individual_vehicles()]
+        sizes = BinPackingAlgorithm.vehicle_sizes(unit.length for unit in units)
+        columns = (store.lengths[start:end].tolist(), store.widths[start:end].tolist(), store.prices[start:end].tolist())
+        calls.append((units, store.listings(start, end), sizes, columns))
+    return calls
+
+
+def _packing_case(store: ListingStore, query_count: int, seed: int) -> Dict[str, Any]:
+    calls = _packing_calls(store, query_count, seed)
+
+    def objects() -> None:
+        for units, listings, _, _ in calls:
+            BinPackingAlgorithm.find_optimal_combination(units, listings)
+
+    def rows() -> None:
+        for _, _, sizes, columns in calls:
+            BinPackingAlgorithm.find_optimal_rows(sizes, *columns)
+
+    combination_s, combination_peak = measure(objects)
+    rows_s, rows_peak = measure(rows)
+    return {
+        "find_optimal_combination_us": round(combination_s / len(calls) * 1e6, 2),
+        "find_optimal_combination_peak_bytes": combination_peak,
+        "find_optimal_rows_us": round(rows_s / len(calls) * 1e6, 2),
+        "find_optimal_rows_peak_bytes": rows_peak,
+    }
+
+
+def density_sweep(densities: List[int], query_count: int, seed: int) -> List[Dict[str, Any]]:
+    points = []
+    for density in densities:
+        locations = max(1, min(200, 50000 // density))
+        store = ListingStore.from_records(generate_listings(locations, density, "wide", seed))
+        points.append(dict({"listings_per_location": density, "locations": locations},
+                           **_packing_case(store, query_count, seed)))
+    return points
+
+
+def profile_sweep(query_count: int, seed: int) -> List[Dict[str, Any]]:
+    points = []
+    for profile in DIMENSION_PROFILES:
+        store = ListingStore.from_records(generate_listings(200, 10, profile, seed))
+        points.append(dict({"profile": profile}, **_packing_case(store, query_count, seed)))
+    return points
+
+
+def dataset_sweep(sizes: List[int], query_count: int, seed: int) -> List[Dict[str, Any]]:
+    queries = [[Vehicle(**v) for v in body] for body in generate_queries(query_count, seed=seed)]
+    points = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"listings-{size}.json")
+            # The sample distribution averages ~2.74 listings per location
+            records = generate_listings(max(1, round(size / 2.74)), seed=seed)
+            file_bytes = write_listings(path, records)
+            del records
+
+            # A new service each run, so every load parses the file
+            load_store_s, load_store_peak = measure(lambda: ListingService(path).load_store(), repeat=1)
+            load_listings_s, load_listings_peak = measure(lambda: ListingService(path).load_listings(), repeat=1)
+
+            listing_service = ListingService(path)
+            store = listing_service.load_store()
+            grouping_s, grouping_peak = measure(listing_service.get_listings_by_location, repeat=1)
+
+            search_service = SearchService(listing_service)
+            search_service.result_cache = None
+
+            def search() -> None:
+                for vehicles in queries:
+                    search_service.search_locations(vehicles)
+
+            search_s, search_peak = measure(search, repeat=1)
+            points.append({
+                "listings": len(store),
+                "locations": store.location_count,
+                "file_bytes": file_bytes,
+                "load_store_s": round(load_store_s, 4),
+                "load_store_peak_bytes": load_store_peak,
+                "load_listings_s": round(load_listings_s, 4),
+                "load_listings_peak_bytes": load_listings_peak,
+                "grouping_s": round(grouping_s, 4),
+                "grouping_peak_bytes": grouping_peak,
+                "search_locations_ms": round(search_s / len(queries) * 1000, 3),
+                "search_locations_peak_bytes": search_peak,
+            })
+            del listing_service, store, search_service
+    return points
+
+
+def add_exponents(points: List[Dict[str, Any]], x: str, metrics: List[str]) -> None:
+    """Annotate each point with the growth exponent of every metric since the previous point"""
+    for previous, point in zip(points, points[1:]):
+        for metric in metrics:
+            if previous[metric] > 0 and point[metric] > 0 and point[x] != previous[x]:
+                point[f"{metric}_exponent"] = round(
+                    math.log(point[metric] / previous[metric]) / math.log(point[x] / previous[x]), 2
+                )
+
+
+def print_curve(title: str, points: List[Dict[str, Any]], x: str, metrics: List[str]) -> None:
+    widths = [len(metric) + 2 for metric in metrics]
+    print(f"\n{title}")
+    print(f"{x:>22}" + "".join(f"{metric:>{width}}{'k':>6}" for metric, width in zip(metrics, widths)))
+    for point in points:
+        row = f"{point[x]:>22}"
+        for metric, width in zip(metrics, widths):
+            exponent: Optional[float] = point.get(f"{metric}_exponent")
+            row += f"{point[metric]:>{width}}" + (f"{exponent:>6.2f}" if exponent is not None else f"{'':>6}")
+        print(row)
+
+
+def _mib(points: List[Dict[str, Any]]) -> None:
+    for point in points:
+        for key in [k for k in point if k.endswith("_peak_bytes")]:
+            point[key.replace("_bytes", "_mib")] = round(point[key] / 2 ** 20, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--densities", default="1,3,10,30,100,300", help="listings per location")
+    parser.add_argument("--max-listings", type=int, default=100000, help="largest dataset (x10 steps from 1000)")
+    parser.add_argument("--queries", type=int, default=200, help="queries per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the curves to this file")
+    parser.add_argument("--csv", help="write one row per point to this file")
+    args = parser.parse_args()
+
+    sizes = []
+    size = 1000
+    while size <= args.max_listings:
+        sizes.append(size)
+        size *= 10
+
+    packing_metrics = ["find_optimal_combination_us", "find_optimal_rows_us"]
+    dataset_metrics = ["load_store_s", "load_listings_s", "grouping_s", "search_locations_ms"]
+    curves = {
+        "density": density_sweep([int(d) for d in args.densities.split(",")], args.queries, args.seed),
+        "dataset": dataset_sweep(sizes, max(10, args.queries // 4), args.seed),
+        "profile": profile_sweep(args.queries, args.seed),
+    }
+    add_exponents(curves["density"], "listings_per_location", packing_metrics)
+    add_exponents(curves["dataset"], "listings", dataset_metrics)
+    for points in curves.values():
+        _mib(points)
+
+    print_curve("Packing vs listings per location", curves["density"], "listings_per_location",
+                packing_metrics + ["find_optimal_combination_peak_mib"])
+    print_curve("Dataset size", curves["dataset"], "listings", dataset_metrics)
+    print_curve("Dataset size, peak MiB", curves["dataset"], "listings",
+                ["load_store_peak_mib", "load_listings_peak_mib", "grouping_peak_mib", "search_locations_peak_mib"])
+    print_curve("Packing vs dimension profile (10 listings per location)", curves["profile"], "profile", packing_metrics)
+    print("\nk = growth exponent since the previous point (1 = linear, 2 = quadratic)")
+
+    report = {"seed": args.seed, "queries": args.queries, "cpus": os.cpu_count(), "curves": curves}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.csv:
+        columns = sorted({key for points in curves.values() for point in points for key in point})
+        with open(args.csv, "w") as f:
+            f.write(",".join(["curve"] + columns) + "\n")
+            for name, points in curves.items():
+                for point in points:
+                    f.write(",".join([name] + [str(point.get(column, "")) for column in columns]) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Scaling of the sharded search engine with the number of worker processes
+
+Usage:
+    python -m benchmarks.bench_sharded_search [--listings 200000] [--workers 1,2,4,8] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from app.models.vehicle import Vehicle
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from app.services.sharded_search import ShardedSearchEngine
+from benchmarks.synthetic import generate_listings, generate_queries
+
+
+def _run(search_service: SearchService, queries: List[List[Vehicle]]) -> Dict[str, Any]:
+    latencies = []
+    started = time.perf_counter()
+    for vehicles in queries:
+        query_started = time.perf_counter()
+        search_service.search_locations(vehicles)
+        latencies.append((time.perf_counter() - query_started) * 1000)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "queries": len(queries),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 2),
+        "throughput_qps": round(len(queries) / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--listings", type=int, default=200000, help="approximate synthetic listing count")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--solver", default="greedy", choices=["greedy", "exact"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    # The sample distribution averages ~2.7 listings per location
+    records = generate_listings(max(1, int(args.listings / 2.74)), seed=args.seed)
+    queries = [[Vehicle(**v) for v in body] for body in generate_queries(args.queries, seed=args.seed)]
+    report: Dict[str, Any] = {"listings": len(records), "cpus": os.cpu_count(), "cases": {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        with open(path, "w") as f:
+            json.dump(records, f)
+
+        listing_service = ListingService(path)
+        local = SearchService(listing_service, packing_solver=args.solver)
+        local.result_cache = None
+        listing_service.load_store()
+        report["cases"]["local"] = _run(local, queries)
+
+        for workers in (int(w) for w in args.workers.split(",")):
+            started = time.perf_counter()
+            engine = ShardedSearchEngine(path, workers, args.solver)
+            startup = time.perf_counter() - started
+            sharded = SearchService(listing_service, packing_solver=args.solver)
+            sharded.result_cache = None
+            sharded.sharded_engine = engine
+            try:
+                sharded.search_locations(queries[0])  # warm up the workers
+                report["cases"][f"{workers} workers"] = dict(_run(sharded, queries), startup_s=round(startup, 2))
+            finally:
+                engine.close()
+
+    print(f"{report['listings']} listings, {report['cpus']} CPUs, {args.queries} queries, {args.solver} solver")
+    print(f"{'engine':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'qps':>10}{'speedup':>10}")
+    baseline = report["cases"]["local"]["mean_ms"]
+    for name, case in report["cases"].items():
+        print(
+            f"{name:<12}{case['mean_ms']:>10.2f}{case['p50_ms']:>10.2f}{case['p95_ms']:>10.2f}"
+            f"{case['throughput_qps']:>10.1f}{baseline / case['mean_ms']:>9.2f}x"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
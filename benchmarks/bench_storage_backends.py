@@ -0,0 +1,135 @@
+"""
+Startup time and resident memory of the json and sqlite storage backends as the dataset grows
+
+For every dataset size, each backend is measured in a fresh spawned process:
+how long ``ListingService.get_snapshot`` takes, how much resident memory
+the load adds, the latency of the first and later searches, and resident
+memory after the searches (which for sqlite includes its block cache).
+
+Linux only (smaps_rollup).
+
+Usage:
+    python -m benchmarks.bench_storage_backends [--locations 10000 50000 200000] [--cache-locations 16384] [--json out.json]
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.bench_worker_memory import read_memory
+from benchmarks.synthetic import generate_listings, generate_queries, write_listings
+
+
+BACKENDS = ("json", "sqlite")
+
+
+def _measure(
+    backend: str,
+    listings_path: str,
+    database_path: str,
+    cache_locations: int,
+    queries: List[List[Dict[str, int]]],
+    results: "multiprocessing.Queue",
+) -> None:
+    from app.config.settings import settings
+    from app.models.vehicle import Vehicle
+    from app.services.listing_service import ListingService
+    from app.services.search_service import SearchService
+
+    # Cached result lists would dominate the heap; measure the dataset and the search working set only
+    settings.enable_caching = False
+    settings.sqlite_database_path = database_path
+    settings.sqlite_cache_locations = cache_locations
+    gc.collect()
+    before = read_memory()
+    started = time.perf_counter()
+    listing_service = ListingService(listings_path, storage_backend=backend)
+    search_service = SearchService(listing_service)
+    listing_service.get_snapshot()
+    startup_seconds = time.perf_counter() - started
+    gc.collect()
+    loaded = read_memory()
+
+    search_seconds = []
+    for query in queries:
+        search_started = time.perf_counter()
+        search_service.search_locations([Vehicle(**vehicle) for vehicle in query])
+        search_seconds.append(time.perf_counter() - search_started)
+    gc.collect()
+    after = read_memory()
+    results.put({
+        "startup_seconds": round(startup_seconds, 4),
+        "loaded_rss_mib": round(loaded["rss_mib"] - before["rss_mib"], 1),
+        "after_rss_mib": round(after["rss_mib"] - before["rss_mib"], 1),
+        "first_search_ms": round(search_seconds[0] * 1000, 1),
+        "median_search_ms": round(statistics.median(search_seconds[1:] or search_seconds) * 1000, 1),
+    })
+
+
+def run_backend(backend: str, listings_path: str, database_path: str, cache_locations: int,
+                queries: List[List[Dict[str, int]]]) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(
+        target=_measure, args=(backend, listings_path, database_path, cache_locations, queries, results)
+    )
+    process.start()
+    report = results.get(timeout=1800)
+    process.join()
+    return report
+
+
+def run(location_counts: List[int], cache_locations: int, seed: int) -> List[Dict[str, Any]]:
+    from app.services.sqlite_listings_builder import build_sqlite_listings
+
+    queries = generate_queries(10, seed=seed)
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for locations in location_counts:
+            listings_path = os.path.join(tmp, f"listings-{locations}.json")
+            database_path = os.path.join(tmp, f"listings-{locations}.db")
+            records = generate_listings(locations, seed=seed)
+            report: Dict[str, Any] = {"locations": locations, "listings": len(records), "backends": {}}
+            report["json_bytes"] = write_listings(listings_path, records)
+            del records
+            report["sqlite_bytes"] = build_sqlite_listings(listings_path, database_path)["database_bytes"]
+            for backend in BACKENDS:
+                report["backends"][backend] = run_backend(
+                    backend, listings_path, database_path, cache_locations, queries
+                )
+            reports.append(report)
+            os.remove(listings_path)
+            os.remove(database_path)
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--locations", type=int, nargs="+", default=[10000, 50000, 200000],
+                        help="dataset sizes, in locations")
+    parser.add_argument("--cache-locations", type=int, default=16384, help="sqlite block cache size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    reports = run(args.locations, args.cache_locations, args.seed)
+
+    print(f"\n{'listings':>10}{'backend':>9}{'startup_s':>11}{'loaded':>9}{'after':>9}{'first_ms':>10}{'p50_ms':>9}")
+    for report in reports:
+        for backend, stats in report["backends"].items():
+            print(f"{report['listings']:>10}{backend:>9}{stats['startup_seconds']:>11}{stats['loaded_rss_mib']:>9}"
+                  f"{stats['after_rss_mib']:>9}{stats['first_search_ms']:>10}{stats['median_search_ms']:>9}")
+    print("(RSS growth in MiB over the process before loading: after the load, and after the searches)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
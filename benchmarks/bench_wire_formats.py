@@ -0,0 +1,185 @@
+"""
+/search payload size and latency per wire format, field projection and response compression
+
+Wide queries (one or two short vehicles) return nearly every location, the
+case compact formats are for. Each combination of media type (row JSON,
+columnar JSON, MessagePack when installed), projection (all fields, or
+without ``listing_ids``) and content coding (none, gzip, brotli when
+installed) is requested in-process over ASGI with the result cache off, so
+every request searches, encodes and compresses. Decoded responses are
+checked against the default JSON. In-process timings leave out the network,
+so the report adds the time the body would take at ``--bandwidth-mbps``.
+
+Usage:
+    python -m benchmarks.bench_wire_formats [--locations 20000] [--requests 30] [--fast-path] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.utils.compression import available_encodings
+from app.utils import wire_formats
+from app.utils.wire_formats import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, available_media_types
+from benchmarks.bench_fast_search import WIDE_QUERIES
+from benchmarks.loadtest import AsgiTarget
+from benchmarks.synthetic import generate_listings, write_listings
+
+
+PROJECTIONS = {"all": "", "no_listing_ids": "fields=location_id,total_price_in_cents"}
+
+
+async def _post(app, query: str, headers: List[Tuple[bytes, bytes]], body: bytes) -> Tuple[int, Dict[bytes, bytes], bytes]:
+    """One in-process ASGI POST /search; returns (status, response headers, raw response body)"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/search",
+        "raw_path": b"/search",
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json")] + headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    chunks: List[bytes] = []
+    response: Dict[str, Any] = {}
+    sent = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], b"".join(chunks)
+
+
+def _decode(headers: Dict[bytes, bytes], content: bytes) -> Any:
+    """Response body back to rows of (location_id, listing_ids or None, total_price_in_cents)"""
+    encoding = headers.get(b"content-encoding")
+    if encoding == b"gzip":
+        content = gzip.decompress(content)
+    elif encoding == b"br":
+        import brotli
+        content = brotli.decompress(content)
+    media_type = headers[b"content-type"].decode()
+    if media_type == MSGPACK_MEDIA_TYPE:
+        document = wire_formats.msgpack.unpackb(content)
+    else:
+        document = json.loads(content)
+    if media_type == JSON_MEDIA_TYPE:
+        return [(r["location_id"], r.get("listing_ids"), r["total_price_in_cents"]) for r in document]
+    count = len(document["location_id"])
+    listing_ids = document.get("listing_ids", [None] * count)
+    return list(zip(document["location_id"], listing_ids, document["total_price_in_cents"]))
+
+
+async def run(locations: int, requests: int, fast_path: bool, seed: int) -> Dict[str, Any]:
+    bodies = [json.dumps(query).encode() for query in WIDE_QUERIES]
+    report: Dict[str, Any] = {"locations": locations, "queries": WIDE_QUERIES, "fast_path": fast_path, "cases": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        write_listings(path, generate_listings(locations, seed=seed))
+        settings.listings_file_path = path
+        # Live engine only: no answer table, no result cache, no reloads
+        settings.answer_table_path = os.path.join(tmp, "missing.bin")
+        settings.hot_reload_enabled = False
+        settings.enable_caching = False
+        settings.fast_search_enabled = fast_path
+        settings.compression_enabled = True
+
+        target = AsgiTarget()
+        await target.start()
+        try:
+            expected: List[Any] = []
+            for body in bodies:
+                status, headers, content = await _post(target.app, "", [], body)
+                if status != 200:
+                    raise RuntimeError(f"/search returned {status}: {content[:200]!r}")
+                expected.append(_decode(headers, content))
+
+            for media_type in available_media_types():
+                for projection, query in PROJECTIONS.items():
+                    for encoding in [None] + available_encodings():
+                        headers = [(b"accept", media_type.encode())]
+                        if encoding is not None:
+                            headers.append((b"accept-encoding", encoding.encode()))
+                        sizes, latencies = [], []
+                        for i, body in enumerate(bodies):
+                            _, response_headers, content = await _post(target.app, query, headers, body)
+                            if response_headers[b"content-type"].decode() != media_type:
+                                raise RuntimeError(f"Asked for {media_type}, got {response_headers[b'content-type']!r}")
+                            rows = _decode(response_headers, content)
+                            reference = expected[i] if projection == "all" else [(location_id, None, price) for location_id, _, price in expected[i]]
+                            if rows != reference:
+                                raise RuntimeError(f"{media_type} ({projection}, {encoding}) differs from the default JSON")
+                            sizes.append(len(content))
+                        for i in range(requests):
+                            started = time.perf_counter()
+                            await _post(target.app, query, headers, bodies[i % len(bodies)])
+                            latencies.append((time.perf_counter() - started) * 1000)
+                        latencies.sort()
+                        report["cases"].append({
+                            "media_type": media_type,
+                            "projection": projection,
+                            "encoding": encoding or "identity",
+                            "mean_response_bytes": round(statistics.fmean(sizes)),
+                            "mean_ms": round(statistics.fmean(latencies), 2),
+                            "p50_ms": round(latencies[len(latencies) // 2], 2),
+                            "p95_ms": round(latencies[int(len(latencies) * 0.95)], 2),
+                        })
+            report["mean_results"] = round(statistics.fmean(len(rows) for rows in expected))
+        finally:
+            await target.stop()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--locations", type=int, default=20000, help="locations in the synthetic dataset")
+    parser.add_argument("--requests", type=int, default=30, help="timed requests per combination")
+    parser.add_argument("--fast-path", action="store_true", help="serve /search through the pydantic-free fast path")
+    parser.add_argument("--bandwidth-mbps", type=float, default=100.0, help="link speed for the transfer estimate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.locations, args.requests, args.fast_path, args.seed))
+    baseline: Optional[int] = None
+    print(f"\n{args.locations} locations, {report['mean_results']} results per query, "
+          f"{'fast path' if args.fast_path else 'pydantic route'}, transfer at {args.bandwidth_mbps:g} Mbit/s")
+    print(f"{'media type':<40}{'fields':<16}{'encoding':<10}{'bytes':>10}{'ratio':>7}"
+          f"{'p50_ms':>9}{'p95_ms':>9}{'+transfer':>11}")
+    for case in report["cases"]:
+        size = case["mean_response_bytes"]
+        baseline = baseline or size
+        case["transfer_ms"] = round(size * 8 / (args.bandwidth_mbps * 1000), 2)
+        print(f"{case['media_type']:<40}{case['projection']:<16}{case['encoding']:<10}{size:>10}"
+              f"{size / baseline:>7.2f}{case['p50_ms']:>9}{case['p95_ms']:>9}{case['p50_ms'] + case['transfer_ms']:>11.2f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Per-worker memory with the dataset parsed in every worker vs one shared, memory-mapped copy
+
+Each mode starts N worker processes the way uvicorn's multi-worker mode does
+(spawned, fresh interpreters). Every worker builds the listing and search
+services through the normal code path, loads the dataset, runs a few
+searches and then reads its own /proc/self/smaps_rollup while all workers
+are still alive, so shared pages are split across them in PSS.
+
+- ``json``: every worker parses listings.json into its own heap (the default)
+- ``shared``: ``shared_dataset`` on; the first worker compiles the listings
+  once and every worker maps the same file read-only
+
+Linux only (smaps_rollup).
+
+Usage:
+    python -m benchmarks.bench_worker_memory [--locations 50000] [--workers 4] [--json out.json]
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import re
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.synthetic import generate_listings, generate_queries, write_listings
+
+
+MODES = ("json", "shared")
+
+
+def read_memory() -> Dict[str, float]:
+    """RSS, PSS, shared and private resident memory of this process, in MiB"""
+    fields: Dict[str, int] = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            match = re.match(r"(\w+):\s+(\d+) kB", line)
+            if match:
+                fields[match.group(1)] = int(match.group(2))
+    return {
+        "rss_mib": round(fields["Rss"] / 1024, 1),
+        "pss_mib": round(fields["Pss"] / 1024, 1),
+        "shared_mib": round((fields["Shared_Clean"] + fields["Shared_Dirty"]) / 1024, 1),
+        "private_mib": round((fields["Private_Clean"] + fields["Private_Dirty"]) / 1024, 1),
+    }
+
+
+def _worker(
+    listings_path: str,
+    compiled_path: Optional[str],
+    shared: bool,
+    queries: List[List[Dict[str, int]]],
+    results: "multiprocessing.Queue",
+    done: "multiprocessing.Event",
+) -> None:
+    from app.config.settings import settings
+    from app.models.vehicle import Vehicle
+    from app.services.listing_service import ListingService
+    from app.services.search_service import SearchService
+
+    # Cached result lists would dominate the heap; measure the dataset and the search working set only
+    settings.enable_caching = False
+    gc.collect()
+    before = read_memory()
+    started = time.perf_counter()
+    listing_service = ListingService(listings_path, compiled_listings_path=compiled_path, shared_dataset=shared)
+    search_service = SearchService(listing_service)
+    snapshot = listing_service.get_snapshot()
+    load_seconds = time.perf_counter() - started
+    gc.collect()
+    loaded = read_memory()
+    for query in queries:
+        search_service.search_locations([Vehicle(**vehicle) for vehicle in query])
+    gc.collect()
+    results.put({
+        "pid": os.getpid(),
+        "source": snapshot.source,
+        "load_seconds": round(load_seconds, 3),
+        "before": before,
+        "loaded": loaded,
+        "after": read_memory(),
+    })
+    # Stay alive until every worker has measured, so shared pages are counted as shared
+    done.wait()
+
+
+def run_mode(
+    mode: str,
+    listings_path: str,
+    compiled_path: str,
+    workers: int,
+    queries: List[List[Dict[str, int]]],
+) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    done = context.Event()
+    shared = mode == "shared"
+    if os.path.exists(compiled_path):
+        os.remove(compiled_path)
+
+    processes = [
+        context.Process(
+            target=_worker,
+            args=(listings_path, compiled_path if shared else None, shared, queries, results, done),
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get(timeout=600) for _ in processes]
+    done.set()
+    for process in processes:
+        process.join()
+
+    summary: Dict[str, Any] = {"workers": reports, "sources": sorted({r["source"] for r in reports})}
+    for key in ("rss_mib", "pss_mib", "shared_mib", "private_mib"):
+        summary[f"mean_{key}"] = round(statistics.fmean(r["after"][key] for r in reports), 1)
+    summary["mean_dataset_pss_mib"] = round(statistics.fmean(
+        r["loaded"]["pss_mib"] - r["before"]["pss_mib"] for r in reports
+    ), 1)
+    summary["total_pss_mib"] = round(sum(r["after"]["pss_mib"] for r in reports), 1)
+    summary["max_load_seconds"] = max(r["load_seconds"] for r in reports)
+    return summary
+
+
+def run(locations: int, workers: int, seed: int) -> Dict[str, Any]:
+    queries = generate_queries(5, seed=seed)
+    report: Dict[str, Any] = {"locations": locations, "worker_count": workers, "modes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        listings_path = os.path.join(tmp, "listings.json")
+        compiled_path = os.path.join(tmp, "listings.bin")
+        records = generate_listings(locations, seed=seed)
+        report["listings"] = len(records)
+        report["file_bytes"] = write_listings(listings_path, records)
+        del records
+        for mode in MODES:
+            report["modes"][mode] = run_mode(mode, listings_path, compiled_path, workers, queries)
+        report["compiled_bytes"] = os.path.getsize(compiled_path)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--locations", type=int, default=50000, help="locations in the synthetic dataset")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes per mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args.locations, args.workers, args.seed)
+
+    print(f"\n{report['listings']} listings / {args.locations} locations, {args.workers} workers "
+          f"(JSON {report['file_bytes'] / 2**20:.1f} MiB, compiled {report['compiled_bytes'] / 2**20:.1f} MiB)")
+    print(f"{'mode':<8}{'rss':>9}{'pss':>9}{'shared':>9}{'private':>9}{'dataset':>9}{'total pss':>11}{'load_s':>8}")
+    for mode, stats in report["modes"].items():
+        print(f"{mode:<8}{stats['mean_rss_mib']:>9}{stats['mean_pss_mib']:>9}{stats['mean_shared_mib']:>9}"
+              f"{stats['mean_private_mib']:>9}{stats['mean_dataset_pss_mib']:>9}{stats['total_pss_mib']:>11}"
+              f"{stats['max_load_seconds']:>8}")
+    print("(MiB per worker after load and searches; dataset = PSS growth over the load itself)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""
+Replay a JSONL query log against the API and report latency percentiles
+
+Each log line is either a ``/search`` body (a JSON list of vehicles) or an
+object ``{"path": "/search", "method": "POST", "params": {...}, "body": [...]}``.
+
+Usage:
+    python -m benchmarks.loadtest queries.jsonl [--concurrency 8 | --rate 200] [--json out.json]
+    python -m benchmarks.loadtest --synthetic 1000 --save-log queries.jsonl
+    python -m benchmarks.loadtest queries.jsonl --target http://127.0.0.1:8000
+    python -m benchmarks.loadtest queries.jsonl --start-server
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from app.config.settings import settings
+from benchmarks.synthetic import generate_queries
+
+
+# (method, path, query string, body bytes)
+LoggedRequest = Tuple[str, str, str, bytes]
+
+
+def load_log(path: str) -> List[LoggedRequest]:
+    """
+    Parse a JSONL query log
+
+    Raises:
+        ValueError: If a line is neither a vehicle list nor a request object
+    """
+    requests: List[LoggedRequest] = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                if isinstance(entry, list):
+                    entry = {"body": entry}
+                if not isinstance(entry, dict) or "body" not in entry:
+                    raise ValueError("expected a vehicle list or an object with a 'body'")
+                requests.append((
+                    entry.get("method", "POST").upper(),
+                    entry.get("path", "/search"),
+                    urlencode(entry.get("params") or {}),
+                    json.dumps(entry["body"]).encode(),
+                ))
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: invalid query log entry: {e}")
+    if not requests:
+        raise ValueError(f"{path}: query log is empty")
+    return requests
+
+
+class AsgiTarget:
+    """Calls the FastAPI app in-process through the ASGI interface, running its lifespan."""
+
+    def __init__(self):
+        from app.main import app
+        self.app = app
+        self._lifespan_events: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._lifespan_replies: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._lifespan_task: Optional[asyncio.Task] = None
+
+    async def _lifespan(self, event: str) -> None:
+        await self._lifespan_events.put({"type": f"lifespan.{event}"})
+        reply = await self._lifespan_replies.get()
+        if reply["type"] != f"lifespan.{event}.complete":
+            raise RuntimeError(f"Application {event} failed: {reply.get('message', reply['type'])}")
+
+    async def start(self) -> None:
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan_task = asyncio.create_task(
+            self.app(scope, self._lifespan_events.get, self._lifespan_replies.put)
+        )
+        await self._lifespan("startup")
+
+    async def stop(self) -> None:
+        await self._lifespan("shutdown")
+        await self._lifespan_task
+
+    async def request(self, method: str, path: str, query: str, body: bytes) -> Tuple[int, int]:
+        """Return (status code, response body size)"""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", b"loadtest"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("loadtest", 80),
+        }
+        done = asyncio.Event()
+        request_sent = False
+        status = 0
+        size = 0
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: Dict[str, Any]) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return status, size
+
+
+class HttpTarget:
+    """Minimal HTTP/1.1 client with keep-alive connections, for a running server."""
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise ValueError(f"Only http:// targets are supported: {url}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.base_path = parts.path.rstrip("/")
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+    async def request(self, method: str, path: str, query: str, body: bytes) -> Tuple[int, int]:
+        """Return (status code, response body size)"""
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        target = self.base_path + path + (f"?{query}" if query else "")
+        writer.write(
+            f"{method} {target} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            size = 0
+            while True:
+                chunk_size = int((await reader.readline()).split(b";")[0], 16)
+                await reader.readexactly(chunk_size + 2)
+                size += chunk_size
+                if chunk_size == 0:
+                    break
+        else:
+            size = int(headers.get("content-length", 0))
+            await reader.readexactly(size)
+
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, size
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class Recorder:
+    """Collects per-request outcomes"""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.response_bytes = 0
+
+    async def run(self, target: Any, request: LoggedRequest, scheduled: Optional[float] = None) -> None:
+        # Open-loop latency counts from the scheduled send time, so queueing delay is not hidden
+        started = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            status, size = await target.request(*request)
+        except Exception as e:
+            name = type(e).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+            return
+        self.latencies_ms.append((time.perf_counter() - started) * 1000)
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        self.response_bytes += size
+
+
+async def run_closed_loop(target: Any, requests: List[LoggedRequest], concurrency: int, recorder: Recorder) -> None:
+    """``concurrency`` clients, each sending its next request as soon as the previous one returns"""
+    position = 0
+
+    async def client() -> None:
+        nonlocal position
+        while position < len(requests):
+            request = requests[position]
+            position += 1
+            await recorder.run(target, request)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+
+
+async def run_open_loop(
+    target: Any,
+    requests: List[LoggedRequest],
+    rate: float,
+    arrival: str,
+    max_in_flight: int,
+    seed: int,
+    recorder: Recorder,
+) -> None:
+    """Send requests on a fixed schedule of ``rate`` per second, whatever the response times"""
+    rng = random.Random(seed)
+    limit = asyncio.Semaphore(max_in_flight)
+    tasks = []
+    next_send = time.perf_counter()
+
+    async def send(request: LoggedRequest, scheduled: float) -> None:
+        async with limit:
+            await recorder.run(target, request, scheduled)
+
+    for request in requests:
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(request, next_send)))
+        next_send += rng.expovariate(rate) if arrival == "poisson" else 1 / rate
+    await asyncio.gather(*tasks)
+
+
+def summarize(recorder: Recorder, elapsed: float, budget_ms: float) -> Dict[str, Any]:
+    ordered = sorted(recorder.latencies_ms)
+    completed = len(ordered)
+    over_budget = completed - next((i for i, v in enumerate(ordered) if v > budget_ms), completed)
+    ok = recorder.statuses.get("200", 0)
+    return {
+        "requests": completed + sum(recorder.errors.values()),
+        "completed": completed,
+        "status_counts": dict(sorted(recorder.statuses.items())),
+        "transport_errors": dict(sorted(recorder.errors.items())),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 1) if elapsed > 0 else 0.0,
+        "response_bytes": recorder.response_bytes,
+        "latency_ms": {
+            "mean": round(sum(ordered) / completed, 3) if completed else 0.0,
+            "p50": round(percentile(ordered, 0.50), 3),
+            "p95": round(percentile(ordered, 0.95), 3),
+            "p99": round(percentile(ordered, 0.99), 3),
+            "max": round(ordered[-1], 3) if ordered else 0.0,
+        },
+        "budget": {
+            "max_response_time_ms": budget_ms,
+            "over_budget": over_budget,
+            "over_budget_pct": round(100 * over_budget / completed, 3) if completed else 0.0,
+            "passed": completed > 0 and over_budget == 0 and ok == completed and not recorder.errors,
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int) -> Tuple[subprocess.Popen, str]:
+    """Start ``uvicorn app.main:app`` on a free local port and wait until it answers"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as conn:
+                conn.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+                if conn.recv(12).startswith(b"HTTP/1.1 200"):
+                    return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become healthy within 60 s")
+
+
+async def run(args: argparse.Namespace, requests: List[LoggedRequest], url: Optional[str]) -> Dict[str, Any]:
+    target = HttpTarget(url) if url else AsgiTarget()
+    await target.start()
+    try:
+        warmup = Recorder()
+        await run_closed_loop(target, requests[:args.warmup], 1, warmup)
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        if args.rate:
+            await run_open_loop(target, requests, args.rate, args.arrival, args.max_in_flight, args.seed, recorder)
+        else:
+            await run_closed_loop(target, requests, args.concurrency, recorder)
+        elapsed = time.perf_counter() - started
+    finally:
+        await target.stop()
+    return summarize(recorder, elapsed, args.budget_ms)
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    result = report["result"]
+    latency = result["latency_ms"]
+    budget = result["budget"]
+    print(f"target={report['config']['target']} mode={report['config']['mode']} requests={result['requests']}")
+    print(f"throughput {result['throughput_rps']} req/s over {result['duration_s']} s, statuses {result['status_counts']}")
+    print(f"{'':<12}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    print(f"{'latency ms':<12}" + "".join(f"{latency[k]:>10.2f}" for k in ("mean", "p50", "p95", "p99", "max")))
+    if baseline is not None:
+        before = baseline["result"]["latency_ms"]
+        print(f"{'baseline':<12}" + "".join(f"{before[k]:>10.2f}" for k in ("mean", "p50", "p95", "p99", "max")))
+        print(f"{'change %':<12}" + "".join(
+            f"{100 * (latency[k] - before[k]) / before[k]:>+10.1f}" if before[k] else f"{'n/a':>10}"
+            for k in ("mean", "p50", "p95", "p99", "max")
+        ))
+    verdict = "PASS" if budget["passed"] else "FAIL"
+    print(f"{verdict}: {budget['over_budget']} requests ({budget['over_budget_pct']}%) over {budget['max_response_time_ms']} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("log", nargs="?", help="JSONL query log to replay")
+    parser.add_argument("--synthetic", type=int, help="replay this many generated queries instead of a log")
+    parser.add_argument("--save-log", help="write the replayed queries to this JSONL file")
+    parser.add_argument("--target", default="asgi", help="'asgi' (in-process) or a server URL like http://127.0.0.1:8000")
+    parser.add_argument("--start-server", action="store_true", help="start a local uvicorn and target it")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn workers with --start-server")
+    parser.add_argument("--concurrency", type=int, default=1, help="closed-loop clients")
+    parser.add_argument("--rate", type=float, help="open-loop arrival rate in requests per second")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="open-loop cap on outstanding requests")
+    parser.add_argument("--requests", type=int, help="total requests (the log is cycled if shorter)")
+    parser.add_argument("--warmup", type=int, default=10, help="requests sent before measuring")
+    parser.add_argument("--budget-ms", type=float, default=settings.max_response_time_ms)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="previous --json report to compare against")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        requests = [("POST", "/search", "", json.dumps(body).encode()) for body in generate_queries(args.synthetic, seed=args.seed)]
+        source = f"synthetic:{args.synthetic}:seed={args.seed}"
+    elif args.log:
+        try:
+            requests = load_log(args.log)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        source = args.log
+    else:
+        parser.error("a query log or --synthetic is required")
+    if args.requests:
+        requests = [requests[i % len(requests)] for i in range(args.requests)]
+    if args.save_log:
+        with open(args.save_log, "w") as f:
+            for method, path, query, body in requests:
+                entry = {"method": method, "path": path, "params": dict(parse_qsl(query)), "body": json.loads(body)}
+                f.write(json.dumps(entry) + "\n")
+
+    log_digest = hashlib.sha256(b"\n".join(b" ".join((m.encode(), p.encode(), q.encode(), b)) for m, p, q, b in requests))
+    server = None
+    url = None if args.target == "asgi" else args.target
+    if args.start_server:
+        server, url = start_server(args.server_workers)
+    try:
+        result = asyncio.run(run(args, requests, url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "config": {
+            "source": source,
+            "log_sha256": log_digest.hexdigest(),
+            "target": "asgi" if url is None else ("uvicorn" if server is not None else url),
+            "mode": f"open-loop {args.arrival} {args.rate}/s" if args.rate else f"closed-loop x{args.concurrency}",
+            "requests": len(requests),
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "packing_solver": settings.packing_solver,
+            "search_engine": settings.search_engine,
+            "cpus": os.cpu_count(),
+        },
+        "result": result,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    sys.exit(0 if result["budget"]["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
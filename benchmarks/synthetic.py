@@ -0,0 +1,130 @@
+"""
+Seeded synthetic listing generator
+
+Usage:
+    python -m benchmarks.synthetic --locations 400000 [--per-location 3] [--profile wide] --out big.json
+"""
+
+import argparse
+import json
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+# (length, width) distribution observed in the bundled listings.json
+SAMPLE_DIMENSIONS: Sequence[Tuple[int, int]] = [
+    (length, width) for length in (10, 20, 30, 40, 50) for width in (10, 20, 30, 40, 50)
+]
+SAMPLE_DIMENSION_WEIGHTS: Sequence[int] = [
+    15, 35, 19, 37, 13,
+    34, 77, 60, 67, 33,
+    29, 55, 51, 65, 27,
+    27, 74, 60, 63, 44,
+    12, 34, 17, 31, 21,
+]
+# Listings per location in the bundled listings.json (1..7)
+SAMPLE_LOCATION_SIZES: Sequence[int] = [1, 2, 3, 4, 5, 6, 7]
+SAMPLE_LOCATION_SIZE_WEIGHTS: Sequence[int] = [82, 92, 91, 59, 26, 10, 5]
+
+DIMENSION_PROFILES = ("sample", "wide", "irregular", "lots")
+
+
+def _dimensions(rng: random.Random, profile: str) -> Tuple[int, int]:
+    if profile == "sample":
+        return rng.choices(SAMPLE_DIMENSIONS, SAMPLE_DIMENSION_WEIGHTS)[0]
+    if profile == "wide":
+        # Multiples of 10 up to 100 ft, so long vehicles and many-lane listings occur
+        return rng.randrange(10, 101, 10), rng.randrange(10, 101, 10)
+    if profile == "irregular":
+        # Arbitrary feet, exercising rounding and wasted space
+        return rng.randint(5, 105), rng.randint(5, 65)
+    if profile == "lots":
+        # Yards with 5 to 50 lanes of up to 100 ft, large enough for fleets
+        return rng.randrange(20, 101, 10), rng.randrange(50, 501, 10)
+    raise ValueError(f"Unknown dimension profile: {profile}")
+
+
+def generate_listings(
+    location_count: int,
+    listings_per_location: Optional[int] = None,
+    dimension_profile: str = "sample",
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Generate listing records shaped like listings.json
+
+    Args:
+        location_count: Number of locations
+        listings_per_location: Fixed listings per location, or None to follow the sample distribution
+        dimension_profile: "sample", "wide", "irregular" or "lots"
+        seed: Random seed; the same arguments always produce the same records
+
+    Returns:
+        List[Dict[str, Any]]: Listing records, interleaved across locations like the real file
+    """
+    rng = random.Random(seed)
+    records: List[Dict[str, Any]] = []
+    for location in range(location_count):
+        location_id = f"loc-{seed}-{location:08d}"
+        count = listings_per_location or rng.choices(SAMPLE_LOCATION_SIZES, SAMPLE_LOCATION_SIZE_WEIGHTS)[0]
+        for _ in range(count):
+            length, width = _dimensions(rng, dimension_profile)
+            records.append({
+                "id": f"lst-{seed}-{len(records):09d}",
+                "location_id": location_id,
+                "length": length,
+                "width": width,
+                "price_in_cents": rng.randint(1000, 100000),
+            })
+    rng.shuffle(records)
+    return records
+
+
+def generate_queries(count: int, max_vehicles: int = 5, seed: int = 0) -> List[List[Dict[str, int]]]:
+    """
+    Generate random /search request bodies
+
+    Args:
+        count: Number of queries
+        max_vehicles: Largest total quantity per query
+        seed: Random seed
+
+    Returns:
+        List[List[Dict[str, int]]]: Request bodies (lists of {length, quantity})
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        remaining = rng.randint(1, max_vehicles)
+        body = []
+        while remaining:
+            quantity = rng.randint(1, remaining)
+            body.append({"length": rng.randint(1, 100 if rng.random() < 0.2 else 50), "quantity": quantity})
+            remaining -= quantity
+        queries.append(body)
+    return queries
+
+
+def write_listings(path: str, records: List[Dict[str, Any]]) -> int:
+    """Write records as a listings.json file and return its size in bytes"""
+    with open(path, "w") as f:
+        json.dump(records, f, separators=(",", ":"))
+        return f.tell()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic listings.json")
+    parser.add_argument("--locations", type=int, required=True)
+    parser.add_argument("--per-location", type=int, help="fixed listings per location (default: sample distribution)")
+    parser.add_argument("--profile", default="sample", choices=DIMENSION_PROFILES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    records = generate_listings(args.locations, args.per_location, args.profile, args.seed)
+    size = write_listings(args.out, records)
+    print(f"{len(records)} listings over {args.locations} locations, {size / 1e6:.1f} MB -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
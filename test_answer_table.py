@@ -0,0 +1,136 @@
+"""
+Answer table: every precomputed answer must equal the live search, and a table for another dataset is never used
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from app.config.settings import settings
+from app.models.vehicle import Vehicle
+from app.services.answer_table_builder import build_answer_table
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from app.utils.answer_table import AnswerTable, canonical_queries, encode_query
+from tests.helpers import random_records
+
+def vehicles(sizes):
+    return [Vehicle(length=size, quantity=1) for size in sizes]
+
+def write_records(path, records):
+    with open(path, "w") as f:
+        json.dump(records, f)
+
+def without_cache(test):
+    """Run a test with the result cache off, so every answer comes from the table or the engine"""
+    def run():
+        enabled = settings.enable_caching
+        settings.enable_caching = False
+        try:
+            test()
+        finally:
+            settings.enable_caching = enabled
+    run.__name__, run.__doc__ = test.__name__, test.__doc__
+    return run
+
+def test_query_codes():
+    """Canonical queries are enumerated once each and get distinct codes"""
+    print("Testing canonical query codes...")
+    queries = list(canonical_queries(5))
+    # Multisets of 1..5 of the 10 rounded lengths
+    assert len(queries) == 10 + 55 + 220 + 715 + 2002
+    assert all(list(query) == sorted(query, reverse=True) for query in queries)
+    assert len({encode_query(query) for query in queries}) == len(queries)
+    print(f"✅ Query codes passed - {len(queries)} distinct codes")
+
+@without_cache
+def test_lookups_match_live_search():
+    """Every canonical query's precomputed answer equals the live search, through every search entry point"""
+    print("Testing answer table lookups against live searches...")
+    rng = random.Random(1)
+    checks = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path, table_path = os.path.join(tmp, "listings.json"), os.path.join(tmp, "answer_table.bin")
+        for trial in range(6):
+            write_records(path, random_records(rng, 30, 200))
+            max_vehicles = 3 if trial else 5
+            report = build_answer_table(path, table_path, max_vehicles)
+            table = AnswerTable(table_path)
+            assert report["query_count"] == table.meta["query_count"] == len(list(canonical_queries(max_vehicles)))
+
+            live = SearchService(ListingService(path, storage_backend="json"))
+            served = SearchService(ListingService(path, storage_backend="json"))
+            assert served.load_answer_table(table_path) and served.answer_table is not None
+            for query in canonical_queries(max_vehicles):
+                expected = live.search_locations(vehicles(query))
+                assert table.lookup(query) == expected, query
+                assert served.search_locations(vehicles(query)) == expected, query
+                assert served.search_json([(size, 1) for size in query]) == \
+                    live.search_json([(size, 1) for size in query]), query
+                checks += 1
+            # Both searches of every query were answered by the table
+            assert served.metrics.precomputed.value == 2 * len(list(canonical_queries(max_vehicles)))
+            assert table.lookup((100,) * (max_vehicles + 1)) is None
+    print(f"✅ Answer table lookups passed - {checks} canonical queries identical to live searches")
+
+@without_cache
+def test_stale_table_is_ignored():
+    """A table for another dataset or solver is not attached, and one made stale by a reload stops answering"""
+    print("Testing stale answer tables...")
+    rng = random.Random(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        path, table_path = os.path.join(tmp, "listings.json"), os.path.join(tmp, "answer_table.bin")
+        records = random_records(rng, 30, 200)
+        write_records(path, records)
+        build_answer_table(path, table_path, 2)
+        stale_records = [dict(record, price_in_cents=record["price_in_cents"] + 1) for record in records]
+        write_records(path, stale_records)
+
+        search_service = SearchService(ListingService(path, storage_backend="json"))
+        assert search_service.load_answer_table(table_path) is False and search_service.answer_table is None
+        assert search_service.load_answer_table(os.path.join(tmp, "missing.bin")) is False
+
+        # Attached while it matched, then the file changes under it
+        write_records(path, records)
+        listing_service = ListingService(path, storage_backend="json")
+        search_service = SearchService(listing_service)
+        assert search_service.load_answer_table(table_path) is True
+        assert SearchService(listing_service, "exact").load_answer_table(table_path) is False
+        write_records(path, stale_records)
+        assert listing_service.reload() is True
+        live = SearchService(ListingService(path, storage_backend="json"))
+        table = search_service.answer_table
+        stale_answers = 0
+        for query in canonical_queries(2):
+            expected = live.search_locations(vehicles(query))
+            stale_answers += table.lookup(query) != expected
+            assert search_service.search_locations(vehicles(query)) == expected, query
+            assert search_service.search_json([(size, 1) for size in query]) == \
+                live.search_json([(size, 1) for size in query]), query
+            assert search_service.search_batch([vehicles(query)]).queries[0].results == expected, query
+        assert stale_answers > 0 and search_service.metrics.precomputed.value == 0
+    print(f"✅ Stale answer tables passed - the engine answered the {stale_answers} queries the table had wrong")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting answer table tests...\n")
+
+    try:
+        test_query_codes()
+        print()
+
+        test_lookups_match_live_search()
+        print()
+
+        test_stale_table_is_ignored()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
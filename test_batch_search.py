@@ -0,0 +1,135 @@
+"""
+Batch search: each entry must equal the matching single search, duplicates searched once and bad queries isolated
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.models.vehicle import Vehicle
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from tests.helpers import random_records
+
+def random_query(rng):
+    return [{"length": rng.randint(1, 100), "quantity": rng.randint(1, 2)} for _ in range(rng.randint(1, 3))]
+
+def same_sizes(rng, query):
+    """The query as single vehicles, shuffled, each length anywhere that rounds up to the same 10 ft"""
+    rewritten = []
+    for vehicle in query:
+        rounded = -(-vehicle["length"] // 10) * 10
+        rewritten += [{"length": rng.randint(rounded - 9, rounded), "quantity": 1} for _ in range(vehicle["quantity"])]
+    rng.shuffle(rewritten)
+    return rewritten
+
+def random_batch(rng):
+    """Random queries, repeats and rewritten repeats of some, and invalid queries, shuffled"""
+    queries = [random_query(rng) for _ in range(rng.randint(1, 12))]
+    queries += [rng.choice(queries) for _ in range(rng.randint(0, 4))]
+    queries += [same_sizes(rng, rng.choice(queries)) for _ in range(rng.randint(0, 4))]
+    invalid = [[] for _ in range(rng.randint(0, 2))]
+    invalid += [[{"length": 10, "quantity": 3}, {"length": 20, "quantity": 3}] for _ in range(rng.randint(0, 2))]
+    batch = queries + invalid
+    rng.shuffle(batch)
+    return batch
+
+def vehicles(query):
+    return [Vehicle(**vehicle) for vehicle in query]
+
+def test_batch_matches_single_searches():
+    """Each batch entry is the single search's results, or its validation error"""
+    print("Testing batch search against single searches...")
+    rng = random.Random(1)
+    entries = repeats = invalid = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        for _ in range(40):
+            with open(path, "w") as f:
+                json.dump(random_records(rng), f)
+            listing_service = ListingService(path, storage_backend="json")
+            for solver in ("greedy", "exact"):
+                # Separate services, so the batch cannot be answered from the single searches' cache
+                batch_service = SearchService(listing_service, solver)
+                single_service = SearchService(listing_service, solver)
+                batch = random_batch(rng)
+                response = batch_service.search_batch([vehicles(query) for query in batch])
+                assert response.query_count == len(batch) and len(response.queries) == len(batch)
+                canonical, valid = set(), 0
+                for query, entry in zip(batch, response.queries):
+                    try:
+                        single_service.validate_vehicles(vehicles(query))
+                    except ValueError as e:
+                        assert entry.error == str(e) and entry.results == []
+                        invalid += 1
+                        continue
+                    assert entry.error is None
+                    assert entry.results == single_service.search_locations(vehicles(query)), query
+                    canonical.add(single_service.canonical_query(vehicles(query)))
+                    valid += 1
+                assert response.unique_query_count == len(canonical)
+                entries += valid
+                repeats += valid - len(canonical)
+    assert repeats > 0 and invalid > 0
+    print(f"✅ Batch search passed - {entries} entries identical to single searches "
+          f"({repeats} answered by a repeat, {invalid} invalid)")
+
+def test_batch_endpoint():
+    """POST /search/batch entries equal POST /search bodies; a bad query fails alone, a bad batch with 400"""
+    print("Testing /search/batch...")
+    rng = random.Random(2)
+    names = ("listings_file_path", "hot_reload_enabled", "warmup_enabled", "max_batch_queries")
+    saved = {name: getattr(settings, name) for name in names}
+    settings.listings_file_path, settings.hot_reload_enabled, settings.warmup_enabled = "listings.json", False, False
+    from app.main import app
+    checks = 0
+    try:
+        with TestClient(app) as client:
+            for _ in range(10):
+                batch = random_batch(rng)
+                response = client.post("/search/batch", json=batch)
+                assert response.status_code == 200
+                body = response.json()
+                assert body["query_count"] == len(batch)
+                for query, entry in zip(batch, body["queries"]):
+                    single = client.post("/search", json=query)
+                    if single.status_code == 400:
+                        assert entry["error"] == single.json()["detail"] and entry["results"] == []
+                    else:
+                        assert single.status_code == 200 and entry["error"] is None
+                        assert entry["results"] == single.json(), query
+                    checks += 1
+
+            assert client.post("/search/batch", json=[]).status_code == 400
+            settings.max_batch_queries = 2
+            assert client.post("/search/batch", json=[[{"length": 10, "quantity": 1}]] * 3).status_code == 400
+            # A vehicle the model rejects fails the whole request, like it does on /search
+            assert client.post("/search/batch", json=[[{"length": 0, "quantity": 1}]]).status_code == 422
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+    print(f"✅ /search/batch passed - {checks} entries identical to /search")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting batch search tests...\n")
+
+    try:
+        test_batch_matches_single_searches()
+        print()
+
+        test_batch_endpoint()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
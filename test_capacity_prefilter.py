@@ -0,0 +1,120 @@
+"""
+The capacity prefilter must never drop a location the packer can fill, nor bound its price above what the packer pays
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from app.models.listing import Listing
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from app.utils.bin_packing import BinPackingAlgorithm
+from tests.helpers import random_fleet, random_record, random_records, random_sizes
+
+def unfiltered_rows(snapshot, pack, query):
+    """Every location packed, without the prefilter, sorted as searches sort their results"""
+    results = []
+    for location in range(snapshot.store.location_count):
+        packed = pack(location, query)
+        if packed:
+            rows, total_price = packed
+            results.append((location, rows, total_price))
+    results.sort(key=lambda x: x[2])
+    return results
+
+def check_bounds(unfiltered, candidates, bounds):
+    """Each packed location is a candidate whose price lower bound it meets"""
+    bound_of = dict(zip(candidates.tolist(), bounds.tolist()))
+    for location, _, total_price in unfiltered:
+        assert location in bound_of, location
+        assert bound_of[location] <= total_price, (location, bound_of[location], total_price)
+
+def check_queries(rng, search_service, snapshot):
+    """Searches with the prefilter against packing every location, for vehicle lists and fleets"""
+    index = snapshot.capacity_index
+    checks = pruned = 0
+    for _ in range(10):
+        sizes = random_sizes(rng)
+        unfiltered = unfiltered_rows(snapshot, search_service._packer(snapshot, sizes), sizes)
+        candidates = index.candidate_locations(sizes)
+        check_bounds(unfiltered, candidates, index.price_lower_bounds(sizes, candidates))
+        assert search_service.search_rows(sizes, snapshot) == unfiltered, sizes
+        limit = rng.randint(1, 5)
+        assert search_service.search_top_rows(sizes, limit, None, snapshot) == unfiltered[:limit], sizes
+        pruned += snapshot.store.location_count - len(candidates)
+        checks += 1
+    if search_service.packing_solver == "greedy":
+        for _ in range(3):
+            blocks = BinPackingAlgorithm.vehicle_blocks(random_fleet(rng, 200))
+            unfiltered = unfiltered_rows(snapshot, search_service._fleet_packer(snapshot, blocks), blocks)
+            counts = search_service._block_counts(blocks)
+            candidates = index.candidate_locations_for_counts(counts)
+            check_bounds(unfiltered, candidates, index.price_lower_bounds_for_counts(counts, candidates))
+            assert search_service.search_fleet_rows(blocks, snapshot) == unfiltered, blocks
+            pruned += snapshot.store.location_count - len(candidates)
+            checks += 1
+    return checks, pruned
+
+def test_prefilter_keeps_packable_locations():
+    """Prefiltered searches match packing every location, with the greedy and the exact solver"""
+    print("Testing the capacity prefilter against unfiltered packing...")
+    rng = random.Random(1)
+    checks = pruned = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        for _ in range(40):
+            with open(path, "w") as f:
+                json.dump(random_records(rng, yards=rng.random() < 0.5), f)
+            listing_service = ListingService(path, storage_backend="json")
+            snapshot = listing_service.get_snapshot()
+            for solver in ("greedy", "exact"):
+                counts = check_queries(rng, SearchService(listing_service, solver), snapshot)
+                checks, pruned = checks + counts[0], pruned + counts[1]
+    assert pruned > 0
+    print(f"✅ Capacity prefilter passed - {checks} searches identical without it ({pruned} locations pruned)")
+
+def test_prefilter_after_listing_changes():
+    """The capacity index overlaid by applied listing changes stays conservative"""
+    print("Testing the capacity prefilter after listing changes...")
+    rng = random.Random(2)
+    checks = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        for trial in range(15):
+            records = random_records(rng, yards=True)
+            with open(path, "w") as f:
+                json.dump(records, f)
+            listing_service = ListingService(path, storage_backend="json")
+            search_service = SearchService(listing_service)
+            listing_service.get_snapshot()
+            for change in range(4):
+                deletes = [record["id"] for record in rng.sample(records, min(len(records), rng.randint(0, 5)))]
+                upserts = [
+                    Listing(**random_record(rng, f"new-{trial}-{change}-{i}", 45, yards=True))
+                    for i in range(rng.randint(1, 6))
+                ]
+                listing_service.apply_changes(upserts=upserts, deletes=deletes)
+                checks += check_queries(rng, search_service, listing_service.get_snapshot())[0]
+    print(f"✅ Prefilter after listing changes passed - {checks} searches identical without it")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting capacity prefilter tests...\n")
+
+    try:
+        test_prefilter_keeps_packable_locations()
+        print()
+
+        test_prefilter_after_listing_changes()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
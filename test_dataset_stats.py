@@ -0,0 +1,100 @@
+"""
+Dataset aggregates carried across reloads and listing changes must equal those computed from scratch
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from app.models.listing import Listing
+from app.services.listing_service import ListingService
+from app.utils.dataset_stats import DatasetStats
+from tests.helpers import random_record, random_records, reloaded_records
+
+def assert_same_stats(stats, store):
+    """``stats`` holds exactly the aggregates ``DatasetStats.from_store`` computes for ``store``"""
+    expected = DatasetStats.from_store(store)
+    for name in ("prices", "areas", "location_sizes"):
+        counts, expected_counts = getattr(stats, name), getattr(expected, name)
+        assert counts.values.tolist() == expected_counts.values.tolist(), name
+        assert counts.counts.tolist() == expected_counts.counts.tolist(), name
+    assert (stats.listing_count, stats.location_count) == (expected.listing_count, expected.location_count)
+    assert stats.summary == expected.summary
+
+def write_records(path, records):
+    with open(path, "w") as f:
+        json.dump(records, f)
+
+def test_reload_matches_from_store():
+    """A reload derives its aggregates from the previous snapshot's and lands on the full computation"""
+    print("Testing aggregates across reloads...")
+    rng = random.Random(1)
+    reloads = reused = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        for _ in range(30):
+            records = random_records(rng, 40, 300)
+            write_records(path, records)
+            listing_service = ListingService(path, storage_backend="json")
+            assert_same_stats(listing_service.get_snapshot().stats, listing_service.get_snapshot().store)
+            for reload_number in range(4):
+                records = reloaded_records(rng, records, reload_number)
+                write_records(path, records)
+                if not listing_service.reload():
+                    continue
+                snapshot = listing_service.get_snapshot()
+                assert_same_stats(snapshot.stats, snapshot.store)
+                reloads += 1
+                reused += snapshot.reused_locations
+    assert reused > 0
+    print(f"✅ Reload aggregates passed - {reloads} reloads identical to a full computation")
+
+def test_changes_match_from_store():
+    """Upserts and deletes update the aggregates to those of the changed store, emptied locations excluded"""
+    print("Testing aggregates across listing changes...")
+    rng = random.Random(2)
+    batches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        for _ in range(30):
+            records = random_records(rng, 30, 200)
+            write_records(path, records)
+            listing_service = ListingService(path, storage_backend="json")
+            listing_service.get_snapshot()
+            ids = [record["id"] for record in records]
+            for round_number in range(6):
+                deletes = rng.sample(ids, min(len(ids), rng.randint(0, 8)))
+                upserts = []
+                for i in range(rng.randint(0, 8)):
+                    listing_id = rng.choice(ids) if ids and rng.random() < 0.5 else f"new-{round_number}-{i}"
+                    upserts.append(Listing(**random_record(rng, listing_id, 35)))
+                listing_service.apply_changes(upserts, deletes)
+                ids = [listing_id for listing_id in ids if listing_id not in deletes]
+                ids += [listing.id for listing in upserts if listing.id not in ids]
+                snapshot = listing_service.get_snapshot()
+                # An overlay keeps emptied locations until compaction; the aggregates never count them
+                store = snapshot.store.compacted() if hasattr(snapshot.store, "compacted") else snapshot.store
+                assert_same_stats(snapshot.stats, store)
+                batches += 1
+    print(f"✅ Listing change aggregates passed - {batches} change batches identical to a full computation")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting dataset aggregate tests...\n")
+
+    try:
+        test_reload_matches_from_store()
+        print()
+
+        test_changes_match_from_store()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
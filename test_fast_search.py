@@ -0,0 +1,155 @@
+"""
+The fast /search path must send the bytes the pydantic route sends, and hand everything else to the route
+"""
+
+import random
+
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.utils.fast_search import LENGTH_BOUNDS, QUANTITY_BOUNDS, parse_vehicles
+from app.utils.wire_formats import COLUMNAR_MEDIA_TYPE, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+
+# Default fields, a pair given out of order, one field
+PROJECTIONS = [None, "total_price_in_cents,location_id", "listing_ids"]
+
+def random_query(rng):
+    """Up to 4 vehicles, all within the search limit, so the fast path answers every one"""
+    return [{"length": rng.randint(1, 100), "quantity": rng.randint(1, 2)} for _ in range(rng.randint(1, 2))]
+
+def with_app_settings(test):
+    """Run a test against the app on listings.json, restoring the settings it changes"""
+    def run():
+        names = ("listings_file_path", "hot_reload_enabled", "warmup_enabled", "fast_search_enabled")
+        saved = {name: getattr(settings, name) for name in names}
+        settings.listings_file_path, settings.hot_reload_enabled, settings.warmup_enabled = "listings.json", False, False
+        try:
+            test()
+        finally:
+            for name, value in saved.items():
+                setattr(settings, name, value)
+    run.__name__, run.__doc__ = test.__name__, test.__doc__
+    return run
+
+def counting(calls, name, search):
+    """``search``, appending ``name`` to ``calls`` on every call"""
+    def counted(*args):
+        calls.append(name)
+        return search(*args)
+    return counted
+
+def test_parse_vehicles():
+    """Only arrays of integer lengths and quantities within the Vehicle bounds are accepted"""
+    print("Testing fast path body validation...")
+    assert (LENGTH_BOUNDS, QUANTITY_BOUNDS) == ((1, 100), (1, 5))
+    assert parse_vehicles(b'[{"length": 10, "quantity": 1}, {"quantity": 5, "length": 100}]') == [(10, 1), (100, 5)]
+    assert parse_vehicles(b"[]") == []
+    for body in (
+        b"", b"{", b"{}", b"[1]", b'[{"length": 10}]',
+        b'[{"length": "10", "quantity": 1}]', b'[{"length": 10.0, "quantity": 1}]',
+        b'[{"length": true, "quantity": 1}]', b'[{"length": 0, "quantity": 1}]',
+        b'[{"length": 101, "quantity": 1}]', b'[{"length": 10, "quantity": 6}]',
+    ):
+        assert parse_vehicles(body) is None, body
+    print("✅ Body validation passed")
+
+@with_app_settings
+def test_fast_path_bytes_match_route():
+    """Status, content type and body are byte-for-byte the route's, for results and for errors"""
+    print("Testing fast path responses against the pydantic route...")
+    rng = random.Random(1)
+    from app.main import app
+    import app.main as main
+    requests = []
+    for _ in range(20):
+        query = random_query(rng)
+        for media_type in (JSON_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE, MSGPACK_MEDIA_TYPE):
+            fields = rng.choice(PROJECTIONS)
+            requests.append((query, {"fields": fields} if fields else {}, media_type))
+    # Too many vehicles (400 from search validation), out of bounds, coerced strings, unknown fields
+    requests += [
+        ([{"length": 10, "quantity": 5}, {"length": 20, "quantity": 1}], {}, JSON_MEDIA_TYPE),
+        ([], {}, JSON_MEDIA_TYPE),
+        ([{"length": 0, "quantity": 1}], {}, JSON_MEDIA_TYPE),
+        ([{"length": "30", "quantity": "2"}], {}, JSON_MEDIA_TYPE),
+        ([{"length": 10, "quantity": 1}], {"fields": "price"}, JSON_MEDIA_TYPE),
+        ([{"length": 10, "quantity": 1}], {"limit": 3}, JSON_MEDIA_TYPE),
+    ]
+    with TestClient(app) as client:
+        search_service = main.search_controller.search_service
+        calls = []
+        search_service.search_json = counting(calls, "fast", search_service.search_json)
+        search_service.search_locations = counting(calls, "route", search_service.search_locations)
+        fast_answers = 0
+        for query, params, media_type in requests:
+            responses = []
+            for fast_path in (False, True):
+                settings.fast_search_enabled = fast_path
+                del calls[:]
+                responses.append(client.post("/search", params=params, json=query, headers={"Accept": media_type}))
+                fast_answers += fast_path and calls == ["fast"]
+            route, fast = responses
+            assert fast.status_code == route.status_code, (query, params)
+            assert fast.headers["content-type"] == route.headers["content-type"], (query, params, media_type)
+            assert fast.content == route.content, (query, params, media_type)
+            assert fast.headers.get("vary") == route.headers.get("vary")
+
+        # A malformed body is the route's 422 either way
+        for fast_path in (False, True):
+            settings.fast_search_enabled = fast_path
+            responses[fast_path] = client.post("/search", content=b"[{", headers={"Content-Type": "application/json"})
+        assert responses[0].status_code == responses[1].status_code == 422
+        assert responses[0].content == responses[1].content
+    assert fast_answers == 60
+    print(f"✅ Fast path bytes passed - {len(requests)} requests identical, {fast_answers} served by the fast path")
+
+@with_app_settings
+def test_search_errors_propagate():
+    """Only validation errors are replayed through the route; any other error is a 500 and runs once"""
+    print("Testing fast path error handling...")
+    from app.main import app
+    import app.main as main
+    settings.fast_search_enabled = True
+    with TestClient(app, raise_server_exceptions=False) as client:
+        search_service = main.search_controller.search_service
+        calls = []
+        search_json = search_service.search_json
+
+        def broken(*args):
+            calls.append("fast")
+            raise RuntimeError("boom")
+
+        search_service.search_json = broken
+        search_service.search_locations = counting(calls, "route", search_service.search_locations)
+        response = client.post("/search", json=[{"length": 10, "quantity": 1}])
+        assert response.status_code == 500 and calls == ["fast"]
+
+        # A validation error from the search is the route's 400
+        search_service.search_json = counting(calls, "fast", search_json)
+        del calls[:]
+        response = client.post("/search", json=[{"length": 10, "quantity": 5}, {"length": 10, "quantity": 1}])
+        assert response.status_code == 400 and calls == ["fast", "route"]
+    print("✅ Error handling passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting fast search path tests...\n")
+
+    try:
+        test_parse_vehicles()
+        print()
+
+        test_fast_path_bytes_match_route()
+        print()
+
+        test_search_errors_propagate()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
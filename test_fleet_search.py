@@ -0,0 +1,146 @@
+"""
+Fleet search packs a block of equal lengths at a time; it must open what the per-vehicle greedy opens, one vehicle at a time
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from app.config.settings import settings
+from app.models.listing import Listing
+from app.models.vehicle import FleetVehicle
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from app.utils.bin_packing import BinPackingAlgorithm
+from tests.helpers import random_fleet, random_records
+
+def expanded_sizes(fleet):
+    return BinPackingAlgorithm.vehicle_sizes(length for length, quantity in fleet for _ in range(quantity))
+
+def test_blocks_match_per_vehicle_packing():
+    """Placing whole blocks opens the same listings, in the same order, as placing vehicles one by one"""
+    print("Testing block packing against per-vehicle packing...")
+    rng = random.Random(1)
+    checks = feasible = 0
+    for _ in range(4000):
+        count = rng.randint(1, 15)
+        lengths = [rng.choice([rng.randint(1, 120), rng.randrange(10, 110, 10)]) for _ in range(count)]
+        widths = [rng.choice([rng.randint(1, 120), rng.randrange(10, 510, 10)]) for _ in range(count)]
+        prices = [rng.choice([rng.randint(1, 5000), 100 * rng.randint(1, 6)]) for _ in range(count)]
+        fleet = random_fleet(rng, rng.choice([5, 40, 500]))
+        expected = BinPackingAlgorithm.find_optimal_rows(expanded_sizes(fleet), lengths, widths, prices)
+        blocks = BinPackingAlgorithm.vehicle_blocks(fleet)
+        assert BinPackingAlgorithm.find_optimal_rows_for_blocks(blocks, lengths, widths, prices) == expected, fleet
+        checks += 1
+        feasible += bool(expected)
+    print(f"✅ Block packing passed - {checks} packings identical ({feasible} feasible)")
+
+def test_fleet_search_matches_search_rows():
+    """Fleet searches return the greedy /search results, on loaded and on changed snapshots"""
+    print("Testing fleet searches against per-vehicle searches...")
+    rng = random.Random(2)
+    checks = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        for trial in range(40):
+            records = random_records(rng, 30, yards=True)
+            with open(path, "w") as f:
+                json.dump(records, f)
+            listing_service = ListingService(path, storage_backend="json")
+            search_service = SearchService(listing_service, "greedy")
+            if trial % 2:
+                # Overlaid snapshot: the capacity index and store answer through the change overlay
+                moved = rng.sample(records, min(3, len(records)))
+                listing_service.apply_changes(
+                    [Listing(**dict(record, location_id="location-new")) for record in moved], [records[0]["id"]]
+                )
+            snapshot = listing_service.get_snapshot()
+            for _ in range(10):
+                fleet = random_fleet(rng, rng.choice([5, 50, 500]))
+                blocks = BinPackingAlgorithm.vehicle_blocks(fleet)
+                expected = search_service.search_rows(expanded_sizes(fleet), snapshot)
+                assert search_service.search_fleet_rows(blocks, snapshot) == expected, fleet
+                limit = rng.randint(1, 5)
+                assert search_service.search_fleet_top_rows(blocks, limit, None, snapshot) == expected[:limit]
+                if expected:
+                    after = (expected[0][2], expected[0][0])
+                    assert search_service.search_fleet_top_rows(blocks, limit, after, snapshot) == expected[1:limit + 1]
+                checks += 1
+    print(f"✅ Fleet search passed - {checks} fleets identical to per-vehicle searches")
+
+def test_fleet_pagination_and_cache():
+    """Walking the pages of a fleet search returns the full results, cached or not"""
+    print("Testing fleet search pagination...")
+    rng = random.Random(3)
+    pages = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        for _ in range(10):
+            with open(path, "w") as f:
+                json.dump(random_records(rng, 30, yards=True), f)
+            search_service = SearchService(ListingService(path, storage_backend="json"), "greedy")
+            fleet = [FleetVehicle(length=length, quantity=quantity) for length, quantity in random_fleet(rng, 60)]
+            for cached in (False, True):
+                if not cached:
+                    search_service.result_cache.clear()
+                walked, cursor = [], None
+                while True:
+                    page, cursor = search_service.search_fleet(fleet, 2, cursor)
+                    walked.extend(page)
+                    pages += 1
+                    if cursor is None:
+                        break
+                full, no_cursor = search_service.search_fleet(fleet)
+                assert no_cursor is None
+                assert walked == full
+            other = [FleetVehicle(length=100, quantity=1)]
+            _, cursor = search_service.search_fleet(fleet, 1)
+            if cursor is not None:
+                try:
+                    search_service.search_fleet(other, 1, cursor)
+                    raise AssertionError("A cursor of another fleet was accepted")
+                except ValueError:
+                    pass
+    print(f"✅ Fleet pagination passed - {pages} pages walked")
+
+def test_fleet_validation():
+    """Fleets are bounded by fleet_max_vehicles, not max_vehicles_per_request"""
+    print("Testing fleet validation...")
+    search_service = SearchService(ListingService("listings.json", storage_backend="json"))
+    search_service.validate_fleet_quantities([settings.fleet_max_vehicles - 1, 1])
+    for quantities in ([], [settings.fleet_max_vehicles, 1]):
+        try:
+            search_service.validate_fleet_quantities(quantities)
+            raise AssertionError(f"Quantities {quantities} were accepted")
+        except ValueError:
+            pass
+    fleet = [FleetVehicle(length=12, quantity=200), FleetVehicle(length=20, quantity=100), FleetVehicle(length=95, quantity=1)]
+    assert search_service.fleet_blocks(fleet) == [(100, 1), (20, 300)]
+    print("✅ Fleet validation passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting fleet search tests...\n")
+
+    try:
+        test_blocks_match_per_vehicle_packing()
+        print()
+
+        test_fleet_search_matches_search_rows()
+        print()
+
+        test_fleet_pagination_and_cache()
+        print()
+
+        test_fleet_validation()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
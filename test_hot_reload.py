@@ -0,0 +1,170 @@
+"""
+Hot reload: only changed locations are rebuilt, and the new snapshot is swapped in atomically under concurrent searches
+"""
+
+import json
+import os
+import random
+import tempfile
+import threading
+
+from app.models.vehicle import Vehicle
+from app.services.listing_reloader import ListingReloader
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from tests.helpers import random_records, random_sizes, reloaded_records
+
+RECORDS = [
+    {"id": "a1", "location_id": "loc-a", "length": 20, "width": 10, "price_in_cents": 100},
+    {"id": "b1", "location_id": "loc-b", "length": 50, "width": 20, "price_in_cents": 500},
+    {"id": "b2", "location_id": "loc-b", "length": 30, "width": 10, "price_in_cents": 200},
+    {"id": "c1", "location_id": "loc-c", "length": 100, "width": 10, "price_in_cents": 900},
+]
+
+def write_records(path, records):
+    with open(path, "w") as f:
+        json.dump(records, f)
+
+def test_reload_rebuilds_changed_locations():
+    """Unchanged files are not reloaded; a reload reuses every location whose listings are the same"""
+    print("Testing the reload diff...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        write_records(path, RECORDS)
+        listing_service = ListingService(path, storage_backend="json")
+        first = listing_service.get_snapshot()
+        assert (first.version, first.reused_locations, first.changed_locations) == (1, 0, 3)
+        assert listing_service.reload() is False and listing_service.get_snapshot() is first
+
+        # loc-a dropped, loc-b repriced, loc-c kept, loc-d added
+        records = [dict(RECORDS[1], price_in_cents=450), RECORDS[2], RECORDS[3],
+                   {"id": "d1", "location_id": "loc-d", "length": 40, "width": 40, "price_in_cents": 300}]
+        write_records(path, records)
+        assert listing_service.reload() is True
+        second = listing_service.get_snapshot()
+        assert second.version == 2 and listing_service.dataset_version == 2
+        assert (second.reused_locations, second.changed_locations) == (1, 2)
+        assert second.describe()["reused_locations"] == 1 and second.describe()["changed_locations"] == 2
+        assert list(second.store.location_ids) == ["loc-b", "loc-c", "loc-d"]
+        assert second.stats.summary["total_listings"] == 4
+
+        # The replaced snapshot is left exactly as it was
+        assert list(first.store.location_ids) == ["loc-a", "loc-b", "loc-c"]
+        assert first.stats.summary["total_listings"] == 4 and first.store.prices.tolist() == [100, 500, 200, 900]
+
+        assert listing_service.reload(force=True) is True
+        third = listing_service.get_snapshot()
+        assert third.version == 3 and (third.reused_locations, third.changed_locations) == (3, 0)
+
+        # Moving loc-c's only listing to loc-b changes loc-b and drops loc-c
+        records[2] = dict(records[2], location_id="loc-b")
+        write_records(path, records)
+        assert listing_service.reload() is True
+        fourth = listing_service.get_snapshot()
+        assert (fourth.reused_locations, fourth.changed_locations) == (1, 1)
+        assert list(fourth.store.location_ids) == ["loc-b", "loc-d"]
+    print("✅ Reload diff passed")
+
+def test_reloader_keeps_serving_through_bad_files():
+    """A file that fails to parse is counted and skipped; the next good one is swapped in"""
+    print("Testing the background reloader...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        write_records(path, RECORDS)
+        listing_service = ListingService(path, storage_backend="json")
+        snapshot = listing_service.get_snapshot()
+        reloader = ListingReloader(listing_service, 60)
+        assert reloader.check() is False
+
+        with open(path, "w") as f:
+            f.write('[{"id": "a1", "location_id"')
+        assert reloader.check() is False
+        assert reloader.failures == 1 and reloader.last_error
+        assert listing_service.get_snapshot() is snapshot and listing_service.dataset_version == 1
+
+        write_records(path, RECORDS[:2])
+        assert reloader.check() is True
+        assert reloader.stats()["reloads"] == 1 and len(listing_service.get_snapshot().store) == 2
+    print("✅ Background reloader passed")
+
+def test_swap_under_concurrent_searches():
+    """Searches racing reloads always see one whole dataset version, never a mix of two"""
+    print("Testing atomic snapshot swaps under concurrent searches...")
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        datasets = [random_records(rng, 40, 300)]
+        datasets.append(reloaded_records(rng, datasets[0], "b"))
+        queries = [[Vehicle(length=length, quantity=1) for length in random_sizes(rng)] for _ in range(8)]
+
+        # Results of every query on each dataset, from services that never reload
+        expected = {}
+        for i, records in enumerate(datasets):
+            path = os.path.join(tmp, f"expected-{i}.json")
+            write_records(path, records)
+            listing_service = ListingService(path, storage_backend="json")
+            search_service = SearchService(listing_service)
+            expected[listing_service.get_dataset_hash()] = [search_service.search_locations(q) for q in queries]
+        assert len(expected) == 2
+
+        path = os.path.join(tmp, "listings.json")
+        write_records(path, datasets[0])
+        listing_service = ListingService(path, storage_backend="json")
+        search_service = SearchService(listing_service)
+        listing_service.get_snapshot()
+        stop = threading.Event()
+        seen, errors = set(), []
+
+        def search():
+            last_version = 0
+            try:
+                while not stop.is_set():
+                    for i, query in enumerate(queries):
+                        snapshot = listing_service.get_snapshot()
+                        assert snapshot.version >= last_version
+                        last_version = snapshot.version
+                        # Everything read off one snapshot belongs to the same dataset
+                        assert len(snapshot.store) == snapshot.stats.listing_count
+                        results = search_service.search_locations(query)
+                        assert any(results == by_dataset[i] for by_dataset in expected.values()), query
+                        seen.add(snapshot.dataset_hash)
+            except AssertionError as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=search) for _ in range(3)]
+        for reader in readers:
+            reader.start()
+        try:
+            for reload_number in range(1, 41):
+                write_records(path, datasets[reload_number % 2])
+                assert listing_service.reload() is True
+        finally:
+            stop.set()
+            for reader in readers:
+                reader.join()
+        assert not errors, errors[0]
+        assert seen == set(expected)
+        assert listing_service.dataset_version == 41
+    print("✅ Atomic swap passed - 40 reloads under 3 concurrent searchers")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting hot reload tests...\n")
+
+    try:
+        test_reload_rebuilds_changed_locations()
+        print()
+
+        test_reloader_keeps_serving_through_bad_files()
+        print()
+
+        test_swap_under_concurrent_searches()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,149 @@
+"""
+Lane tables must open exactly the listings the per-call orientation scan opens, in the same order
+"""
+
+import os
+import random
+import tempfile
+
+from app.models.listing_store import ListingStore
+from app.services.listing_snapshot import ListingSnapshot
+from app.utils.bin_packing import BinPackingAlgorithm
+from app.utils.compiled_listings import CompiledListings, write_compiled_listings
+from app.utils.capacity_index import LocationCapacityIndex
+from app.utils.lane_tables import LaneTables
+from tests.helpers import random_records, random_sizes, reloaded_records
+
+def random_store(rng):
+    return ListingStore.from_records(random_records(rng))
+
+def scan_rows(store, location, sizes):
+    """Reference: the per-call scan over the location's columns, in store rows"""
+    start, end = store.location_range(location)
+    rows = BinPackingAlgorithm.find_optimal_rows(
+        sizes,
+        store.lengths[start:end].tolist(),
+        store.widths[start:end].tolist(),
+        store.prices[start:end].tolist(),
+    )
+    return [start + row for row in rows]
+
+def test_lane_tables_match_scan():
+    """Lane tables pick the same listings, in the same order, on randomized inputs"""
+    print("Testing lane tables against the orientation scan...")
+    rng = random.Random(1)
+    checks = 0
+    for _ in range(200):
+        store = random_store(rng)
+        tables = LaneTables.from_store(store)
+        for _ in range(20):
+            sizes = random_sizes(rng, 25)
+            for location in range(store.location_count):
+                expected = scan_rows(store, location, sizes)
+                assert tables.find_optimal_rows(location, sizes) == expected, (location, sizes)
+                packed = tables.pack(location, sizes)
+                if expected:
+                    assert packed == (expected, int(store.prices[expected].sum()))
+                else:
+                    assert packed is None
+                checks += 1
+    print(f"✅ Lane tables passed - {checks} location/query pairs identical")
+
+def test_pruned_lane_tables_match_scan():
+    """Lane tables cut to a depth still match the scan for queries of up to that many vehicles"""
+    print("Testing depth-capped lane tables against the orientation scan...")
+    rng = random.Random(2)
+    checks = 0
+    pruned_entries = 0
+    for _ in range(200):
+        store = random_store(rng)
+        depth = rng.randint(1, 6)
+        tables = LaneTables.from_store(store, depth)
+        pruned_entries += tables.pruning["pruned_entries"]
+        for _ in range(20):
+            sizes = random_sizes(rng, depth)
+            for location in range(store.location_count):
+                assert tables.find_optimal_rows(location, sizes) == scan_rows(store, location, sizes), (location, sizes)
+                checks += 1
+        assert not tables.covers(depth + 1)
+        try:
+            tables.find_optimal_rows(0, [10] * (depth + 1))
+            assert False, "deeper queries must be refused"
+        except ValueError:
+            pass
+    assert pruned_entries > 0
+    print(f"✅ Pruned lane tables passed - {checks} location/query pairs identical, {pruned_entries} entries pruned")
+
+def test_compiled_lane_tables():
+    """Lane tables read back from a compiled listings file match freshly built ones"""
+    print("Testing compiled lane tables...")
+    rng = random.Random(3)
+    store = random_store(rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.bin")
+        built = LaneTables.from_store(store, 5)
+        write_compiled_listings(path, store, LocationCapacityIndex.from_store(store), {"dataset_hash": "test"}, built)
+        compiled = CompiledListings(path)
+        mapped = compiled.store()
+        tables = compiled.lane_tables(mapped)
+        assert tables.depth == 5 and tables.pruning == built.pruning
+        for _ in range(50):
+            sizes = random_sizes(rng, 5)
+            for location in range(store.location_count):
+                assert tables.pack(location, sizes) == built.pack(location, sizes)
+                assert mapped.find_location(store.location_ids[location]) == location
+        assert mapped.find_location("missing") is None
+        del tables, mapped, compiled
+    print("✅ Compiled lane tables passed")
+
+def test_reloaded_lane_tables_match_rebuild():
+    """A reload that reuses the unchanged locations' entries gives the tables built from scratch"""
+    print("Testing lane tables carried across reloads...")
+    rng = random.Random(4)
+    reloads = reused = 0
+    for _ in range(100):
+        depth = rng.choice([None, rng.randint(1, 6)])
+        records = random_records(rng)
+        snapshot = ListingSnapshot.build(ListingStore.from_records(records), 1, "", lane_depth=depth)
+        for version in range(2, 6):
+            records = reloaded_records(rng, records, version)
+            store = ListingStore.from_records(records)
+            snapshot = ListingSnapshot.build(store, version, "", previous=snapshot, lane_depth=depth)
+            tables, expected = snapshot.lane_tables, LaneTables.from_store(store, depth)
+            for name in ("rows", "lanes", "limits", "offsets"):
+                assert getattr(tables, name).tolist() == getattr(expected, name).tolist(), name
+            assert tables.depth == depth and tables.pruning == expected.pruning
+            for _ in range(5):
+                sizes = random_sizes(rng, depth or 8)
+                for location in range(store.location_count):
+                    assert tables.pack(location, sizes) == expected.pack(location, sizes)
+            reloads += 1
+            reused += snapshot.reused_locations
+    assert reused > 0
+    print(f"✅ Reloaded lane tables passed - {reloads} reloads identical to a rebuild, {reused} locations reused")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting lane table tests...\n")
+
+    try:
+        test_lane_tables_match_scan()
+        print()
+
+        test_pruned_lane_tables_match_scan()
+        print()
+
+        test_compiled_lane_tables()
+        print()
+
+        test_reloaded_lane_tables_match_rebuild()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,231 @@
+"""
+Listing upserts and deletes: a snapshot with changes applied must search and aggregate like one rebuilt from the changed dataset
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from app.config.settings import settings
+from app.models.listing import Listing
+from app.models.listing_store import ListingStore
+from app.models.vehicle import Vehicle
+from app.services.listing_service import ListingService
+from app.services.listing_snapshot import ListingSnapshot
+from app.services.search_service import SearchService
+from app.utils.sqlite_listings import write_sqlite_listings
+from tests.helpers import random_record, random_records, random_sizes
+
+# Change batches applied to each random dataset
+ROUNDS = 8
+
+def random_changes(rng, groups, next_id):
+    """Deletes (some unknown) and upserts (replacements, moves, new listings and new locations)"""
+    known = [record["id"] for records in groups.values() for record in records]
+    deletes = rng.sample(known, min(len(known), rng.randint(0, 6)))
+    if rng.random() < 0.3:
+        deletes.append("no-such-listing")
+    upserts = []
+    location_count = len(groups) + 3
+    for _ in range(rng.randint(0, 8)):
+        if known and rng.random() < 0.5:
+            listing_id = rng.choice(known)
+        else:
+            listing_id = f"new-{next_id}"
+            next_id += 1
+        record = random_record(rng, listing_id, location_count)
+        if rng.random() < 0.3:
+            record["location_id"] = f"fresh-{rng.randrange(3)}"
+        upserts.append(Listing(**record))
+    return deletes, upserts, next_id
+
+def apply_reference(groups, deletes, upserts):
+    """The documented semantics on plain dictionaries: location -> records, in order"""
+    def remove(listing_id):
+        for records in groups.values():
+            records[:] = [record for record in records if record["id"] != listing_id]
+
+    for listing_id in deletes:
+        remove(listing_id)
+    for listing in upserts:
+        record = listing.model_dump()
+        records = groups.setdefault(listing.location_id, [])
+        for position, existing in enumerate(records):
+            if existing["id"] == listing.id:
+                records[position] = record
+                break
+        else:
+            remove(listing.id)
+            records.append(record)
+
+def rebuilt(groups):
+    records = [record for records in groups.values() for record in records]
+    return ListingSnapshot.build(ListingStore.from_records(records), version=0, dataset_hash="", lane_depth=5)
+
+def named(store, rows):
+    return [
+        (store.location_ids[location], [store.ids[row] for row in listing_rows], price)
+        for location, listing_rows, price in rows
+    ]
+
+def assert_equivalent(search_services, snapshot, reference, rng):
+    """Same searches, candidates, price bounds, top-k pages and aggregates as the rebuilt dataset"""
+    store, expected_store = snapshot.store, reference.store
+    assert len(store) == len(expected_store)
+    assert snapshot.stats.summary == reference.stats.summary
+    listed = sorted((listing.id, listing.location_id) for listing in store.listings())
+    assert listed == sorted((listing.id, listing.location_id) for listing in expected_store.listings())
+    for _ in range(6):
+        sizes = random_sizes(rng)
+        for search_service in search_services:
+            expected = named(expected_store, search_service.search_rows(sizes, reference))
+            assert named(store, search_service.search_rows(sizes, snapshot)) == expected, sizes
+            limit = rng.randint(1, 5)
+            assert named(store, search_service.search_top_rows(sizes, limit, None, snapshot)) == expected[:limit]
+
+        candidates = snapshot.capacity_index.candidate_locations(sizes)
+        expected_candidates = reference.capacity_index.candidate_locations(sizes)
+        assert sorted(store.location_ids[c] for c in candidates.tolist()) == \
+            sorted(expected_store.location_ids[c] for c in expected_candidates.tolist())
+        bounds = dict(zip(
+            (store.location_ids[c] for c in candidates.tolist()),
+            snapshot.capacity_index.price_lower_bounds(sizes, candidates).tolist(),
+        ))
+        expected_bounds = dict(zip(
+            (expected_store.location_ids[c] for c in expected_candidates.tolist()),
+            reference.capacity_index.price_lower_bounds(sizes, expected_candidates).tolist(),
+        ))
+        assert bounds == expected_bounds
+
+def run_trials(rng, make_service, trials):
+    """Apply random change batches through a ListingService, checking every version"""
+    checks = compactions = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(trials):
+            records = random_records(rng, 30, 200)
+            listing_service = make_service(tmp, records)
+            greedy = SearchService(listing_service, "greedy")
+            exact = SearchService(listing_service, "exact")
+            listing_service.get_snapshot()
+            groups = {}
+            for record in records:
+                groups.setdefault(record["location_id"], []).append(record)
+            next_id = 0
+            for _ in range(ROUNDS):
+                deletes, upserts, next_id = random_changes(rng, groups, next_id)
+                before = listing_service.dataset_version
+                report = listing_service.apply_changes(upserts, deletes)
+                missing = [listing_id for listing_id in deletes if not any(
+                    record["id"] == listing_id for records in groups.values() for record in records
+                )]
+                apply_reference(groups, deletes, upserts)
+                if report["compacted"]:
+                    compactions += 1
+                    # Emptied locations are forgotten; re-adding one appends it after the others
+                    groups = {location: records for location, records in groups.items() if records}
+                assert report["missing_ids"] == missing
+                assert (report["version"] > before) == (report["changed_locations"] > 0)
+                reference = rebuilt({location: records for location, records in groups.items() if records})
+                assert_equivalent([greedy, exact], listing_service.get_snapshot(), reference, rng)
+                checks += 1
+    return checks, compactions
+
+def json_service(tmp, records):
+    path = os.path.join(tmp, "listings.json")
+    with open(path, "w") as f:
+        json.dump(records, f)
+    return ListingService(path, storage_backend="json")
+
+def test_changes_match_rebuild():
+    """Overlaid snapshots search and aggregate exactly like the changed dataset built from scratch"""
+    print("Testing listing changes against rebuilt snapshots...")
+    checks, _ = run_trials(random.Random(1), json_service, 30)
+    print(f"✅ Listing changes passed - {checks} change batches identical to a rebuild")
+
+def test_compaction():
+    """Compacting keeps the version and the contents, and drops emptied locations"""
+    print("Testing overlay compaction...")
+    limit = settings.listing_compaction_locations
+    settings.listing_compaction_locations = 3
+    try:
+        checks, compactions = run_trials(random.Random(2), json_service, 10)
+    finally:
+        settings.listing_compaction_locations = limit
+    assert compactions > 0
+    print(f"✅ Compaction passed - {checks} change batches identical to a rebuild, {compactions} compactions")
+
+def test_changes_over_sqlite():
+    """Changes layer over the on-demand SQLite store the same way"""
+    print("Testing listing changes over the SQLite backend...")
+    database_path = settings.sqlite_database_path
+
+    def sqlite_service(tmp, records):
+        snapshot = ListingSnapshot.build(ListingStore.from_records(records), version=1, dataset_hash="test")
+        path = os.path.join(tmp, "listings.db")
+        write_sqlite_listings(path, snapshot.store, snapshot.capacity_index, snapshot.stats, {"dataset_hash": "test"})
+        settings.sqlite_database_path = path
+        return ListingService(storage_backend="sqlite")
+
+    try:
+        checks, _ = run_trials(random.Random(3), sqlite_service, 10)
+    finally:
+        settings.sqlite_database_path = database_path
+    print(f"✅ SQLite overlay passed - {checks} change batches identical to a rebuild")
+
+def test_cached_results_carry_over():
+    """Cached results survive changes elsewhere and are never served stale"""
+    print("Testing result cache carry-over...")
+    rng = random.Random(4)
+    carried = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(30):
+            records = random_records(rng, 30, 200)
+            listing_service = json_service(tmp, records)
+            search_service = SearchService(listing_service)
+            queries = [[{"length": rng.randint(1, 100), "quantity": 1}] for _ in range(5)]
+            groups = {}
+            for record in records:
+                groups.setdefault(record["location_id"], []).append(record)
+            next_id = 0
+            for _ in range(ROUNDS):
+                for query in queries:
+                    search_service.search_locations([Vehicle(**vehicle) for vehicle in query])
+                deletes, upserts, next_id = random_changes(rng, groups, next_id)
+                listing_service.apply_changes(upserts, deletes)
+                apply_reference(groups, deletes, upserts)
+                reference = rebuilt({location: records for location, records in groups.items() if records})
+                for query in queries:
+                    sizes = search_service.vehicle_sizes([Vehicle(**vehicle) for vehicle in query])
+                    results = search_service.search_locations([Vehicle(**vehicle) for vehicle in query])
+                    expected = named(reference.store, search_service.search_rows(sizes, reference))
+                    assert [(r.location_id, r.listing_ids, r.total_price_in_cents) for r in results] == expected
+            carried += search_service.result_cache.carried_over
+    assert carried > 0
+    print(f"✅ Cache carry-over passed - {carried} cached results kept across changes")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting listing change tests...\n")
+
+    try:
+        test_changes_match_rebuild()
+        print()
+
+        test_compaction()
+        print()
+
+        test_changes_over_sqlite()
+        print()
+
+        test_cached_results_carry_over()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,129 @@
+"""
+/metrics: counters and histograms must render in the Prometheus text format and count every timed request
+"""
+
+import random
+
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.utils.metrics import LATENCY_BUCKETS, TIMED_PATHS, MetricsRegistry
+
+def parse_samples(text):
+    """``{'name{labels}': value}`` for every sample line, checking each family has its HELP and TYPE first"""
+    samples, declared = {}, set()
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            declared.add(line.split()[2])
+        elif line.startswith("# TYPE "):
+            assert line.split()[2] in declared, line
+        else:
+            name, value = line.rsplit(" ", 1)
+            family = name.split("{", 1)[0]
+            assert any(family == base or family == base + suffix for base in declared
+                       for suffix in ("_bucket", "_sum", "_count")), line
+            samples[name] = float(value)
+    return samples
+
+def check_histogram(samples, name, labels=""):
+    """Buckets are cumulative and end in +Inf, which is ``_count``; returns (count, sum)"""
+    prefix = labels + "," if labels else ""
+    bounds = [repr(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]
+    counts = [samples[f'{name}_bucket{{{prefix}le="{bound}"}}'] for bound in bounds]
+    assert counts == sorted(counts), (name, labels)
+    suffix = "{" + labels + "}" if labels else ""
+    assert counts[-1] == samples[f"{name}_count{suffix}"]
+    return counts[-1], samples[f"{name}_sum{suffix}"]
+
+def test_registry_rendering():
+    """Observations land in the first bucket that holds them; _sum and _count follow the buckets"""
+    print("Testing metric rendering...")
+    rng = random.Random(1)
+    registry = MetricsRegistry()
+    counter = registry.counter("things_total", "Things").labels()
+    histogram = registry.histogram("wait_seconds", "Waits", ["kind"])
+    values = {kind: [rng.choice([0.0, 10.0, rng.uniform(0, 6)]) for _ in range(200)] for kind in ("a", "b")}
+    for kind, observed in values.items():
+        for value in observed:
+            histogram.labels(kind).observe(value)
+            counter.inc()
+
+    samples = parse_samples(registry.render())
+    assert samples["things_total"] == 400
+    for kind, observed in values.items():
+        count, total = check_histogram(samples, "wait_seconds", f'kind="{kind}"')
+        assert count == len(observed) and abs(total - sum(observed)) < 1e-9
+        for bound in LATENCY_BUCKETS:
+            # Prometheus buckets are upper-inclusive
+            expected = sum(value <= bound for value in observed)
+            assert samples[f'wait_seconds_bucket{{kind="{kind}",le="{bound!r}"}}'] == expected, (kind, bound)
+    print("✅ Metric rendering passed")
+
+def test_metrics_endpoint():
+    """Every timed path's requests are counted once; search counters and dataset gauges are exported"""
+    print("Testing /metrics...")
+    rng = random.Random(2)
+    names = ("listings_file_path", "hot_reload_enabled", "warmup_enabled", "fast_search_enabled")
+    saved = {name: getattr(settings, name) for name in names}
+    settings.listings_file_path, settings.hot_reload_enabled, settings.warmup_enabled = "listings.json", False, False
+    from app.main import app
+    import app.main as main
+    try:
+        with TestClient(app) as client:
+            response = client.get("/metrics")
+            assert response.status_code == 200
+            assert response.headers["content-type"] == MetricsRegistry.CONTENT_TYPE + "; charset=utf-8"
+            before = parse_samples(response.text)
+
+            sent = dict.fromkeys(TIMED_PATHS, 0)
+            searches = 0
+            for _ in range(30):
+                query = [{"length": rng.randint(1, 100), "quantity": 1} for _ in range(rng.randint(1, 3))]
+                path = rng.choice(TIMED_PATHS)
+                # Both /search routes: the fast path and the pydantic route
+                settings.fast_search_enabled = rng.random() < 0.5
+                body = [query] if path == "/search/batch" else query
+                assert client.post(path, json=body).status_code == 200
+                sent[path] += 1
+                searches += path == "/search"
+            assert all(sent.values())
+            client.get("/health")
+
+            samples = parse_samples(client.get("/metrics").text)
+            for path, count in sent.items():
+                labels = f'path="{path}"'
+                total, seconds = check_histogram(samples, "http_request_duration_seconds", labels)
+                assert total - before[f"http_request_duration_seconds_count{{{labels}}}"] == count, path
+                assert seconds > before[f"http_request_duration_seconds_sum{{{labels}}}"]
+            assert not any('path="/health"' in name for name in samples)
+
+            assert samples["search_queries_total"] - before["search_queries_total"] >= searches
+            validated, _ = check_histogram(samples, "search_stage_duration_seconds", 'stage="request_validation"')
+            assert validated - before['search_stage_duration_seconds_count{stage="request_validation"}'] == 30
+            store = main.search_controller.search_service.listing_service.get_snapshot().store
+            assert samples["dataset_listings"] == len(store)
+            assert samples["dataset_locations"] == store.location_count
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+    print(f"✅ /metrics passed - {sent}")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting metrics tests...\n")
+
+    try:
+        test_registry_rendering()
+        print()
+
+        test_metrics_endpoint()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,167 @@
+"""
+Cursor pagination: pages must add up to the unpaged results, and cursors must expire with the dataset version
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.models.listing import Listing
+from app.models.vehicle import Vehicle
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from tests.helpers import random_records
+
+def random_vehicles(rng):
+    return [Vehicle(length=rng.randint(1, 100), quantity=1) for _ in range(rng.randint(1, 5))]
+
+def walk(search_service, vehicles, limit):
+    """Every page of a search, following cursors until the last page"""
+    results, cursor = [], None
+    while True:
+        page, cursor = search_service.search_page(vehicles, limit, cursor)
+        assert len(page) <= limit and (cursor is None or len(page) == limit)
+        results.extend(page)
+        if cursor is None:
+            return results
+
+def expect_expired(search_service, vehicles, limit, cursor):
+    try:
+        search_service.search_page(vehicles, limit, cursor)
+        raise AssertionError("An expired cursor was accepted")
+    except ValueError as e:
+        assert "expired" in str(e)
+
+def test_pages_concatenate_to_full_results():
+    """Pages walked from the live search or sliced from cached results add up to search_locations"""
+    print("Testing that pages concatenate to the full results...")
+    rng = random.Random(1)
+    pages = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        for _ in range(30):
+            with open(path, "w") as f:
+                json.dump(random_records(rng), f)
+            search_service = SearchService(ListingService(path, storage_backend="json"), rng.choice(["greedy", "exact"]))
+            for _ in range(5):
+                vehicles = random_vehicles(rng)
+                limit = rng.randint(1, 7)
+                search_service.result_cache.clear()
+                # Cold: every page comes from the top-k search
+                walked = walk(search_service, vehicles, limit)
+                full = search_service.search_locations(vehicles)
+                assert walked == full, vehicles
+                # Warm: pages are sliced from the cached full results
+                assert walk(search_service, vehicles, limit) == full
+                pages += 2 * (len(full) // limit + 1)
+    print(f"✅ Page concatenation passed - about {pages} pages walked")
+
+def test_cursor_expires_on_reload():
+    """A reload that swaps in new listings rejects older cursors; one that changes nothing does not"""
+    print("Testing cursor expiry on reload...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        with open("listings.json") as f:
+            records = json.load(f)
+        with open(path, "w") as f:
+            json.dump(records, f)
+        listing_service = ListingService(path, storage_backend="json")
+        search_service = SearchService(listing_service)
+        vehicles = [Vehicle(length=10, quantity=1)]
+        _, cursor = search_service.search_page(vehicles, 5)
+        assert cursor is not None
+
+        assert listing_service.reload() is False
+        search_service.search_page(vehicles, 5, cursor)
+
+        with open(path, "w") as f:
+            json.dump(records[1:], f)
+        assert listing_service.reload() is True
+        expect_expired(search_service, vehicles, 5, cursor)
+        # A new walk over the reloaded dataset works again
+        assert walk(search_service, vehicles, 50) == search_service.search_locations(vehicles)
+    print("✅ Cursor expiry on reload passed")
+
+def test_cursor_expires_on_listing_changes():
+    """Applied listing changes reject older cursors; a batch that changes nothing does not"""
+    print("Testing cursor expiry on listing changes...")
+    listing_service = ListingService("listings.json", storage_backend="json")
+    search_service = SearchService(listing_service)
+    vehicles = [Vehicle(length=10, quantity=1)]
+    _, cursor = search_service.search_page(vehicles, 5)
+
+    report = listing_service.apply_changes(deletes=["no-such-listing"])
+    assert report["changed_locations"] == 0
+    search_service.search_page(vehicles, 5, cursor)
+
+    listing = listing_service.get_snapshot().store.listing(0)
+    listing_service.apply_changes(upserts=[Listing(**dict(listing.model_dump(), price_in_cents=1))])
+    expect_expired(search_service, vehicles, 5, cursor)
+    print("✅ Cursor expiry on listing changes passed")
+
+def test_api_pages_concatenate():
+    """/search pages followed through X-Next-Cursor add up to the unpaged /search body; stale cursors get a 400"""
+    print("Testing /search pagination...")
+    rng = random.Random(2)
+    listings_file_path, hot_reload_enabled = settings.listings_file_path, settings.hot_reload_enabled
+    settings.listings_file_path, settings.hot_reload_enabled = "listings.json", False
+    from app.main import app
+    import app.main as main
+    try:
+        with TestClient(app) as client:
+            for _ in range(20):
+                body = [vehicle.model_dump() for vehicle in random_vehicles(rng)]
+                full = client.post("/search", json=body)
+                assert full.status_code == 200 and "x-next-cursor" not in full.headers
+                limit = rng.randint(1, 40)
+                walked, cursor = [], None
+                while True:
+                    params = {"limit": limit} if cursor is None else {"limit": limit, "cursor": cursor}
+                    page = client.post("/search", params=params, json=body)
+                    assert page.status_code == 200
+                    walked.extend(page.json())
+                    cursor = page.headers.get("x-next-cursor")
+                    if cursor is None:
+                        break
+                assert walked == full.json(), body
+
+            body = [{"length": 10, "quantity": 1}]
+            cursor = client.post("/search", params={"limit": 3}, json=body).headers["x-next-cursor"]
+            listing_service = main.search_controller.listing_service
+            listing = listing_service.get_snapshot().store.listing(0)
+            listing_service.apply_changes(upserts=[Listing(**dict(listing.model_dump(), price_in_cents=2))])
+            stale = client.post("/search", params={"limit": 3, "cursor": cursor}, json=body)
+            assert stale.status_code == 400 and "expired" in stale.json()["detail"]
+    finally:
+        settings.listings_file_path, settings.hot_reload_enabled = listings_file_path, hot_reload_enabled
+    print("✅ /search pagination passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting pagination tests...\n")
+
+    try:
+        test_pages_concatenate_to_full_results()
+        print()
+
+        test_cursor_expires_on_reload()
+        print()
+
+        test_cursor_expires_on_listing_changes()
+        print()
+
+        test_api_pages_concatenate()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,119 @@
+"""
+Profiling hooks: off (403) without a configured token, 401 without the right bearer token, and a debug trace per search
+"""
+
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.utils.metrics import SEARCH_STAGES
+from app.utils.profiling import TRACED_COUNTERS
+
+TOKEN = "profiling-secret"
+QUERY = [{"length": 10, "quantity": 1}, {"length": 20, "quantity": 2}]
+
+def with_app_settings(test):
+    """Run a test against the app on listings.json, restoring the settings it changes"""
+    def run():
+        names = ("listings_file_path", "hot_reload_enabled", "warmup_enabled", "profiling_api_token")
+        saved = {name: getattr(settings, name) for name in names}
+        settings.listings_file_path, settings.hot_reload_enabled, settings.warmup_enabled = "listings.json", False, False
+        try:
+            test()
+        finally:
+            for name, value in saved.items():
+                setattr(settings, name, value)
+    run.__name__, run.__doc__ = test.__name__, test.__doc__
+    return run
+
+def gated_requests(client, headers):
+    """One request to each token-gated profiling hook"""
+    return [
+        client.post("/admin/profile", params={"seconds": 0.05, "interval_ms": 5}, headers=headers),
+        client.get("/admin/memory", params={"top": 5}, headers=headers),
+        client.post("/search", params={"debug": "timings"}, json=QUERY, headers=headers),
+        client.post("/search", params={"debug": "profile"}, json=QUERY, headers=headers),
+    ]
+
+@with_app_settings
+def test_token_gating():
+    """403 while no token is configured; 401 for a missing, wrong or non-bearer token; 200 with the token"""
+    print("Testing profiling token gating...")
+    from app.main import app
+    with TestClient(app) as client:
+        settings.profiling_api_token = None
+        for response in gated_requests(client, {"Authorization": f"Bearer {TOKEN}"}):
+            assert response.status_code == 403, response.request.url
+            assert response.json()["detail"] == "Profiling is disabled"
+
+        settings.profiling_api_token = TOKEN
+        for headers in ({}, {"Authorization": "Bearer wrong"}, {"Authorization": f"Basic {TOKEN}"},
+                        {"Authorization": TOKEN}):
+            for response in gated_requests(client, headers):
+                assert response.status_code == 401, (response.request.url, headers)
+                assert response.json()["detail"] == "Invalid or missing bearer token"
+
+        responses = gated_requests(client, {"Authorization": f"Bearer {TOKEN}"})
+        assert [response.status_code for response in responses] == [200] * 4
+        profile, memory = responses[:2]
+        assert profile.headers["content-type"].startswith("text/plain")
+        assert int(profile.headers["X-Profile-Samples"]) >= 0 and int(profile.headers["X-Profile-Pid"]) > 0
+        assert set(memory.json()) == {"rss_bytes", "structures", "tracemalloc", "pid"}
+
+        # Plain searches never need the token
+        assert client.post("/search", json=QUERY).status_code == 200
+    print("✅ Token gating passed")
+
+@with_app_settings
+def test_debug_trace():
+    """A debug search returns the plain search's results with its stage timings, counts and profile"""
+    print("Testing debug search traces...")
+    from app.main import app
+    settings.profiling_api_token = TOKEN
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+    with TestClient(app) as client:
+        plain = client.post("/search", json=QUERY).json()
+        page = client.post("/search", params={"limit": 2}, json=QUERY)
+        for debug in ("timings", "profile"):
+            body = client.post("/search", params={"debug": debug}, json=QUERY, headers=headers).json()
+            assert set(body) == {"results", "next_cursor", "debug"}
+            assert body["results"] == plain and body["next_cursor"] is None
+            trace = body["debug"]
+            assert set(trace) == {"timings_ms", "counts", "dataset_version", "packing_solver", "profile"}
+            # Stages that ran, in pipeline order, request validation first
+            stages = list(trace["timings_ms"])
+            assert stages[0] == "request_validation" and stages == [s for s in SEARCH_STAGES if s in stages]
+            assert all(ms >= 0 for ms in trace["timings_ms"].values())
+            assert set(trace["counts"]) <= set(TRACED_COUNTERS) and trace["counts"]["searches"] == 1
+            assert trace["dataset_version"] == 1 and trace["packing_solver"] == settings.packing_solver
+            if debug == "timings":
+                assert trace["profile"] is None
+            else:
+                assert set(trace["profile"]) == {"total_calls", "profiled_ms", "functions"}
+                assert trace["profile"]["functions"] and len(trace["profile"]["functions"]) <= \
+                    settings.profiling_top_functions
+                assert set(trace["profile"]["functions"][0]) == {"function", "calls", "self_ms", "cumulative_ms"}
+
+        # Pages carry the cursor in the body instead of the header
+        body = client.post("/search", params={"debug": "timings", "limit": 2}, json=QUERY, headers=headers).json()
+        assert body["results"] == page.json() and body["next_cursor"] == page.headers.get("X-Next-Cursor")
+    print("✅ Debug trace passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting profiling tests...\n")
+
+    try:
+        test_token_gating()
+        print()
+
+        test_debug_trace()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
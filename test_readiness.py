@@ -0,0 +1,127 @@
+"""
+/ready: 503 while the startup warm-up runs or after it fails, 200 once it has finished or when it is disabled
+"""
+
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.services.listing_service import ListingService
+
+def with_app_settings(test):
+    """Run a test against the app on listings.json, restoring the settings it changes"""
+    def run():
+        names = ("listings_file_path", "hot_reload_enabled", "warmup_enabled", "warmup_queries")
+        saved = {name: getattr(settings, name) for name in names}
+        settings.listings_file_path, settings.hot_reload_enabled = "listings.json", False
+        try:
+            test()
+        finally:
+            for name, value in saved.items():
+                setattr(settings, name, value)
+    run.__name__, run.__doc__ = test.__name__, test.__doc__
+    return run
+
+def ready_gauge(client):
+    return [line for line in client.get("/metrics").text.splitlines() if line.startswith("ready ")]
+
+@with_app_settings
+def test_not_ready_until_warm():
+    """The warm-up is held at its dataset load: /ready is 503 until it is let go and finishes"""
+    print("Testing /ready during the warm-up...")
+    from app.main import app
+    import app.main as main
+    settings.warmup_enabled = True
+    settings.warmup_queries = [[{"length": 10, "quantity": 1}], [{"length": 25, "quantity": 2}]]
+    release = threading.Event()
+    get_snapshot = ListingService.get_snapshot
+
+    def held_get_snapshot(self):
+        if threading.current_thread().name == "warm-up":
+            assert release.wait(30), "warm-up never released"
+        return get_snapshot(self)
+
+    ListingService.get_snapshot = held_get_snapshot
+    try:
+        with TestClient(app) as client:
+            warmup = main.search_controller.warmup
+            for _ in range(3):
+                response = client.get("/ready")
+                assert response.status_code == 503
+                body = response.json()
+                assert body["status"] == "not_ready" and body["warmup"]["state"] in ("pending", "running")
+                assert body["warmup"]["duration_seconds"] is None
+            assert ready_gauge(client) == ["ready 0"]
+            # Liveness does not wait for the warm-up
+            assert client.get("/").status_code == 200
+
+            release.set()
+            assert warmup.wait(30)
+            response = client.get("/ready")
+            assert response.status_code == 200
+            body = response.json()
+            assert body["status"] == "ready" and body["warmup"]["state"] == "ready"
+            assert list(body["warmup"]["stage_seconds"]) == ["load", "indexes", "queries"]
+            assert body["warmup"]["queries"] == 2 and body["warmup"]["error"] is None
+            assert ready_gauge(client) == ["ready 1"]
+    finally:
+        ListingService.get_snapshot = get_snapshot
+        release.set()
+    print("✅ Warm-up readiness passed")
+
+@with_app_settings
+def test_failed_warmup_stays_not_ready():
+    """A warm-up query that fails validation leaves /ready at 503 with the error"""
+    print("Testing /ready after a failed warm-up...")
+    from app.main import app
+    import app.main as main
+    settings.warmup_enabled = True
+    settings.warmup_queries = [[{"length": 10, "quantity": 1}], [{"length": 0, "quantity": 1}]]
+    with TestClient(app) as client:
+        assert main.search_controller.warmup.wait(30)
+        response = client.get("/ready")
+        assert response.status_code == 503
+        body = response.json()
+        assert body["status"] == "not_ready" and body["warmup"]["state"] == "failed" and body["warmup"]["error"]
+        # Searches are still served
+        assert client.post("/search", json=[{"length": 10, "quantity": 1}]).status_code == 200
+    print("✅ Failed warm-up passed")
+
+@with_app_settings
+def test_ready_without_warmup():
+    """With the warm-up disabled the dataset loads lazily and /ready is 200 right away"""
+    print("Testing /ready with the warm-up disabled...")
+    from app.main import app
+    import app.main as main
+    settings.warmup_enabled = False
+    with TestClient(app) as client:
+        assert main.search_controller.warmup is None
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready" and response.json()["warmup"] is None
+        assert ready_gauge(client) == ["ready 1"]
+    print("✅ Disabled warm-up passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting readiness tests...\n")
+
+    try:
+        test_not_ready_until_warm()
+        print()
+
+        test_failed_warmup_stays_not_ready()
+        print()
+
+        test_ready_without_warmup()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
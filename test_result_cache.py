@@ -0,0 +1,210 @@
+"""
+Result cache: canonical keys, TTL and LRU eviction, invalidation with the dataset, and carry-over across listing changes
+"""
+
+import json
+import os
+import tempfile
+
+from app.models.listing import Listing
+from app.models.vehicle import Vehicle
+from app.services import search_service as search_module
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from app.utils.result_cache import ResultCache
+from app.utils.wire_formats import JSON_MEDIA_TYPE, RESULT_FIELDS
+
+# Three locations: a short, a medium and a long single-lane listing
+RECORDS = [
+    {"id": "a1", "location_id": "loc-a", "length": 20, "width": 10, "price_in_cents": 100},
+    {"id": "b1", "location_id": "loc-b", "length": 50, "width": 10, "price_in_cents": 500},
+    {"id": "c1", "location_id": "loc-c", "length": 100, "width": 10, "price_in_cents": 900},
+]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def json_services(tmp, records=RECORDS):
+    path = os.path.join(tmp, "listings.json")
+    with open(path, "w") as f:
+        json.dump(records, f)
+    listing_service = ListingService(path, storage_backend="json")
+    return listing_service, SearchService(listing_service)
+
+def vehicles(*lengths):
+    return [Vehicle(length=length, quantity=1) for length in lengths]
+
+def test_ttl_and_lru():
+    """Entries expire after the TTL and the least recently used one is evicted first"""
+    print("Testing result cache TTL and LRU eviction...")
+    clock = FakeClock()
+    cache = ResultCache(2, 10, clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.keys() == ["a", "c"] and cache.get("b") is None
+    assert (cache.evictions, cache.hits, cache.misses) == (1, 1, 1)
+    # Refreshing an entry restarts its TTL
+    clock.now = 6
+    cache.put("a", 4)
+    clock.now = 10
+    assert cache.get("c") is None and cache.get("a") == 4
+    assert cache.expirations == 1 and cache.keys() == ["a"]
+    clock.now = 16
+    assert cache.get("a") is None and len(cache) == 0
+    assert cache.stats()["expirations"] == 2
+
+    try:
+        ResultCache(0, 10)
+        raise AssertionError("A cache without room was created")
+    except ValueError:
+        pass
+    print("✅ TTL and LRU eviction passed")
+
+def test_rekey_keeps_expiry():
+    """Rekeyed entries keep their expiry time; dropped and unknown keys are handled"""
+    print("Testing result cache rekeying...")
+    clock = FakeClock()
+    cache = ResultCache(10, 10, clock)
+    cache.put((1, "kept"), "x")
+    cache.put((1, "dropped"), "y")
+    clock.now = 5
+    assert cache.rekey({(1, "kept"): (2, "kept"), (1, "dropped"): None, (1, "missing"): (2, "missing")}) == 1
+    assert cache.keys() == [(2, "kept")] and cache.carried_over == 1
+    clock.now = 10
+    assert cache.get((2, "kept")) is None and cache.expirations == 1
+    print("✅ Rekeying passed")
+
+def test_keys_are_canonical():
+    """Vehicle order, quantities and lengths that round to the same size share one entry"""
+    print("Testing result cache key canonicalization...")
+    with tempfile.TemporaryDirectory() as tmp:
+        _, search_service = json_services(tmp)
+        cache = search_service.result_cache
+        expected = search_service.search_locations(vehicles(11, 35))
+        assert len(cache) == 1 and cache.misses == 1
+        for same in (vehicles(35, 11), vehicles(40, 20), vehicles(20, 31), vehicles(33, 18)):
+            assert search_service.search_locations(same) == expected
+        assert len(cache) == 1 and cache.hits == 4
+
+        doubled = search_service.search_locations([Vehicle(length=15, quantity=2)])
+        assert search_service.search_locations(vehicles(20, 12)) == doubled
+        assert len(cache) == 2 and cache.hits == 5
+
+        # Encoded bodies are cached per media type and projection, under the same rounded sizes
+        body = search_service.search_json([(11, 1)])
+        assert search_service.search_json([(20, 1)]) == body
+        projected = search_service.search_json([(15, 1)], JSON_MEDIA_TYPE, ("location_id",))
+        keys = [key for key in cache.keys() if len(key) == 4]
+        assert sorted(key[3] for key in keys) == sorted([RESULT_FIELDS, ("location_id",)])
+        assert all(key[1] == (20,) for key in keys) and projected != body
+    print("✅ Key canonicalization passed")
+
+def test_invalidation():
+    """clear_cache, a reload that changes the dataset and applied listing changes never serve earlier results"""
+    print("Testing result cache invalidation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        listing_service, search_service = json_services(tmp)
+        cache = search_service.result_cache
+        query = vehicles(10)
+
+        def prices():
+            return [result.total_price_in_cents for result in search_service.search_locations(query)]
+
+        assert prices() == [100, 500, 900] and len(cache) == 1
+        listing_service.clear_cache()
+        assert len(cache) == 0 and cache.invalidations == 1
+        assert prices() == [100, 500, 900]
+
+        # A reload that finds the file unchanged keeps the entries
+        assert listing_service.reload() is False and len(cache) == 1
+        records = [dict(RECORDS[0], price_in_cents=700)] + RECORDS[1:]
+        with open(os.path.join(tmp, "listings.json"), "w") as f:
+            json.dump(records, f)
+        assert listing_service.reload() is True
+        assert len(cache) == 0 and cache.invalidations == 2
+        assert prices() == [500, 700, 900]
+
+        listing_service.apply_changes(upserts=[Listing(**dict(RECORDS[1], price_in_cents=800))])
+        assert all(key[0] == listing_service.dataset_version for key in cache.keys())
+        assert prices() == [700, 800, 900]
+    print("✅ Invalidation passed")
+
+def test_carry_over_rekeys_unaffected_entries():
+    """Entries whose results the changed locations cannot alter move to the new version, the rest are dropped"""
+    print("Testing result cache carry-over rekeying...")
+    with tempfile.TemporaryDirectory() as tmp:
+        listing_service, search_service = json_services(tmp)
+        cache = search_service.result_cache
+        # Only loc-c holds 100 ft; loc-b and loc-c hold 50 ft
+        long_only = search_service.search_locations(vehicles(100))
+        long_body = search_service.search_json([(100, 1)])
+        search_service.search_locations(vehicles(50))
+        search_service.search_fleet([Vehicle(length=100, quantity=1)])
+        version = listing_service.dataset_version
+
+        listing_service.apply_changes(upserts=[Listing(**dict(RECORDS[1], price_in_cents=600))])
+        new_version = listing_service.dataset_version
+        assert new_version == version + 1
+        assert sorted(map(repr, cache.keys())) == sorted(map(repr, [
+            (new_version, (100,)),
+            (new_version, (100,), JSON_MEDIA_TYPE, RESULT_FIELDS),
+            (new_version, ((100, 1),), "fleet"),
+        ]))
+        assert cache.carried_over == 3
+        hits = cache.hits
+        assert search_service.search_locations(vehicles(100)) == long_only
+        assert search_service.search_json([(100, 1)]) == long_body
+        assert cache.hits == hits + 2
+        assert [r.total_price_in_cents for r in search_service.search_locations(vehicles(50))] == [600, 900]
+
+        # A change that does alter a cached query drops it
+        listing_service.apply_changes(upserts=[Listing(**dict(RECORDS[2], price_in_cents=950))])
+        assert all(key[1] != (100,) for key in cache.keys())
+        assert [r.total_price_in_cents for r in search_service.search_locations(vehicles(100))] == [950]
+
+        # Past the packing budget the cache is cleared instead
+        budget = search_module.CARRY_OVER_PACK_BUDGET
+        search_module.CARRY_OVER_PACK_BUDGET = 0
+        try:
+            invalidations = cache.invalidations
+            listing_service.apply_changes(upserts=[Listing(**dict(RECORDS[0], price_in_cents=150))])
+            assert len(cache) == 0 and cache.invalidations == invalidations + 1
+        finally:
+            search_module.CARRY_OVER_PACK_BUDGET = budget
+    print("✅ Carry-over rekeying passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting result cache tests...\n")
+
+    try:
+        test_ttl_and_lru()
+        print()
+
+        test_rekey_keeps_expiry()
+        print()
+
+        test_keys_are_canonical()
+        print()
+
+        test_invalidation()
+        print()
+
+        test_carry_over_rekeys_unaffected_entries()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,158 @@
+"""
+Admission control: a saturated search executor sheds searches with 429 or 503 and a Retry-After header
+"""
+
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.utils.search_executor import SearchExecutor, SearchRejected
+
+QUERY = [{"length": 10, "quantity": 1}]
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the executor"
+        time.sleep(0.005)
+
+def gated(gate, calls, search=None):
+    """A search function that blocks until ``gate`` is set, then runs ``search`` (or returns its arguments)"""
+    def blocked(*args):
+        calls.append(args)
+        gate.wait(10)
+        return search(*args) if search is not None else args
+    return blocked
+
+def test_executor_sheds_load():
+    """Full queue is 429, a predicted or actual missed deadline is 503, and shed searches never run"""
+    print("Testing search executor admission control...")
+
+    async def scenario():
+        executor = SearchExecutor(1, 2, 0.2)
+        gate, calls = threading.Event(), []
+        search = gated(gate, calls)
+        try:
+            running = asyncio.ensure_future(executor.run(search, "running"))
+            await asyncio.sleep(0.05)
+            queued = asyncio.ensure_future(executor.run(search, "queued"))
+            await asyncio.sleep(0.05)
+            assert (executor.in_flight, executor.queued) == (1, 1)
+
+            # Two searches ahead on one thread at 0.1s each would start past the 0.2s deadline
+            executor.average_search_seconds = 0.1
+            try:
+                await executor.run(search, "predicted")
+                raise AssertionError("A search that cannot start in time was admitted")
+            except SearchRejected as e:
+                assert (e.status_code, e.reason) == (503, "deadline")
+            executor.average_search_seconds = 0.0
+            late = asyncio.ensure_future(executor.run(search, "late"))
+            await asyncio.sleep(0.05)
+            try:
+                await executor.run(search, "full")
+                raise AssertionError("A search was admitted past the queue limit")
+            except SearchRejected as e:
+                assert (e.status_code, e.reason) == (429, "queue_full")
+
+            # Hold the thread past the deadline of both queued searches
+            await asyncio.sleep(0.25)
+            gate.set()
+            assert await running == ("running",)
+            for future in (queued, late):
+                try:
+                    await future
+                    raise AssertionError("A search whose deadline passed in the queue ran")
+                except SearchRejected as e:
+                    assert (e.status_code, e.reason) == (503, "expired")
+            assert calls == [("running",)]
+            stats = executor.stats()
+            assert stats["shed"] == {"queue_full": 1, "deadline": 1, "expired": 2}, stats
+            assert (stats["completed"], stats["in_flight"], stats["queue_depth"]) == (1, 0, 0)
+        finally:
+            gate.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
+    print("✅ Admission control passed")
+
+def test_saturated_api():
+    """/search answers 503 and 429 with Retry-After while saturated, on the standard and the fast path"""
+    print("Testing /search under saturation...")
+    names = (
+        "listings_file_path", "hot_reload_enabled", "warmup_enabled", "fast_search_enabled",
+        "search_max_in_flight", "search_max_queue", "max_response_time_ms",
+    )
+    saved = {name: getattr(settings, name) for name in names}
+    settings.listings_file_path, settings.hot_reload_enabled, settings.warmup_enabled = "listings.json", False, False
+    settings.search_max_in_flight, settings.search_max_queue, settings.max_response_time_ms = 1, 2, 60000
+    from app.main import app
+    import app.main as main
+    try:
+        for fast_path in (False, True):
+            settings.fast_search_enabled = fast_path
+            with TestClient(app) as client:
+                executor, search_service = main.search_controller.executor, main.search_controller.search_service
+                gate, calls = threading.Event(), []
+                search_service.search_locations = gated(gate, calls, search_service.search_locations)
+                search_service.search_json = gated(gate, calls, search_service.search_json)
+                answered = []
+
+                def search():
+                    answered.append(client.post("/search", json=QUERY))
+
+                threads = [threading.Thread(target=search) for _ in range(3)]
+                try:
+                    threads[0].start()
+                    wait_for(lambda: executor.in_flight == 1)
+                    threads[1].start()
+                    wait_for(lambda: executor.queued == 1)
+
+                    executor.average_search_seconds = executor.timeout_seconds
+                    shed = client.post("/search", json=QUERY)
+                    assert shed.status_code == 503, shed.status_code
+                    assert shed.headers["retry-after"] == "1" and "response time budget" in shed.json()["detail"]
+
+                    executor.average_search_seconds = 0.0
+                    threads[2].start()
+                    wait_for(lambda: executor.queued == 2)
+                    full = client.post("/search", json=QUERY)
+                    assert full.status_code == 429, full.status_code
+                    assert full.headers["retry-after"] == "1" and "queued" in full.json()["detail"]
+                    assert client.get("/health").status_code == 200
+                finally:
+                    gate.set()
+                    for thread in threads:
+                        thread.join()
+                assert [response.status_code for response in answered] == [200, 200, 200]
+                assert len(calls) == 3
+                assert executor.stats()["shed"] == {"queue_full": 1, "deadline": 1, "expired": 0}
+                metrics = client.get("/metrics").text
+                assert 'reason="queue_full"} 1' in metrics and 'reason="deadline"} 1' in metrics
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+    print("✅ Saturated /search passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting search executor tests...\n")
+
+    try:
+        test_executor_sheds_load()
+        print()
+
+        test_saturated_api()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,153 @@
+"""
+The sharded engine must answer every search, batch and page exactly like the single-process engine
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from app.config.settings import settings
+from app.models.vehicle import FleetVehicle, Vehicle
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from app.services.sharded_search import ShardedSearchEngine
+from app.utils.bin_packing import BinPackingAlgorithm
+from tests.helpers import random_fleet, random_records, random_sizes, reloaded_records
+
+def write_records(path, records):
+    with open(path, "w") as f:
+        json.dump(records, f)
+
+def local_results(store, rows):
+    """Local (location, rows, price) results as the engine's (location, location_id, listing_ids, price) tuples"""
+    return [
+        (location, store.location_ids[location], [store.ids[row] for row in listing_rows], price)
+        for location, listing_rows, price in rows
+    ]
+
+def pages(search_top, limit):
+    """Every result, fetched ``limit`` at a time after the last (price, location) seen"""
+    results, after = [], None
+    while True:
+        page = search_top(limit, after)
+        results += page
+        if len(page) < limit:
+            return results
+        after = (page[-1][3], page[-1][0])
+
+def check_engine(engine, local, rng):
+    """Searches, batches, top-k pages, fleets and statistics against the local service; returns the count"""
+    snapshot = local.listing_service.get_snapshot()
+    store = snapshot.store
+    checks = 0
+    queries = [random_sizes(rng) for _ in range(12)]
+    for sizes in queries:
+        expected = local_results(store, local.search_rows(sizes, snapshot))
+        assert engine.search(sizes) == expected, sizes
+        limit = rng.randint(1, 4)
+        assert pages(lambda n, after: engine.search_top(sizes, n, after), limit) == expected
+        assert engine.location_statistics(sizes) == local.location_statistics(sizes, snapshot)
+        checks += 1
+
+    found, seconds = engine.search_batch(queries + queries[:3])
+    assert len(seconds) == len(queries) + 3
+    expected, _ = local.search_rows_batch(queries + queries[:3], snapshot)
+    assert found == [local_results(store, rows) for rows in expected]
+
+    for _ in range(4):
+        blocks = BinPackingAlgorithm.vehicle_blocks(random_fleet(rng, 40))
+        expected = local_results(store, local.search_fleet_rows(blocks, snapshot))
+        assert engine.search_fleet(blocks) == expected, blocks
+        assert pages(lambda n, after: engine.search_fleet_top(blocks, n, after), rng.randint(1, 4)) == expected
+        checks += 1
+    return checks
+
+def test_engine_matches_local_search():
+    """Every shard count returns the local results, with each location at its global index"""
+    print("Testing the sharded engine against the local engine...")
+    rng = random.Random(1)
+    checks = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.json")
+        for worker_count in (1, 2, 3):
+            records = random_records(rng, 40, 300, yards=True)
+            write_records(path, records)
+            local = SearchService(ListingService(path, storage_backend="json"))
+            engine = ShardedSearchEngine(path, worker_count)
+            try:
+                store = local.listing_service.get_snapshot().store
+                assert engine.location_count == store.location_count and engine.listing_count == len(store)
+                checks += check_engine(engine, local, rng)
+
+                # Workers reload their shards and keep matching
+                write_records(path, reloaded_records(rng, records, worker_count))
+                assert engine.reload() is True and engine.reload() is False
+                local = SearchService(ListingService(path, storage_backend="json"))
+                checks += check_engine(engine, local, rng)
+            finally:
+                engine.close()
+    print(f"✅ Sharded engine passed - {checks} queries identical to the local engine")
+
+def test_search_service_over_shards():
+    """search_locations, search_batch, search_page cursors and search_fleet through an attached engine"""
+    print("Testing SearchService with a sharded engine attached...")
+    rng = random.Random(2)
+    enabled = settings.enable_caching
+    # Results must come from the workers, not from the cache
+    settings.enable_caching = False
+    checks = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "listings.json")
+            write_records(path, random_records(rng, 40, 300, yards=True))
+            local = SearchService(ListingService(path, storage_backend="json"))
+            sharded = SearchService(ListingService(path, storage_backend="json"))
+            engine = ShardedSearchEngine(path, 2)
+            try:
+                sharded.attach_sharded_engine(engine)
+                batch = []
+                for _ in range(15):
+                    vehicles = [Vehicle(length=size, quantity=1) for size in random_sizes(rng)]
+                    batch.append(vehicles)
+                    expected = local.search_locations(vehicles)
+                    assert sharded.search_locations(vehicles) == expected
+                    results, cursor = [], None
+                    limit = rng.randint(1, 4)
+                    while True:
+                        page, cursor = sharded.search_page(vehicles, limit, cursor)
+                        results += page
+                        if cursor is None:
+                            break
+                    assert results == expected
+                    fleet = [FleetVehicle(length=length, quantity=count) for length, count in random_fleet(rng, 40)]
+                    assert sharded.search_fleet(fleet) == local.search_fleet(fleet)
+                    checks += 1
+                expected = local.search_batch(batch).queries
+                assert [entry.results for entry in sharded.search_batch(batch).queries] == \
+                    [entry.results for entry in expected]
+            finally:
+                engine.close()
+    finally:
+        settings.enable_caching = enabled
+    print(f"✅ Sharded SearchService passed - {checks} searches, pages and fleets identical to the local engine")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting sharded search tests...\n")
+
+    try:
+        test_engine_matches_local_search()
+        print()
+
+        test_search_service_over_shards()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,211 @@
+"""
+The SQLite storage backend must serve the dataset the JSON backend serves, through a bounded block cache
+"""
+
+import json
+import os
+import random
+import tempfile
+
+from app.config.settings import settings
+from app.services.listing_backends import ListingBackend
+from app.services.listing_service import ListingService
+from app.services.search_service import SearchService
+from app.services.sqlite_listings_builder import build_sqlite_listings
+from app.utils.bin_packing import BinPackingAlgorithm
+from app.utils.sqlite_listings import LOCATION_BLOCK
+from benchmarks.synthetic import generate_listings
+from tests.helpers import random_fleet, random_records, random_sizes
+
+def sqlite_service(json_path, database_path, cache_locations):
+    """A ListingService over the database imported from ``json_path``"""
+    build_sqlite_listings(json_path, database_path)
+    settings.sqlite_database_path = database_path
+    settings.sqlite_cache_locations = cache_locations
+    return ListingService(storage_backend="sqlite")
+
+def write_json(path, records):
+    with open(path, "w") as f:
+        json.dump(records, f)
+
+def with_sqlite_settings(test):
+    """Run a test with the SQLite settings restored afterwards"""
+    def run():
+        database_path, cache_locations = settings.sqlite_database_path, settings.sqlite_cache_locations
+        try:
+            test()
+        finally:
+            settings.sqlite_database_path, settings.sqlite_cache_locations = database_path, cache_locations
+    run.__name__, run.__doc__ = test.__name__, test.__doc__
+    return run
+
+def named(store, rows):
+    return [
+        (store.location_ids[location], [store.ids[row] for row in listing_rows], price)
+        for location, listing_rows, price in rows
+    ]
+
+@with_sqlite_settings
+def test_sqlite_matches_json():
+    """Same listings, locations, prefilter, aggregates and search results as the JSON store"""
+    print("Testing the SQLite store against the JSON store...")
+    rng = random.Random(1)
+    checks = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, database_path = os.path.join(tmp, "listings.json"), os.path.join(tmp, "listings.db")
+        # Adversarial small datasets, and one spanning several location blocks
+        datasets = [random_records(rng, yards=True) for _ in range(12)] + [generate_listings(700, seed=1)]
+        for records in datasets:
+            write_json(json_path, records)
+            json_listings = ListingService(json_path, storage_backend="json")
+            # One cached block, so searches keep evicting and re-reading blocks
+            sqlite_listings = sqlite_service(json_path, database_path, LOCATION_BLOCK)
+            expected, snapshot = json_listings.get_snapshot(), sqlite_listings.get_snapshot()
+            expected_store, store = expected.store, snapshot.store
+
+            assert snapshot.dataset_hash == expected.dataset_hash
+            assert snapshot.stats.summary == expected.stats.summary
+            assert (len(store), store.location_count) == (len(expected_store), expected_store.location_count)
+            assert store.listings() == expected_store.listings()
+            for location in range(store.location_count):
+                location_id = expected_store.location_ids[location]
+                assert store.location_ids[location] == location_id
+                assert store.location_listings(location) == expected_store.location_listings(location)
+                assert store.find_location(location_id) == location
+            assert store.find_location("missing") is None
+
+            for solver in ("greedy", "exact"):
+                json_search = SearchService(json_listings, solver)
+                sqlite_search = SearchService(sqlite_listings, solver)
+                queries = [random_sizes(rng) for _ in range(8)]
+                for sizes in queries:
+                    rows = named(expected_store, json_search.search_rows(sizes, expected))
+                    assert named(store, sqlite_search.search_rows(sizes, snapshot)) == rows, (solver, sizes)
+                    limit = rng.randint(1, 5)
+                    assert named(store, sqlite_search.search_top_rows(sizes, limit, None, snapshot)) == rows[:limit]
+                    candidates = snapshot.capacity_index.candidate_locations(sizes)
+                    assert candidates.tolist() == expected.capacity_index.candidate_locations(sizes).tolist()
+                    assert snapshot.capacity_index.price_lower_bounds(sizes, candidates).tolist() == \
+                        expected.capacity_index.price_lower_bounds(sizes, candidates).tolist()
+                    checks += 1
+                found, _ = sqlite_search.search_rows_batch(queries, snapshot)
+                expected_found, _ = json_search.search_rows_batch(queries, expected)
+                assert [named(store, rows) for rows in found] == [named(expected_store, rows) for rows in expected_found]
+            blocks = BinPackingAlgorithm.vehicle_blocks(random_fleet(rng, 200))
+            greedy = SearchService(sqlite_listings, "greedy")
+            assert named(store, greedy.search_fleet_rows(blocks, snapshot)) == \
+                named(expected_store, greedy.search_fleet_rows(blocks, expected))
+            assert store.cache_stats()["cached_locations"] <= LOCATION_BLOCK
+    print(f"✅ SQLite store passed - {checks} searches identical to the JSON store")
+
+@with_sqlite_settings
+def test_block_cache_counters():
+    """Location blocks are read once, counted as hits and misses, and evicted least recently used first"""
+    print("Testing the SQLite block cache counters...")
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, database_path = os.path.join(tmp, "listings.json"), os.path.join(tmp, "listings.db")
+        write_json(json_path, generate_listings(3 * LOCATION_BLOCK, seed=2))
+
+        store = sqlite_service(json_path, database_path, 2 * LOCATION_BLOCK).get_snapshot().store
+        assert store.location_count == 3 * LOCATION_BLOCK
+
+        def counters():
+            stats = store.cache_stats()
+            return stats["hits"], stats["misses"], stats["evictions"], stats["cached_locations"]
+
+        assert counters() == (0, 0, 0, 0)
+        store.location_columns(0)
+        store.location_columns(LOCATION_BLOCK - 1)
+        assert counters() == (1, 1, 0, LOCATION_BLOCK)
+        store.location_columns(LOCATION_BLOCK)
+        assert counters() == (1, 2, 0, 2 * LOCATION_BLOCK)
+        # Touch block 0 so block 1 is the least recently used when block 2 comes in
+        store.location_columns(1)
+        store.location_columns(2 * LOCATION_BLOCK)
+        assert counters() == (2, 3, 1, 2 * LOCATION_BLOCK)
+        store.location_columns(2)
+        assert counters() == (3, 3, 1, 2 * LOCATION_BLOCK)
+        store.location_columns(LOCATION_BLOCK + 1)
+        assert counters() == (3, 4, 2, 2 * LOCATION_BLOCK)
+        # Ids of uncached blocks are looked up by key, without churning the cache
+        store.location_ids[2 * LOCATION_BLOCK + 5]
+        assert counters() == (3, 4, 2, 2 * LOCATION_BLOCK)
+        assert store.cache_stats()["max_cached_locations"] == 2 * LOCATION_BLOCK
+    print("✅ Block cache counters passed")
+
+@with_sqlite_settings
+def test_reload_only_when_rebuilt():
+    """A reload keeps the snapshot while the database is unchanged, and swaps it once it is rebuilt"""
+    print("Testing SQLite reloads...")
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, database_path = os.path.join(tmp, "listings.json"), os.path.join(tmp, "listings.db")
+        records = generate_listings(50, seed=3)
+        write_json(json_path, records)
+        listing_service = sqlite_service(json_path, database_path, LOCATION_BLOCK)
+        backend = listing_service.backend
+        assert isinstance(backend, ListingBackend)
+        snapshot = listing_service.get_snapshot()
+
+        assert backend.load(snapshot, snapshot.version + 1, 0.0) is None
+        assert listing_service.reload() is False
+        assert listing_service.get_snapshot() is snapshot
+        forced = backend.load(snapshot, snapshot.version + 1, 0.0, force=True)
+        assert forced is not None and forced.dataset_hash == snapshot.dataset_hash
+
+        write_json(json_path, records[: len(records) // 2])
+        build_sqlite_listings(json_path, database_path)
+        assert backend.dataset_hash() != snapshot.dataset_hash
+        assert listing_service.reload() is True
+        reloaded = listing_service.get_snapshot()
+        assert reloaded.version > snapshot.version
+        assert len(reloaded.store) == len(records) // 2
+        assert reloaded.dataset_hash == backend.dataset_hash()
+        # The previous snapshot keeps reading the database it was opened on
+        assert len(snapshot.store.listings()) == len(records)
+    print("✅ SQLite reload passed")
+
+def test_backends_are_abstract():
+    """ListingBackend cannot be instantiated without dataset_hash and load"""
+    print("Testing the ListingBackend interface...")
+    try:
+        ListingBackend()
+        raise AssertionError("ListingBackend was instantiated")
+    except TypeError:
+        pass
+
+    class HashOnly(ListingBackend):
+        def dataset_hash(self):
+            return ""
+
+    try:
+        HashOnly()
+        raise AssertionError("A backend without load was instantiated")
+    except TypeError:
+        pass
+    print("✅ ListingBackend interface passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting SQLite backend tests...\n")
+
+    try:
+        test_sqlite_matches_json()
+        print()
+
+        test_block_cache_counters()
+        print()
+
+        test_reload_only_when_rebuilt()
+        print()
+
+        test_backends_are_abstract()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,204 @@
+"""
+Negotiated wire formats and compression must carry the same results as the default JSON response
+"""
+
+import json
+import random
+
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.utils import compression
+from app.utils import wire_formats
+from app.utils.compression import negotiate_encoding, vary_accept_encoding
+from app.utils.wire_formats import (
+    COLUMNAR_MEDIA_TYPE, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, RESULT_FIELDS, negotiate_media_type,
+)
+
+# Default fields, a pair given out of order, one field
+PROJECTIONS = [None, "location_id,total_price_in_cents", "total_price_in_cents,location_id", "listing_ids"]
+
+def random_query(rng):
+    return [{"length": rng.randint(1, 60), "quantity": rng.randint(1, 2)} for _ in range(rng.randint(1, 3))]
+
+def decode(media_type, content):
+    """Response body back to one dictionary per result, whatever the format"""
+    if media_type == JSON_MEDIA_TYPE:
+        return json.loads(content)
+    document = wire_formats.msgpack.unpackb(content) if media_type == MSGPACK_MEDIA_TYPE else json.loads(content)
+    count = len(next(iter(document.values())))
+    return [{name: column[i] for name, column in document.items()} for i in range(count)]
+
+def with_app_settings(**overrides):
+    """Run a test against the app on listings.json, with some settings overridden and all restored afterwards"""
+    overrides = dict(overrides, listings_file_path="listings.json", hot_reload_enabled=False, warmup_enabled=False)
+
+    def decorate(test):
+        def run():
+            saved = {name: getattr(settings, name) for name in list(overrides) + ["fast_search_enabled"]}
+            for name, value in overrides.items():
+                setattr(settings, name, value)
+            try:
+                test()
+            finally:
+                for name, value in saved.items():
+                    setattr(settings, name, value)
+        run.__name__, run.__doc__ = test.__name__, test.__doc__
+        return run
+    return decorate
+
+def test_media_type_negotiation():
+    """The best supported Accept media range wins; anything else falls back to JSON"""
+    print("Testing media type negotiation...")
+    cases = {
+        None: JSON_MEDIA_TYPE,
+        "": JSON_MEDIA_TYPE,
+        "*/*": JSON_MEDIA_TYPE,
+        "text/html": JSON_MEDIA_TYPE,
+        COLUMNAR_MEDIA_TYPE: COLUMNAR_MEDIA_TYPE,
+        "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+        f"{MSGPACK_MEDIA_TYPE};q=0.5, {COLUMNAR_MEDIA_TYPE};q=0.9": COLUMNAR_MEDIA_TYPE,
+        f"{COLUMNAR_MEDIA_TYPE}, {MSGPACK_MEDIA_TYPE}": COLUMNAR_MEDIA_TYPE,
+        f"{MSGPACK_MEDIA_TYPE};q=0, application/json;q=0.1": JSON_MEDIA_TYPE,
+        f"{COLUMNAR_MEDIA_TYPE};q=oops": JSON_MEDIA_TYPE,
+    }
+    for accept, expected in cases.items():
+        assert negotiate_media_type(accept) == expected, accept
+    msgpack = wire_formats.msgpack
+    wire_formats.msgpack = None
+    try:
+        assert negotiate_media_type(MSGPACK_MEDIA_TYPE) == JSON_MEDIA_TYPE
+        assert negotiate_media_type(f"{MSGPACK_MEDIA_TYPE}, {COLUMNAR_MEDIA_TYPE};q=0.1") == COLUMNAR_MEDIA_TYPE
+    finally:
+        wire_formats.msgpack = msgpack
+    print("✅ Media type negotiation passed")
+
+def test_encoding_negotiation():
+    """brotli wins ties, q=0 refuses a coding, and without brotli or a known coding the body goes as is"""
+    print("Testing Accept-Encoding negotiation...")
+    cases = {
+        None: None,
+        "": None,
+        "identity": None,
+        "deflate, compress": None,
+        "gzip": "gzip",
+        "gzip, br": "br",
+        "br;q=0.5, gzip": "gzip",
+        "br;q=0, gzip;q=0": None,
+        "*": "br",
+        "*;q=0.2, gzip;q=0.5": "gzip",
+        "br;q=0, *": "gzip",
+        "gzip;q=oops, br;q=0": None,
+    }
+    for accept_encoding, expected in cases.items():
+        assert negotiate_encoding(accept_encoding) == expected, accept_encoding
+    for headers, expected in (
+        ([], [(b"vary", b"Accept-Encoding")]),
+        ([(b"Vary", b"Accept")], [(b"Vary", b"Accept, Accept-Encoding")]),
+        ([(b"vary", b"accept-encoding")], [(b"vary", b"accept-encoding")]),
+        ([(b"vary", b"*")], [(b"vary", b"*")]),
+    ):
+        assert vary_accept_encoding(headers) == expected, headers
+    brotli = compression.brotli
+    compression.brotli = None
+    try:
+        assert compression.available_encodings() == ["gzip"]
+        assert negotiate_encoding("br") is None
+        assert negotiate_encoding("br, gzip;q=0.1") == "gzip"
+        assert negotiate_encoding("*") == "gzip"
+    finally:
+        compression.brotli = brotli
+    print("✅ Accept-Encoding negotiation passed")
+
+@with_app_settings()
+def test_formats_match_default_json():
+    """Columnar JSON, MessagePack and field projections decode to the default JSON results"""
+    print("Testing wire format round trips...")
+    rng = random.Random(1)
+    from app.main import app
+    checks = 0
+    for fast_path in (False, True):
+        settings.fast_search_enabled = fast_path
+        with TestClient(app) as client:
+            for _ in range(15):
+                query = random_query(rng)
+                default = client.post("/search", json=query)
+                assert default.status_code == 200 and default.headers["content-type"] == JSON_MEDIA_TYPE
+                expected = default.json()
+                for media_type in (JSON_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE, MSGPACK_MEDIA_TYPE):
+                    for fields in PROJECTIONS:
+                        params = {"fields": fields} if fields else {}
+                        response = client.post("/search", params=params, json=query, headers={"Accept": media_type})
+                        assert response.status_code == 200, (media_type, fields)
+                        assert response.headers["content-type"] == media_type
+                        names = [name for name in RESULT_FIELDS if fields is None or name in fields.split(",")]
+                        projected = [{name: result[name] for name in names} for result in expected]
+                        assert decode(media_type, response.content) == projected, (query, media_type, fields)
+                        checks += 1
+            unknown = client.post("/search", params={"fields": "price"}, json=[{"length": 10, "quantity": 1}])
+            assert unknown.status_code == 400
+    print(f"✅ Wire formats passed - {checks} responses identical to the default JSON")
+
+@with_app_settings(compression_enabled=True, compression_min_bytes=1024)
+def test_compression_negotiation():
+    """Compressed bodies decode to the uncompressed one; unknown codings and small bodies go uncompressed"""
+    print("Testing response compression negotiation...")
+    from app.main import app
+    query = [{"length": 10, "quantity": 1}]
+    for fast_path in (False, True):
+        settings.fast_search_enabled = fast_path
+        with TestClient(app) as client:
+            plain = client.post("/search", json=query, headers={"Accept-Encoding": "identity"})
+            assert "content-encoding" not in plain.headers and len(plain.content) >= 1024
+            for accept_encoding, expected in (("gzip", "gzip"), ("br, gzip", "br"), ("br;q=0, gzip", "gzip"),
+                                              ("deflate", None), ("br;q=0, gzip;q=0", None)):
+                response = client.post("/search", json=query, headers={"Accept-Encoding": accept_encoding})
+                assert response.status_code == 200
+                assert response.headers.get("content-encoding") == expected, (accept_encoding, fast_path)
+                # httpx decodes gzip and brotli bodies; the bytes on the wire are the compressed ones
+                assert response.content == plain.content, accept_encoding
+                if expected is not None:
+                    assert response.num_bytes_downloaded < len(plain.content)
+                # Compressed or not, the body depended on Accept-Encoding
+                assert response.headers["vary"] == "Accept, Accept-Encoding", (accept_encoding, fast_path)
+            small = client.post("/search", json=[{"length": 100, "quantity": 5}], headers={"Accept-Encoding": "gzip"})
+            assert len(small.content) < 1024 and "content-encoding" not in small.headers
+            assert plain.headers["vary"] == small.headers["vary"] == "Accept, Accept-Encoding"
+            assert client.get("/health", headers={"Accept-Encoding": "gzip"}).headers["vary"] == "Accept-Encoding"
+            assert client.get("/stats", headers={"Accept-Encoding": ""}).headers["vary"] == "Accept-Encoding"
+            brotli = compression.brotli
+            compression.brotli = None
+            try:
+                response = client.post("/search", json=query, headers={"Accept-Encoding": "br, gzip;q=0.5"})
+                assert response.headers["content-encoding"] == "gzip" and response.content == plain.content
+                response = client.post("/search", json=query, headers={"Accept-Encoding": "br"})
+                assert "content-encoding" not in response.headers and response.content == plain.content
+            finally:
+                compression.brotli = brotli
+    print("✅ Compression negotiation passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("🚀 Starting wire format tests...\n")
+
+    try:
+        test_media_type_negotiation()
+        print()
+
+        test_encoding_negotiation()
+        print()
+
+        test_formats_match_default_json()
+        print()
+
+        test_compression_negotiation()
+        print()
+
+        print("🎉 All tests passed!")
+
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_all_tests()
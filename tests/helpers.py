@@ -0,0 +1,97 @@
+"""
+Adversarial random records and queries the randomized tests draw from
+"""
+
+import random
+from typing import Any, Dict, List, Tuple
+
+from app.utils.bin_packing import BinPackingAlgorithm
+
+
+def random_record(rng: random.Random, listing_id: str, location_count: int, yards: bool = False) -> Dict[str, Any]:
+    """
+    One listing record for randomized tests
+
+    Unlike ``generate_listings``, dimensions are arbitrary feet or round
+    multiples of 10 (some too small for any vehicle) and prices are often
+    round, so equal price-per-lane ties are common.
+
+    Args:
+        rng: Random source
+        listing_id: Id of the record
+        location_count: The record goes to one of ``location-0`` .. ``location-{location_count - 1}``
+        yards: Also draw widths of 100 to 500 ft, large enough for fleets
+    """
+    widths = [rng.randint(1, 120), rng.randrange(10, 110, 10)]
+    if yards:
+        widths.append(rng.randrange(100, 510, 10))
+    return {
+        "id": listing_id,
+        "location_id": f"location-{rng.randrange(location_count)}",
+        "length": rng.choice([rng.randint(1, 120), rng.randrange(10, 110, 10)]),
+        "width": rng.choice(widths),
+        "price_in_cents": rng.choice([rng.randint(1, 50000), 1000 * rng.randint(1, 6)]),
+    }
+
+
+def random_records(
+    rng: random.Random,
+    max_locations: int = 40,
+    max_listings: int = 300,
+    yards: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    A random dataset of ``random_record`` listings for randomized tests
+
+    Args:
+        rng: Random source
+        max_locations: Largest number of locations
+        max_listings: Largest number of listings
+        yards: See ``random_record``
+
+    Returns:
+        List[Dict[str, Any]]: Records ``listing-0``, ``listing-1``, ... in file order
+    """
+    location_count = rng.randint(1, max_locations)
+    return [random_record(rng, f"listing-{i}", location_count, yards) for i in range(rng.randint(1, max_listings))]
+
+
+def random_sizes(rng: random.Random, max_vehicles: int = 5) -> List[int]:
+    """Rounded lengths of 1 to ``max_vehicles`` random vehicles, largest first, as searches take them"""
+    return BinPackingAlgorithm.vehicle_sizes([rng.randint(1, 100) for _ in range(rng.randint(1, max_vehicles))])
+
+
+def random_fleet(rng: random.Random, max_vehicles: int = 500) -> List[Tuple[int, int]]:
+    """(length, quantity) pairs adding up to between 1 and ``max_vehicles`` vehicles"""
+    remaining = rng.randint(1, max_vehicles)
+    fleet = []
+    while remaining:
+        quantity = rng.randint(1, remaining)
+        fleet.append((rng.randint(1, 100), quantity))
+        remaining -= quantity
+    return fleet
+
+
+def reloaded_records(rng: random.Random, records: List[Dict[str, Any]], tag: Any) -> List[Dict[str, Any]]:
+    """
+    The next version of a ``random_records`` file, as a reload would find it
+
+    Most records stay as they are; some are dropped, repriced or resized,
+    and new ones (ids ``added-{tag}-0``, ...) join existing or new locations.
+    """
+    changed = []
+    for record in records:
+        roll = rng.random()
+        if roll < 0.1:
+            continue
+        if roll < 0.25:
+            record = dict(record, price_in_cents=rng.randint(1, 50000))
+        elif roll < 0.3:
+            record = dict(record, length=rng.randint(1, 120), width=rng.randint(1, 120))
+        changed.append(record)
+    for i in range(rng.randint(0, 20)):
+        record = random_record(rng, f"added-{tag}-{i}", 60)
+        if rng.random() < 0.3:
+            record["location_id"] = f"fresh-{rng.randrange(5)}"
+        changed.append(record)
+    return changed